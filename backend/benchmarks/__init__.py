@@ -0,0 +1,6 @@
+"""
+Offline API benchmarks
+In-memory Supabase stand-in (fake_supabase), deterministic seed data (seed),
+the SQL functions the routes call (rpc_handlers), hot-path scenarios (scenarios) and the load runner (runner).
+Entry point: scripts/benchmark_api.py
+"""
@@ -0,0 +1,675 @@
+"""
+Fake Supabase client
+In-memory stand-in for the parts of supabase-py used by the backend:
+table()/from_() query builders (select with embedded resources, filters, or_/not_,
+order/range/limit, single/maybe_single, count="exact", insert/upsert/update/delete),
+rpc() with registered handlers, and the auth calls made by utils/auth.py and
+routers/auth.py. Every execute() can sleep for a simulated round-trip so that
+query counts show up in latency the way they do against a real PostgREST.
+
+Not a database: no constraints, types are whatever the seeded rows hold, and
+comparisons coerce the filter value to the stored value's type.
+"""
+
+import base64
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Columns that are FKs but whose name doesn't give away the target table
+FOREIGN_KEYS: Dict[Tuple[str, str], str] = {
+    ("tasks", "assigned_to"): "employees",
+    ("tasks", "created_by"): "users",
+    ("tasks", "group_id"): "task_groups",
+    ("task_comments", "user_id"): "users",
+    ("task_assignments", "assigned_to"): "employees",
+    ("task_assignments", "assigned_by"): "users",
+    ("task_checklist_items", "assignee_id"): "employees",
+    ("task_checklist_items", "checklist_id"): "task_checklists",
+    ("task_checklist_assignments", "checklist_id"): "task_checklists",
+    ("projects", "manager_id"): "employees",
+    ("project_team", "user_id"): "users",
+    ("employees", "manager_id"): "employees",
+    ("journal_entry_lines", "entry_id"): "journal_entries",
+    ("internal_messages", "sender_id"): "users",
+    ("internal_conversation_participants", "user_id"): "users",
+    ("quotes", "created_by"): "employees",
+    ("invoices", "created_by"): "employees",
+}
+
+_EMBED = re.compile(r"^(?:(?P<alias>[\w]+):)?(?P<name>[\w]+)(?:!(?P<hint>[\w]+))?\((?P<columns>.*)\)$", re.S)
+_FILTER = re.compile(r"^(?P<column>[\w.]+)\.(?P<negate>not\.)?(?P<op>\w+)\.(?P<value>.*)$", re.S)
+
+
+class FakeAPIError(Exception):
+    """Raised where PostgREST would answer with an error"""
+
+    def __init__(self, message: str, code: str = "PGRST000", details: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.details = details
+
+
+def _split_top_level(text: str, separator: str = ",") -> List[str]:
+    """Split on separators outside parentheses"""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == separator and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def _singular(table: str) -> str:
+    if table.endswith("ies"):
+        return table[:-3] + "y"
+    if table.endswith("ses"):
+        return table[:-2]
+    return table[:-1] if table.endswith("s") else table
+
+
+def _coerce(value: Any, like: Any) -> Any:
+    """Convert a filter value to the type of the stored value"""
+    if value is None or like is None:
+        return value
+    if isinstance(like, bool):
+        return value if isinstance(value, bool) else str(value).lower() == "true"
+    if isinstance(like, (int, float)) and not isinstance(value, (int, float)):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+    if isinstance(like, str) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _like(pattern: str, case_insensitive: bool) -> "re.Pattern":
+    regex = "^" + ".*".join(re.escape(part) for part in str(pattern).replace("*", "%").split("%")) + "$"
+    return re.compile(regex, re.I | re.S if case_insensitive else re.S)
+
+
+def _compare(stored: Any, op: str, value: Any) -> bool:
+    if op == "is":
+        if str(value).lower() in ("null", "none") or value is None:
+            return stored is None
+        return stored is _coerce(value, True)
+    if op == "in":
+        return stored is not None and stored in {_coerce(v, stored) for v in value}
+    if op in ("like", "ilike"):
+        return stored is not None and bool(_like(value, op == "ilike").match(str(stored)))
+    if op == "cs":
+        items = value if isinstance(value, (list, tuple)) else [value]
+        return isinstance(stored, list) and all(item in stored for item in items)
+    if stored is None:
+        return False
+    value = _coerce(value, stored)
+    try:
+        if op == "eq":
+            return stored == value
+        if op == "neq":
+            return stored != value
+        if op == "gt":
+            return stored > value
+        if op == "gte":
+            return stored >= value
+        if op == "lt":
+            return stored < value
+        if op == "lte":
+            return stored <= value
+    except TypeError:
+        return False
+    raise FakeAPIError(f"Unsupported operator {op}")
+
+
+def _parse_or(expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate for a PostgREST logic tree such as a.eq.1,and(b.gt.2,c.is.null)"""
+    terms = []
+    for part in _split_top_level(expression):
+        if part.startswith(("and(", "or(")):
+            inner = part[part.index("(") + 1:-1]
+            if part.startswith("and("):
+                predicates = [_parse_or(term) for term in _split_top_level(inner)]
+                terms.append(lambda row, predicates=predicates: all(p(row) for p in predicates))
+            else:
+                terms.append(_parse_or(inner))
+            continue
+        match = _FILTER.match(part)
+        if not match:
+            raise FakeAPIError(f"Unsupported or_ term: {part}")
+        column, op, raw, negate = match["column"], match["op"], match["value"], bool(match["negate"])
+        value: Any = raw
+        if op == "in":
+            value = [v.strip().strip('"') for v in raw.strip("()").split(",")]
+        elif isinstance(raw, str):
+            value = raw.strip('"')
+        terms.append(
+            lambda row, column=column, op=op, value=value, negate=negate:
+            _compare(row.get(column), op, value) != negate
+        )
+    return lambda row: any(term(row) for term in terms)
+
+
+class FakeResponse:
+    """Shape of postgrest's APIResponse"""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self):
+        return f"FakeResponse(data={self.data!r}, count={self.count!r})"
+
+
+class FakeQuery:
+    """Chainable query builder; nothing runs before execute()"""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._action = "select"
+        self._columns = "*"
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._returning = "representation"
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        # Filters on embedded columns run after projection
+        self._embed_filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._eq_index: Optional[Tuple[str, Any]] = None
+        self._orders: List[Tuple[str, bool, Optional[bool]]] = []
+        self._offset = 0
+        self._limit: Optional[int] = None
+        self._single: Optional[str] = None
+        self._head = False
+        self._negate_next = False
+
+    # ------------------------------------------------------------ actions
+
+    def select(self, *columns: str, count: Optional[str] = None, head: Optional[bool] = None):
+        self._columns = ",".join(columns) if columns else "*"
+        self._count = count
+        self._head = bool(head)
+        return self
+
+    def insert(self, json: Any, count: Optional[str] = None, returning: str = "representation", upsert: bool = False, **kwargs):
+        self._action = "upsert" if upsert else "insert"
+        self._payload = json
+        self._count = count
+        self._returning = getattr(returning, "value", returning)
+        return self
+
+    def upsert(self, json: Any, count: Optional[str] = None, returning: str = "representation",
+               ignore_duplicates: bool = False, on_conflict: str = "", **kwargs):
+        self._action = "upsert"
+        self._payload = json
+        self._count = count
+        self._returning = getattr(returning, "value", returning)
+        self._on_conflict = on_conflict or None
+        return self
+
+    def update(self, json: Dict[str, Any], count: Optional[str] = None, returning: str = "representation", **kwargs):
+        self._action = "update"
+        self._payload = json
+        self._count = count
+        self._returning = getattr(returning, "value", returning)
+        return self
+
+    def delete(self, count: Optional[str] = None, returning: str = "representation", **kwargs):
+        self._action = "delete"
+        self._count = count
+        self._returning = getattr(returning, "value", returning)
+        return self
+
+    # ------------------------------------------------------------ filters
+
+    def _add_filter(self, column: str, op: str, value: Any, negate: bool = False):
+        negate, self._negate_next = negate or self._negate_next, False
+        if op == "eq" and not negate and self._eq_index is None and "." not in column:
+            # Served from the column index instead of a scan
+            self._eq_index = (column, value)
+            return self
+        if "." in column:
+            embed, _, field = column.partition(".")
+
+            def predicate(row, embed=embed, field=field):
+                target = row.get(embed)
+                if isinstance(target, list):
+                    return any(_compare((item or {}).get(field), op, value) for item in target) != negate
+                return _compare((target or {}).get(field), op, value) != negate
+            self._embed_filters.append(predicate)
+            return self
+        else:
+            def predicate(row, column=column):
+                return _compare(row.get(column), op, value) != negate
+        self._filters.append(predicate)
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._add_filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any):
+        return self._add_filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any):
+        return self._add_filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any):
+        return self._add_filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any):
+        return self._add_filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any):
+        return self._add_filter(column, "lte", value)
+
+    def like(self, column: str, pattern: str):
+        return self._add_filter(column, "like", pattern)
+
+    def ilike(self, column: str, pattern: str):
+        return self._add_filter(column, "ilike", pattern)
+
+    def is_(self, column: str, value: Any):
+        return self._add_filter(column, "is", value)
+
+    def in_(self, column: str, values: Any):
+        return self._add_filter(column, "in", list(values))
+
+    def contains(self, column: str, value: Any):
+        return self._add_filter(column, "cs", value)
+
+    def match(self, query: Dict[str, Any]):
+        for column, value in query.items():
+            self._add_filter(column, "eq", value)
+        return self
+
+    def filter(self, column: str, operator: str, criteria: Any):
+        negate = operator.startswith("not.")
+        op = operator[4:] if negate else operator
+        if op == "in" and isinstance(criteria, str):
+            criteria = [v.strip().strip('"') for v in criteria.strip("()").split(",")]
+        return self._add_filter(column, op, criteria, negate=negate)
+
+    def or_(self, filters: str, reference_table: Optional[str] = None):
+        self._filters.append(_parse_or(filters))
+        return self
+
+    @property
+    def not_(self) -> "FakeQuery":
+        """builder.not_.<filter>(...): like postgrest, negates the next filter and returns the builder"""
+        self._negate_next = True
+        return self
+
+    # ---------------------------------------------------------- modifiers
+
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None, foreign_table: Optional[str] = None, **kwargs):
+        if not foreign_table and "." not in column:
+            self._orders.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size: int, foreign_table: Optional[str] = None, **kwargs):
+        if not foreign_table:
+            self._limit = size
+        return self
+
+    def offset(self, size: int):
+        self._offset = size
+        return self
+
+    def range(self, start: int, end: int, foreign_table: Optional[str] = None, **kwargs):
+        if not foreign_table:
+            self._offset = start
+            self._limit = end - start + 1
+        return self
+
+    def single(self):
+        self._single = "single"
+        return self
+
+    def maybe_single(self):
+        self._single = "maybe"
+        return self
+
+    # ---------------------------------------------------------- execution
+
+    def _matching(self) -> List[Dict[str, Any]]:
+        if self._eq_index:
+            rows = self._db._lookup(self._table, *self._eq_index)
+        else:
+            rows = self._db._rows(self._table)
+        return [row for row in rows if all(predicate(row) for predicate in self._filters)]
+
+    def _sorted(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for column, desc, nullsfirst in reversed(self._orders):
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            try:
+                present.sort(key=lambda row: row[column], reverse=desc)
+            except TypeError:
+                present.sort(key=lambda row: str(row[column]), reverse=desc)
+            # PostgreSQL default: NULLS LAST for ASC, NULLS FIRST for DESC
+            nulls_first = desc if nullsfirst is None else nullsfirst
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def execute(self) -> Optional[FakeResponse]:
+        self._db._round_trip(self._table, self._action)
+        with self._db._lock:
+            if self._action == "select":
+                return self._execute_select()
+            if self._action in ("insert", "upsert"):
+                return self._execute_write(self._db._insert(self._table, self._payload, self._action == "upsert", self._on_conflict))
+            if self._action == "update":
+                rows = self._matching()
+                for row in rows:
+                    row.update(self._payload)
+                self._db._touch(self._table)
+                return self._execute_write(rows)
+            rows = self._matching()
+            self._db._delete(self._table, rows)
+            return self._execute_write(rows)
+
+    def _execute_write(self, rows: List[Dict[str, Any]]) -> FakeResponse:
+        count = len(rows) if self._count else None
+        data = [] if self._returning == "minimal" else [dict(row) for row in rows]
+        return FakeResponse(data, count)
+
+    def _execute_select(self) -> Optional[FakeResponse]:
+        rows = self._sorted(self._matching())
+        end = None if self._limit is None else self._offset + self._limit
+        if self._embed_filters or "!inner" in self._columns:
+            # Embedded filters and inner joins decide membership: project everything first
+            projected = [self._db._project(self._table, row, self._columns) for row in rows]
+            projected = [
+                row for row in projected
+                if row is not None and all(predicate(row) for predicate in self._embed_filters)
+            ]
+            total = len(projected)
+            page = projected[self._offset:end]
+        else:
+            # Only the requested page is projected (embeds resolved per returned row)
+            total = len(rows)
+            page = [self._db._project(self._table, row, self._columns) for row in rows[self._offset:end]]
+        count = total if self._count else None
+        if self._head:
+            return FakeResponse([], count)
+        if self._single:
+            if len(page) == 1:
+                return FakeResponse(page[0], count)
+            if not page and self._single == "maybe":
+                return None
+            raise FakeAPIError(
+                "JSON object requested, multiple (or no) rows returned",
+                code="PGRST116",
+                details=f"The result contains {len(page)} rows",
+            )
+        return FakeResponse(page, count)
+
+
+class _FakeAdminAuth:
+    def __init__(self, db: "FakeSupabase"):
+        self._db = db
+
+    def create_user(self, attributes: Dict[str, Any]):
+        self._db._round_trip("auth.users", "insert")
+        with self._db._lock:
+            email = attributes["email"].lower()
+            if email in self._db.auth_users:
+                raise FakeAPIError("A user with this email address has already been registered", code="422")
+            user_id = str(uuid.uuid4())
+            self._db.auth_users[email] = {"id": user_id, "password": attributes.get("password")}
+        return SimpleNamespace(user=self._db._auth_user(user_id, email, attributes.get("user_metadata") or {}))
+
+    def delete_user(self, user_id: str):
+        with self._db._lock:
+            for email, record in list(self._db.auth_users.items()):
+                if record["id"] == user_id:
+                    del self._db.auth_users[email]
+
+
+class _FakeAuth:
+    def __init__(self, db: "FakeSupabase"):
+        self._db = db
+        self.admin = _FakeAdminAuth(db)
+
+    def sign_in_with_password(self, credentials: Dict[str, str]):
+        self._db._round_trip("auth.token", "rpc")
+        email = credentials["email"].lower()
+        record = self._db.auth_users.get(email)
+        if not record or record.get("password") != credentials.get("password"):
+            raise FakeAPIError("Invalid login credentials", code="400")
+        return SimpleNamespace(
+            user=self._db._auth_user(record["id"], email),
+            session=SimpleNamespace(access_token=self._db.token_for(record["id"]), refresh_token="refresh"),
+        )
+
+    def get_user(self, token: str):
+        self._db._round_trip("auth.user", "rpc")
+        user_id = self._db.user_for_token(token)
+        if not user_id:
+            raise FakeAPIError("invalid JWT: unable to parse or verify signature", code="401")
+        users = self._db._lookup("users", "id", user_id)
+        email = users[0]["email"] if users else f"{user_id}@example.com"
+        return SimpleNamespace(user=self._db._auth_user(user_id, email))
+
+    def sign_out(self):
+        return None
+
+
+class FakeSupabase:
+    """In-memory tables behind the supabase-py client interface"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        # Simulated PostgREST round-trip per execute() (blocking, like the real sync client)
+        self.latency = latency_ms / 1000
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.auth_users: Dict[str, Dict[str, Any]] = {}
+        self.rpc_handlers: Dict[str, Callable[["FakeSupabase", Dict[str, Any]], Any]] = {}
+        self.auth = _FakeAuth(self)
+        self._lock = threading.RLock()
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._indexes: Dict[Tuple[str, str], Tuple[int, Dict[Any, List[Dict[str, Any]]]]] = {}
+        self.query_count = 0
+
+    # ------------------------------------------------------------ client API
+
+    def table(self, table_name: str) -> FakeQuery:
+        return FakeQuery(self, table_name)
+
+    def from_(self, table_name: str) -> FakeQuery:
+        return FakeQuery(self, table_name)
+
+    def rpc(self, fn: str, params: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        db = self
+        handler = self.rpc_handlers.get(fn)
+
+        class _RPC:
+            def execute(self_inner):
+                db._round_trip(f"rpc:{fn}", "rpc")
+                if handler is None:
+                    raise FakeAPIError(f"Could not find the function public.{fn}", code="PGRST202")
+                with db._lock:
+                    return FakeResponse(handler(db, params or {}))
+
+        return _RPC()
+
+    # --------------------------------------------------------------- auth
+
+    @staticmethod
+    def token_for(user_id: str) -> str:
+        """JWT-shaped bearer token (3 parts) understood by auth.get_user"""
+        payload = base64.urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+        return f"fake.{payload}.signature"
+
+    @staticmethod
+    def user_for_token(token: str) -> Optional[str]:
+        parts = token.split(".")
+        if len(parts) != 3 or parts[0] != "fake":
+            return None
+        try:
+            return base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)).decode()
+        except ValueError:
+            return None
+
+    def _auth_user(self, user_id: str, email: str, user_metadata: Optional[Dict[str, Any]] = None):
+        return SimpleNamespace(id=user_id, email=email, user_metadata=user_metadata or {}, app_metadata={})
+
+    def add_auth_user(self, user_id: str, email: str, password: str):
+        self.auth_users[email.lower()] = {"id": user_id, "password": password}
+
+    # ------------------------------------------------------------ storage
+
+    def _round_trip(self, table: str, action: str):
+        self.query_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _rows(self, table: str) -> List[Dict[str, Any]]:
+        return self.tables.get(table, [])
+
+    def _touch(self, table: str):
+        self._versions[table] += 1
+
+    def _lookup(self, table: str, column: str, value: Any) -> List[Dict[str, Any]]:
+        """Rows with column == value via a lazily built hash index"""
+        version = self._versions[table]
+        cached = self._indexes.get((table, column))
+        if cached is None or cached[0] != version:
+            index: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+            for row in self._rows(table):
+                index[row.get(column)].append(row)
+            cached = (version, index)
+            self._indexes[(table, column)] = cached
+        index = cached[1]
+        if value in index:
+            return index[value]
+        # Filter value of another type than the stored one (e.g. "true" for a boolean)
+        for key, rows in index.items():
+            if key is not None:
+                return index.get(_coerce(value, key), [])
+        return []
+
+    def _insert(self, table: str, payload: Any, upsert: bool, on_conflict: Optional[str]) -> List[Dict[str, Any]]:
+        records = payload if isinstance(payload, list) else [payload]
+        keys = [key.strip() for key in (on_conflict or "id").split(",")]
+        now = datetime.now(timezone.utc).isoformat()
+        existing_by_key = {}
+        if upsert:
+            existing_by_key = {tuple(row.get(key) for key in keys): row for row in self._rows(table)}
+        written = []
+        for record in records:
+            record = dict(record)
+            record.setdefault("id", str(uuid.uuid4()))
+            record.setdefault("created_at", now)
+            record.setdefault("updated_at", now)
+            existing = existing_by_key.get(tuple(record.get(key) for key in keys)) if upsert else None
+            if existing is not None:
+                existing.update(record)
+                written.append(existing)
+            else:
+                self.tables[table].append(record)
+                written.append(record)
+        self._touch(table)
+        return written
+
+    def _delete(self, table: str, rows: List[Dict[str, Any]]):
+        doomed = {id(row) for row in rows}
+        self.tables[table] = [row for row in self._rows(table) if id(row) not in doomed]
+        self._touch(table)
+
+    # -------------------------------------------------------------- embeds
+
+    def _target_table(self, table: str, column: str) -> Optional[str]:
+        target = FOREIGN_KEYS.get((table, column))
+        if target:
+            return target
+        if column.endswith("_id"):
+            base = column[:-3]
+            for candidate in (base + "s", base[:-1] + "ies" if base.endswith("y") else None, base):
+                if candidate and candidate in self.tables:
+                    return candidate
+        return None
+
+    def _fk_column(self, table: str, target: str, hint: Optional[str]) -> Optional[str]:
+        """Column on table referencing target (to-one embed)"""
+        if hint:
+            if hint.endswith("_fkey"):
+                return hint[len(table) + 1:-5] if hint.startswith(table + "_") else hint[:-5]
+            return hint
+        for (fk_table, column), fk_target in FOREIGN_KEYS.items():
+            if fk_table == table and fk_target == target and column == f"{_singular(target)}_id":
+                return column
+        column = f"{_singular(target)}_id"
+        sample = self._rows(table)[:1]
+        if sample and column in sample[0]:
+            return column
+        return None
+
+    def _reverse_fk_column(self, table: str, target: str) -> Optional[str]:
+        """Column on target referencing table (to-many embed)"""
+        for (fk_table, column), fk_target in FOREIGN_KEYS.items():
+            if fk_table == target and fk_target == table:
+                return column
+        return f"{_singular(table)}_id"
+
+    def _project(self, table: str, row: Dict[str, Any], columns: str) -> Optional[Dict[str, Any]]:
+        """Row shaped by a PostgREST select string (None if an !inner embed is missing)"""
+        result: Dict[str, Any] = {}
+        for item in _split_top_level(columns.replace("\n", " ")):
+            item = item.strip()
+            if not item:
+                continue
+            if item == "*":
+                result.update(row)
+                continue
+            embed = _EMBED.match(item)
+            if embed:
+                value = self._embed(table, row, embed)
+                if value is _MISSING_INNER:
+                    return None
+                result[embed["alias"] or embed["name"]] = value
+                continue
+            alias, _, column = item.rpartition(":")
+            column = column.split("::")[0].strip()
+            result[alias or column] = row.get(column)
+        return result
+
+    def _embed(self, table: str, row: Dict[str, Any], embed: "re.Match") -> Any:
+        name, hint, columns = embed["name"], embed["hint"], embed["columns"] or "*"
+        inner = hint == "inner"
+        if hint in ("inner", "left"):
+            hint = None
+        if name in self.tables or FOREIGN_KEYS.get((table, name)) is None and not name.endswith("_id"):
+            target, fk_column = name, self._fk_column(table, name, hint)
+        else:
+            # alias:fk_column(...) form
+            target, fk_column = self._target_table(table, name), name
+        if target is None:
+            return None
+
+        if fk_column and fk_column in row:
+            matches = self._lookup(target, "id", row.get(fk_column)) if row.get(fk_column) is not None else []
+            value = self._project(target, matches[0], columns) if matches else None
+            return _MISSING_INNER if inner and value is None else value
+
+        reverse = self._reverse_fk_column(table, target)
+        children = [self._project(target, child, columns) for child in self._lookup(target, reverse, row.get("id"))]
+        children = [child for child in children if child is not None]
+        return _MISSING_INNER if inner and not children else children
+
+
+_MISSING_INNER = object()
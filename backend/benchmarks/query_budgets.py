@@ -0,0 +1,214 @@
+"""
+Query budgets
+Per-route limits on PostgREST queries per request, checked offline against the
+fake client. QueryCapture collects the classified queries (table, operation,
+count) of every request the app handles; a QueryBudget declares the most
+queries a route may issue: the intended constant ceiling, not the current count.
+Each budget is measured on two seed sizes in fresh processes: a count above the
+budget, or one that grows with the data set (the N+1 signature: a query per task,
+per conversation, ...), fails the check. Routes not there yet are marked
+expected_failure: reported, but failing the check only once they pass (so the
+marker gets removed).
+
+Entry point: scripts/check_query_budgets.py
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.scenarios import SCENARIOS, Scenario
+
+
+class QueryCapture:
+    """Records (method, route, query breakdown) for every request while active"""
+
+    def __init__(self):
+        self.requests: List[Dict[str, Any]] = []
+
+    def _record(self, method: str, route: str, metrics):
+        self.requests.append({
+            "method": method,
+            "route": route,
+            "queries": metrics.query_count,
+            "breakdown": {f"{q['operation']} {q['table']}": q["count"] for q in metrics.breakdown()},
+        })
+
+    def __enter__(self) -> "QueryCapture":
+        from utils.query_metrics import registry
+
+        registry.add_listener(self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        from utils.query_metrics import registry
+
+        registry.remove_listener(self._record)
+
+    @property
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.requests[-1] if self.requests else None
+
+
+@dataclass
+class QueryBudget:
+    scenario: Scenario
+    max_queries: int
+    # Tracking note for a route that does not meet its budget yet: its problems are
+    # reported without failing the check, and meeting the budget fails it (strict)
+    expected_failure: Optional[str] = None
+    # Optional caps per "operation table" (e.g. {"select tasks": 1})
+    per_query: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return self.scenario.name
+
+
+def scenario(name: str) -> Scenario:
+    return next(s for s in SCENARIOS if s.name == name)
+
+
+def _get(name: str, path: Any, user: str = "admin_user_id") -> Scenario:
+    return Scenario(name, "GET", path, user=user)
+
+
+# The 20 most-used routes (web dashboard + mobile app). Budgets are the intended
+# ceilings with warm caches, including the auth lookup of the current user: one
+# query per table read, never one per row. Do not raise a budget to make a route
+# pass; mark it expected_failure with what is left to fix.
+BUDGETS: List[QueryBudget] = [
+    QueryBudget(scenario("auth.login"), 2),
+    QueryBudget(scenario("auth.me"), 1),
+    # One aggregate query per source table (invoices, expenses, bills, journal
+    # entries and lines, accounts)
+    QueryBudget(
+        scenario("dashboard.stats"), 6,
+        expected_failure="monthly revenue/expense queried per month",
+    ),
+    QueryBudget(scenario("sales.quotes"), 4),
+    QueryBudget(_get("sales.quote_detail", lambda h, _: f"/api/sales/quotes/{h['quote_id']}"), 3),
+    QueryBudget(_get("sales.quote_items", lambda h, _: f"/api/sales/quotes/{h['quote_id']}/items"), 2),
+    QueryBudget(scenario("sales.invoices"), 2),
+    QueryBudget(scenario("projects.list"), 3),
+    QueryBudget(_get("projects.detail", lambda h, _: f"/api/projects/{h['project_id']}"), 4),
+    QueryBudget(scenario("employees.list"), 2),
+    # Customers + their paid invoices in one in.(...) query
+    QueryBudget(
+        _get("customers.list", "/api/customers/"), 3,
+        expected_failure="paid invoices fetched per customer for the customer level",
+    ),
+    QueryBudget(scenario("tasks.board"), 2, per_query={"select tasks": 1}),
+    QueryBudget(scenario("tasks.by_project"), 5, per_query={"select tasks": 1}),
+    # Flat lookups (12) + comments and their replies in one query each
+    QueryBudget(
+        _get("tasks.detail", lambda h, _: f"/api/tasks/{h['task_id']}"), 14,
+        expected_failure="replies fetched per comment",
+    ),
+    # Comments, replies, read receipts, reactions: one query each
+    QueryBudget(
+        _get("tasks.comments", lambda h, _: f"/api/tasks/{h['task_id']}/comments"), 5,
+        expected_failure="replies, read receipts and reactions fetched per comment",
+    ),
+    # Conversations (2), participants, last messages and unread counts: one query each
+    QueryBudget(
+        scenario("chat.conversations"), 6,
+        expected_failure="participants, last message and unread count fetched per conversation",
+    ),
+    QueryBudget(_get("chat.conversation", lambda h, _: f"/api/chat/conversations/{h['chat_conversation_id']}", "chat_user_id"), 5),
+    QueryBudget(scenario("chat.messages"), 4),
+    QueryBudget(scenario("notifications.inbox"), 3),
+    QueryBudget(_get("notifications.unread_count", "/api/notifications/notifications/unread-count", "employee_user_id"), 2),
+]
+
+
+def measure(scale: float, budgets: Optional[List[QueryBudget]] = None) -> Dict[str, Dict[str, Any]]:
+    """Query breakdown of one warm request per budgeted route on a fresh seed
+
+    Imports the app, so call it in a fresh process (see check()): module-level
+    caches must not carry rows over from another seed.
+    """
+    from benchmarks import runner
+    from benchmarks.fake_supabase import FakeSupabase
+    from benchmarks.seed import seed
+
+    runner.prepare_environment()
+    logging.disable(logging.WARNING)
+
+    budgets = budgets if budgets is not None else BUDGETS
+    fake = FakeSupabase()
+    handles = seed(fake, scale=scale)
+
+    async def run_all() -> Dict[str, Dict[str, Any]]:
+        import httpx
+        import main
+
+        runner.install(fake)
+        results = {}
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://budget", timeout=60) as client:
+                for budget in budgets:
+                    scenario = budget.scenario
+                    headers = {}
+                    if scenario.user:
+                        headers["Authorization"] = f"Bearer {fake.token_for(handles[scenario.user])}"
+                    with QueryCapture() as capture:
+                        # First request warms caches and deferred routers; the second is measured
+                        for iteration in range(2):
+                            response = await client.request(
+                                scenario.method,
+                                scenario.url(handles, iteration),
+                                json=scenario.json(handles, iteration),
+                                headers=headers,
+                            )
+                    result = dict(capture.last or {"queries": 0, "breakdown": {}})
+                    result["status"] = response.status_code
+                    results[budget.name] = result
+        return results
+
+    return asyncio.run(run_all())
+
+
+def _measure_in_subprocess(scale: float) -> Dict[str, Dict[str, Any]]:
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(measure, (scale,))
+
+
+def check(scales: Tuple[float, float] = (0.05, 0.2)) -> Tuple[List[str], List[str], Dict[float, Dict[str, Dict[str, Any]]]]:
+    """(failures, expected failures, measurements per scale) for BUDGETS"""
+    measurements = {scale: _measure_in_subprocess(scale) for scale in scales}
+    small, large = (measurements[scale] for scale in scales)
+    failures, expected = [], []
+    for budget in BUDGETS:
+        before, after = small[budget.name], large[budget.name]
+        if after["status"] >= 400 or before["status"] >= 400:
+            failures.append(f"{budget.name}: HTTP {before['status']}/{after['status']}")
+            continue
+        problems = []
+        worst = max(before["queries"], after["queries"])
+        if worst > budget.max_queries:
+            problems.append(f"{worst} queries (budget {budget.max_queries})")
+        for key, limit in budget.per_query.items():
+            count = max(before["breakdown"].get(key, 0), after["breakdown"].get(key, 0))
+            if count > limit:
+                problems.append(f"{count}x {key} (budget {limit})")
+        grown = {
+            key: (before["breakdown"].get(key, 0), count)
+            for key, count in after["breakdown"].items()
+            if count > before["breakdown"].get(key, 0)
+        }
+        if grown:
+            detail = ", ".join(f"{key} {a}->{b}" for key, (a, b) in sorted(grown.items()))
+            problems.append(f"queries grow with data ({detail})")
+        if budget.expected_failure:
+            if problems:
+                expected.append(f"{budget.name}: {'; '.join(problems)} - {budget.expected_failure}")
+            else:
+                failures.append(f"{budget.name}: meets its budget now, remove expected_failure")
+        else:
+            failures.extend(f"{budget.name}: {problem}" for problem in problems)
+    return failures, expected, measurements
@@ -0,0 +1,53 @@
+"""
+Benchmark RPC handlers
+Python versions of the SQL functions (database/migrations) that the benchmarked
+routes call through supabase.rpc(). Each takes (db, params) and returns the rows
+PostgREST would.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List
+
+from benchmarks.fake_supabase import FakeSupabase
+
+
+def get_task_card_stats(db: FakeSupabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # create_task_board_stats.sql
+    task_ids = set(params.get("p_task_ids") or [])
+    comments = Counter(row["task_id"] for row in db._rows("task_comments") if row["task_id"] in task_ids)
+    attachments = Counter(row["task_id"] for row in db._rows("task_attachments") if row["task_id"] in task_ids)
+    assignees = Counter(row["task_id"] for row in db._rows("task_assignments") if row["task_id"] in task_ids)
+    checklist_tasks = {row["id"]: row["task_id"] for row in db._rows("task_checklists") if row["task_id"] in task_ids}
+    items, completed = Counter(), Counter()
+    for item in db._rows("task_checklist_items"):
+        task_id = checklist_tasks.get(item["checklist_id"])
+        if task_id:
+            items[task_id] += 1
+            completed[task_id] += int(bool(item.get("is_completed")))
+    return [
+        {
+            "task_id": task_id,
+            "comment_count": comments[task_id],
+            "attachment_count": attachments[task_id],
+            "assignee_count": assignees[task_id],
+            "checklist_item_count": items[task_id],
+            "checklist_completed_count": completed[task_id],
+        }
+        for task_id in task_ids
+    ]
+
+
+def get_notification_type_counts(db: FakeSupabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # create_notification_inbox.sql
+    counts = Counter(row["type"] for row in db._lookup("notifications", "user_id", params.get("p_user_id")))
+    return [{"type": notification_type, "count": count} for notification_type, count in counts.items()]
+
+
+HANDLERS = {
+    "get_task_card_stats": get_task_card_stats,
+    "get_notification_type_counts": get_notification_type_counts,
+}
+
+
+def register(db: FakeSupabase):
+    db.rpc_handlers.update(HANDLERS)
@@ -0,0 +1,199 @@
+"""
+Benchmark runner
+Runs the scenarios against the real FastAPI app (full middleware stack, routers,
+services) in-process over ASGI, with the Supabase client swapped for the fake one.
+Reports per-endpoint throughput, latency percentiles and PostgREST queries per
+request (read back from the Server-Timing header), and compares against a saved
+baseline so regressions fail the run.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.scenarios import Scenario
+
+# Settings the app reads at import time; real values in the environment win
+BENCHMARK_ENVIRONMENT = {
+    "ENVIRONMENT": "development",
+    "RATE_LIMIT_ENABLED": "false",
+    "TASK_CLEANUP_ENABLED": "false",
+    "EMAIL_OUTBOX_WORKER_ENABLED": "false",
+    "SUPABASE_URL": "http://fake-supabase.local",
+    "SUPABASE_SERVICE_KEY": "benchmark-service-key",
+    "SUPABASE_ANON_KEY": "benchmark-anon-key",
+    "SUPABASE_DB_HOST": "localhost",
+    "SUPABASE_DB_USER": "postgres",
+    "SUPABASE_DB_PASSWORD": "postgres",
+    "SECRET_KEY": "benchmark-secret-key",
+    "SUPABASE_JWT_SECRET": "benchmark-jwt-secret",
+}
+
+
+def prepare_environment():
+    """Must run before main/config are imported"""
+    for key, value in BENCHMARK_ENVIRONMENT.items():
+        os.environ.setdefault(key, value)
+
+
+def install(fake: FakeSupabase):
+    """Route every get_supabase_client()/get_supabase_anon_client() call to fake"""
+    from services.supabase_client import supabase_service
+
+    # get_client() wraps it in the query-metrics InstrumentedClient, as in production
+    supabase_service.client = fake
+    supabase_service.get_anon_client = lambda: fake
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def _query_count(server_timing: Optional[str]) -> Optional[int]:
+    # db;dur=12.3;desc="7 queries", app;dur=20.1
+    if not server_timing or 'desc="' not in server_timing:
+        return None
+    try:
+        return int(server_timing.split('desc="', 1)[1].split(" ", 1)[0])
+    except ValueError:
+        return None
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    method: str
+    requests: int = 0
+    errors: int = 0
+    duration_seconds: float = 0.0
+    latencies_ms: List[float] = field(default_factory=list)
+    query_counts: List[int] = field(default_factory=list)
+    error_samples: List[str] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        queries = self.query_counts or [0]
+        return {
+            "name": self.name,
+            "method": self.method,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.requests / self.duration_seconds, 1) if self.duration_seconds else 0.0,
+            "p50_ms": round(_percentile(self.latencies_ms, 50), 2),
+            "p95_ms": round(_percentile(self.latencies_ms, 95), 2),
+            "p99_ms": round(_percentile(self.latencies_ms, 99), 2),
+            "mean_queries": round(sum(queries) / len(queries), 1),
+            "max_queries": max(queries),
+        }
+
+
+async def _run_scenario(client, fake: FakeSupabase, scenario: Scenario, handles: Dict[str, Any],
+                        requests: int, concurrency: int, warmup: int) -> ScenarioResult:
+    result = ScenarioResult(scenario.name, scenario.method)
+    headers = {}
+    if scenario.user:
+        headers["Authorization"] = f"Bearer {fake.token_for(handles[scenario.user])}"
+
+    async def send(iteration: int, record: bool):
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                scenario.method,
+                scenario.url(handles, iteration),
+                json=scenario.json(handles, iteration),
+                headers=headers,
+            )
+            failed = response.status_code >= 400
+            detail = f"{response.status_code} {response.text[:200]}"
+        except Exception as e:
+            response, failed, detail = None, True, f"{type(e).__name__}: {e}"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not record:
+            return
+        result.requests += 1
+        result.latencies_ms.append(elapsed_ms)
+        if failed:
+            result.errors += 1
+            if len(result.error_samples) < 3:
+                result.error_samples.append(detail)
+        if response is not None:
+            count = _query_count(response.headers.get("server-timing"))
+            if count is not None:
+                result.query_counts.append(count)
+
+    # Warm-up requests load deferred routers and fill caches; not recorded
+    for iteration in range(warmup):
+        await send(iteration, record=False)
+
+    counter = iter(range(requests))
+
+    async def worker():
+        for iteration in counter:
+            await send(iteration, record=True)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.duration_seconds = time.perf_counter() - started
+    return result
+
+
+async def run(fake: FakeSupabase, scenarios: List[Scenario], handles: Dict[str, Any],
+              requests: int = 200, concurrency: int = 8, warmup: int = 3) -> List[ScenarioResult]:
+    """Start the app (lifespan included) and run each scenario in turn"""
+    import httpx
+    import main
+
+    install(fake)
+    results = []
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            for scenario in scenarios:
+                results.append(await _run_scenario(client, fake, scenario, handles, requests, concurrency, warmup))
+    return results
+
+
+def format_report(summaries: List[Dict[str, Any]]) -> str:
+    header = f"{'scenario':<24}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'max q':>7}"
+    lines = [header, "-" * len(header)]
+    for s in summaries:
+        lines.append(
+            f"{s['name']:<24}{s['requests']:>7}{s['errors']:>8}{s['rps']:>9.1f}{s['p50_ms']:>9.1f}"
+            f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['mean_queries']:>9.1f}{s['max_queries']:>7}"
+        )
+    return "\n".join(lines)
+
+
+def compare(summaries: List[Dict[str, Any]], baseline: Dict[str, Any], max_p95_regression: float) -> List[str]:
+    """Regressions against a previous --json report
+
+    A scenario regresses when its p95 grows by more than max_p95_regression
+    (fraction, e.g. 0.2 = 20%), its worst-case query count grows, or it
+    starts returning errors.
+    """
+    previous = {s["name"]: s for s in baseline.get("scenarios", [])}
+    problems = []
+    for s in summaries:
+        before = previous.get(s["name"])
+        if not before:
+            continue
+        if before["p95_ms"] and s["p95_ms"] > before["p95_ms"] * (1 + max_p95_regression):
+            problems.append(f"{s['name']}: p95 {before['p95_ms']:.1f} ms -> {s['p95_ms']:.1f} ms")
+        if s["max_queries"] > before["max_queries"]:
+            problems.append(f"{s['name']}: queries per request {before['max_queries']} -> {s['max_queries']}")
+        if s["errors"] and not before["errors"]:
+            problems.append(f"{s['name']}: {s['errors']} errors (baseline had none)")
+    return problems
+
+
+def to_json(summaries: List[Dict[str, Any]], settings: Dict[str, Any]) -> str:
+    return json.dumps({"settings": settings, "scenarios": summaries}, indent=2)
+
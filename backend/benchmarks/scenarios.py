@@ -0,0 +1,67 @@
+"""
+Benchmark scenarios
+The hot API paths exercised by the load test. Each scenario builds its request
+from the seed handles and the iteration number, so runs are reproducible and
+paginated endpoints are walked instead of hitting the first page every time.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.seed import BENCHMARK_PASSWORD
+
+Handles = Dict[str, Any]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # Path, or a callable (handles, iteration) -> path
+    path: Any
+    # Seed handle of the user the request is made as (None = anonymous)
+    user: Optional[str] = "admin_user_id"
+    body: Optional[Callable[[Handles, int], Dict[str, Any]]] = None
+
+    def url(self, handles: Handles, iteration: int) -> str:
+        return self.path(handles, iteration) if callable(self.path) else self.path
+
+    def json(self, handles: Handles, iteration: int) -> Optional[Dict[str, Any]]:
+        return self.body(handles, iteration) if self.body else None
+
+
+def _message_page(handles: Handles, iteration: int) -> str:
+    # Scroll back through the conversation 50 messages at a time
+    pages = max(1, handles["messages_per_conversation"] // 50)
+    skip = (iteration % pages) * 50
+    return f"/api/chat/conversations/{handles['chat_conversation_id']}/messages?skip={skip}&limit=50"
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario(
+        "auth.login", "POST", "/api/auth/login", user=None,
+        body=lambda handles, _: {"email": handles["admin_email"], "password": BENCHMARK_PASSWORD},
+    ),
+    Scenario("auth.me", "GET", "/api/auth/me"),
+    Scenario("dashboard.stats", "GET", "/api/dashboard/stats"),
+    Scenario("sales.quotes", "GET", "/api/sales/quotes?limit=50"),
+    Scenario("sales.invoices", "GET", "/api/sales/invoices?limit=50"),
+    Scenario("projects.list", "GET", "/api/projects/"),
+    Scenario("employees.list", "GET", "/api/employees/"),
+    Scenario("tasks.board", "GET", "/api/tasks/board?limit=50"),
+    Scenario("tasks.by_project", "GET", lambda handles, _: f"/api/tasks?project_id={handles['project_id']}"),
+    Scenario("chat.conversations", "GET", "/api/chat/conversations", user="chat_user_id"),
+    Scenario("chat.messages", "GET", _message_page, user="chat_user_id"),
+    Scenario("notifications.inbox", "GET", "/api/notifications/notifications/inbox?limit=50", user="employee_user_id"),
+]
+
+
+def select(names: Optional[List[str]]) -> List[Scenario]:
+    """Scenarios whose name matches one of names (exact or prefix like 'tasks')"""
+    if not names:
+        return SCENARIOS
+    chosen = [s for s in SCENARIOS if any(s.name == n or s.name.startswith(n + ".") for n in names)]
+    unknown = [n for n in names if not any(s.name == n or s.name.startswith(n + ".") for s in SCENARIOS)]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+    return chosen
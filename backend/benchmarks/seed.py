@@ -0,0 +1,321 @@
+"""
+Benchmark seed data
+Deterministic, realistically sized data set for the fake client: users and
+employees, customers, projects with teams, tasks with assignments, comments and
+checklists, quotes, invoices, expenses, journal entries, chat and notifications.
+Volumes scale linearly with `scale` (1.0 = a mid-sized company after a few years).
+"""
+
+import random
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from benchmarks import rpc_handlers
+from benchmarks.fake_supabase import FakeSupabase
+
+BENCHMARK_PASSWORD = "benchmark-password"
+EMAIL_DOMAIN = "phucdat.vn"
+
+# Rows per unit of scale
+VOLUMES = {
+    "employees": 150,
+    "customers": 800,
+    "projects": 2000,
+    "tasks": 10000,
+    "quotes": 3000,
+    "invoices": 5000,
+    "expenses": 5000,
+    "journal_entries": 5000,
+    "conversations": 300,
+    "messages": 30000,
+    "notifications": 20000,
+    # Comments on the single busiest task (long discussion threads)
+    "hot_task_comments": 100,
+}
+
+TASK_STATUSES = ["todo", "in_progress", "completed", "cancelled"]
+PROJECT_STATUSES = ["planning", "active", "on_hold", "completed"]
+
+
+def _ids(rng: random.Random, count: int) -> List[str]:
+    return [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(count)]
+
+
+def seed(db: FakeSupabase, scale: float = 1.0, random_seed: int = 42) -> Dict[str, Any]:
+    """Fill db and return handles the scenarios need (user ids, project ids, ...)"""
+    rng = random.Random(random_seed)
+    now = datetime.now(timezone.utc)
+
+    def volume(name: str) -> int:
+        # At least a handful of rows so scenarios always find users, tasks, ...
+        return max(4, int(VOLUMES[name] * scale))
+
+    def moment(max_days_ago: int) -> str:
+        return (now - timedelta(days=rng.uniform(0, max_days_ago))).isoformat()
+
+    def day(max_days_ago: int) -> str:
+        return (now - timedelta(days=rng.uniform(0, max_days_ago))).date().isoformat()
+
+    tables = db.tables
+    rpc_handlers.register(db)
+
+    # People
+    departments = [{"id": i, "name": f"Phòng {n}", "code": f"D{n}"} for n, i in enumerate(_ids(rng, 6))]
+    positions = [
+        {"id": i, "name": f"Chức vụ {n}", "code": f"P{n}", "department_id": rng.choice(departments)["id"]}
+        for n, i in enumerate(_ids(rng, 10))
+    ]
+    user_ids = _ids(rng, volume("employees"))
+    roles = ["admin", "accountant", "sales"] + [rng.choice(["employee", "worker", "sales"]) for _ in user_ids[3:]]
+    users, employees = [], []
+    for n, (user_id, role) in enumerate(zip(user_ids, roles)):
+        email = f"user{n}@{EMAIL_DOMAIN}"
+        created = moment(1500)
+        users.append({
+            "id": user_id, "email": email, "full_name": f"Nhân viên {n}", "role": role,
+            "is_active": True, "created_at": created, "updated_at": created, "last_login": None,
+        })
+        employees.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)), "user_id": user_id,
+            "employee_code": f"EMP{n:05d}", "first_name": "Nhân viên", "last_name": str(n), "email": email,
+            "phone": f"09{rng.randint(10000000, 99999999)}", "department_id": rng.choice(departments)["id"],
+            "position_id": rng.choice(positions)["id"], "hire_date": day(1500), "salary": rng.randint(8, 40) * 1_000_000,
+            "status": "active", "created_at": created, "updated_at": created,
+        })
+        db.add_auth_user(user_id, email, BENCHMARK_PASSWORD)
+    tables["departments"] = departments
+    tables["positions"] = positions
+    tables["users"] = users
+    tables["employees"] = employees
+
+    customers = []
+    for n, customer_id in enumerate(_ids(rng, volume("customers"))):
+        created = moment(1500)
+        customers.append({
+            "id": customer_id, "customer_code": f"CUS{n:05d}", "name": f"Khách hàng {n}",
+            "type": rng.choice(["individual", "company"]), "email": f"customer{n}@example.vn",
+            "phone": f"08{rng.randint(10000000, 99999999)}", "company": None, "status": "active",
+            "created_at": created, "updated_at": created,
+        })
+    tables["customers"] = customers
+
+    # Projects and teams
+    projects, project_team = [], []
+    for n, project_id in enumerate(_ids(rng, volume("projects"))):
+        created = moment(1000)
+        manager = rng.choice(employees)
+        projects.append({
+            "id": project_id, "project_code": f"PRJ{n:05d}", "name": f"Dự án {n}",
+            "customer_id": rng.choice(customers)["id"], "manager_id": manager["id"],
+            "status": rng.choice(PROJECT_STATUSES), "priority": "medium", "progress": rng.randint(0, 100),
+            "start_date": created[:10], "end_date": None, "budget": rng.randint(50, 2000) * 1_000_000,
+            "billing_type": "fixed", "created_at": created, "updated_at": created,
+        })
+        for member in rng.sample(employees, min(len(employees), 4)):
+            project_team.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)), "project_id": project_id,
+                "user_id": member["user_id"], "name": f"{member['first_name']} {member['last_name']}",
+                "email": member["email"], "role": "member", "status": "active", "start_date": created[:10],
+                "created_at": created, "updated_at": created,
+            })
+    tables["projects"] = projects
+    tables["project_team"] = project_team
+
+    # Tasks
+    tasks, assignments, comments, checklists, checklist_items = [], [], [], [], []
+    for task_id in _ids(rng, volume("tasks")):
+        created = moment(700)
+        project = rng.choice(projects)
+        assignee = rng.choice(employees)
+        task = {
+            "id": task_id, "title": f"Công việc {len(tasks)}", "description": None,
+            "status": rng.choice(TASK_STATUSES), "priority": rng.choice(["low", "medium", "high"]),
+            "project_id": project["id"], "assigned_to": assignee["id"], "created_by": assignee["user_id"],
+            "group_id": None, "parent_id": None, "start_date": None, "due_date": None,
+            "estimated_time": 0, "time_spent": 0, "deleted_at": None,
+            "created_at": created, "updated_at": created,
+        }
+        for _ in range(rng.randint(0, 2)):
+            assignments.append({
+                "id": str(uuid.uuid4()), "task_id": task_id, "assigned_to": rng.choice(employees)["id"],
+                "assigned_by": assignee["user_id"], "status": "todo", "assigned_at": created, "created_at": created,
+            })
+        for _ in range(rng.randint(0, 4)):
+            comments.append({
+                "id": str(uuid.uuid4()), "task_id": task_id, "user_id": rng.choice(users)["id"],
+                "comment": "Đã cập nhật tiến độ", "type": "text", "created_at": moment(300), "updated_at": created,
+            })
+        if rng.random() < 0.3:
+            checklist_id = str(uuid.uuid4())
+            checklists.append({"id": checklist_id, "task_id": task_id, "title": "Checklist", "created_at": created, "updated_at": created})
+            for position in range(rng.randint(2, 6)):
+                checklist_items.append({
+                    "id": str(uuid.uuid4()), "checklist_id": checklist_id, "content": f"Mục {position}",
+                    "is_completed": rng.random() < 0.5, "sort_order": position, "assignee_id": None,
+                    "created_at": created, "updated_at": created,
+                })
+        tasks.append(task)
+    for _ in range(volume("hot_task_comments")):
+        comments.append({
+            "id": str(uuid.uuid4()), "task_id": tasks[0]["id"], "user_id": rng.choice(users)["id"],
+            "comment": "Đã cập nhật tiến độ", "type": "text", "created_at": moment(300), "updated_at": moment(300),
+        })
+    # Counter columns as maintained by the add_task_counters.sql triggers
+    counters = {task["id"]: task for task in tasks}
+    for task in tasks:
+        task.update(comment_count=0, attachment_count=0, assignee_count=0, checklist_item_count=0, checklist_completed_count=0)
+    for assignment in assignments:
+        counters[assignment["task_id"]]["assignee_count"] += 1
+    for comment in comments:
+        counters[comment["task_id"]]["comment_count"] += 1
+    checklist_tasks = {checklist["id"]: checklist["task_id"] for checklist in checklists}
+    for item in checklist_items:
+        task = counters[checklist_tasks[item["checklist_id"]]]
+        task["checklist_item_count"] += 1
+        task["checklist_completed_count"] += int(item["is_completed"])
+    tables["tasks"] = tasks
+    tables["task_assignments"] = assignments
+    tables["task_comments"] = comments
+    tables["task_checklists"] = checklists
+    tables["task_checklist_items"] = checklist_items
+
+    # Sales
+    quotes, quote_items = [], []
+    for n, quote_id in enumerate(_ids(rng, volume("quotes"))):
+        created = moment(700)
+        project = rng.choice(projects)
+        subtotal = rng.randint(5, 500) * 1_000_000
+        quotes.append({
+            "id": quote_id, "quote_number": f"QT{n:06d}", "customer_id": project["customer_id"],
+            "project_id": project["id"], "issue_date": created[:10], "valid_until": None,
+            "subtotal": subtotal, "tax_rate": 10, "tax_amount": subtotal / 10, "total_amount": subtotal * 1.1,
+            "discount_amount": 0, "currency": "VND", "status": rng.choice(["draft", "sent", "accepted", "rejected"]),
+            "notes": None, "created_by": rng.choice(employees)["id"], "created_at": created, "updated_at": created,
+        })
+        for position in range(3):
+            quote_items.append({
+                "id": str(uuid.uuid4()), "quote_id": quote_id, "name_product": f"Sản phẩm {position}",
+                "description": None, "quantity": 1, "unit": "cái", "unit_price": subtotal / 3,
+                "total_price": subtotal / 3, "created_at": created,
+            })
+    tables["quotes"] = quotes
+    tables["quote_items"] = quote_items
+
+    invoices = []
+    for n, invoice_id in enumerate(_ids(rng, volume("invoices"))):
+        created = moment(700)
+        project = rng.choice(projects)
+        status = rng.choice(["paid", "paid", "pending", "overdue", "partial"])
+        subtotal = rng.randint(5, 500) * 1_000_000
+        invoices.append({
+            "id": invoice_id, "invoice_number": f"INV{n:06d}", "customer_id": project["customer_id"],
+            "project_id": project["id"], "issue_date": created[:10], "due_date": created[:10],
+            "subtotal": subtotal, "tax_rate": 10, "tax_amount": subtotal / 10, "total_amount": subtotal * 1.1,
+            "discount_amount": 0, "currency": "VND", "paid_amount": subtotal * 1.1 if status == "paid" else 0,
+            "payment_status": status, "created_by": rng.choice(employees)["id"],
+            "paid_date": created[:10] if status == "paid" else None, "status": "sent",
+            "created_at": created, "updated_at": created,
+        })
+    tables["invoices"] = invoices
+
+    tables["expenses"] = [
+        {
+            "id": expense_id, "expense_code": f"EXP{n:06d}", "employee_id": rng.choice(employees)["id"],
+            "project_id": rng.choice(projects)["id"], "category": rng.choice(["travel", "materials", "equipment", "other"]),
+            "description": "Chi phí", "amount": rng.randint(1, 50) * 100_000, "expense_date": day(700),
+            "status": rng.choice(["approved", "approved", "pending", "rejected"]),
+            "created_at": moment(700), "updated_at": moment(700),
+        }
+        for n, expense_id in enumerate(_ids(rng, volume("expenses")))
+    ]
+    tables["bills"] = [
+        {"id": bill_id, "bill_number": f"BILL{n:05d}", "status": rng.choice(["pending", "paid"]), "amount": 1_000_000,
+         "due_date": day(100), "created_at": moment(300), "updated_at": moment(300)}
+        for n, bill_id in enumerate(_ids(rng, max(1, volume("invoices") // 10)))
+    ]
+
+    # Accounting
+    accounts = [{"account_code": code, "account_name": f"Tài khoản {code}"} for code in
+                ["111", "1111", "1112", "112", "1121", "131", "331", "511", "632", "642"]]
+    tables["chart_of_accounts"] = accounts
+    journal_entries, journal_lines = [], []
+    for n, entry_id in enumerate(_ids(rng, volume("journal_entries"))):
+        entry_date = day(700)
+        amount = rng.randint(1, 100) * 1_000_000
+        journal_entries.append({
+            "id": entry_id, "entry_number": f"JE{n:06d}", "entry_date": entry_date, "description": "Bút toán",
+            "transaction_type": "invoice", "status": "posted", "total_debit": amount, "total_credit": amount,
+            "created_at": entry_date, "updated_at": entry_date,
+        })
+        debit, credit = rng.sample(accounts, 2)
+        journal_lines.append({"id": str(uuid.uuid4()), "entry_id": entry_id, "account_code": debit["account_code"],
+                              "debit_amount": amount, "credit_amount": 0, "description": None})
+        journal_lines.append({"id": str(uuid.uuid4()), "entry_id": entry_id, "account_code": credit["account_code"],
+                              "debit_amount": 0, "credit_amount": amount, "description": None})
+    tables["journal_entries"] = journal_entries
+    tables["journal_entry_lines"] = journal_lines
+
+    # Chat
+    conversations, participants, messages = [], [], []
+    for conversation_id in _ids(rng, volume("conversations")):
+        created = moment(365)
+        members = rng.sample(users, min(len(users), rng.randint(2, 8)))
+        conversations.append({
+            "id": conversation_id, "name": f"Nhóm {len(conversations)}", "type": "group" if len(members) > 2 else "direct",
+            "task_id": None, "project_id": None, "created_by": members[0]["id"], "created_at": created, "updated_at": created,
+            "last_message_at": None, "last_message_preview": None, "avatar_url": None,
+        })
+        for member in members:
+            participants.append({
+                "id": str(uuid.uuid4()), "conversation_id": conversation_id, "user_id": member["id"],
+                "joined_at": created, "last_read_at": None, "role": "member", "is_muted": False,
+            })
+    per_conversation = max(1, volume("messages") // len(conversations))
+    for conversation in conversations:
+        members = [p["user_id"] for p in participants if p["conversation_id"] == conversation["id"]]
+        start = datetime.fromisoformat(conversation["created_at"])
+        for position in range(per_conversation):
+            sent = (start + timedelta(minutes=position * 7)).isoformat()
+            messages.append({
+                "id": str(uuid.uuid4()), "conversation_id": conversation["id"], "sender_id": rng.choice(members),
+                "message_text": f"Tin nhắn {position}", "message_type": "text", "file_url": None, "file_name": None,
+                "file_size": None, "reply_to_id": None, "is_edited": False, "edited_at": None,
+                "is_deleted": False, "deleted_at": None, "created_at": sent, "updated_at": sent,
+            })
+        conversation["last_message_at"] = messages[-1]["created_at"]
+        conversation["last_message_preview"] = messages[-1]["message_text"]
+    tables["internal_conversations"] = conversations
+    tables["internal_conversation_participants"] = participants
+    tables["internal_messages"] = messages
+
+    # Notifications
+    tables["notifications"] = [
+        {
+            "id": notification_id, "user_id": rng.choice(users)["id"], "title": "Cập nhật công việc",
+            "message": "Công việc đã được cập nhật", "type": rng.choice(["task", "project", "system"]),
+            "entity_type": "task", "entity_id": rng.choice(tasks)["id"], "action_url": None,
+            "is_read": rng.random() < 0.6, "read_at": None, "created_at": moment(180),
+        }
+        for notification_id in _ids(rng, volume("notifications"))
+    ]
+
+    # Scenario handles: the busiest user/task/project, so per-row query patterns show up
+    membership = Counter(p["user_id"] for p in participants)
+    chat_user = membership.most_common(1)[0][0]
+    busiest_task = max(tasks, key=lambda task: task["comment_count"] + task["checklist_item_count"])
+    busiest_project = Counter(task["project_id"] for task in tasks).most_common(1)[0][0]
+    return {
+        "admin_user_id": users[0]["id"],
+        "admin_email": users[0]["email"],
+        "employee_user_id": next(user["id"] for user in users if user["role"] == "employee"),
+        "chat_user_id": chat_user,
+        "chat_conversation_id": next(p["conversation_id"] for p in participants if p["user_id"] == chat_user),
+        "messages_per_conversation": per_conversation,
+        "project_id": busiest_project,
+        "task_id": busiest_task["id"],
+        "quote_id": quotes[0]["id"],
+        "customer_id": customers[0]["id"],
+        "row_counts": {name: len(rows) for name, rows in tables.items()},
+    }
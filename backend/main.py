@@ -4,31 +4,34 @@ FastAPI backend for financial management system
 """
 
 from fastapi import FastAPI, HTTPException, Depends, status, Request
-from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from starlette.middleware.base import BaseHTTPMiddleware
-import uvicorn
 from dotenv import load_dotenv
 import os
 import asyncio
+import secrets
 from contextlib import asynccontextmanager
 
 # Load environment variables
 load_dotenv()
 
 # Background task for cleanup
-# DISABLED on free tier to save memory - enable only on paid plans
+# Cleanup is batched and time-boxed, so it is cheap enough to run on every plan
 async def periodic_cleanup():
-    """Periodically cleanup old deleted tasks and groups"""
-    # Skip cleanup on free tier to prevent memory issues
-    if os.getenv("ENVIRONMENT") == "production" and os.getenv("RENDER_PLAN") == "free":
-        return  # Disable on free tier
-    
+    """Periodically cleanup old deleted tasks and groups, archive old read notifications
+    and check the task counter columns, time log and labor cost rollups"""
     from services.task_cleanup_service import task_cleanup_service
+    from services.notification_service import notification_service
+    from services.task_counter_service import task_counter_service
+    from services.time_tracking_service import time_tracking_service
+    from services.labor_cost_service import labor_cost_service
     while True:
         try:
             await asyncio.sleep(7200)  # Run every 2 hours instead of 1 hour
             await task_cleanup_service.cleanup_old_deleted_items()
+            await notification_service.archive_read_notifications()
+            await task_counter_service.run_periodic_check()
+            await time_tracking_service.run_periodic_check()
+            await labor_cost_service.run_periodic_check()
         except Exception as e:
             print(f"Cleanup error: {str(e)}")
             # Continue even if cleanup fails
@@ -37,18 +40,44 @@ async def periodic_cleanup():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown"""
-    # Startup: Start background cleanup task (only if not free tier)
+    # Startup: Start background cleanup task (can be turned off with TASK_CLEANUP_ENABLED=false)
     cleanup_task = None
-    if os.getenv("ENVIRONMENT") != "production" or os.getenv("RENDER_PLAN") != "free":
+    if os.getenv("TASK_CLEANUP_ENABLED", "true").lower() == "true":
         cleanup_task = asyncio.create_task(periodic_cleanup())
+    # Startup: Import the remaining routers in the background (see utils/router_loader.py)
+    router_loader.start()
+    # Startup: /metrics is only served with a token
+    if not os.getenv("METRICS_TOKEN"):
+        print("METRICS_TOKEN is not set: /metrics is disabled")
+    # Startup: Preload the name directory (display names for enrichment) in the background
+    name_directory_task = None
+    if os.getenv("NAME_DIRECTORY_WARM_ON_STARTUP", "true").lower() == "true":
+        from services.name_directory import name_directory
+        name_directory_task = asyncio.create_task(asyncio.to_thread(name_directory.warm))
+    # Startup: Start email outbox worker (delivers queued emails with retries)
+    email_outbox_task = None
+    if os.getenv("EMAIL_OUTBOX_WORKER_ENABLED", "true").lower() == "true":
+        from services.email_outbox_service import email_outbox_service
+        email_outbox_task = asyncio.create_task(email_outbox_service.run_worker())
     yield
-    # Shutdown: Cancel cleanup task
-    if cleanup_task:
-        cleanup_task.cancel()
-        try:
-            await cleanup_task
-        except asyncio.CancelledError:
-            pass
+    # Shutdown: Cancel background tasks
+    await router_loader.stop()
+    for task in (cleanup_task, email_outbox_task, name_directory_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    # Shutdown: Write notifications still waiting for their batch
+    from services.notification_dispatcher import notification_dispatcher
+    await notification_dispatcher.drain()
+    # Shutdown: Stop PDF render worker processes
+    from services.quote_render_service import quote_render_service
+    quote_render_service.shutdown()
+    # Shutdown: Stop bcrypt worker threads
+    from services.password_hasher import password_hasher
+    password_hasher.shutdown()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -83,99 +112,45 @@ else:
         "http://0.0.0.0:3001",
     ]
 
-# HTTPS Redirect Middleware (only in production, add first to execute last)
-from middleware.https_redirect import HTTPSRedirectMiddleware
-app.add_middleware(HTTPSRedirectMiddleware, environment=ENVIRONMENT)
+# Middleware stack: one pure-ASGI pipeline (see middleware/pipeline.py)
+# Order (outermost first): RateLimit -> ErrorHandler -> RequestID -> CORS -> SecurityHeaders -> HTTPSRedirect
+# - HTTPS redirect only in production
+# - Error handler catches all exceptions to prevent crashes
+# - Rate limit responses carry CORS headers themselves since they bypass CORS
+from middleware.pipeline import MiddlewarePipeline
+from middleware.deferred_routes import DeferredRoutesMiddleware
+from utils.router_loader import RouterLoader
 
-# Security Headers Middleware (add after HTTPS redirect, will execute before)
-from middleware.security_headers import SecurityHeadersMiddleware
-app.add_middleware(SecurityHeadersMiddleware, environment=ENVIRONMENT)
+router_loader = RouterLoader(app)
 
-# CORS middleware (add first, will execute last due to reverse order)
-# Enhanced CORS configuration for better security
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins if ENVIRONMENT == "production" else ["*"],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=[
-        "X-Request-ID",
-        "X-RateLimit-Limit",
-        "X-RateLimit-Remaining",
-        "X-RateLimit-Reset",
-        "Retry-After"
-    ],
-    max_age=3600,  # Cache preflight requests for 1 hour
-)
+# Innermost layer: requests for deferred routers wait until they are loaded
+app.add_middleware(DeferredRoutesMiddleware, loader=router_loader)
 
 # Request Signing Middleware (temporarily disabled for debugging)
 # from middleware.request_signing import RequestSigningMiddleware
 # app.add_middleware(RequestSigningMiddleware, environment=ENVIRONMENT)
 
-# Request ID Middleware (add after CORS, will execute before CORS)
-from middleware.request_id import RequestIDMiddleware
-app.add_middleware(RequestIDMiddleware)
-
-# Error Handler Middleware (catch all exceptions to prevent crashes)
-from middleware.error_handler import ErrorHandlerMiddleware
-app.add_middleware(ErrorHandlerMiddleware)
-
-# Rate Limiting Middleware (import and add after CORS, will execute before CORS)
-from middleware.rate_limit import rate_limiter, get_rate_limit_config
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware to apply rate limiting to all requests"""
-    
-    async def dispatch(self, request: Request, call_next):
-        # Get rate limit configuration
-        config = get_rate_limit_config()
-        
-        # Skip rate limiting if disabled
-        if not config["enabled"]:
-            return await call_next(request)
-        
-        # Skip rate limiting for health check and documentation endpoints
-        skip_paths = ["/", "/health", "/docs", "/redoc", "/openapi.json"]
-        if request.url.path in skip_paths:
-            return await call_next(request)
-        
-        # Check rate limit
-        try:
-            rate_limiter.check_rate_limit(
-                request,
-                max_requests=config["max_requests"],
-                window_seconds=config["window_seconds"]
-            )
-        except HTTPException as e:
-            # Add CORS headers manually to rate limit error response
-            # This ensures CORS works even when rate limit is exceeded
-            from fastapi.responses import JSONResponse
-            error_response = JSONResponse(
-                status_code=e.status_code,
-                content={"detail": e.detail},
-                headers={
-                    **e.headers,
-                    "Access-Control-Allow-Origin": allowed_origins[0] if ENVIRONMENT == "production" and allowed_origins else "*",
-                    "Access-Control-Allow-Credentials": "true",
-                }
-            )
-            return error_response
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add rate limit headers to response
-        client_ip = request.client.host if request.client else 'unknown'
-        rate_info = rate_limiter.get_rate_limit_info(f"ip:{client_ip}", config["window_seconds"])
-        
-        response.headers["X-RateLimit-Limit"] = str(config["max_requests"])
-        response.headers["X-RateLimit-Remaining"] = str(max(0, config["max_requests"] - rate_info["requests_count"]))
-        
-        return response
-
-# Add rate limiting middleware (will execute before CORS due to reverse order)
-app.add_middleware(RateLimitMiddleware)
+app.add_middleware(
+    MiddlewarePipeline,
+    environment=ENVIRONMENT,
+    # Enhanced CORS configuration for better security
+    cors_options=dict(
+        allow_origins=allowed_origins if ENVIRONMENT == "production" else ["*"],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=[
+            "X-Request-ID",
+            "X-RateLimit-Limit",
+            "X-RateLimit-Remaining",
+            "X-RateLimit-Reset",
+            "Retry-After",
+            "Server-Timing"
+        ],
+        max_age=3600,  # Cache preflight requests for 1 hour
+    ),
+    rate_limit_cors_origin=allowed_origins[0] if ENVIRONMENT == "production" and allowed_origins else "*",
+)
 
 # Security
 security = HTTPBearer()
@@ -201,62 +176,76 @@ async def health_check():
         "version": "1.0.0"
     }
 
-# Import routers
-from routers import auth, employees, employee_excel, customers, sales, expenses, projects, reports, notifications, dashboard, sales_receipts, credit_memos, purchase_orders, expense_claims, budgeting, pl_report, balance_sheet, drill_down, cash_flow, cash_flow_vietnamese, sales_customer, expenses_vendor, general_ledger, project_reports, projects_financial, project_team, project_timeline, customer_view, project_expenses, emotions_comments, journal, expense_objects, expense_snapshots, expense_restore, system_feedback, product_import, material_adjustment_rules, file_upload, tasks, products, product_categories, custom_products, chat, app_updates, qr_login, project_categories, project_category_members
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics: per-route latency/query histograms and per-table query timings (this worker)"""
+    from fastapi.responses import PlainTextResponse
+    from utils.query_metrics import registry
+    metrics_token = os.getenv("METRICS_TOKEN")
+    if not metrics_token:
+        # Disabled unless a token is configured
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {metrics_token}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+# Routers
+# eager=True: imported at startup (login must work right away); the rest are
+# imported in the background after startup unless LAZY_ROUTERS=false
 
-# Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(qr_login.router, prefix="/api/auth", tags=["QR Login"])
-app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
-app.include_router(employees.router, prefix="/api/employees", tags=["Employees"])
-app.include_router(employee_excel.router, prefix="/api/employee-excel", tags=["Employee Excel"])
-app.include_router(customers.router, prefix="/api/customers", tags=["Customers"])
-app.include_router(sales.router, prefix="/api/sales", tags=["Sales"])
-app.include_router(products.router, prefix="/api/sales", tags=["Products"])
+router_loader.include("auth", "/api/auth", ["Authentication"], eager=True)
+router_loader.include("qr_login", "/api/auth", ["QR Login"], eager=True)
+router_loader.include("dashboard", "/api/dashboard", ["Dashboard"])
+router_loader.include("employees", "/api/employees", ["Employees"])
+router_loader.include("employee_excel", "/api/employee-excel", ["Employee Excel"])
+router_loader.include("customers", "/api/customers", ["Customers"])
+router_loader.include("sales", "/api/sales", ["Sales"])
+router_loader.include("products", "/api/sales", ["Products"])
 # Alias endpoint for mobile app compatibility (/api/products-services)
-app.include_router(products.router, prefix="/api", tags=["Products"])
-app.include_router(product_categories.router, prefix="/api/sales", tags=["Product Categories"])
-app.include_router(custom_products.router, prefix="/api/custom-products", tags=["Custom Products"])
-app.include_router(sales_receipts.router, prefix="/api/sales", tags=["Sales Receipts"])
-app.include_router(credit_memos.router, tags=["Credit Memos"])
-app.include_router(expenses.router, prefix="/api/expenses", tags=["Expenses"])
-app.include_router(project_expenses.router, prefix="/api", tags=["Project Expenses"])
-app.include_router(purchase_orders.router, tags=["Purchase Orders"])
-app.include_router(expense_claims.router, tags=["Expense Claims"])
-app.include_router(budgeting.router, tags=["Budgeting"])
-app.include_router(project_categories.router, prefix="/api/project-categories", tags=["Project Categories"])
-app.include_router(project_category_members.router, prefix="/api/project-category-members", tags=["Project Category Members"])
-# app.include_router(project_status_flow_rules.router, prefix="/api/project-status-flow-rules", tags=["Project Status Flow Rules"])
-app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
-app.include_router(projects_financial.router, prefix="/api/projects", tags=["Project Financial"])
-app.include_router(project_team.router, prefix="/api", tags=["Project Team"])
-app.include_router(project_timeline.router, prefix="/api", tags=["Project Timeline"])
-app.include_router(project_reports.router, prefix="/api/reports", tags=["Project Reports"])
-app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
-app.include_router(pl_report.router, prefix="/api/reports/financial", tags=["P&L Reports"])
-app.include_router(balance_sheet.router, prefix="/api/reports/financial", tags=["Balance Sheet"])
-app.include_router(drill_down.router, prefix="/api/reports/financial", tags=["Drill-Down Reports"])
-app.include_router(cash_flow.router, prefix="/api/reports/financial", tags=["Cash Flow Statement"])
-app.include_router(cash_flow_vietnamese.router, prefix="/api/reports/financial", tags=["Cash Flow Vietnamese"])
-app.include_router(sales_customer.router, prefix="/api/reports/sales", tags=["Sales by Customer"])
-app.include_router(expenses_vendor.router, prefix="/api/reports/expenses", tags=["Expenses by Vendor"])
-app.include_router(general_ledger.router, prefix="/api/reports/accountant", tags=["General Ledger"])
-app.include_router(notifications.router, prefix="/api/notifications", tags=["Notifications"])
-app.include_router(customer_view.router, prefix="/api/customer-view", tags=["Customer View"])
-app.include_router(emotions_comments.router, tags=["Emotions & Comments"])
-app.include_router(journal.router, prefix="/api/accounting", tags=["Journal Entries"])
-app.include_router(expense_objects.router, prefix="/api/expense-objects", tags=["Expense Objects"])
-app.include_router(expense_snapshots.router, prefix="/api/expense-snapshots", tags=["Expense Snapshots"])
-app.include_router(expense_restore.router, prefix="/api/expense-restore", tags=["Expense Restore"])
-app.include_router(system_feedback.router, tags=["System Feedback"])
-app.include_router(product_import.router, prefix="/api/sales/products/import", tags=["Product Import"])
-app.include_router(material_adjustment_rules.router, prefix="/api/material-adjustment-rules", tags=["Material Adjustment Rules"])
-app.include_router(file_upload.router, tags=["File Upload"])
-app.include_router(tasks.router, prefix="/api", tags=["Tasks"])
-app.include_router(chat.router, tags=["Internal Chat"])
-app.include_router(app_updates.router, prefix="/api/app-updates", tags=["App Updates"])
+router_loader.include("products", "/api", ["Products"])
+router_loader.include("product_categories", "/api/sales", ["Product Categories"])
+router_loader.include("custom_products", "/api/custom-products", ["Custom Products"])
+router_loader.include("sales_receipts", "/api/sales", ["Sales Receipts"])
+router_loader.include("credit_memos", tags=["Credit Memos"])
+router_loader.include("expenses", "/api/expenses", ["Expenses"])
+router_loader.include("project_expenses", "/api", ["Project Expenses"])
+router_loader.include("purchase_orders", tags=["Purchase Orders"])
+router_loader.include("expense_claims", tags=["Expense Claims"])
+router_loader.include("budgeting", tags=["Budgeting"])
+router_loader.include("project_categories", "/api/project-categories", ["Project Categories"])
+router_loader.include("project_category_members", "/api/project-category-members", ["Project Category Members"])
+# router_loader.include("project_status_flow_rules", "/api/project-status-flow-rules", ["Project Status Flow Rules"])
+router_loader.include("projects", "/api/projects", ["Projects"])
+router_loader.include("projects_financial", "/api/projects", ["Project Financial"])
+router_loader.include("project_team", "/api", ["Project Team"])
+router_loader.include("project_timeline", "/api", ["Project Timeline"])
+router_loader.include("project_reports", "/api/reports", ["Project Reports"])
+router_loader.include("reports", "/api/reports", ["Reports"])
+router_loader.include("pl_report", "/api/reports/financial", ["P&L Reports"])
+router_loader.include("balance_sheet", "/api/reports/financial", ["Balance Sheet"])
+router_loader.include("drill_down", "/api/reports/financial", ["Drill-Down Reports"])
+router_loader.include("cash_flow", "/api/reports/financial", ["Cash Flow Statement"])
+router_loader.include("cash_flow_vietnamese", "/api/reports/financial", ["Cash Flow Vietnamese"])
+router_loader.include("sales_customer", "/api/reports/sales", ["Sales by Customer"])
+router_loader.include("expenses_vendor", "/api/reports/expenses", ["Expenses by Vendor"])
+router_loader.include("general_ledger", "/api/reports/accountant", ["General Ledger"])
+router_loader.include("notifications", "/api/notifications", ["Notifications"])
+router_loader.include("customer_view", "/api/customer-view", ["Customer View"])
+router_loader.include("emotions_comments", tags=["Emotions & Comments"])
+router_loader.include("journal", "/api/accounting", ["Journal Entries"])
+router_loader.include("expense_objects", "/api/expense-objects", ["Expense Objects"])
+router_loader.include("expense_snapshots", "/api/expense-snapshots", ["Expense Snapshots"])
+router_loader.include("expense_restore", "/api/expense-restore", ["Expense Restore"])
+router_loader.include("system_feedback", tags=["System Feedback"])
+router_loader.include("product_import", "/api/sales/products/import", ["Product Import"])
+router_loader.include("material_adjustment_rules", "/api/material-adjustment-rules", ["Material Adjustment Rules"])
+router_loader.include("file_upload", tags=["File Upload"])
+router_loader.include("tasks", "/api", ["Tasks"])
+router_loader.include("chat", tags=["Internal Chat"])
+router_loader.include("app_updates", "/api/app-updates", ["App Updates"], eager=True)
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "main:app",
         host="localhost",
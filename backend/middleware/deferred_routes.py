@@ -0,0 +1,29 @@
+"""
+Deferred Routes Middleware
+Holds requests for routers that are still being imported in the background
+"""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from utils.router_loader import RouterLoader
+
+# Always served immediately (health checks must answer during startup)
+ALWAYS_READY_PATHS = {"/", "/health", "/metrics"}
+
+
+class DeferredRoutesMiddleware:
+    """Wait for deferred routers before routing requests that may need them"""
+
+    def __init__(self, app: ASGIApp, loader: RouterLoader):
+        self.app = app
+        self.loader = loader
+
+    def _is_ready(self, path: str) -> bool:
+        if path in ALWAYS_READY_PATHS:
+            return True
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.loader.eager_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] in ("http", "websocket") and not self.loader.loaded and not self._is_ready(scope["path"]):
+            await self.loader.wait()
+        await self.app(scope, receive, send)
@@ -3,31 +3,48 @@ Error Handler Middleware
 Handles errors gracefully to prevent server crashes on Render free tier
 """
 
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import traceback
-import sys
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    """Middleware to catch all exceptions and return proper error responses"""
+
+class ErrorHandlerMiddleware:
+    """Middleware to catch all exceptions and return proper error responses (pure ASGI)"""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        response_started = False
+        
+        async def send_tracking(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_tracking)
         except Exception as e:
+            # Headers already sent (streaming response): nothing we can replace
+            if response_started:
+                raise
+            
             # Log error but don't crash server
             error_type = type(e).__name__
             error_message = str(e)
             
             # Print to console for Render logs
             print(f"ERROR: {error_type}: {error_message}")
-            print(f"Path: {request.url.path}")
+            print(f"Path: {scope.get('path')}")
             traceback.print_exc()
             
             # Return error response
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={
                     "detail": "Internal server error. Please try again later.",
@@ -35,5 +52,4 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
                     "message": error_message  # Always show error message for debugging
                 }
             )
-
-
+            await response(scope, receive, send)
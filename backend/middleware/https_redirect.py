@@ -3,37 +3,35 @@ HTTPS Redirect Middleware
 Redirects HTTP requests to HTTPS in production environment
 """
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import URL
 from starlette.responses import RedirectResponse
-import os
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 
-class HTTPSRedirectMiddleware(BaseHTTPMiddleware):
-    """Middleware to redirect HTTP to HTTPS in production"""
+class HTTPSRedirectMiddleware:
+    """Middleware to redirect HTTP to HTTPS in production (pure ASGI)"""
     
-    def __init__(self, app, environment: str = "development"):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, environment: str = "development"):
+        self.app = app
         self.environment = environment
     
-    async def dispatch(self, request: Request, call_next):
-        # Only redirect in production
-        if self.environment != "production":
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Only redirect HTTP requests in production
+        if scope["type"] != "http" or self.environment != "production":
+            return await self.app(scope, receive, send)
         
         # Check if request is HTTP (not HTTPS)
-        url = request.url
-        if url.scheme == "http":
+        if scope.get("scheme") == "http":
             # Build HTTPS URL
-            https_url = url.replace(scheme="https")
+            https_url = URL(scope=scope).replace(scheme="https")
             
             # Return 308 Permanent Redirect (preserves HTTP method)
             # 308 keeps POST as POST, unlike 301 which changes to GET
-            return RedirectResponse(
+            response = RedirectResponse(
                 url=str(https_url),
                 status_code=308
             )
+            return await response(scope, receive, send)
         
         # HTTPS request - proceed normally
-        return await call_next(request)
-
+        await self.app(scope, receive, send)
@@ -0,0 +1,51 @@
+"""
+Middleware Pipeline
+Composes the application middlewares as plain ASGI callables in one place.
+
+All layers are pure ASGI (no BaseHTTPMiddleware), so a request costs one function
+call per layer instead of a task group and a re-streamed body, and streaming
+responses pass through untouched.
+"""
+
+from typing import Any, Dict, Optional
+
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from middleware.error_handler import ErrorHandlerMiddleware
+from middleware.https_redirect import HTTPSRedirectMiddleware
+from middleware.query_metrics import QueryMetricsMiddleware
+from middleware.rate_limit import RateLimitMiddleware
+from middleware.request_id import RequestIDMiddleware
+from middleware.security_headers import SecurityHeadersMiddleware
+from utils.query_metrics import QUERY_METRICS_ENABLED
+
+
+class MiddlewarePipeline:
+    """Single ASGI middleware wrapping the whole application stack
+
+    Execution order (outermost first):
+    RateLimit -> ErrorHandler -> RequestID -> QueryMetrics -> CORS -> SecurityHeaders -> HTTPSRedirect -> app
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        environment: str = "development",
+        cors_options: Optional[Dict[str, Any]] = None,
+        rate_limit_cors_origin: str = "*"
+    ):
+        stack = HTTPSRedirectMiddleware(app, environment=environment)
+        stack = SecurityHeadersMiddleware(stack, environment=environment)
+        if cors_options is not None:
+            stack = CORSMiddleware(stack, **cors_options)
+        if QUERY_METRICS_ENABLED:
+            # Inside RequestID so slow-request logs carry the request id
+            stack = QueryMetricsMiddleware(stack)
+        stack = RequestIDMiddleware(stack)
+        stack = ErrorHandlerMiddleware(stack)
+        stack = RateLimitMiddleware(stack, cors_origin=rate_limit_cors_origin)
+        self.app = stack
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.app(scope, receive, send)
@@ -0,0 +1,79 @@
+"""
+Query Metrics Middleware
+Collects the PostgREST queries of each request (see utils/query_metrics.py),
+adds a Server-Timing header, logs slow/chatty requests with their query
+breakdown and feeds the per-route histograms served by /metrics
+"""
+
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.query_metrics import end_request, log_slow_request, registry, start_request
+
+# Not worth a histogram series of their own
+SKIP_PATHS = {"/health", "/metrics"}
+
+
+class QueryMetricsMiddleware:
+    """Per-request query instrumentation (pure ASGI)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # endpoint -> routes, rebuilt when routers are added (lazy loading)
+        self._routes_by_endpoint: Dict[Any, List[Any]] = {}
+        self._indexed_routes = 0
+
+    def _route(self, scope: Scope) -> str:
+        """Route path (e.g. /api/projects/{project_id}) of the endpoint that handled the request"""
+        endpoint = scope.get("endpoint")
+        app = scope.get("app")
+        if endpoint is None or app is None:
+            return "unmatched"
+        routes = app.routes
+        if len(routes) != self._indexed_routes:
+            index = defaultdict(list)
+            for route in routes:
+                index[getattr(route, "endpoint", None)].append(route)
+            self._routes_by_endpoint = index
+            self._indexed_routes = len(routes)
+        candidates = self._routes_by_endpoint.get(endpoint, [])
+        if len(candidates) == 1:
+            return candidates[0].path
+        # Same endpoint mounted under several prefixes: match again among those only
+        for route in candidates:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in SKIP_PATHS:
+            return await self.app(scope, receive, send)
+
+        metrics, token = start_request(scope.get("state", {}).get("request_id"))
+        status_code: Optional[int] = None
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - metrics.started) * 1000
+                MutableHeaders(scope=message).append(
+                    "Server-Timing",
+                    f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.query_count} queries", app;dur={elapsed_ms:.1f}'
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request(token)
+            duration = time.perf_counter() - metrics.started
+            route = self._route(scope)
+            registry.record_request(scope["method"], route, duration, metrics)
+            log_slow_request(scope["method"], route, scope["path"], status_code or 500, duration, metrics)
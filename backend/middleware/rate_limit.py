@@ -1,128 +1,244 @@
 """
 Rate Limiting Middleware
 Prevents abuse by limiting the number of requests per time window
+
+Uses GCRA (generic cell rate algorithm, a token bucket stored as one timestamp):
+every identifier costs one float of state and O(1) work per request.
+State lives in a pluggable backend - in-process memory (LRU-capped) by default,
+or Redis so several workers enforce one shared budget.
 """
 
-from fastapi import Request, HTTPException, status
-from collections import defaultdict
-from typing import Dict, List
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import asyncio
+import json
+import math
+import threading
 import time
 import os
 
 
+class RateLimitDecision:
+    """Result of one rate limit check"""
+
+    __slots__ = ("allowed", "limit", "remaining", "retry_after", "reset_at")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: float, reset_at: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+        self.reset_at = reset_at
+
+
+def gcra(tat: Optional[float], now: float, max_requests: int, window_seconds: float) -> Tuple[bool, float, float]:
+    """One GCRA step
+
+    Args:
+        tat: Stored theoretical arrival time (None for a new identifier)
+        now: Current time
+        max_requests: Burst size / requests per window
+        window_seconds: Window length
+
+    Returns:
+        (allowed, new_tat, retry_after). new_tat must be stored when allowed.
+    """
+    emission_interval = window_seconds / max_requests
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + emission_interval
+    allow_at = new_tat - window_seconds
+    if allow_at > now:
+        return False, tat, allow_at - now
+    return True, new_tat, 0.0
+
+
+class MemoryRateLimitBackend:
+    """In-process GCRA state, capped to max_keys identifiers (least recently used evicted)"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self.store: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, max_requests: int, window_seconds: float, now: float) -> Tuple[bool, float, float]:
+        """Apply one request to key; returns (allowed, tat, retry_after)"""
+        with self._lock:
+            allowed, tat, retry_after = gcra(self.store.get(key), now, max_requests, window_seconds)
+            if allowed:
+                self.store[key] = tat
+                self.store.move_to_end(key)
+                # Evicting a key only forgets its history (it gets a full bucket again)
+                while len(self.store) > self.max_keys:
+                    self.store.popitem(last=False)
+            return allowed, tat, retry_after
+
+    async def peek(self, key: str) -> Optional[float]:
+        return self.store.get(key)
+
+    def clear(self):
+        with self._lock:
+            self.store.clear()
+
+
+class RedisRateLimitBackend:
+    """Shared GCRA state in Redis (atomic Lua script, keys expire when the bucket is full again)"""
+
+    # Times in milliseconds so all arithmetic stays integral inside Redis
+    SCRIPT = """
+local now = tonumber(ARGV[1])
+local emission = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + emission
+local allow_at = new_tat - window
+if allow_at > now then
+    return {0, tat, allow_at - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.max(1, new_tat - now))
+return {1, new_tat, 0}
+"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        # Optional dependency, only needed when RATE_LIMIT_BACKEND=redis
+        import redis.asyncio as redis_asyncio  # type: ignore
+        self.client = redis_asyncio.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, max_requests: int, window_seconds: float, now: float) -> Tuple[bool, float, float]:
+        window_ms = int(window_seconds * 1000)
+        emission_ms = max(1, window_ms // max_requests)
+        allowed, tat_ms, retry_ms = await self._script(
+            keys=[self.prefix + key],
+            args=[int(now * 1000), emission_ms, window_ms]
+        )
+        return bool(allowed), int(tat_ms) / 1000, int(retry_ms) / 1000
+
+    async def peek(self, key: str) -> Optional[float]:
+        value = await self.client.get(self.prefix + key)
+        return int(value) / 1000 if value is not None else None
+
+    def clear(self):
+        pass
+
+
 class RateLimiter:
     """
-    In-memory rate limiter using sliding window algorithm
-    For production, consider using Redis for distributed rate limiting
+    GCRA rate limiter with per-route/per-role rules and a pluggable state backend
+
+    If the backend fails (e.g. Redis is down) requests are counted in process
+    memory until it answers again, instead of failing every request.
     """
-    
-    def __init__(self):
-        # Store: {identifier: [timestamp1, timestamp2, ...]}
-        self.store: Dict[str, List[float]] = defaultdict(list)
-        # Cleanup old entries periodically
-        self.last_cleanup = time.time()
-        self.cleanup_interval = 300  # 5 minutes
-    
-    def _cleanup_old_entries(self, window_seconds: int):
-        """Remove old entries to prevent memory leak"""
-        current_time = time.time()
-        
-        # Only cleanup every cleanup_interval seconds
-        if current_time - self.last_cleanup < self.cleanup_interval:
-            return
-        
-        self.last_cleanup = current_time
-        window_start = current_time - window_seconds
-        
-        # Remove entries older than window
-        for identifier in list(self.store.keys()):
-            self.store[identifier] = [
-                timestamp for timestamp in self.store[identifier]
-                if timestamp > window_start
-            ]
-            
-            # Remove empty entries
-            if not self.store[identifier]:
-                del self.store[identifier]
-    
-    def check_rate_limit(
-        self,
-        request: Request,
-        max_requests: int = 100,
-        window_seconds: int = 60
-    ) -> None:
+
+    # Seconds between backend error messages during an outage
+    ERROR_LOG_INTERVAL = 60
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryRateLimitBackend()
+        self.fallback = self.backend if isinstance(self.backend, MemoryRateLimitBackend) else MemoryRateLimitBackend()
+        self._last_error_logged = 0.0
+
+    def _backend_failed(self, error: Exception):
+        now = time.monotonic()
+        if now - self._last_error_logged >= self.ERROR_LOG_INTERVAL:
+            self._last_error_logged = now
+            print(f"WARNING: Rate limit backend failed ({error}), using in-memory limiter")
+
+    async def _hit(self, key: str, max_requests: int, window_seconds: float, now: float) -> Tuple[bool, float, float]:
+        try:
+            return await self.backend.hit(key, max_requests, window_seconds, now)
+        except Exception as e:
+            if self.backend is self.fallback:
+                raise
+            self._backend_failed(e)
+            return await self.fallback.hit(key, max_requests, window_seconds, now)
+
+    async def hit(self, identifier: str, max_requests: int, window_seconds: float, bucket: str = "default") -> RateLimitDecision:
         """
-        Check if request exceeds rate limit
-        
+        Count one request for identifier against a limit
+
         Args:
-            request: FastAPI request object
-            max_requests: Maximum number of requests allowed
+            identifier: user:<id> or ip:<address>
+            max_requests: Maximum number of requests allowed per window
             window_seconds: Time window in seconds
-            
-        Raises:
-            HTTPException: If rate limit is exceeded
+            bucket: Name of the rule, so each rule has its own budget
         """
-        # Get identifier (user_id or IP address)
-        user_id = getattr(request.state, 'user_id', None)
-        client_ip = request.client.host if request.client else 'unknown'
-        identifier = user_id or f"ip:{client_ip}"
-        
-        current_time = time.time()
-        window_start = current_time - window_seconds
-        
-        # Cleanup old entries periodically
-        self._cleanup_old_entries(window_seconds)
-        
-        # Get existing requests for this identifier
-        requests = self.store[identifier]
-        
-        # Remove requests outside the time window
-        requests[:] = [ts for ts in requests if ts > window_start]
-        
-        # Check if limit is exceeded
-        if len(requests) >= max_requests:
-            # Calculate retry after time
-            oldest_request = min(requests) if requests else current_time
-            retry_after = int(window_seconds - (current_time - oldest_request)) + 1
-            
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Rate limit exceeded: {max_requests} requests per {window_seconds} seconds. Please try again in {retry_after} seconds.",
-                headers={
-                    "Retry-After": str(retry_after),
-                    "X-RateLimit-Limit": str(max_requests),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(current_time + retry_after))
-                }
-            )
-        
-        # Add current request
-        requests.append(current_time)
-        
-        # Update store
-        self.store[identifier] = requests
-    
-    def get_rate_limit_info(self, identifier: str, window_seconds: int = 60) -> Dict:
+        now = time.time()
+        allowed, tat, retry_after = await self._hit(
+            f"{bucket}|{identifier}", max_requests, window_seconds, now
+        )
+        emission_interval = window_seconds / max_requests
+        remaining = max(0, int((now + window_seconds - tat) / emission_interval)) if allowed else 0
+        return RateLimitDecision(allowed, max_requests, remaining, retry_after, tat)
+
+    async def get_rate_limit_info(self, identifier: str, max_requests: int, window_seconds: float, bucket: str = "default") -> Dict:
         """Get rate limit information for an identifier (for debugging)"""
-        current_time = time.time()
-        window_start = current_time - window_seconds
-        
-        requests = [
-            ts for ts in self.store.get(identifier, [])
-            if ts > window_start
-        ]
-        
+        now = time.time()
+        try:
+            tat = await self.backend.peek(f"{bucket}|{identifier}")
+        except Exception as e:
+            self._backend_failed(e)
+            tat = await self.fallback.peek(f"{bucket}|{identifier}")
+        emission_interval = window_seconds / max_requests
+        used = 0 if tat is None or tat <= now else math.ceil((tat - now) / emission_interval)
         return {
             "identifier": identifier,
-            "requests_count": len(requests),
+            "bucket": bucket,
+            "requests_count": min(used, max_requests),
             "window_seconds": window_seconds,
-            "oldest_request": min(requests) if requests else None,
-            "newest_request": max(requests) if requests else None
+            "full_at": tat if tat and tat > now else None
         }
 
 
+def _create_backend():
+    """Backend from RATE_LIMIT_BACKEND (memory | redis), falling back to memory"""
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend == "redis":
+        try:
+            return RedisRateLimitBackend(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+        except Exception as e:
+            print(f"WARNING: Redis rate limit backend unavailable ({e}), using in-memory limiter")
+    return MemoryRateLimitBackend(max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000")))
+
+
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(_create_backend())
+
+
+@lru_cache(maxsize=4)
+def _parse_rules(raw: str) -> Tuple[Dict, ...]:
+    """Parse RATE_LIMIT_RULES (cached per env value)
+
+    JSON list, first match wins, e.g.
+    [{"name": "login", "path": "/api/auth/login", "methods": ["POST"], "max_requests": 10, "window_seconds": 60},
+     {"name": "admin", "role": "admin", "max_requests": 2000}]
+    """
+    if not raw:
+        return ()
+    try:
+        rules = json.loads(raw)
+    except ValueError as e:
+        print(f"WARNING: Invalid RATE_LIMIT_RULES ignored: {e}")
+        return ()
+    parsed = []
+    for index, rule in enumerate(rules if isinstance(rules, list) else []):
+        if not isinstance(rule, dict) or not rule.get("max_requests"):
+            continue
+        parsed.append({
+            "name": rule.get("name") or f"rule{index}",
+            "path": rule.get("path"),
+            "methods": {method.upper() for method in rule.get("methods") or []},
+            "role": rule.get("role"),
+            "max_requests": int(rule["max_requests"]),
+            "window_seconds": int(rule["window_seconds"]) if rule.get("window_seconds") else None,
+        })
+    return tuple(parsed)
 
 
 # Rate limit configuration from environment variables
@@ -134,6 +250,136 @@ def get_rate_limit_config() -> Dict:
     return {
         "max_requests": int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "500" if is_development else "100")),
         "window_seconds": int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60")),
-        "enabled": os.getenv("RATE_LIMIT_ENABLED", "false" if is_development else "true").lower() == "true"
+        "enabled": os.getenv("RATE_LIMIT_ENABLED", "false" if is_development else "true").lower() == "true",
+        "rules": _parse_rules(os.getenv("RATE_LIMIT_RULES", ""))
     }
 
+
+def match_rule(config: Dict, path: str, method: str, role: Optional[str]) -> Tuple[str, int, int]:
+    """Pick the limit for a request: (bucket name, max_requests, window_seconds)"""
+    for rule in config["rules"]:
+        if rule["path"] and not path.startswith(rule["path"]):
+            continue
+        if rule["methods"] and method not in rule["methods"]:
+            continue
+        if rule["role"] and rule["role"] != role:
+            continue
+        return rule["name"], rule["max_requests"], rule["window_seconds"] or config["window_seconds"]
+    return "default", config["max_requests"], config["window_seconds"]
+
+
+@lru_cache(maxsize=1)
+def _jwt_secret() -> Optional[str]:
+    try:
+        from config import settings
+        return settings.SUPABASE_JWT_SECRET
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=2048)
+def _token_identity(token: str) -> Tuple[Optional[str], float]:
+    """(user id, expiry) from a Supabase access token, verified locally (no network)"""
+    secret = _jwt_secret()
+    if not secret:
+        return None, 0
+    try:
+        import jwt
+        payload = jwt.decode(token, secret, algorithms=["HS256"], options={"verify_aud": False})
+    except Exception:
+        return None, 0
+    return payload.get("sub"), float(payload.get("exp") or 0)
+
+
+def resolve_identity(scope: Scope) -> Tuple[str, Optional[str]]:
+    """Rate limit identifier and user id (None for anonymous requests)
+
+    The limiter runs before route authentication, so the bearer token is verified
+    here (signature + expiry only) to key authenticated users by user id instead
+    of a shared IP. Unverifiable tokens fall back to the client IP.
+    """
+    authorization = Headers(scope=scope).get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        user_id, expires_at = _token_identity(authorization[7:].strip())
+        if user_id and expires_at > time.time():
+            return f"user:{user_id}", user_id
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}", None
+
+
+async def resolve_role(config: Dict, user_id: Optional[str]) -> Optional[str]:
+    """App role of the user (users.role) when some rule is per-role
+
+    Supabase tokens only carry role="authenticated", so the role comes from the
+    users table through the cached name directory (no query per request).
+    """
+    if not user_id or not any(rule["role"] for rule in config["rules"]):
+        return None
+    from services.name_directory import name_directory
+    try:
+        users = await asyncio.to_thread(name_directory.resolve, "users", [user_id])
+    except Exception as e:
+        print(f"WARNING: Could not resolve role for rate limiting: {e}")
+        return None
+    return (users.get(user_id) or {}).get("role")
+
+
+class RateLimitMiddleware:
+    """Middleware to apply rate limiting to all requests (pure ASGI)"""
+
+    # Health check and documentation endpoints are never rate limited
+    SKIP_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+
+    def __init__(self, app: ASGIApp, cors_origin: str = "*"):
+        self.app = app
+        # Access-Control-Allow-Origin for 429 responses, which bypass the CORS middleware
+        self.cors_origin = cors_origin
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # Get rate limit configuration
+        config = get_rate_limit_config()
+
+        # Skip rate limiting if disabled or for excluded paths
+        if not config["enabled"] or scope["path"] in self.SKIP_PATHS:
+            return await self.app(scope, receive, send)
+
+        # Check rate limit
+        identifier, user_id = resolve_identity(scope)
+        role = await resolve_role(config, user_id)
+        bucket, max_requests, window_seconds = match_rule(config, scope["path"], scope["method"], role)
+        decision = await rate_limiter.hit(identifier, max_requests, window_seconds, bucket)
+
+        if not decision.allowed:
+            retry_after = math.ceil(decision.retry_after)
+            # Add CORS headers manually to rate limit error response
+            # This ensures CORS works even when rate limit is exceeded
+            error_response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": f"Rate limit exceeded: {max_requests} requests per {window_seconds} seconds. Please try again in {retry_after} seconds."},
+                headers={
+                    "Retry-After": str(retry_after),
+                    "X-RateLimit-Limit": str(max_requests),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(int(time.time() + retry_after)),
+                    "Access-Control-Allow-Origin": self.cors_origin,
+                    "Access-Control-Allow-Credentials": "true",
+                }
+            )
+            return await error_response(scope, receive, send)
+
+        # Make the identity available to handlers
+        scope.setdefault("state", {})["rate_limit_identifier"] = identifier
+
+        async def send_with_rate_limit_headers(message: Message):
+            if message["type"] == "http.response.start":
+                # Add rate limit headers to response
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(decision.limit)
+                headers["X-RateLimit-Remaining"] = str(decision.remaining)
+            await send(message)
+
+        # Process request
+        await self.app(scope, receive, send_with_rate_limit_headers)
@@ -4,26 +4,32 @@ Generates unique request ID for each request for tracking and debugging
 """
 
 import uuid
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Middleware to add X-Request-ID header to all requests"""
+class RequestIDMiddleware:
+    """Middleware to add X-Request-ID header to all requests (pure ASGI)"""
     
-    async def dispatch(self, request: Request, call_next):
-        # Get existing request ID from header or generate new one
-        request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
         
-        # Store in request state for use in handlers
-        request.state.request_id = request_id
+        # Get existing request ID from header or generate new one
+        request_id = Headers(scope=scope).get("X-Request-ID")
+        if request_id is None:
+            request_id = str(uuid.uuid4())
         
-        # Process request
-        response = await call_next(request)
+        # Store in request state for use in handlers (request.state.request_id)
+        scope.setdefault("state", {})["request_id"] = request_id
         
-        # Add X-Request-ID to response headers
-        response.headers["X-Request-ID"] = request_id
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                # Add X-Request-ID to response headers
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
         
-        return response
-
+        await self.app(scope, receive, send_with_request_id)
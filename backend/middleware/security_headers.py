@@ -3,37 +3,40 @@ Security Headers Middleware
 Adds security headers to all responses for better security
 """
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-import os
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Middleware to add security headers to all responses"""
+class SecurityHeadersMiddleware:
+    """Middleware to add security headers to all responses (pure ASGI)"""
     
-    def __init__(self, app, environment: str = "development"):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, environment: str = "development"):
+        self.app = app
         self.environment = environment
-    
-    async def dispatch(self, request: Request, call_next):
-        # Process request
-        response = await call_next(request)
-        
-        # Add security headers
-        # X-Content-Type-Options: Prevent MIME type sniffing
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        
-        # X-Frame-Options: Prevent clickjacking
-        response.headers["X-Frame-Options"] = "DENY"
-        
-        # X-XSS-Protection: Enable XSS filter (legacy browsers)
-        response.headers["X-XSS-Protection"] = "1; mode=block"
         
+        # Header values are static, build them once
+        self.headers = {
+            # X-Content-Type-Options: Prevent MIME type sniffing
+            "X-Content-Type-Options": "nosniff",
+            # X-Frame-Options: Prevent clickjacking
+            "X-Frame-Options": "DENY",
+            # X-XSS-Protection: Enable XSS filter (legacy browsers)
+            "X-XSS-Protection": "1; mode=block",
+        }
         # Strict-Transport-Security: Force HTTPS (only in production)
-        if self.environment == "production":
+        if environment == "production":
             # HSTS: max-age=1 year, includeSubDomains
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+            self.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
         
-        return response
-
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in self.headers.items():
+                    headers[name] = value
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
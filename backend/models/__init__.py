@@ -2,18 +2,23 @@
 Database models for Financial Management System
 """
 
-from .user import User, UserCreate, UserUpdate
-from .employee import Employee, EmployeeCreate, EmployeeUpdate
-from .customer import Customer, CustomerCreate, CustomerUpdate
-from .project import Project, ProjectCreate, ProjectUpdate
-from .expense import Expense, ExpenseCreate, ExpenseUpdate
-from .invoice import Invoice, InvoiceCreate, InvoiceUpdate
+import importlib
 
-__all__ = [
-    "User", "UserCreate", "UserUpdate",
-    "Employee", "EmployeeCreate", "EmployeeUpdate", 
-    "Customer", "CustomerCreate", "CustomerUpdate",
-    "Project", "ProjectCreate", "ProjectUpdate",
-    "Expense", "ExpenseCreate", "ExpenseUpdate",
-    "Invoice", "InvoiceCreate", "InvoiceUpdate"
-]
+# Submodules are imported on first attribute access (PEP 562), so importing
+# models.user does not build every pydantic model at startup
+_EXPORTS = {
+    "User": "user", "UserCreate": "user", "UserUpdate": "user",
+    "Employee": "employee", "EmployeeCreate": "employee", "EmployeeUpdate": "employee",
+    "Customer": "customer", "CustomerCreate": "customer", "CustomerUpdate": "customer",
+    "Project": "project", "ProjectCreate": "project", "ProjectUpdate": "project",
+    "Expense": "expense", "ExpenseCreate": "expense", "ExpenseUpdate": "expense",
+    "Invoice": "invoice", "InvoiceCreate": "invoice", "InvoiceUpdate": "invoice",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -197,6 +197,11 @@ class CustomProductStructureUpdate(BaseModel):
     is_default: Optional[bool] = None
     is_active: Optional[bool] = None
 
+# Name generation
+class ProductNameRequest(BaseModel):
+    category_id: str
+    structure_id: Optional[str] = None
+    selected_options: Dict[str, str]  # column_id -> option_id
 
-
-
+class ProductNamesRequest(BaseModel):
+    items: List[ProductNameRequest]
@@ -340,11 +340,20 @@ class Task(BaseModel):
     project_name: Optional[str] = None
     comment_count: Optional[int] = 0
     attachment_count: Optional[int] = 0
+    assignee_count: Optional[int] = 0
+    checklist_item_count: Optional[int] = 0
+    checklist_completed_count: Optional[int] = 0
     parent_id: Optional[str] = None
     checklists: Optional[List["TaskChecklist"]] = []
     project: Optional[dict] = None
 
 
+class TaskBoardPage(BaseModel):
+    """One page of task cards (checklists are loaded per task)"""
+    items: List[Task] = []
+    next_cursor: Optional[str] = None
+
+
 class TaskTimeLog(BaseModel):
     id: str
     task_id: str
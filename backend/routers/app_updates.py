@@ -4,7 +4,7 @@ Handles version checking and APK file serving for Android app updates
 Now uses Supabase database to store version information
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form, Request
 from fastapi.responses import FileResponse, RedirectResponse
 from typing import Optional, List
 from pydantic import BaseModel
@@ -14,6 +14,7 @@ from datetime import datetime
 import logging
 from services.supabase_client import get_supabase_client
 from utils.auth import get_current_user, require_admin
+from utils.response_cache import response_cache
 from models.user import User
 from config import settings
 
@@ -45,6 +46,7 @@ class UpdateDownloadUrlRequest(BaseModel):
 
 @router.get("/check", response_model=AppVersionResponse)
 async def check_app_version(
+    request: Request,
     current_version_code: int,
     current_version_name: Optional[str] = None,
     supabase: Optional = Depends(get_supabase_client)
@@ -58,7 +60,7 @@ async def check_app_version(
     Returns:
         AppVersionResponse with update information
     """
-    try:
+    def load():
         # Get latest active version from database
         response = supabase.table("app_versions").select("*").eq("is_active", True).is_("deleted_at", "null").order("version_code", desc=True).limit(1).execute()
         
@@ -118,6 +120,12 @@ async def check_app_version(
             release_notes=release_notes,
             file_size=file_size
         )
+
+    try:
+        # Polled on every app start: cached with ETag, invalidated by version writes
+        return await response_cache.respond(
+            request, "app_versions", (current_version_code, current_version_name), load, AppVersionResponse
+        )
     except Exception as e:
         logger.error(f"Error checking app version: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -443,6 +451,7 @@ async def update_latest_download_url(
             .eq("id", latest_version["id"])
             .execute()
         )
+        response_cache.invalidate("app_versions")
 
         if not update_response.data:
             raise HTTPException(
@@ -523,6 +532,7 @@ async def create_version(
         }
         
         response = supabase.table("app_versions").insert(version_record).execute()
+        response_cache.invalidate("app_versions")
         
         if not response.data:
             raise HTTPException(
@@ -670,6 +680,7 @@ async def upload_apk(
         }
         
         response = supabase.table("app_versions").update(update_data).eq("id", version["id"]).execute()
+        response_cache.invalidate("app_versions")
         
         if not response.data:
             raise HTTPException(
@@ -12,19 +12,21 @@ from jwt import PyJWTError
 from pydantic import BaseModel, EmailStr
 import asyncio
 import os
-import requests
 from concurrent.futures import ThreadPoolExecutor
 
 from config import settings
 from services.supabase_client import get_supabase_client
 # Email service
 from services.email_service import email_service
+from services.email_outbox_service import email_outbox_service
+from services.name_directory import name_directory
+from utils.response_cache import response_cache
 from models.user import User, UserCreate, UserUpdate, UserLogin, UserResponse
 from utils.auth import (
     create_access_token,
     verify_token,
     get_current_user,
-    hash_password,
+    hash_password_async,
     create_password_reset_token,
     verify_password_reset_token,
 )
@@ -144,7 +146,7 @@ async def register(user_data: UserCreate):
             )
         
         # Hash password
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         
         # Create user in Supabase Auth
         auth_response = supabase.auth.sign_up({
@@ -272,6 +274,9 @@ async def update_current_user(
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
         result = supabase.table("users").update(update_data).eq("id", current_user.id).execute()
+        name_directory.invalidate("users", [current_user.id])
+        # The employees dropdown shows users.full_name
+        response_cache.invalidate("employees")
         
         if result.data:
             return UserResponse(**result.data[0])
@@ -339,18 +344,18 @@ async def change_password(
         
         # Update stored hash for reference
         supabase.table("users").update({
-            "password_hash": hash_password(password_data.new_password),
+            "password_hash": await hash_password_async(password_data.new_password),
             "updated_at": datetime.utcnow().isoformat()
         }).eq("id", current_user.id).execute()
         
         # Email service temporarily disabled
         if email_service:
             try:
-                await email_service.send_password_change_confirmation(
-                    user_email=current_user.email,
-                    user_name=current_user.full_name,
-                    via="manual"
-                )
+                await email_outbox_service.enqueue("password_change", current_user.email, {
+                    "user_email": current_user.email,
+                    "user_name": current_user.full_name,
+                    "via": "manual"
+                })
             except Exception as e:
                 print(f"⚠️ Email service disabled - skipping password change confirmation: {e}")
         
@@ -416,7 +421,7 @@ async def reset_password(password_reset_confirm: PasswordResetConfirm):
         # Update stored hash
         try:
             supabase.table("users").update({
-                "password_hash": hash_password(password_reset_confirm.new_password),
+                "password_hash": await hash_password_async(password_reset_confirm.new_password),
                 "updated_at": datetime.utcnow().isoformat()
             }).eq("id", user_id).execute()
         except Exception as hash_error:
@@ -434,11 +439,11 @@ async def reset_password(password_reset_confirm: PasswordResetConfirm):
         # Email service temporarily disabled
         if email_service:
             try:
-                await email_service.send_password_change_confirmation(
-                    user_email=user_email,
-                    user_name=user_full_name,
-                    via="reset"
-                )
+                await email_outbox_service.enqueue("password_change", user_email, {
+                    "user_email": user_email,
+                    "user_name": user_full_name,
+                    "via": "reset"
+                })
             except Exception as e:
                 print(f"⚠️ Email service disabled - skipping password change confirmation: {e}")
         
@@ -498,6 +503,8 @@ async def update_user(
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
         result = supabase.table("users").update(update_data).eq("id", user_id).execute()
+        name_directory.invalidate("users", [user_id])
+        response_cache.invalidate("employees")
         
         if result.data:
             return UserResponse(**result.data[0])
@@ -763,6 +770,7 @@ Nếu bạn không yêu cầu, hãy bỏ qua email này.
             payload["webhook_id"] = n8n_webhook_id
         
         # Send request to n8n webhook
+        import requests
         try:
             print(f"📤 Sending POST request to: {n8n_webhook_url}")
             print(f"📦 Payload keys: {list(payload.keys())}")
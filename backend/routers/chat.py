@@ -25,6 +25,7 @@ from models.user import User
 from utils.auth import get_current_user
 from services.supabase_client import get_supabase_client
 from services.file_upload_service import get_file_upload_service
+from services.name_directory import name_directory
 
 logger = logging.getLogger(__name__)
 
@@ -58,14 +59,7 @@ def _enrich_conversation_with_participants(supabase, conversation: dict, current
         participants.append(p)
     
     # Get user info for participants
-    user_map = {}
-    if user_ids:
-        try:
-            users_result = supabase.table("users").select("id, full_name").in_("id", user_ids).execute()
-            if users_result.data:
-                user_map = {user["id"]: user.get("full_name") for user in users_result.data}
-        except Exception:
-            pass
+    user_map = name_directory.names("users", user_ids)
     
     # Enrich participants with user names
     enriched_participants = []
@@ -401,14 +395,7 @@ async def get_messages(
         enriched_messages = []
         sender_ids = list(set([m["sender_id"] for m in messages_result.data or [] if m.get("sender_id")]))
         
-        user_map = {}
-        if sender_ids:
-            try:
-                users_result = supabase.table("users").select("id, full_name").in_("id", sender_ids).execute()
-                if users_result.data:
-                    user_map = {user["id"]: user.get("full_name") for user in users_result.data}
-            except Exception:
-                pass
+        user_map = name_directory.names("users", sender_ids)
         
         # Get reply messages if any
         reply_ids = [m["reply_to_id"] for m in messages_result.data or [] if m.get("reply_to_id")]
@@ -702,7 +689,8 @@ async def upload_chat_file(
         file_result = await upload_service.upload_file(
             file=file,
             folder_path=folder_path,
-            generate_unique_name=True
+            generate_unique_name=True,
+            deduplicate=True
         )
         
         return {
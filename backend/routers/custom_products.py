@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional, Dict, Any
 from services.supabase_client import get_supabase_client
+from services.custom_product_catalog import custom_product_catalog
 from models.user import User
 from models.custom_products import (
     CustomProductCategory, CustomProductCategoryCreate, CustomProductCategoryUpdate,
     CustomProductColumn, CustomProductColumnCreate, CustomProductColumnUpdate,
     CustomProductOption, CustomProductOptionCreate, CustomProductOptionUpdate,
     CustomProduct, CustomProductCreate, CustomProductUpdate,
-    CustomProductStructure, CustomProductStructureCreate, CustomProductStructureUpdate
+    CustomProductStructure, CustomProductStructureCreate, CustomProductStructureUpdate,
+    ProductNamesRequest
 )
 from utils.auth import get_current_user
+from utils.response_cache import response_cache
 from config import settings
+import asyncio
 import uuid
 from datetime import datetime
 
@@ -62,13 +66,14 @@ async def get_current_user_dev_mode():
 
 @router.get("/categories", response_model=List[CustomProductCategory])
 async def get_categories(
+    request: Request,
     active_only: bool = Query(True),
     current_user: Optional[User] = Depends(get_current_user_dev_mode)
 ):
     """Get all categories"""
     print(f"[API] Getting categories, active_only={active_only}, user={current_user.id if current_user else 'None'}")
 
-    try:
+    def load():
         supabase = get_supabase_client()
         query = supabase.table("custom_product_categories").select("*").order("order_index")
 
@@ -84,6 +89,10 @@ async def get_categories(
             print(f"[API] Category {i+1}: {cat.get('name')} (ID: {cat.get('id')}, is_primary: {cat.get('is_primary')})")
 
         return categories
+
+    try:
+        # Cached with ETag; invalidated by category writes
+        return await response_cache.respond(request, "custom_product_categories", active_only, load, List[CustomProductCategory])
     except Exception as e:
         print(f"[API ERROR] Failed to get categories: {str(e)}")
         import traceback
@@ -156,6 +165,8 @@ async def create_category(
     data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_categories").insert(data).execute()
+    response_cache.invalidate("custom_product_categories")
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to create category")
@@ -178,6 +189,8 @@ async def update_category(
     update_data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_categories").update(update_data).eq("id", category_id).execute()
+    response_cache.invalidate("custom_product_categories")
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to update category")
@@ -213,6 +226,8 @@ async def delete_category(
 
     # Hard delete the category (cascade will delete related columns and options)
     result = supabase.table("custom_product_categories").delete().eq("id", category_id).execute()
+    response_cache.invalidate("custom_product_categories")
+    custom_product_catalog.invalidate()
 
     return {"message": "Category deleted successfully", "id": category_id}
 
@@ -243,14 +258,11 @@ async def get_columns_by_category(
     current_user: User = Depends(get_current_user_dev_mode)
 ):
     """Get columns for a specific category"""
-    supabase = get_supabase_client()
-    query = supabase.table("custom_product_columns").select("*").eq("category_id", category_id).order("order_index")
-
+    catalog = await asyncio.to_thread(custom_product_catalog.get)
     if active_only:
-        query = query.eq("is_active", True)
-
-    result = query.execute()
-    return result.data if result.data else []
+        return catalog.columns_by_category.get(category_id, [])
+    columns = [column for column in catalog.columns.values() if column["category_id"] == category_id]
+    return sorted(columns, key=lambda column: column.get("order_index") or 0)
 
 @router.post("/columns", response_model=CustomProductColumn)
 async def create_column(
@@ -271,6 +283,7 @@ async def create_column(
     data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_columns").insert(data).execute()
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to create column")
@@ -293,6 +306,7 @@ async def update_column(
     update_data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_columns").update(update_data).eq("id", column_id).execute()
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to update column")
@@ -314,6 +328,7 @@ async def delete_column(
         "is_active": False,
         "updated_at": datetime.utcnow().isoformat()
     }).eq("id", column_id).execute()
+    custom_product_catalog.invalidate()
 
     if result.data:
         return {"message": "Column deleted successfully", "id": column_id}
@@ -328,16 +343,15 @@ async def get_options(
     current_user: User = Depends(get_current_user_dev_mode)
 ):
     """Get all options, optionally filtered by column"""
-    supabase = get_supabase_client()
-    query = supabase.table("custom_product_options").select("*").order("order_index")
+    catalog = await asyncio.to_thread(custom_product_catalog.get)
+    if column_id and active_only:
+        return catalog.options_by_column.get(column_id, [])
 
-    if column_id:
-        query = query.eq("column_id", column_id)
-    if active_only:
-        query = query.eq("is_active", True)
-
-    result = query.execute()
-    return result.data if result.data else []
+    options = [
+        option for option in catalog.options.values()
+        if (not column_id or option["column_id"] == column_id) and (not active_only or option.get("is_active"))
+    ]
+    return sorted(options, key=lambda option: option.get("order_index") or 0)
 
 @router.post("/options", response_model=CustomProductOption)
 async def create_option(
@@ -358,6 +372,7 @@ async def create_option(
     data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_options").insert(data).execute()
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to create option")
@@ -380,6 +395,7 @@ async def update_option(
     update_data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_options").update(update_data).eq("id", option_id).execute()
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to update option")
@@ -401,6 +417,7 @@ async def delete_option(
         "is_active": False,
         "updated_at": datetime.utcnow().isoformat()
     }).eq("id", option_id).execute()
+    custom_product_catalog.invalidate()
 
     if result.data:
         return {"message": "Option deleted successfully", "id": option_id}
@@ -430,48 +447,14 @@ async def get_structures(
 async def get_dashboard_data(
     current_user: User = Depends(get_current_user_dev_mode)
 ):
-    """Get all data needed for dashboard in a single request to avoid rate limiting"""
-    supabase = get_supabase_client()
+    """Get all data needed for dashboard in a single request to avoid rate limiting
 
+    Served from the in-memory catalog snapshot, so it includes every active option
+    (previously truncated to 50). "version" changes whenever the catalog is reloaded.
+    """
     try:
-        # Get all active categories
-        categories_result = supabase.table("custom_product_categories").select("*").eq("is_active", True).order("order_index", desc=True).execute()
-        categories = categories_result.data or []
-
-        # Get all active structures
-        structures_result = supabase.table("custom_product_structures").select("*").eq("is_active", True).order("created_at", desc=True).execute()
-        structures = structures_result.data or []
-
-        # Get all active columns
-        columns_result = supabase.table("custom_product_columns").select("*").eq("is_active", True).order("order_index", desc=True).execute()
-        columns = columns_result.data or []
-
-        # Group columns by category_id
-        columns_by_category = {}
-        for column in columns:
-            category_id = column["category_id"]
-            if category_id not in columns_by_category:
-                columns_by_category[category_id] = []
-            columns_by_category[category_id].append(column)
-
-        # Get limited options for performance (first 50 options only)
-        options_result = supabase.table("custom_product_options").select("*").eq("is_active", True).order("order_index", desc=True).limit(50).execute()
-        options = options_result.data or []
-
-        # Group options by column_id
-        options_by_column = {}
-        for option in options:
-            column_id = option["column_id"]
-            if column_id not in options_by_column:
-                options_by_column[column_id] = []
-            options_by_column[column_id].append(option)
-
-        return {
-            "categories": categories,
-            "structures": structures,
-            "columns_by_category": columns_by_category,
-            "options_by_column": options_by_column
-        }
+        catalog = await asyncio.to_thread(custom_product_catalog.get)
+        return catalog.dashboard_data()
 
     except Exception as e:
         print(f"Error in get_dashboard_data: {e}")
@@ -498,6 +481,7 @@ async def create_structure(
     data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_structures").insert(data).execute()
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to create structure")
@@ -527,6 +511,7 @@ async def update_structure(
     update_data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("custom_product_structures").update(update_data).eq("id", structure_id).execute()
+    custom_product_catalog.invalidate()
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to update structure")
@@ -548,11 +533,60 @@ async def delete_structure(
         "is_active": False,
         "updated_at": datetime.utcnow().isoformat()
     }).eq("id", structure_id).execute()
+    custom_product_catalog.invalidate()
 
     if result.data:
         return {"message": "Structure deleted successfully", "id": structure_id}
     raise HTTPException(status_code=400, detail="Failed to delete structure")
 
+# ========== NAME GENERATION ==========
+# Declared before "/{product_id}" so these paths are not captured by it
+
+def _parse_selected_options_from_query(request: Request) -> Dict[str, str]:
+    """Parse selected_options from query string (e.g. selected_options[col_id]=opt_id)."""
+    selected_options: Dict[str, str] = {}
+    for key, value in request.query_params.items():
+        if key.startswith("selected_options[") and key.endswith("]"):
+            col_id = key[len("selected_options[") : -1]
+            if col_id and value:
+                selected_options[col_id] = value
+    return selected_options
+
+
+@router.get("/generate-name")
+async def generate_product_name(
+    request: Request,
+    category_id: str = Query(...),
+    structure_id: Optional[str] = Query(None),
+    current_user: User = Depends(get_current_user_dev_mode),
+):
+    """Generate product name from selected options (query: selected_options[column_id]=option_id)."""
+    selected_options = _parse_selected_options_from_query(request)
+    if not selected_options:
+        raise HTTPException(status_code=400, detail="Missing or invalid selected_options")
+
+    catalog = await asyncio.to_thread(custom_product_catalog.get)
+    try:
+        return catalog.generate_name(category_id, selected_options, structure_id)
+    except LookupError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/generate-names")
+async def generate_product_names(
+    request_data: ProductNamesRequest,
+    current_user: User = Depends(get_current_user_dev_mode),
+):
+    """Generate names for many products at once; failures are reported per item"""
+    catalog = await asyncio.to_thread(custom_product_catalog.get)
+    results = []
+    for item in request_data.items:
+        try:
+            results.append(catalog.generate_name(item.category_id, item.selected_options, item.structure_id))
+        except LookupError as e:
+            results.append({"error": str(e)})
+    return {"version": catalog.version, "results": results}
+
 # ========== COMBINED PRODUCTS ==========
 
 @router.get("/", response_model=List[CustomProduct])
@@ -675,87 +709,6 @@ async def reorder_columns(
             "order_index": i,
             "updated_at": datetime.utcnow().isoformat()
         }).eq("id", col_data["id"]).execute()
+    custom_product_catalog.invalidate()
 
     return {"message": "Columns reordered successfully"}
-
-def _parse_selected_options_from_query(request: Request) -> Dict[str, str]:
-    """Parse selected_options from query string (e.g. selected_options[col_id]=opt_id)."""
-    selected_options: Dict[str, str] = {}
-    for key, value in request.query_params.items():
-        if key.startswith("selected_options[") and key.endswith("]"):
-            col_id = key[len("selected_options[") : -1]
-            if col_id and value:
-                selected_options[col_id] = value
-    return selected_options
-
-
-@router.get("/generate-name")
-async def generate_product_name(
-    request: Request,
-    category_id: str = Query(...),
-    structure_id: Optional[str] = Query(None),
-    current_user: User = Depends(get_current_user_dev_mode),
-):
-    """Generate product name from selected options (query: selected_options[column_id]=option_id)."""
-    selected_options = _parse_selected_options_from_query(request)
-    if not selected_options:
-        raise HTTPException(status_code=400, detail="Missing or invalid selected_options")
-
-    supabase = get_supabase_client()
-
-    # Get structure (default or specified)
-    if structure_id:
-        structure_result = supabase.table("custom_product_structures").select("*").eq("id", structure_id).execute()
-    else:
-        structure_result = supabase.table("custom_product_structures").select("*").eq("category_id", category_id).eq("is_default", True).execute()
-
-    if not structure_result.data:
-        raise HTTPException(status_code=400, detail="No structure found for category")
-
-    structure = structure_result.data[0]
-    column_order = structure.get("column_order") or []
-    separator = structure.get("separator") or " "
-
-    # Get detailed information for each column
-    option_details = []
-    generated_parts = []
-
-    for column_id in column_order:
-        if column_id in selected_options:
-            option_id = selected_options[column_id]
-
-            # Get column information
-            column_result = supabase.table("custom_product_columns").select("name, category_id").eq("id", column_id).execute()
-            if column_result.data:
-                column_data = column_result.data[0]
-
-                # Get category name
-                category_result = supabase.table("custom_product_categories").select("name").eq("id", column_data["category_id"]).execute()
-                category_name = category_result.data[0]["name"] if category_result.data else "Unknown"
-
-                # Get option name
-                option_result = supabase.table("custom_product_options").select("name").eq("id", option_id).execute()
-                if option_result.data:
-                    option_name = option_result.data[0]["name"]
-
-                    # Create detailed part
-                    part_detail = {
-                        "option_name": option_name,
-                        "column_name": column_data["name"],
-                        "category_name": category_name,
-                        "full_text": f"{option_name} ({category_name})"
-                    }
-
-                    option_details.append(part_detail)
-                    generated_parts.append(part_detail["full_text"])
-
-    generated_name = separator.join(generated_parts)
-
-    return {
-        "generated_name": generated_name,
-        "option_details": option_details,
-        "separator": separator,
-        "generated_parts": generated_parts
-    }
-
-
@@ -3,7 +3,7 @@ Customer Management Router
 Handles CRUD operations for customers, customer levels, and transaction history
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional
 from datetime import datetime, date
 import uuid
@@ -26,6 +26,8 @@ from utils.customer_code_generator import (
     check_customer_code_exists
 )
 from services.supabase_client import get_supabase_client
+from utils.response_cache import response_cache
+from services.name_directory import name_directory
 
 router = APIRouter()
 
@@ -181,10 +183,11 @@ async def get_customers_public_list():
 
 @router.get("/dropdown")
 async def get_customers_dropdown(
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Get customers list for dropdown selection - simplified endpoint with authentication"""
-    try:
+    def load():
         supabase = get_supabase_client()
         
         # Get basic customer info for dropdown
@@ -197,7 +200,10 @@ async def get_customers_dropdown(
         
         # Return as array (not wrapped in object) for easier frontend consumption
         return result.data or []
-        
+
+    try:
+        # Cached with ETag; invalidated by customer writes
+        return await response_cache.respond(request, "customers", "dropdown", load)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -634,6 +640,7 @@ async def create_customer(customer_data: CustomerCreate):
         customer_dict["updated_at"] = datetime.utcnow().isoformat()
         
         result = supabase.table("customers").insert(customer_dict).execute()
+        response_cache.invalidate("customers")
         
         if result.data:
             customer_data = result.data[0]
@@ -694,6 +701,8 @@ async def update_customer(
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
         result = supabase.table("customers").update(update_data).eq("id", customer_id).execute()
+        response_cache.invalidate("customers")
+        name_directory.invalidate("customers", [customer_id])
         
         if result.data:
             customer_data = result.data[0]
@@ -798,6 +807,9 @@ async def delete_customer(
                 
                 # 8. Finally, delete the customer
                 result = supabase.table("customers").delete().eq("id", customer_id).execute()
+                response_cache.invalidate("customers")
+                name_directory.invalidate("customers", [customer_id])
+                name_directory.invalidate("projects")
                 
                 # Verify deletion - Supabase sometimes returns empty data even on success
                 # So we check if customer still exists
@@ -839,6 +851,7 @@ async def delete_customer(
                 "status": "inactive",
                 "updated_at": datetime.utcnow().isoformat()
             }).eq("id", customer_id).execute()
+            response_cache.invalidate("customers")
             
             if result.data:
                 return {"message": "Customer deleted successfully (soft delete)"}
@@ -3,20 +3,16 @@ Employee Excel Import/Export Router
 Simple, dedicated router for Excel operations - NO AUTHENTICATION REQUIRED for download
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from fastapi.responses import StreamingResponse
-from typing import List
-import pandas as pd
+from typing import List, Optional
+import asyncio
 import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.worksheet.datavalidation import DataValidation
-from datetime import datetime
-import uuid
-import random
 
+from services.employee_onboarding_service import OnboardingRow, employee_onboarding_service
 from services.supabase_client import get_supabase_client
-from utils.auth import hash_password, require_manager_or_admin
+from utils.auth import require_manager_or_admin
+from utils.response_cache import response_cache
 from models.user import User
 
 # Create dedicated router for Excel operations
@@ -37,6 +33,9 @@ async def download_excel_template():
         5. Danh sách chức vụ (Positions detail)
         6. Hướng dẫn (Instructions)
     """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.worksheet.datavalidation import DataValidation
     try:
         supabase = get_supabase_client()
         
@@ -337,12 +336,18 @@ async def download_excel_template():
 @router.post("/upload-excel")
 async def upload_excel(
     file: UploadFile = File(...),
+    job_id: Optional[str] = Query(None, description="Resume a previous import of the same file"),
     current_user: User = Depends(require_manager_or_admin)
 ):
     """
     Upload and import employees from Excel
     REQUIRES AUTHENTICATION: Admin or Manager only
+
+    Rows are imported in batches (services/employee_onboarding_service.py). If some
+    rows fail, fix the file and upload it again with the returned job_id: rows
+    already imported are skipped.
     """
+    import pandas as pd  # Imported on first use (slow import)
     try:
         # Validate file
         if not file.filename.endswith(('.xlsx', '.xls')):
@@ -371,116 +376,74 @@ async def upload_excel(
         current_user_id = str(current_user.id)
         current_user_email = current_user.email
         
-        # Process rows
-        success = 0
-        errors = []
+        # Parse rows; invalid ones are kept with their error so they appear in the job
+        rows = []
         for idx, row in df.iterrows():
-            row_num = idx + 2
+            first_name = str(row.get("Họ *", "")).strip()
+            last_name = str(row.get("Tên *", "")).strip()
+            email = str(row.get("Email *", "")).strip().lower()
+            hire_date_str = str(row.get("Ngày vào làm *", "")).strip()
+            dept_code = str(row.get("Mã phòng ban", "")).strip() if pd.notna(row.get("Mã phòng ban")) else None
+            pos_code = str(row.get("Mã chức vụ", "")).strip() if pd.notna(row.get("Mã chức vụ")) else None
+            salary = row.get("Lương") if pd.notna(row.get("Lương")) else None
+            onboarding_row = OnboardingRow(
+                row_number=idx + 2,
+                email=email,
+                first_name=first_name,
+                last_name=last_name,
+                phone=str(row.get("Số điện thoại", "")).strip() if pd.notna(row.get("Số điện thoại")) else None,
+                department_id=dept_map.get(dept_code),
+                position_id=pos_map.get(pos_code),
+                role=str(row.get("Vai trò *", "employee")).strip().lower(),
+                password=str(row.get("Mật khẩu", "123456")).strip(),
+            )
+            rows.append(onboarding_row)
+            
+            # Validate
+            if not all([first_name, last_name, email, hire_date_str]):
+                onboarding_row.fail("Thiếu thông tin bắt buộc")
+                continue
+            
+            if "@" not in email:
+                onboarding_row.fail("Email không hợp lệ")
+                continue
+            
+            # Parse date
             try:
-                # Extract data
-                first_name = str(row.get("Họ *", "")).strip()
-                last_name = str(row.get("Tên *", "")).strip()
-                email = str(row.get("Email *", "")).strip().lower()
-                phone = str(row.get("Số điện thoại", "")).strip() if pd.notna(row.get("Số điện thoại")) else None
-                dept_code = str(row.get("Mã phòng ban", "")).strip() if pd.notna(row.get("Mã phòng ban")) else None
-                pos_code = str(row.get("Mã chức vụ", "")).strip() if pd.notna(row.get("Mã chức vụ")) else None
-                hire_date_str = str(row.get("Ngày vào làm *", "")).strip()
-                salary = row.get("Lương") if pd.notna(row.get("Lương")) else None
-                role = str(row.get("Vai trò *", "employee")).strip().lower()
-                password = str(row.get("Mật khẩu", "123456")).strip()
-                
-                # Validate
-                if not all([first_name, last_name, email, hire_date_str]):
-                    errors.append(f"Dòng {row_num}: Thiếu thông tin bắt buộc")
-                    continue
-                
-                if "@" not in email:
-                    errors.append(f"Dòng {row_num}: Email không hợp lệ")
-                    continue
-                
-                # Parse date
-                try:
-                    hire_date = pd.to_datetime(hire_date_str).date().isoformat()
-                except:
-                    errors.append(f"Dòng {row_num}: Ngày không hợp lệ (dùng YYYY-MM-DD)")
-                    continue
-                
-                # Check email exists
-                existing = supabase.table("users").select("id").eq("email", email).execute()
-                if existing.data:
-                    errors.append(f"Dòng {row_num}: Email {email} đã tồn tại")
-                    continue
-                
-                # Generate employee code
-                emp_code = f"EMP{datetime.now().strftime('%Y%m')}{random.randint(1000, 9999)}"
-                while supabase.table("employees").select("id").eq("employee_code", emp_code).execute().data:
-                    emp_code = f"EMP{datetime.now().strftime('%Y%m')}{random.randint(1000, 9999)}"
-                
-                # Create auth user
-                auth_resp = supabase.auth.admin.create_user({
-                    "email": email,
-                    "password": password,
-                    "email_confirm": True,
-                    "user_metadata": {
-                        "full_name": f"{first_name} {last_name}",
-                        "role": role
-                    }
-                })
-                
-                if not auth_resp.user:
-                    errors.append(f"Dòng {row_num}: Không tạo được tài khoản")
-                    continue
-                
-                user_id = auth_resp.user.id
-                
-                # Create user record
-                supabase.table("users").insert({
-                    "id": user_id,
-                    "email": email,
-                    "full_name": f"{first_name} {last_name}",
-                    "role": role,
-                    "password_hash": hash_password(password),
-                    "is_active": True,
-                    "created_by": current_user_id,
-                    "updated_by": current_user_id,
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
-                }).execute()
-                
-                # Create employee
-                supabase.table("employees").insert({
-                    "id": str(uuid.uuid4()),
-                    "user_id": user_id,
-                    "employee_code": emp_code,
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "email": email,
-                    "phone": phone,
-                    "department_id": dept_map.get(dept_code),
-                    "position_id": pos_map.get(pos_code),
-                    "hire_date": hire_date,
-                    "salary": float(salary) if salary else None,
-                    "status": "active",
-                    "created_by": current_user_id,
-                    "updated_by": current_user_id,
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
-                }).execute()
-                
-                success += 1
-                
-            except Exception as e:
-                errors.append(f"Dòng {row_num}: {str(e)}")
+                onboarding_row.hire_date = pd.to_datetime(hire_date_str).date().isoformat()
+            except:
+                onboarding_row.fail("Ngày không hợp lệ (dùng YYYY-MM-DD)")
                 continue
+            
+            try:
+                onboarding_row.salary = float(salary) if salary else None
+            except (TypeError, ValueError):
+                onboarding_row.fail("Lương không hợp lệ")
+        
+        try:
+            result = await employee_onboarding_service.run(
+                rows,
+                created_by=current_user_id,
+                file_name=file.filename,
+                job_id=job_id,
+            )
+        except LookupError:
+            raise HTTPException(404, "Không tìm thấy job import")
+        
+        if result["success_count"]:
+            response_cache.invalidate("employees")
         
         return {
             "message": "Hoàn thành import",
-            "success_count": success,
-            "error_count": len(errors),
+            "job_id": result["job_id"],
+            "success_count": result["success_count"],
+            "skipped_count": result["skipped_count"],
+            "error_count": result["error_count"],
             "total_rows": len(df),
             "imported_by": current_user_email,
             "imported_by_id": current_user_id,
-            "errors": errors[:20]
+            "errors": result["errors"][:20],
+            "rows": result["rows"]
         }
         
     except HTTPException:
@@ -488,3 +451,17 @@ async def upload_excel(
     except Exception as e:
         raise HTTPException(500, f"Lỗi xử lý file: {str(e)}")
 
+
+@router.get("/import-jobs/{job_id}")
+async def get_import_job(
+    job_id: str,
+    current_user: User = Depends(require_manager_or_admin)
+):
+    """
+    Status of an Excel import job, with the status of every row
+    REQUIRES AUTHENTICATION: Admin or Manager only
+    """
+    job = await asyncio.to_thread(employee_onboarding_service.get_job, job_id)
+    if not job:
+        raise HTTPException(404, "Không tìm thấy job import")
+    return job
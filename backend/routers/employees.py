@@ -3,7 +3,7 @@ Employee Management Router
 Handles CRUD operations for employees, departments, and positions
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional
 from datetime import datetime, date
 import uuid
@@ -14,9 +14,11 @@ from models.employee import (
     PositionCreate, PositionUpdate
 )
 from models.user import User, UserRole
-from utils.auth import get_current_user, require_manager_or_admin, hash_password
+from utils.auth import get_current_user, require_manager_or_admin, hash_password_async
 from utils.simple_auth import get_current_user_simple
 from services.supabase_client import get_supabase_client
+from utils.response_cache import response_cache
+from services.name_directory import name_directory
 
 router = APIRouter()
 
@@ -93,9 +95,9 @@ async def get_employees_public():
 
 
 @router.get("/public-departments")
-async def get_departments_public():
+async def get_departments_public(request: Request):
     """Public endpoint to get departments without authentication"""
-    try:
+    def load():
         supabase = get_supabase_client()
         
         result = supabase.table("departments").select("*").execute()
@@ -105,7 +107,10 @@ async def get_departments_public():
             "departments": result.data or [],
             "status": "success"
         }
-        
+
+    try:
+        # Cached with ETag; invalidated by department writes
+        return await response_cache.respond(request, "departments", "public", load)
     except Exception as e:
         return {
             "message": f"Error fetching departments: {str(e)}",
@@ -136,10 +141,11 @@ async def get_positions_public():
 
 @router.get("/dropdown")
 async def get_employees_dropdown(
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Get employees list for dropdown selection - simplified endpoint with authentication"""
-    try:
+    def load():
         supabase = get_supabase_client()
         
         # Get basic employee info for dropdown with user full_name
@@ -176,7 +182,10 @@ async def get_employees_dropdown(
         
         # Return as array (not wrapped in object) for easier frontend consumption
         return employees
-        
+
+    try:
+        # Cached with ETag; invalidated by employee writes
+        return await response_cache.respond(request, "employees", "dropdown", load)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -539,10 +548,12 @@ async def create_employee(
                     "updated_at": datetime.utcnow().isoformat()
                 }
                 supabase.table("users").update(user_update_data).eq("id", user_id).execute()
+                name_directory.invalidate("users", [user_id])
+                response_cache.invalidate("employees")
                 print(f"Updated existing user: {employee_data.email}")
             else:
                 # Hash password for storage in custom users table
-                hashed_password = hash_password(plain_password)
+                hashed_password = await hash_password_async(plain_password)
                 
                 # Create new user record in users table
                 user_record = {
@@ -588,6 +599,8 @@ async def create_employee(
                 }
                 
                 result = supabase.table("employees").update(employee_update_data).eq("user_id", user_id).execute()
+                response_cache.invalidate("employees")
+                name_directory.invalidate("employees")
                 print(f"Updated existing employee: {employee_data.email}")
             else:
                 # Create new employee record
@@ -610,6 +623,8 @@ async def create_employee(
                 }
                 
                 result = supabase.table("employees").insert(employee_dict).execute()
+                response_cache.invalidate("employees")
+                name_directory.invalidate("employees")
                 print(f"Created new employee: {employee_data.email}")
             
             if not result.data:
@@ -715,6 +730,8 @@ async def update_employee(
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
         result = supabase.table("employees").update(update_data).eq("id", employee_id).execute()
+        response_cache.invalidate("employees")
+        name_directory.invalidate("employees", [employee_id])
         
         if result.data:
             return Employee(**result.data[0])
@@ -767,6 +784,8 @@ async def delete_employee(
         
         # Hard delete - permanently remove from database
         result = supabase.table("employees").delete().eq("id", employee_id).execute()
+        response_cache.invalidate("employees")
+        name_directory.invalidate("employees", [employee_id])
         
         # Verify deletion
         verify = supabase.table("employees").select("id").eq("id", employee_id).execute()
@@ -844,6 +863,7 @@ async def create_department(
         }
         
         result = supabase.table("departments").insert(department_dict).execute()
+        response_cache.invalidate("departments")
         
         if result.data:
             return Department(**result.data[0])
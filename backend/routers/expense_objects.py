@@ -3,7 +3,7 @@ Expense Objects Management Router
 Quản lý đối tượng chi phí (expense objects)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional
 from datetime import datetime
 import uuid
@@ -12,6 +12,7 @@ from models.expense_object import ExpenseObject, ExpenseObjectCreate, ExpenseObj
 from models.user import User
 from utils.auth import get_current_user
 from services.supabase_client import get_supabase_client
+from utils.response_cache import response_cache
 
 def calculate_level(parent_id: str = None, supabase_client=None) -> int:
     """Tính toán level dựa trên parent_id"""
@@ -67,9 +68,9 @@ def recalc_parent_totals(supabase, parent_id: Optional[str]):
         pass
 
 @router.get("/public", response_model=List[ExpenseObject])
-async def get_expense_objects_public(active_only: bool = Query(True, description="Chỉ lấy đối tượng đang hoạt động")):
+async def get_expense_objects_public(request: Request, active_only: bool = Query(True, description="Chỉ lấy đối tượng đang hoạt động")):
     """Public: Lấy danh sách đối tượng chi phí (không yêu cầu xác thực)"""
-    try:
+    def load():
         supabase = get_supabase_client()
         query = supabase.table("expense_objects").select("*")
         if active_only:
@@ -91,6 +92,10 @@ async def get_expense_objects_public(active_only: bool = Query(True, description
                 updated_by=str(row["updated_by"]) if row.get("updated_by") else None
             ))
         return expense_objects
+
+    try:
+        # Cache kèm ETag; bị xóa khi đối tượng chi phí thay đổi
+        return await response_cache.respond(request, "expense_objects", ("public", active_only), load, List[ExpenseObject])
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Lỗi khi lấy danh sách đối tượng chi phí (public): {str(e)}")
 
@@ -201,6 +206,7 @@ async def create_expense_object(
         }
         
         result = supabase.table("expense_objects").insert(expense_object_data).execute()
+        response_cache.invalidate("expense_objects")
         
         if not result.data:
             raise HTTPException(
@@ -277,6 +283,7 @@ async def update_expense_object(
             .update(update_data)\
             .eq("id", expense_object_id)\
             .execute()
+        response_cache.invalidate("expense_objects")
         
         if not result.data:
             raise HTTPException(
@@ -340,6 +347,7 @@ async def delete_expense_object(
             .delete()\
             .eq("id", expense_object_id)\
             .execute()
+        response_cache.invalidate("expense_objects")
         
         if not result.data:
             raise HTTPException(
@@ -3,8 +3,10 @@ File Upload Router
 Centralized endpoints for file/image uploads
 """
 
+import asyncio
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi.responses import RedirectResponse
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from services.file_upload_service import get_file_upload_service, FileUploadService
 from models.user import User
@@ -25,12 +27,47 @@ class UploadResponse(BaseModel):
     uploaded_at: str
     path: str
     content_type: str
+    variants: Optional[Dict[str, str]] = None  # {"thumb": url, "medium": url} for images
+    variants_pending: bool = False  # Variants still being generated: their URLs 404 until then
 
 class MultipleUploadResponse(BaseModel):
     """Response model for multiple file uploads"""
     files: List[UploadResponse]
     errors: Optional[List[dict]] = None
 
+@router.get("/file/{file_path:path}")
+async def get_file(
+    file_path: str,
+    variant: Optional[str] = Query(None, description="Image variant: thumb or medium"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Redirect to a stored file, optionally to a downscaled image variant
+    
+    - **file_path**: Path of the original file in storage
+    - **variant**: `thumb` or `medium`; falls back to the original while the variant is not generated yet
+    
+    Example: `/api/uploads/file/Expenses/abc.jpg?variant=thumb`
+    """
+    service = get_file_upload_service()
+    file_path = file_path.strip('/')
+    if variant:
+        if variant not in service.variant_service.VARIANT_SIZES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown variant '{variant}'. Allowed: {', '.join(service.variant_service.VARIANT_SIZES)}"
+            )
+        if await asyncio.to_thread(service.variant_service.variant_exists, file_path, variant):
+            return RedirectResponse(service.variant_service.variant_urls(file_path)[variant])
+    
+    url = service._get_public_url(file_path)
+    if not url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    return RedirectResponse(url)
+
 @router.post("/{folder_path:path}", response_model=UploadResponse)
 async def upload_file(
     folder_path: str,
@@ -55,7 +92,9 @@ async def upload_file(
         result = await service.upload_file(
             file=file,
             folder_path=folder_path,
-            max_size=max_size
+            max_size=max_size,
+            generate_variants=True,
+            deduplicate=True
         )
         return UploadResponse(**result)
     except HTTPException:
@@ -83,12 +122,23 @@ async def upload_multiple_files(
     """
     try:
         service = get_file_upload_service()
-        results = await service.upload_multiple_files(
+        batch = await service.upload_batch(
             files=files,
             folder_path=folder_path,
-            max_size=max_size
+            max_size=max_size,
+            generate_variants=True,
+            deduplicate=True
+        )
+        if batch["errors"] and not batch["files"]:
+            # All files failed
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"All files failed to upload: {batch['errors']}"
+            )
+        return MultipleUploadResponse(
+            files=[UploadResponse(**r) for r in batch["files"]],
+            errors=batch["errors"] or None
         )
-        return MultipleUploadResponse(files=[UploadResponse(**r) for r in results])
     except HTTPException:
         raise
     except Exception as e:
@@ -118,7 +168,8 @@ async def upload_image(
             file=file,
             folder_path=folder_path,
             max_size=max_size,
-            allowed_types=service.ALLOWED_IMAGE_TYPES
+            allowed_types=service.ALLOWED_IMAGE_TYPES,
+            generate_variants=True
         )
         return UploadResponse(**result)
     except HTTPException:
@@ -177,7 +228,9 @@ async def upload_expense_receipt(
         result = await service.upload_file(
             file=file,
             folder_path=f"Expenses/{expense_id}",
-            allowed_types=service.ALLOWED_IMAGE_TYPES + ['application/pdf']
+            allowed_types=service.ALLOWED_IMAGE_TYPES + ['application/pdf'],
+            generate_variants=True,
+            deduplicate=True
         )
         return UploadResponse(**result)
     except HTTPException:
@@ -200,7 +253,9 @@ async def upload_invoice_attachment(
         service = get_file_upload_service()
         result = await service.upload_file(
             file=file,
-            folder_path=f"Invoices/{invoice_id}"
+            folder_path=f"Invoices/{invoice_id}",
+            generate_variants=True,
+            deduplicate=True
         )
         return UploadResponse(**result)
     except HTTPException:
@@ -224,7 +279,9 @@ async def upload_bill_receipt(
         result = await service.upload_file(
             file=file,
             folder_path=f"Bills/{bill_id}",
-            allowed_types=service.ALLOWED_IMAGE_TYPES + ['application/pdf']
+            allowed_types=service.ALLOWED_IMAGE_TYPES + ['application/pdf'],
+            generate_variants=True,
+            deduplicate=True
         )
         return UploadResponse(**result)
     except HTTPException:
@@ -248,7 +305,8 @@ async def upload_project_image(
         result = await service.upload_file(
             file=file,
             folder_path=f"Projects/{project_id}/Images",
-            allowed_types=service.ALLOWED_IMAGE_TYPES
+            allowed_types=service.ALLOWED_IMAGE_TYPES,
+            generate_variants=True
         )
         return UploadResponse(**result)
     except HTTPException:
@@ -272,7 +330,8 @@ async def upload_product_image(
         result = await service.upload_file(
             file=file,
             folder_path=f"Products/{product_id}/Images",
-            allowed_types=service.ALLOWED_IMAGE_TYPES
+            allowed_types=service.ALLOWED_IMAGE_TYPES,
+            generate_variants=True
         )
         return UploadResponse(**result)
     except HTTPException:
@@ -302,7 +361,8 @@ async def upload_avatar(
         result = await service.upload_file(
             file=file,
             folder_path=f"Avatars/{entity_type}/{entity_id}",
-            allowed_types=service.ALLOWED_IMAGE_TYPES
+            allowed_types=service.ALLOWED_IMAGE_TYPES,
+            generate_variants=True
         )
         return UploadResponse(**result)
     except HTTPException:
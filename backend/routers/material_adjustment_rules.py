@@ -16,6 +16,7 @@ from models.material_adjustment_rule import (
 from models.user import User
 from utils.auth import get_current_user, require_manager_or_admin
 from services.supabase_client import get_supabase_client
+from services.material_adjustment_service import material_adjustment_service
 
 router = APIRouter()
 
@@ -154,6 +155,8 @@ async def create_material_adjustment_rule(
                 detail="Không thể tạo quy tắc điều chỉnh vật tư"
             )
         
+        material_adjustment_service.invalidate_rules_cache()
+        
         row = result.data[0]
         return MaterialAdjustmentRule(
             id=str(row["id"]),
@@ -220,6 +223,9 @@ async def update_material_adjustment_rule(
                 detail="Không thể cập nhật quy tắc điều chỉnh vật tư"
             )
         
+        # Rule có thể đổi expense_object_id nên xóa toàn bộ cache
+        material_adjustment_service.invalidate_rules_cache()
+        
         row = result.data[0]
         return MaterialAdjustmentRule(
             id=str(row["id"]),
@@ -267,6 +273,8 @@ async def delete_material_adjustment_rule(
                 detail="Không tìm thấy quy tắc điều chỉnh vật tư"
             )
         
+        material_adjustment_service.invalidate_rules_cache()
+        
         return {"message": "Đã xóa quy tắc điều chỉnh vật tư thành công"}
         
     except HTTPException:
@@ -3,7 +3,7 @@ Notification System Router
 Handles email notifications, system alerts, and notification management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Response
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from pydantic import BaseModel
@@ -15,6 +15,7 @@ from email.mime.multipart import MIMEMultipart
 from models.user import User
 from utils.auth import get_current_user, require_manager_or_admin
 from services.supabase_client import get_supabase_client
+from services.notification_service import NOTIFICATION_ARCHIVE_AFTER_DAYS, notification_service
 from config import settings
 
 router = APIRouter()
@@ -32,6 +33,14 @@ class Notification(BaseModel):
     action_url: Optional[str] = None
     created_at: datetime
 
+class NotificationPage(BaseModel):
+    items: List[Notification]
+    next_cursor: Optional[str] = None
+    unread_count: int
+
+class NotificationMarkRead(BaseModel):
+    ids: List[str]
+
 class NotificationCreate(BaseModel):
     user_id: str
     title: str
@@ -289,39 +298,84 @@ async def send_email_notification(email_data: EmailNotification):
 
 @router.get("/notifications", response_model=List[Notification])
 async def get_notifications(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     unread_only: bool = Query(False),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     current_user: User = Depends(get_current_user)
 ):
-    """Get user notifications"""
+    """Get user notifications
+    
+    Pages are cursor-based: pass the X-Next-Cursor response header as cursor to get
+    the next page. skip is still accepted for older clients (offset scan).
+    """
     try:
-        supabase = get_supabase_client()
-        
-        query = supabase.table("notifications").select("*").eq("user_id", current_user.id)
-        
-        if unread_only:
-            query = query.eq("is_read", False)
-        
-        result = query.order("created_at", desc=True).range(skip, skip + limit - 1).execute()
-        
-        # Map database fields to frontend format
-        mapped_notifications = []
-        for notification in result.data:
-            mapped_notification = notification.copy()
-            mapped_notification['read'] = notification.get('is_read', False)
-            if 'is_read' in mapped_notification:
-                del mapped_notification['is_read']
-            mapped_notifications.append(Notification(**mapped_notification))
-        
-        return mapped_notifications
-        
+        if skip and not cursor:
+            supabase = get_supabase_client()
+            query = supabase.table("notifications").select("*").eq("user_id", current_user.id)
+            if unread_only:
+                query = query.eq("is_read", False)
+            result = query.order("created_at", desc=True).order("id", desc=True).range(skip, skip + limit - 1).execute()
+            items = []
+            for notification in result.data:
+                mapped_notification = notification.copy()
+                mapped_notification['read'] = mapped_notification.pop('is_read', False) or False
+                items.append(mapped_notification)
+            return [Notification(**item) for item in items]
+        
+        page = await notification_service.list_inbox(current_user.id, limit=limit, cursor=cursor, unread_only=unread_only)
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+        return [Notification(**item) for item in page["items"]]
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch notifications: {str(e)}"
+        )
+
+@router.get("/notifications/inbox", response_model=NotificationPage)
+async def get_notification_inbox(
+    limit: int = Query(30, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    unread_only: bool = Query(False),
+    current_user: User = Depends(get_current_user)
+):
+    """Cursor-paginated inbox with the unread badge count"""
+    try:
+        page = await notification_service.list_inbox(current_user.id, limit=limit, cursor=cursor, unread_only=unread_only)
+        unread_count = await notification_service.get_unread_count(current_user.id)
+        return NotificationPage(items=page["items"], next_cursor=page["next_cursor"], unread_count=unread_count)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch notifications: {str(e)}"
         )
 
+@router.get("/notifications/unread-count")
+async def get_unread_notification_count(
+    current_user: User = Depends(get_current_user)
+):
+    """Unread badge count (single counter row; safe to poll)"""
+    try:
+        return {"unread": await notification_service.get_unread_count(current_user.id)}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch unread count: {str(e)}"
+        )
+
 @router.post("/notifications", response_model=Notification)
 async def create_notification(
     notification_data: NotificationCreate,
@@ -373,26 +427,19 @@ async def mark_notification_read(
 ):
     """Mark notification as read"""
     try:
-        supabase = get_supabase_client()
+        updated = await notification_service.mark_read(current_user.id, [notification_id])
+        if updated:
+            return {"message": "Notification marked as read"}
         
-        # Check if notification belongs to user
+        # Nothing changed: already read, or not the user's notification
+        supabase = get_supabase_client()
         existing = supabase.table("notifications").select("id").eq("id", notification_id).eq("user_id", current_user.id).execute()
         if not existing.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Notification not found"
             )
-        
-        # Mark as read
-        result = supabase.table("notifications").update({"read": True}).eq("id", notification_id).execute()
-        
-        if result.data:
-            return {"message": "Notification marked as read"}
-        
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Failed to mark notification as read"
-        )
+        return {"message": "Notification already read"}
         
     except HTTPException:
         raise
@@ -402,17 +449,30 @@ async def mark_notification_read(
             detail=f"Failed to mark notification as read: {str(e)}"
         )
 
+@router.put("/notifications/read")
+async def mark_notifications_read(
+    data: NotificationMarkRead,
+    current_user: User = Depends(get_current_user)
+):
+    """Mark several notifications as read (only unread ones are updated)"""
+    try:
+        updated = await notification_service.mark_read(current_user.id, data.ids)
+        return {"message": f"Marked {updated} notifications as read", "updated": updated}
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to mark notifications as read: {str(e)}"
+        )
+
 @router.put("/notifications/read-all")
 async def mark_all_notifications_read(
     current_user: User = Depends(get_current_user)
 ):
     """Mark all user notifications as read"""
     try:
-        supabase = get_supabase_client()
-        
-        result = supabase.table("notifications").update({"read": True}).eq("user_id", current_user.id).eq("read", False).execute()
-        
-        return {"message": f"Marked {len(result.data)} notifications as read"}
+        updated = await notification_service.mark_read(current_user.id)
+        return {"message": f"Marked {updated} notifications as read", "updated": updated}
         
     except Exception as e:
         raise HTTPException(
@@ -420,6 +480,22 @@ async def mark_all_notifications_read(
             detail=f"Failed to mark all notifications as read: {str(e)}"
         )
 
+@router.post("/notifications/archive")
+async def archive_read_notifications(
+    older_than_days: int = Query(NOTIFICATION_ARCHIVE_AFTER_DAYS, ge=1),
+    current_user: User = Depends(require_manager_or_admin)
+):
+    """Move read notifications older than older_than_days to notifications_archive"""
+    try:
+        archived = await notification_service.archive_read_notifications(older_than_days=older_than_days)
+        return {"message": f"Archived {archived} notifications", "archived": archived}
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to archive notifications: {str(e)}"
+        )
+
 @router.post("/notifications/email")
 async def send_email_notification_endpoint(
     email_data: EmailNotification,
@@ -511,18 +587,14 @@ async def get_notification_stats(
     try:
         supabase = get_supabase_client()
         
-        # Get total notifications
-        total = supabase.table("notifications").select("id", count="exact").eq("user_id", current_user.id).execute().count or 0
-        
-        # Get unread notifications
-        unread = supabase.table("notifications").select("id", count="exact").eq("user_id", current_user.id).eq("read", False).execute().count or 0
+        # Total / unread from the per-user counter row
+        counters = await notification_service.get_counters(current_user.id)
+        total = counters["total"]
+        unread = counters["unread"]
         
-        # Get notifications by type
-        notifications = supabase.table("notifications").select("type").eq("user_id", current_user.id).execute()
-        type_counts = {}
-        for notification in notifications.data:
-            type_name = notification["type"]
-            type_counts[type_name] = type_counts.get(type_name, 0) + 1
+        # Get notifications by type (grouped in the database)
+        type_rows = supabase.rpc("get_notification_type_counts", {"p_user_id": current_user.id}).execute()
+        type_counts = {row["type"]: row["count"] for row in type_rows.data or []}
         
         return {
             "total": total,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional
 from services.supabase_client import get_supabase_client
 from models.user import User
@@ -9,6 +9,7 @@ from models.product_category import (
     ProductCategoryTree
 )
 from utils.auth import get_current_user
+from utils.response_cache import response_cache
 import uuid
 from datetime import datetime
 
@@ -16,6 +17,7 @@ router = APIRouter()
 
 @router.get("/product-categories", response_model=List[ProductCategory])
 async def get_product_categories(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
@@ -24,21 +26,27 @@ async def get_product_categories(
     current_user: User = Depends(get_current_user)
 ):
     """Get product categories list"""
-    supabase = get_supabase_client()
-    query = supabase.table("product_categories").select("*")
+    def load():
+        supabase = get_supabase_client()
+        query = supabase.table("product_categories").select("*")
+
+        if search:
+            query = query.ilike("name", f"%{search}%")
+        if parent_id:
+            query = query.eq("parent_id", parent_id)
+        if is_active is not None:
+            query = query.eq("is_active", is_active)
 
-    if search:
-        query = query.ilike("name", f"%{search}%")
-    if parent_id:
-        query = query.eq("parent_id", parent_id)
-    if is_active is not None:
-        query = query.eq("is_active", is_active)
+        query = query.order("category_level", desc=False).order("sort_order", desc=False).order("name", desc=False)
 
-    query = query.order("category_level", desc=False).order("sort_order", desc=False).order("name", desc=False)
+        result = query.range(skip, skip + limit - 1).execute()
 
-    result = query.range(skip, skip + limit - 1).execute()
+        return result.data if result.data else []
 
-    return result.data if result.data else []
+    # Cached with ETag; invalidated by category writes
+    return await response_cache.respond(
+        request, "product_categories", (skip, limit, search, parent_id, is_active), load, List[ProductCategory]
+    )
 
 @router.get("/product-categories/tree", response_model=List[ProductCategoryTree])
 async def get_product_categories_tree(
@@ -116,6 +124,7 @@ async def create_product_category(
     data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("product_categories").insert(data).execute()
+    response_cache.invalidate("product_categories")
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to create product category")
@@ -145,6 +154,7 @@ async def update_product_category(
     update_data["updated_at"] = datetime.utcnow().isoformat()
 
     result = supabase.table("product_categories").update(update_data).eq("id", category_id).execute()
+    response_cache.invalidate("product_categories")
     if result.data:
         return result.data[0]
     raise HTTPException(status_code=400, detail="Failed to update product category")
@@ -183,6 +193,7 @@ async def delete_product_category(
         "is_active": False,
         "updated_at": datetime.utcnow().isoformat()
     }).eq("id", category_id).execute()
+    response_cache.invalidate("product_categories")
 
     if result.data:
         return {"message": "Product category deleted successfully", "id": category_id}
@@ -223,6 +234,7 @@ async def bulk_create_product_categories(
                 data["updated_at"] = datetime.utcnow().isoformat()
 
                 result = supabase.table("product_categories").insert(data).execute()
+                response_cache.invalidate("product_categories")
 
                 if result.data:
                     created.append(result.data[0])
@@ -6,7 +6,6 @@ Handles Excel file import for products
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any
-import pandas as pd
 import io
 import os
 from datetime import datetime
@@ -14,6 +13,7 @@ import uuid
 
 from models.user import User
 from utils.auth import get_current_user
+from utils.response_cache import response_cache
 from services.supabase_client import get_supabase_client
 
 router = APIRouter()
@@ -43,6 +43,7 @@ async def preview_products_from_excel(
     current_user: User = Depends(get_current_user)
 ):
     """Preview products from Excel file without importing"""
+    import pandas as pd  # Imported on first use (slow import)
     try:
         # Validate file type
         if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
@@ -186,6 +187,7 @@ async def import_products_from_excel(
                             "description": f"Tự động tạo từ import Excel",
                             "is_active": True
                         }).execute()
+                        response_cache.invalidate("product_categories")
                         
                         if new_category.data:
                             product_data["category_id"] = new_category.data[0]["id"]
@@ -221,6 +223,7 @@ async def download_excel_template(
     current_user: User = Depends(get_current_user)
 ):
     """Download Excel template for product import with lookup sheets"""
+    import pandas as pd  # Imported on first use (slow import)
     try:
         supabase = get_supabase_client()
         
@@ -12,6 +12,7 @@ from pydantic import BaseModel
 from models.user import User
 from utils.auth import get_current_user, require_manager_or_admin
 from services.supabase_client import get_supabase_client
+from services.labor_cost_service import labor_cost_service
 
 router = APIRouter()
 
@@ -162,12 +163,8 @@ async def get_projects_profitability_report(
             receipts_query = receipts_query.lte("issue_date", period_end.isoformat())
         sales_receipts = receipts_query.execute()
 
-        time_entries_query = supabase.table("time_entries").select("project_id, hours_worked, hourly_rate, entry_date").in_("project_id", project_ids)
-        if period_start:
-            time_entries_query = time_entries_query.gte("entry_date", period_start.isoformat())
-        if period_end:
-            time_entries_query = time_entries_query.lte("entry_date", period_end.isoformat())
-        time_entries = time_entries_query.execute()
+        # Monthly labor rollups; report periods are whole months or years
+        labor_by_project = labor_cost_service.get_project_totals(project_ids, period_start, period_end)
 
         expenses_query = supabase.table("expenses").select("project_id, amount, expense_date").in_("project_id", project_ids)
         if period_start:
@@ -193,7 +190,6 @@ async def get_projects_profitability_report(
         # Pre-process financial data for efficiency
         invoices_by_project = {}
         sales_receipts_by_project = {}
-        time_entries_by_project = {}
         expenses_by_project = {}
         bills_by_project = {}
         
@@ -209,12 +205,6 @@ async def get_projects_profitability_report(
                 sales_receipts_by_project[project_id] = []
             sales_receipts_by_project[project_id].append(receipt)
         
-        for entry in time_entries.data:
-            project_id = entry["project_id"]
-            if project_id not in time_entries_by_project:
-                time_entries_by_project[project_id] = []
-            time_entries_by_project[project_id].append(entry)
-        
         for expense in expenses.data:
             project_id = expense["project_id"]
             if project_id not in expenses_by_project:
@@ -242,13 +232,12 @@ async def get_projects_profitability_report(
             total_income = invoice_amount + sales_receipt_amount
             
             # Calculate costs
-            project_time_entries = time_entries_by_project.get(project_id, [])
             project_expenses = expenses_by_project.get(project_id, [])
             project_bills = bills_by_project.get(project_id, [])
             
             # Labor costs
-            total_hours = sum(te["hours_worked"] for te in project_time_entries)
-            labor_cost = sum(te["hours_worked"] * te["hourly_rate"] for te in project_time_entries if te["hourly_rate"])
+            total_hours = labor_by_project[project_id]["hours"]
+            labor_cost = labor_by_project[project_id]["cost"]
             
             # Other costs
             expenses_cost = sum(exp["amount"] for exp in project_expenses)
@@ -395,12 +384,8 @@ async def get_projects_profitability_summary(
             receipts_query = receipts_query.lte("issue_date", period_end.isoformat())
         sales_receipts = receipts_query.execute()
 
-        time_entries_query = supabase.table("time_entries").select("project_id, hours_worked, hourly_rate, entry_date").in_("project_id", project_ids)
-        if period_start:
-            time_entries_query = time_entries_query.gte("entry_date", period_start.isoformat())
-        if period_end:
-            time_entries_query = time_entries_query.lte("entry_date", period_end.isoformat())
-        time_entries = time_entries_query.execute()
+        # Monthly labor rollups; report periods are whole months or years
+        labor_by_project = labor_cost_service.get_project_totals(project_ids, period_start, period_end)
 
         expenses_query = supabase.table("expenses").select("project_id, amount, expense_date").in_("project_id", project_ids)
         if period_start:
@@ -432,12 +417,11 @@ async def get_projects_profitability_summary(
             # Calculate project-specific metrics
             project_invoices = [inv for inv in invoices.data if inv.get("project_id") == project_id]
             project_sales_receipts = [sr for sr in sales_receipts.data if sr.get("project_id") == project_id]
-            project_time_entries = [te for te in time_entries.data if te.get("project_id") == project_id]
             project_expenses = [exp for exp in expenses.data if exp.get("project_id") == project_id]
             project_bills = [bill for bill in bills.data if bill.get("project_id") == project_id]
             
             project_income = sum(inv["total_amount"] for inv in project_invoices) + sum(sr["total_amount"] for sr in project_sales_receipts)
-            project_labor_cost = sum(te["hours_worked"] * te["hourly_rate"] for te in project_time_entries if te["hourly_rate"])
+            project_labor_cost = labor_by_project[project_id]["cost"]
             project_expenses_cost = sum(exp["amount"] for exp in project_expenses)
             project_bills_cost = sum(bill["amount"] for bill in project_bills)
             project_costs = project_labor_cost + project_expenses_cost + project_bills_cost
@@ -11,6 +11,7 @@ from datetime import datetime, timezone
 from models.user import User
 from services.supabase_client import get_supabase_client
 from services.notification_service import notification_service
+from services.notification_dispatcher import membership_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -241,6 +242,7 @@ async def add_team_member(
                 member_dict["start_date"] = datetime.now().date().isoformat()
         
         result = supabase.table("project_team").insert(member_dict).execute()
+        membership_cache.invalidate(project_id)
         
         if not result.data:
             raise HTTPException(
@@ -341,7 +343,9 @@ async def add_team_member(
                     new_member_user_id=new_member_user_id
                 )
                 
-                if result.get("created", 0) > 0:
+                if result.get("queued"):
+                    logger.info(f"🔔 Queued team member addition notification: {member_name} to project {project_name}")
+                elif result.get("created", 0) > 0:
                     print(f"✅ Created {result.get('created')} notifications for team member addition: {member_name} to project {project_name}")
                     logger.info(f"✅ Created {result.get('created')} notifications for team member addition: {member_name} to project {project_name}")
                 elif result.get("errors"):
@@ -360,7 +364,7 @@ async def add_team_member(
                             new_member_user_id=new_member_user_id,
                             added_by_name=added_by_name
                         )
-                        if r2.get("created"):
+                        if r2.get("created") or r2.get("queued"):
                             logger.info(f"✅ Notification sent to new member: added to project {project_name}")
                     except Exception as e2:
                         logger.warning(f"Failed to notify new member: {e2}")
@@ -419,6 +423,7 @@ async def update_team_member(
             del update_data["role"]
         
         result = supabase.table("project_team").update(update_data).eq("id", member_id).execute()
+        membership_cache.invalidate(project_id)
         
         if not result.data:
             raise HTTPException(
@@ -467,6 +472,7 @@ async def delete_team_member(
 
         # Delete team member
         result = supabase.table("project_team").delete().eq("id", member_id).execute()
+        membership_cache.invalidate(project_id)
         
         # Also remove from task participants and task_group_members if employee_id is known
         if employee_id:
@@ -10,13 +10,11 @@ from pydantic import BaseModel
 from datetime import datetime
 import uuid
 import os
-import zipfile
-import io
-import requests
 
 from models.user import User
 from services.supabase_client import get_supabase_client
 from utils.auth import get_current_user
+from utils.zip_stream import stream_zip_from_urls
 
 router = APIRouter()
 
@@ -542,14 +540,15 @@ async def download_all_timeline_files(
                 detail="No timeline entries found for this project"
             )
         
-        # Collect all attachments
+        # Collect all attachments (one query per 100 entries instead of one per entry)
+        entry_titles = {entry["id"]: entry.get("title", "Unknown") for entry in timeline_result.data}
+        entry_ids = list(entry_titles)
         all_attachments = []
-        for entry in timeline_result.data:
-            attachments_result = supabase.table("timeline_attachments").select("*").eq("timeline_entry_id", entry["id"]).execute()
-            if attachments_result.data:
-                for att in attachments_result.data:
-                    att["entry_title"] = entry.get("title", "Unknown")
-                    all_attachments.append(att)
+        for start in range(0, len(entry_ids), 100):
+            attachments_result = supabase.table("timeline_attachments").select("timeline_entry_id, name, url").in_("timeline_entry_id", entry_ids[start:start + 100]).execute()
+            for att in attachments_result.data or []:
+                att["entry_title"] = entry_titles.get(att["timeline_entry_id"], "Unknown")
+                all_attachments.append(att)
         
         if not all_attachments:
             raise HTTPException(
@@ -557,37 +556,19 @@ async def download_all_timeline_files(
                 detail="No attachments found for this project"
             )
         
-        # Create ZIP file in memory
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for attachment in all_attachments:
-                try:
-                    # Download file from URL
-                    file_url = attachment.get("url")
-                    if not file_url:
-                        continue
-                    
-                    # Download file content
-                    response = requests.get(file_url, timeout=30)
-                    if response.status_code == 200:
-                        # Create a safe filename
-                        entry_title = attachment.get("entry_title", "Unknown").replace("/", "_").replace("\\", "_")
-                        file_name = attachment.get("name", "file")
-                        # Sanitize filename
-                        safe_entry_title = "".join(c for c in entry_title if c.isalnum() or c in (' ', '-', '_')).strip()
-                        safe_file_name = "".join(c for c in file_name if c.isalnum() or c in ('.', '-', '_')).strip()
-                        
-                        # Create folder structure: Entry Title/File Name
-                        zip_path = f"{safe_entry_title}/{safe_file_name}"
-                        
-                        # Add file to ZIP
-                        zip_file.writestr(zip_path, response.content)
-                except Exception as e:
-                    print(f"Error downloading file {attachment.get('name', 'unknown')}: {e}")
-                    # Continue with other files even if one fails
-                    continue
-        
-        zip_buffer.seek(0)
+        # Archive entries: Entry Title/File Name
+        zip_entries = []
+        for attachment in all_attachments:
+            file_url = attachment.get("url")
+            if not file_url:
+                continue
+            # Create a safe filename
+            entry_title = attachment.get("entry_title", "Unknown").replace("/", "_").replace("\\", "_")
+            file_name = attachment.get("name", "file")
+            # Sanitize filename
+            safe_entry_title = "".join(c for c in entry_title if c.isalnum() or c in (' ', '-', '_')).strip()
+            safe_file_name = "".join(c for c in file_name if c.isalnum() or c in ('.', '-', '_')).strip()
+            zip_entries.append((f"{safe_entry_title}/{safe_file_name}", file_url))
         
         # Get project name for ZIP filename
         project_result = supabase.table("projects").select("name, project_code").eq("id", project_id).single().execute()
@@ -599,8 +580,9 @@ async def download_all_timeline_files(
         safe_project_name = "".join(c for c in project_name if c.isalnum() or c in (' ', '-', '_')).strip()
         zip_filename = f"{safe_project_name}_timeline_files.zip"
         
+        # Files are downloaded concurrently and streamed into the archive as they arrive
         return StreamingResponse(
-            io.BytesIO(zip_buffer.read()),
+            stream_zip_from_urls(zip_entries),
             media_type="application/zip",
             headers={
                 "Content-Disposition": f"attachment; filename={zip_filename}"
@@ -17,9 +17,13 @@ from models.project import Project, ProjectCreate, ProjectUpdate
 from models.user import User, UserRole
 from utils.auth import get_current_user, require_manager_or_admin, security
 from services.supabase_client import get_supabase_client
+from utils.response_cache import response_cache
 from services.project_profitability_service import ProjectProfitabilityService
+from services.labor_cost_service import labor_cost_service
+from services.name_directory import name_directory
 from services.project_default_tasks_service import create_default_tasks_for_project
 from services.notification_service import notification_service
+from services.notification_dispatcher import membership_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -490,13 +494,14 @@ class ProjectStatusUpdate(BaseModel):
 
 @router.get("/statuses", response_model=List[ProjectStatus])
 async def get_project_statuses(
+    request: Request,
     category_id: Optional[str] = Query(None, description="Filter by category ID. Returns global statuses (category_id IS NULL) and statuses for this category"),
     current_user: User = Depends(get_current_user)
 ):
     """Get all project statuses ordered by display_order. 
     If category_id is provided, returns global statuses (category_id IS NULL) and statuses for that category.
     If category_id is not provided, returns all active statuses."""
-    try:
+    def load():
         supabase = get_supabase_client()
         
         query = supabase.table("project_statuses")\
@@ -528,7 +533,10 @@ async def get_project_statuses(
                 return result.data
             
             return []
-        
+
+    try:
+        # Cached with ETag; invalidated by status writes
+        return await response_cache.respond(request, "project_statuses", category_id, load, List[ProjectStatus])
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -622,6 +630,7 @@ async def create_project_status(
         result = supabase.table("project_statuses")\
             .insert(status_dict)\
             .execute()
+        response_cache.invalidate("project_statuses")
         
         if result.data:
             return result.data[0]
@@ -755,6 +764,7 @@ async def update_project_status_item(
             .update(update_data)\
             .eq("id", status_id)\
             .execute()
+        response_cache.invalidate("project_statuses")
         
         if result.data:
             return result.data[0]
@@ -835,6 +845,7 @@ async def delete_project_status(
                         # Log error but don't fail the delete operation
                         print(f"Warning: Failed to shift status {status_to_shift['id']}: {str(shift_error)}")
         
+        response_cache.invalidate("project_statuses")
         return {"message": "Project status deleted successfully"}
         
         raise HTTPException(
@@ -1700,6 +1711,7 @@ async def create_project(
                             }
                             
                             supabase.table("project_team").insert(team_member_data).execute()
+                            membership_cache.invalidate(project_id)
                             
                             # Tự động thêm vào task_participants cho tất cả tasks của project
                             # Trigger có thể tạo task sau khi insert project, nên cần retry
@@ -2174,6 +2186,7 @@ async def update_project(
         old_status_id = old_project.data[0].get('status_id') if old_project.data else None
         
         result = supabase.table("projects").update(update_data).eq("id", project_id).execute()
+        name_directory.invalidate("projects", [project_id])
         
         # Apply flow rules and auto-calculate progress if status_id changed
         new_status_id = update_data.get('status_id')
@@ -2331,6 +2344,7 @@ async def delete_project(
         # 4. Delete project team members
         try:
             supabase.table("project_team").delete().eq("project_id", project_id).execute()
+            membership_cache.invalidate(project_id)
         except Exception as e:
             logger.warning(f"Error deleting project team: {str(e)}")
         
@@ -2360,6 +2374,7 @@ async def delete_project(
         
         # 9. Finally, delete the project itself
         result = supabase.table("projects").delete().eq("id", project_id).execute()
+        name_directory.invalidate("projects", [project_id])
         
         if result.data:
             logger.info(f"Project {project_id} ({project.get('name', 'N/A')}) deleted by user {current_user.id}")
@@ -2562,12 +2577,9 @@ async def get_project_stats(
         total_hours = 0
         
         if project_ids:
-            time_entries = supabase.table("time_entries").select("*").in_("project_id", project_ids).execute()
-            total_hours = sum(entry["hours_worked"] for entry in time_entries.data)
-            
-            for entry in time_entries.data:
-                if entry["hourly_rate"]:
-                    total_labor_cost += entry["hours_worked"] * entry["hourly_rate"]
+            labor_by_project = labor_cost_service.get_project_totals(project_ids)
+            total_hours = sum(labor["hours"] for labor in labor_by_project.values())
+            total_labor_cost = sum(labor["cost"] for labor in labor_by_project.values())
         
         # Get total expenses for all projects
         total_expenses = 0
@@ -2862,15 +2874,10 @@ async def get_project_financial_summary(
         # CALCULATE TOTAL COSTS - Tính tổng chi phí
         # ============================================================================
         
-        # Get time entries and calculate labor costs
-        time_entries_result = supabase.table("time_entries").select("*").eq("project_id", project_id).execute()
-        time_entries = time_entries_result.data or []
-        total_hours = sum(entry.get("hours_worked", 0) for entry in time_entries)
-        total_labor_cost = 0
-        
-        for entry in time_entries:
-            if entry.get("hourly_rate"):
-                total_labor_cost += entry.get("hours_worked", 0) * entry.get("hourly_rate", 0)
+        # Labor costs from the monthly rollups (time entries + task time logs)
+        labor = labor_cost_service.get_project_total(project_id)
+        total_hours = labor["hours"]
+        total_labor_cost = labor["cost"]
         
         # Get direct project expenses
         expenses_result = supabase.table("expenses").select("*").eq("project_id", project_id).execute()
@@ -4,11 +4,10 @@ Comprehensive sales management with quotes, invoices, sales receipts, and paymen
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, UploadFile, File
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
 import uuid
 import asyncio
-import pandas as pd
 import io
 import json
 from pydantic import BaseModel
@@ -32,10 +31,13 @@ from services.journal_service import journal_service
 from services.project_validation_service import ProjectValidationService
 # Temporarily disabled email service
 from services.email_service import email_service
+from services.email_outbox_service import email_outbox_service
 from services.notification_service import notification_service
 from services.quote_service import quote_service
+from services.name_directory import display_name, name_directory
 from utils.file_utils import get_company_logo_path
 from utils.customer_code_generator import get_next_available_customer_code
+from utils.response_cache import response_cache
 
 router = APIRouter()
 
@@ -136,6 +138,14 @@ def check_user_has_project_access(supabase, current_user: User, project_id: Opti
     
     return False
 
+def get_employee_contact(employee_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(name, phone) of the employee in charge of a quote, preferring users.full_name"""
+    employee = name_directory.resolve("employees", [employee_id]).get(employee_id) if employee_id else None
+    if not employee:
+        return None, None
+    user_name = name_directory.name("users", employee.get("user_id"))
+    return user_name or display_name("employees", employee) or "", employee.get("phone")
+
 # ============================================================================
 # PROJECT INTEGRATION - Tích hợp dự án
 # ============================================================================
@@ -964,21 +974,21 @@ async def create_invoice_from_quote(quote_id: str, quote: dict, approver_user_id
         traceback.print_exc()
         return False
 
-# Helper function to send email notification (runs in background)
+# Helper function to queue email notification (runs in background)
 async def send_quote_approved_email_background(quote_id: str, quote: dict, employee_email: str, employee_name: str):
-    """Send quote approved email notification - runs in background"""
+    """Queue quote approved email notification in the email outbox - runs in background"""
     try:
         if not email_service:
             print(f"⚠️ Email service disabled - skipping quote approved notification email")
             return
         quote_items = await quote_service.get_quote_items_with_categories(quote_id)
-        await email_service.send_quote_approved_notification_email(
-            quote,
-            employee_email,
-            employee_name,
-            quote_items
-        )
-        print(f"Quote approved notification email sent to employee {employee_name}")
+        await email_outbox_service.enqueue("quote_approved", employee_email, {
+            "quote_data": quote,
+            "employee_email": employee_email,
+            "employee_name": employee_name,
+            "quote_items": quote_items
+        })
+        print(f"Quote approved notification email queued for employee {employee_name}")
     except Exception as email_error:
         print(f"Failed to send quote approved notification email: {email_error}")
 
@@ -1166,11 +1176,7 @@ async def preview_quote_email(
         # Parallel fetch: Customer Info and Quote Items
         async def get_customer_info(c_id):
             if not c_id: return None
-            try:
-                res = supabase.table("customers").select("*").eq("id", c_id).single().execute()
-                return res.data
-            except Exception:
-                return None
+            return name_directory.resolve("customers", [c_id]).get(c_id)
 
         # Execute parallel tasks
         customer_task = get_customer_info(quote.get("customer_id"))
@@ -1191,35 +1197,8 @@ async def preview_quote_email(
             customer_address = customer_data.get("address", "")
         
         # Get employee information from created_by -> employees -> users
-        employee_name = None
-        employee_phone = None
         emp_id = quote.get("employee_in_charge_id") or quote.get("created_by")
-        if emp_id:
-            try:
-                # Step 1: Get employee info including user_id
-                emp_res = supabase.table("employees").select("id, user_id, first_name, last_name, phone").eq("id", emp_id).single().execute()
-                if emp_res.data:
-                    emp = emp_res.data
-                    employee_phone = emp.get("phone")
-                    # Candidate name from employees table (first_name + last_name)
-                    candidate_name = f"{emp.get('first_name','')} {emp.get('last_name','')}".strip()
-                    
-                    # Step 2: Prefer users.full_name if available
-                    user_id = emp.get("user_id")
-                    if user_id:
-                        try:
-                            user_res = supabase.table("users").select("full_name").eq("id", user_id).single().execute()
-                            if user_res.data and user_res.data.get("full_name"):
-                                employee_name = user_res.data.get("full_name")
-                            else:
-                                employee_name = candidate_name
-                        except Exception:
-                            employee_name = candidate_name
-                    else:
-                        employee_name = candidate_name
-            except Exception as e:
-                print(f"Error fetching employee info: {e}")
-                pass
+        employee_name, employee_phone = get_employee_contact(emp_id)
         
         # Add customer info to quote data
         quote_data = {
@@ -1600,15 +1579,7 @@ async def send_quote_to_customer(
                 customer_email = customer.get("email")
                 
                 # Fetch project name if available
-                project_name = None
-                try:
-                    project_id = quote_result.data[0].get("project_id")
-                    if project_id:
-                        project_res = supabase.table("projects").select("name").eq("id", project_id).single().execute()
-                        if project_res.data:
-                            project_name = project_res.data.get("name")
-                except Exception as _:
-                    project_name = None
+                project_name = name_directory.name("projects", quote_result.data[0].get("project_id"))
                 
                 if customer_email:
                     try:
@@ -1670,35 +1641,8 @@ async def send_quote_to_customer(
                                     item['category_name'] = category_map[item.get('product_category_id')]
                         
                         # Get employee in charge from created_by -> employees -> users
-                        employee_name = None
-                        employee_phone = None
                         emp_id = quote_result.data[0].get("employee_in_charge_id") or quote_result.data[0].get("created_by")
-                        if emp_id:
-                            try:
-                                # Step 1: Get employee info including user_id
-                                emp_res = supabase.table("employees").select("id, user_id, first_name, last_name, phone").eq("id", emp_id).single().execute()
-                                if emp_res.data:
-                                    emp = emp_res.data
-                                    employee_phone = emp.get("phone")
-                                    # Candidate name from employees table (first_name + last_name)
-                                    candidate_name = f"{emp.get('first_name','')} {emp.get('last_name','')}".strip()
-                                    
-                                    # Step 2: Prefer users.full_name if available
-                                    user_id = emp.get("user_id")
-                                    if user_id:
-                                        try:
-                                            user_res = supabase.table("users").select("full_name").eq("id", user_id).single().execute()
-                                            if user_res.data and user_res.data.get("full_name"):
-                                                employee_name = user_res.data.get("full_name")
-                                            else:
-                                                employee_name = candidate_name
-                                        except Exception:
-                                            employee_name = candidate_name
-                                    else:
-                                        employee_name = candidate_name
-                            except Exception as e:
-                                print(f"Error fetching employee info: {e}")
-                                pass
+                        employee_name, employee_phone = get_employee_contact(emp_id)
                         
                         # Prepare custom content: load from email_customizations (active), then fallback to request body
                         custom_payment_terms = None
@@ -1912,35 +1856,38 @@ async def send_quote_to_customer(
                                 for att in request.attachments
                             ]
                         
+                        # The outbox worker marks this log sent/failed once delivery finishes
+                        email_log_id = str(uuid.uuid4())
                         if email_service:
-                            background_tasks.add_task(
-                                email_service.send_quote_email,
-                                quote_data_with_custom,
-                                customer_email,
-                                customer_name,
-                                quote_items,
-                                custom_payment_terms,
-                                additional_notes,
-                                final_html,
-                                company_info if company_info else None,
-                                bank_info if bank_info else None,
-                                default_notes,
-                                attachments_list
-                            )
+                            # Durable delivery with retries via the email outbox worker
+                            await email_outbox_service.enqueue("quote", customer_email, {
+                                "quote_data": quote_data_with_custom,
+                                "customer_email": customer_email,
+                                "customer_name": customer_name,
+                                "quote_items": quote_items,
+                                "custom_payment_terms": custom_payment_terms,
+                                "additional_notes": additional_notes,
+                                "prepared_html": final_html,
+                                "company_info": company_info if company_info else None,
+                                "bank_info": bank_info if bank_info else None,
+                                "default_notes": default_notes,
+                                "attachments": attachments_list
+                            }, email_log_id=email_log_id)
                         else:
                             print(f"⚠️ Email service disabled - skipping quote email to {customer_email}")
                         
                         # Save email log with custom content
                         try:
                             log_data = {
+                                "id": email_log_id,
                                 "to_email": customer_email,
                                 "subject": f"Báo giá {quote_result.data[0].get('quote_number', '')} - {customer_name}",
                                 # Save the exact HTML if provided, else a short note
                                 "body": final_html if final_html else f"Email báo giá cho quote {quote_id}",
-                                "status": "sent",
+                                "status": "queued" if email_service else "failed",
+                                "error_message": None if email_service else "Email service disabled",
                                 "entity_type": "quote",
                                 "entity_id": quote_id,
-                                "sent_at": datetime.utcnow().isoformat(),
                                 "edited_at": datetime.utcnow().isoformat(),
                                 "edited_by": current_user.id
                             }
@@ -3848,6 +3795,7 @@ async def import_quotes_from_excel(
     current_user: User = Depends(require_manager_or_admin)
 ):
     """Import quotes from Excel file - creates customers, projects, products, and quotes"""
+    import pandas as pd  # Imported on first use (slow import)
     try:
         supabase = get_supabase_client()
         
@@ -4050,6 +3998,7 @@ async def import_quotes_from_excel(
                             "updated_at": datetime.utcnow().isoformat()
                         }
                         result = supabase.table("customers").insert(customer_data).execute()
+                        response_cache.invalidate("customers")
                         if result.data:
                             customer_id = result.data[0]['id']
                             created_customers += 1
@@ -4392,6 +4341,7 @@ async def import_quote_from_ai_analysis(
                     "updated_at": datetime.utcnow().isoformat()
                 }
                 result = supabase.table("customers").insert(customer_data).execute()
+                response_cache.invalidate("customers")
                 if result.data:
                     customer_id = result.data[0]['id']
                     created_customers = 1
@@ -4418,6 +4368,7 @@ async def import_quote_from_ai_analysis(
                     "updated_at": datetime.utcnow().isoformat()
                 }
                 result = supabase.table("customers").insert(customer_data).execute()
+                response_cache.invalidate("customers")
                 if result.data:
                     customer_id = result.data[0]['id']
                     created_customers = 1
@@ -4736,6 +4687,7 @@ async def import_quote_from_ai_analysis(
                             "updated_at": datetime.utcnow().isoformat()
                         }
                         parent_result = supabase.table("expense_objects").insert(parent_data).execute()
+                        response_cache.invalidate("expense_objects")
                         if parent_result.data:
                             other_cost_parent = parent_result.data[0]['id']
                             print(f"✅ Created parent expense object: {other_cost_parent}")
@@ -4758,6 +4710,7 @@ async def import_quote_from_ai_analysis(
                             "updated_at": datetime.utcnow().isoformat()
                         }
                         expense_result = supabase.table("expense_objects").insert(expense_object_data).execute()
+                        response_cache.invalidate("expense_objects")
                         if expense_result.data:
                             expense_object_id = expense_result.data[0]['id']
                             print(f"✅ Created new expense object: '{expense_object_name}' (ID: {expense_object_id})")
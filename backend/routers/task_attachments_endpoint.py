@@ -25,7 +25,8 @@ async def upload_task_attachment(
         upload_service = get_file_upload_service()
         file_result = await upload_service.upload_file(
             file=file,
-            folder_path=f"Tasks/{task_id}"
+            folder_path=f"Tasks/{task_id}",
+            generate_variants=True
         )
         
         # Create attachment record
@@ -41,6 +42,10 @@ async def upload_task_attachment(
             "created_at": datetime.utcnow().isoformat()
         }
         
+        # Thumbnail/medium URLs for images (generated in background)
+        if file_result.get("variants"):
+            attachment_data["variants"] = file_result["variants"]
+        
         result = supabase.table("task_attachments").insert(attachment_data).execute()
         
         return {
@@ -50,7 +55,9 @@ async def upload_task_attachment(
             "file_type": file_result["content_type"],
             "file_size": file_result["size"],
             "uploaded_by_name": current_user.full_name,
-            "created_at": attachment_data["created_at"]
+            "created_at": attachment_data["created_at"],
+            "variants": file_result.get("variants"),
+            "variants_pending": file_result.get("variants_pending", False)
         }
     except HTTPException:
         raise
@@ -3,9 +3,9 @@ Task Management Router
 Handles CRUD operations for tasks, task groups, assignments, and notifications
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from typing import List, Optional
-from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Response
+from typing import Dict, List, Optional
+from datetime import date, datetime, timezone
 import uuid
 import re
 import logging
@@ -16,6 +16,7 @@ logger = logging.getLogger(__name__)
 
 from models.task import (
     Task,
+    TaskBoardPage,
     TaskCreate,
     TaskUpdate,
     TaskGroup,
@@ -58,10 +59,14 @@ from models.task import (
 from models.user import User
 from utils.auth import get_current_user, get_current_user_optional, require_manager_or_admin
 from services.supabase_client import get_supabase_client
+from utils.pagination import before_cursor_filter, encode_cursor
 from services.notification_service import notification_service
+from services.notification_dispatcher import membership_cache
+from services.name_directory import display_name, name_directory
 import asyncio
 from services.file_upload_service import get_file_upload_service
 from services.task_cleanup_service import task_cleanup_service
+from services.time_tracking_service import time_tracking_service, ROLLUP_PERIODS
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
@@ -115,6 +120,8 @@ def _calculate_duration_minutes(start: datetime, end: Optional[datetime]) -> int
 
 
 def _recalculate_task_time_spent(supabase, task_id: str) -> None:
+    """Full rescan of the task's logs; only used where add_time_log_rollups.sql
+    (incremental trigger) has not been applied"""
     logs_result = supabase.table("task_time_logs").select("start_time, end_time").eq("task_id", task_id).execute()
     total_minutes = 0
     for log in logs_result.data or []:
@@ -126,38 +133,87 @@ def _recalculate_task_time_spent(supabase, task_id: str) -> None:
 
 
 def _fetch_task_checklists(supabase, task_id: str) -> List[TaskChecklist]:
-    checklists_result = supabase.table("task_checklists").select("*").eq("task_id", task_id).order("created_at", desc=False).execute()
+    return _fetch_checklists_for_tasks(supabase, [task_id]).get(task_id, [])
+
+
+# Tasks per batch in _fetch_checklists_for_tasks (keeps the in.(...) URLs short)
+CHECKLIST_BATCH_TASKS = 50
+# Checklist / item ids per in.(...) query within a batch (a task can have many items)
+CHECKLIST_BATCH_IDS = 100
+
+
+def _select_in_chunks(build_query, column: str, values: List[str]) -> List[dict]:
+    """Rows of build_query().in_(column, values), CHECKLIST_BATCH_IDS values per query"""
+    rows: List[dict] = []
+    for start in range(0, len(values), CHECKLIST_BATCH_IDS):
+        result = build_query().in_(column, values[start:start + CHECKLIST_BATCH_IDS]).execute()
+        rows.extend(result.data or [])
+    return rows
+
+
+def _fetch_checklists_for_tasks(supabase, task_ids: List[str], item_counts: Optional[Dict[str, int]] = None) -> Dict[str, List[dict]]:
+    """Checklists with items and assignments for many tasks, keyed by task_id
+
+    A fixed number of queries per CHECKLIST_BATCH_TASKS tasks instead of several
+    per task. item_counts (tasks.checklist_item_count) skips the item queries for
+    tasks without checklist items.
+    """
+    checklists_by_task: Dict[str, List[dict]] = {task_id: [] for task_id in task_ids}
+    for start in range(0, len(task_ids), CHECKLIST_BATCH_TASKS):
+        for checklist in _fetch_checklist_batch(supabase, task_ids[start:start + CHECKLIST_BATCH_TASKS], item_counts):
+            checklists_by_task.setdefault(checklist["task_id"], []).append(checklist)
+    return checklists_by_task
+
+
+def _fetch_checklist_batch(supabase, task_ids: List[str], item_counts: Optional[Dict[str, int]] = None) -> List[dict]:
+    if not task_ids:
+        return []
+    # Checklist assignments are embedded, so they need no query of their own
+    checklists_result = supabase.table("task_checklists").select("""
+        *,
+        task_checklist_assignments(*, employees:employee_id(id, first_name, last_name))
+    """).in_("task_id", task_ids).order("created_at", desc=False).execute()
     checklists = checklists_result.data or []
     checklist_ids = [checklist["id"] for checklist in checklists]
     items_map = {cid: [] for cid in checklist_ids}
+    item_checklist_ids = [
+        checklist["id"] for checklist in checklists
+        if item_counts is None or item_counts.get(checklist["task_id"], 1) > 0
+    ]
 
-    if checklist_ids:
-        items_result = (
-            supabase.table("task_checklist_items")
+    if item_checklist_ids:
+        # Chunks hold whole checklists, so items stay ordered within each checklist
+        items = _select_in_chunks(
+            lambda: supabase.table("task_checklist_items")
             .select("""
                 *,
                 employees:assignee_id(id, first_name, last_name)
             """)
-            .in_("checklist_id", checklist_ids)
             .order("sort_order", desc=False)
-            .order("created_at", desc=False)
-            .execute()
+            .order("created_at", desc=False),
+            "checklist_id",
+            item_checklist_ids,
         )
-        item_ids = [item["id"] for item in items_result.data or []]
+        item_ids = [item["id"] for item in items]
         
         # Fetch assignments for all items
         assignments_map = {}
         if item_ids:
-            assignments_result = (
-                supabase.table("task_checklist_item_assignments")
+            item_assignments = _select_in_chunks(
+                lambda: supabase.table("task_checklist_item_assignments")
                 .select("""
                     *,
                     employees:employee_id(id, first_name, last_name)
-                """)
-                .in_("checklist_item_id", item_ids)
-                .execute()
+                """),
+                "checklist_item_id",
+                item_ids,
             )
-            for assignment in assignments_result.data or []:
+            # Names the employees join did not return, resolved in one cached lookup
+            fallback_names = name_directory.names(
+                "employees",
+                [a.get("employee_id") for a in item_assignments if not a.get("employees")],
+            )
+            for assignment in item_assignments:
                 item_id = assignment["checklist_item_id"]
                 if item_id not in assignments_map:
                     assignments_map[item_id] = []
@@ -177,24 +233,17 @@ def _fetch_task_checklists(supabase, task_id: str) -> List[TaskChecklist]:
                     if name:
                         assignment_data["employee_name"] = name
                 
-                # Fallback: if join didn't work, query directly
-                if not assignment_data.get("employee_name") and assignment.get("employee_id"):
-                    try:
-                        emp_result = supabase.table("employees").select("first_name, last_name").eq("id", assignment.get("employee_id")).single().execute()
-                        if emp_result.data:
-                            emp_data = emp_result.data
-                            name = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                            if not name:
-                                name = emp_data.get('full_name')
-                            
-                            if name:
-                                assignment_data["employee_name"] = name
-                    except Exception:
-                        pass
+                # Fallback: if join didn't work, use the name directory
+                if not assignment_data.get("employee_name") and fallback_names.get(assignment.get("employee_id")):
+                    assignment_data["employee_name"] = fallback_names[assignment["employee_id"]]
 
                 assignments_map[item_id].append(assignment_data)
         
-        for item in items_result.data or []:
+        assignee_names = name_directory.names(
+            "employees",
+            [item.get("assignee_id") for item in items if not item.get("employees")],
+        )
+        for item in items:
             employee = item.get("employees")
             if isinstance(employee, list):
                 employee = employee[0] if employee else None
@@ -203,31 +252,25 @@ def _fetch_task_checklists(supabase, task_id: str) -> List[TaskChecklist]:
                 item["assignee_name"] = f"{employee.get('first_name', '')} {employee.get('last_name', '')}".strip()
             
             # Fallback for assignee_name
-            if not item.get("assignee_name") and item.get("assignee_id"):
-                try:
-                    emp_result = supabase.table("employees").select("first_name, last_name").eq("id", item.get("assignee_id")).single().execute()
-                    if emp_result.data:
-                        emp_data = emp_result.data
-                        item["assignee_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                except Exception:
-                    pass
+            if not item.get("assignee_name") and assignee_names.get(item.get("assignee_id")):
+                item["assignee_name"] = assignee_names[item["assignee_id"]]
             # Add assignments to item
             item["assignments"] = assignments_map.get(item["id"], [])
             items_map.setdefault(item["checklist_id"], []).append(item)
 
-    # Fetch assignments for all checklists
+    # Assignments for all checklists
     checklist_assignments_map = {}
-    if checklist_ids:
-        checklist_assignments_result = (
-            supabase.table("task_checklist_assignments")
-            .select("""
-                *,
-                employees:employee_id(id, first_name, last_name)
-            """)
-            .in_("checklist_id", checklist_ids)
-            .execute()
+    checklist_assignments = [
+        assignment
+        for checklist in checklists
+        for assignment in checklist.pop("task_checklist_assignments", None) or []
+    ]
+    if checklist_assignments:
+        fallback_names = name_directory.names(
+            "employees",
+            [a.get("employee_id") for a in checklist_assignments if not a.get("employees")],
         )
-        for assignment in checklist_assignments_result.data or []:
+        for assignment in checklist_assignments:
             cl_id = assignment["checklist_id"]
             if cl_id not in checklist_assignments_map:
                 checklist_assignments_map[cl_id] = []
@@ -248,20 +291,9 @@ def _fetch_task_checklists(supabase, task_id: str) -> List[TaskChecklist]:
                 if name:
                     assignment_data["employee_name"] = name
             
-            # Fallback: if join didn't work, query directly
-            if not assignment_data.get("employee_name") and assignment.get("employee_id"):
-                try:
-                    emp_result = supabase.table("employees").select("first_name, last_name").eq("id", assignment.get("employee_id")).single().execute()
-                    if emp_result.data:
-                        emp_data = emp_result.data
-                        name = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                        if not name:
-                            name = emp_data.get('full_name')
-                        
-                        if name:
-                            assignment_data["employee_name"] = name
-                except Exception:
-                    pass
+            # Fallback: if join didn't work, use the name directory
+            if not assignment_data.get("employee_name") and fallback_names.get(assignment.get("employee_id")):
+                assignment_data["employee_name"] = fallback_names[assignment["employee_id"]]
 
             checklist_assignments_map[cl_id].append(assignment_data)
 
@@ -408,10 +440,12 @@ def _fetch_task_time_logs(supabase, task_id: str) -> List[TaskTimeLog]:
             if user_id and user_id in user_map:
                 log["user_name"] = user_map[user_id]
             
-            start_dt = _parse_iso_datetime(log.get("start_time"))
-            end_dt = _parse_iso_datetime(log.get("end_time"))
-            if start_dt:
-                log["duration_minutes"] = _calculate_duration_minutes(start_dt, end_dt)
+            # Stopped logs carry duration_minutes (set by trigger); only running
+            # logs (or rows from before add_time_log_rollups.sql) are computed here
+            if log.get("duration_minutes") is None:
+                start_dt = _parse_iso_datetime(log.get("start_time"))
+                if start_dt:
+                    log["duration_minutes"] = _calculate_duration_minutes(start_dt, _parse_iso_datetime(log.get("end_time")))
             enriched_logs.append(log)
     
     return enriched_logs
@@ -429,6 +463,10 @@ def _fetch_task_participants(supabase, task_id: str) -> List[TaskParticipant]:
         .execute()
     )
 
+    fallback_names = name_directory.names(
+        "employees",
+        [p.get("employee_id") for p in participants_result.data or [] if not p.get("employees")],
+    )
     participants = []
     for participant in participants_result.data or []:
         # Try to get employee name from join first
@@ -441,16 +479,9 @@ def _fetch_task_participants(supabase, task_id: str) -> List[TaskParticipant]:
             if employee:
                 participant["employee_name"] = f"{employee.get('first_name', '')} {employee.get('last_name', '')}".strip()
         
-        # If join didn't work, query directly
-        if not participant.get("employee_name") and participant.get("employee_id"):
-            try:
-                emp_result = supabase.table("employees").select("first_name, last_name").eq("id", participant.get("employee_id")).single().execute()
-                if emp_result.data:
-                    emp_data = emp_result.data
-                    participant["employee_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-            except Exception:
-                # Employee not found or query failed
-                pass
+        # If join didn't work, use the name directory
+        if not participant.get("employee_name") and fallback_names.get(participant.get("employee_id")):
+            participant["employee_name"] = fallback_names[participant["employee_id"]]
         
         participants.append(participant)
     return participants
@@ -1100,6 +1131,7 @@ async def remove_group_member(
                             user_id = emp_result.data[0].get("user_id")
                             # Remove from project_team
                             supabase.table("project_team").delete().eq("project_id", project_id).eq("user_id", user_id).execute()
+                            membership_cache.invalidate(project_id)
             except Exception as sync_err:
                 # Log but do not fail delete
                 logger.warning(f"Failed to sync with project_team when removing group member: {str(sync_err)}")
@@ -1115,86 +1147,170 @@ async def remove_group_member(
 
 # ==================== Tasks ====================
 
+TASK_LIST_SELECT = """
+    *,
+    employees:assigned_to(id, first_name, last_name),
+    users:created_by(id, full_name),
+    task_groups:group_id(id, name),
+    projects:project_id(id, name)
+"""
+
+TASK_CARD_STAT_FIELDS = ("comment_count", "attachment_count", "assignee_count", "checklist_item_count", "checklist_completed_count")
+
+
+def _apply_task_list_joins(task: dict) -> dict:
+    """Flatten the joined names selected by TASK_LIST_SELECT"""
+    employee = task.get("employees")
+    if employee:
+        task["assigned_to_name"] = f"{employee.get('first_name', '')} {employee.get('last_name', '')}".strip()
+    user = task.get("users")
+    if user:
+        task["created_by_name"] = user.get("full_name")
+    group = task.get("task_groups")
+    if group:
+        task["group_name"] = group.get("name")
+    project = task.get("projects")
+    if project:
+        task["project_name"] = project.get("name")
+    return task
+
+
+def _fetch_task_card_stats(supabase, task_ids: List[str]) -> Dict[str, dict]:
+    """Comment/attachment/assignee counts and checklist progress for many tasks (one RPC)"""
+    if not task_ids:
+        return {}
+    result = supabase.rpc("get_task_card_stats", {"p_task_ids": task_ids}).execute()
+    return {row["task_id"]: row for row in result.data or []}
+
+
+def _task_list_query(supabase, task_status, group_id, assigned_to, priority, project_id):
+    query = supabase.table("tasks").select(TASK_LIST_SELECT)
+    
+    # Filter out deleted tasks
+    query = query.is_("deleted_at", "null")
+    
+    if task_status:
+        query = query.eq("status", task_status)
+    if group_id:
+        query = query.eq("group_id", group_id)
+    if assigned_to:
+        query = query.eq("assigned_to", assigned_to)
+    if priority:
+        query = query.eq("priority", priority)
+    if project_id:
+        query = query.eq("project_id", project_id)
+    return query
+
+
+def _build_task_cards(supabase, rows: List[dict], include_checklists: bool) -> List[dict]:
+    task_ids = [task["id"] for task in rows]
+    # Counter columns are maintained by triggers (add_task_counters.sql); the
+    # grouped RPC is only needed where that migration has not been applied
+    if rows and all(field in rows[0] for field in TASK_CARD_STAT_FIELDS):
+        stats = {task["id"]: task for task in rows}
+    else:
+        stats = _fetch_task_card_stats(supabase, task_ids)
+    if include_checklists:
+        # Tasks without checklist items need no item queries
+        item_counts = {task_id: stats.get(task_id, {}).get("checklist_item_count", 1) for task_id in task_ids}
+        checklists = _fetch_checklists_for_tasks(supabase, task_ids, item_counts)
+    else:
+        checklists = {}
+    tasks = []
+    for task in rows:
+        _apply_task_list_joins(task)
+        task_stats = stats.get(task["id"], {})
+        for field in TASK_CARD_STAT_FIELDS:
+            task[field] = task_stats.get(field, 0)
+        task["checklists"] = checklists.get(task["id"], [])
+        tasks.append(task)
+    return tasks
+
+
 @router.get("", response_model=List[Task])
 async def get_tasks(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    status: Optional[str] = Query(None, description="Filter by status"),
+    task_status: Optional[str] = Query(None, alias="status", description="Filter by status"),
     group_id: Optional[str] = Query(None, description="Filter by group"),
     assigned_to: Optional[str] = Query(None, description="Filter by assigned employee"),
     priority: Optional[str] = Query(None, description="Filter by priority"),
-    project_id: Optional[str] = Query(None, description="Filter by project")
+    project_id: Optional[str] = Query(None, description="Filter by project"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default: all tasks)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    include_checklists: bool = Query(True, description="Embed full checklists (use /tasks/board for cards)")
 ):
-    """Get all tasks with filters"""
+    """Get all tasks with filters
+    
+    Counts come from one grouped query and checklists are loaded in batches, so
+    the number of round-trips does not grow with the number of tasks.
+    """
     try:
         supabase = get_supabase_client()
         
-        query = supabase.table("tasks").select("""
-            *,
-            employees:assigned_to(id, first_name, last_name),
-            users:created_by(id, full_name),
-            task_groups:group_id(id, name),
-            projects:project_id(id, name)
-        """)
+        query = _task_list_query(supabase, task_status, group_id, assigned_to, priority, project_id)
+        if cursor:
+            query = query.or_(before_cursor_filter(cursor))
+        query = query.order("created_at", desc=True).order("id", desc=True)
+        if limit:
+            query = query.limit(limit + 1)
+        rows = query.execute().data or []
         
-        # Filter out deleted tasks
-        query = query.is_("deleted_at", "null")
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
         
-        if status:
-            query = query.eq("status", status)
-        if group_id:
-            query = query.eq("group_id", group_id)
-        if assigned_to:
-            query = query.eq("assigned_to", assigned_to)
-        if priority:
-            query = query.eq("priority", priority)
-        if project_id:
-            query = query.eq("project_id", project_id)
+        return _build_task_cards(supabase, rows, include_checklists)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch tasks: {str(e)}"
+        )
+
+@router.get("/board", response_model=TaskBoardPage)
+async def get_task_board(
+    current_user: User = Depends(get_current_user),
+    task_status: Optional[str] = Query(None, alias="status", description="Filter by status"),
+    group_id: Optional[str] = Query(None, description="Filter by group"),
+    assigned_to: Optional[str] = Query(None, description="Filter by assigned employee"),
+    priority: Optional[str] = Query(None, description="Filter by priority"),
+    project_id: Optional[str] = Query(None, description="Filter by project"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Task cards for the Kanban board, newest first
+    
+    Keyset-paginated on (created_at, id). Each card carries its counts and
+    checklist progress; full checklists are fetched with GET /tasks/{task_id}/checklists.
+    """
+    try:
+        supabase = get_supabase_client()
         
-        result = query.order("created_at", desc=True).execute()
+        query = _task_list_query(supabase, task_status, group_id, assigned_to, priority, project_id)
+        if cursor:
+            query = query.or_(before_cursor_filter(cursor))
+        rows = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute().data or []
         
-        tasks = []
-        for task in result.data or []:
-            # Process assigned_to
-            employee = task.get("employees")
-            if employee:
-                task["assigned_to_name"] = f"{employee.get('first_name', '')} {employee.get('last_name', '')}".strip()
-            
-            # Process created_by
-            user = task.get("users")
-            if user:
-                task["created_by_name"] = user.get("full_name")
-            
-            # Process group
-            group = task.get("task_groups")
-            if group:
-                task["group_name"] = group.get("name")
-            
-            # Process project
-            project = task.get("projects")
-            if project:
-                task["project_name"] = project.get("name")
-            
-            # Get comment and attachment counts
-            comment_count = supabase.table("task_comments").select("id", count="exact").eq("task_id", task["id"]).execute()
-            task["comment_count"] = comment_count.count if hasattr(comment_count, 'count') else 0
-            
-            attachment_count = supabase.table("task_attachments").select("id", count="exact").eq("task_id", task["id"]).execute()
-            task["attachment_count"] = attachment_count.count if hasattr(attachment_count, 'count') else 0
-
-            assignment_count = supabase.table("task_assignments").select("id", count="exact").eq("task_id", task["id"]).execute()
-            task["assignee_count"] = assignment_count.count if hasattr(assignment_count, 'count') else 0
-            
-            # Get checklists with items
-            checklists = _fetch_task_checklists(supabase, task["id"])
-            task["checklists"] = checklists
-            
-            tasks.append(task)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
         
-        return tasks
+        return TaskBoardPage(items=_build_task_cards(supabase, rows, include_checklists=False), next_cursor=next_cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to fetch tasks: {str(e)}"
+            detail=f"Failed to fetch task board: {str(e)}"
         )
 
 @router.get("/deleted", response_model=List[Task])
@@ -1605,16 +1721,15 @@ async def get_task(
                     
                     # Get Customer Name
                     if project_data.get("customer_id"):
-                        cust_res = supabase.table("customers").select("name").eq("id", project_data["customer_id"]).single().execute()
-                        if cust_res.data:
-                            project_data["customer_name"] = cust_res.data.get("name")
+                        customer_name = name_directory.name("customers", project_data["customer_id"])
+                        if customer_name:
+                            project_data["customer_name"] = customer_name
                             
                     # Get Manager Name (assigned_to in project table)
                     if project_data.get("manager_id"):
-                        mgr_res = supabase.table("employees").select("first_name, last_name").eq("id", project_data["manager_id"]).single().execute()
-                        if mgr_res.data:
-                            mgr_data = mgr_res.data
-                            project_data["manager_name"] = f"{mgr_data.get('first_name', '')} {mgr_data.get('last_name', '')}".strip()
+                        manager_name = name_directory.name("employees", project_data["manager_id"])
+                        if manager_name:
+                            project_data["manager_name"] = manager_name
                     
                     # Add to task object
                     task["project"] = project_data
@@ -1628,6 +1743,15 @@ async def get_task(
             users:assigned_by(id, full_name)
         """).eq("task_id", task_id).execute()
         
+        # Names the joins did not return, resolved in one cached lookup per kind
+        fallback_employee_names = name_directory.names(
+            "employees",
+            [a.get("assigned_to") for a in assignments_result.data or [] if not a.get("employees")],
+        )
+        fallback_user_names = name_directory.names(
+            "users",
+            [a.get("assigned_by") for a in assignments_result.data or [] if not a.get("users")],
+        )
         assignments = []
         for assignment in assignments_result.data or []:
             # Try to get employee name from join first
@@ -1640,16 +1764,9 @@ async def get_task(
                 if emp:
                     assignment["assigned_to_name"] = f"{emp.get('first_name', '')} {emp.get('last_name', '')}".strip()
             
-            # If join didn't work, query directly
-            if not assignment.get("assigned_to_name") and assignment.get("assigned_to"):
-                try:
-                    emp_result = supabase.table("employees").select("first_name, last_name").eq("id", assignment.get("assigned_to")).single().execute()
-                    if emp_result.data:
-                        emp_data = emp_result.data
-                        assignment["assigned_to_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                except Exception:
-                    # Employee not found or query failed
-                    pass
+            # If join didn't work, use the name directory
+            if not assignment.get("assigned_to_name") and fallback_employee_names.get(assignment.get("assigned_to")):
+                assignment["assigned_to_name"] = fallback_employee_names[assignment["assigned_to"]]
             
             # Get assigned_by name
             usr = assignment.get("users")
@@ -1659,14 +1776,9 @@ async def get_task(
                 if usr:
                     assignment["assigned_by_name"] = usr.get("full_name")
             
-            # If join didn't work, query directly
-            if not assignment.get("assigned_by_name") and assignment.get("assigned_by"):
-                try:
-                    user_result = supabase.table("users").select("full_name").eq("id", assignment.get("assigned_by")).single().execute()
-                    if user_result.data:
-                        assignment["assigned_by_name"] = user_result.data.get("full_name")
-                except Exception:
-                    pass
+            # If join didn't work, use the name directory
+            if not assignment.get("assigned_by_name") and fallback_user_names.get(assignment.get("assigned_by")):
+                assignment["assigned_by_name"] = fallback_user_names[assignment["assigned_by"]]
             
             assignments.append(assignment)
         
@@ -1699,6 +1811,10 @@ async def get_task(
                 # parent_id column doesn't exist, return empty list
                 return []
             
+            reply_user_names = name_directory.names(
+                "users",
+                [r.get("user_id") for r in replies_result.data or [] if not r.get("users")],
+            )
             replies = []
             for reply in replies_result.data or []:
                 usr = reply.get("users")
@@ -1710,13 +1826,8 @@ async def get_task(
                     reply["employee_name"] = f"{emp.get('first_name', '')} {emp.get('last_name', '')}".strip()
 
                 # Fallback: nếu chưa có user_name mà có user_id thì lấy từ bảng users
-                if not reply.get("user_name") and reply.get("user_id"):
-                    try:
-                        user_result = supabase.table("users").select("full_name").eq("id", reply.get("user_id")).single().execute()
-                        if user_result.data:
-                            reply["user_name"] = user_result.data.get("full_name")
-                    except Exception:
-                        pass
+                if not reply.get("user_name") and reply_user_names.get(reply.get("user_id")):
+                    reply["user_name"] = reply_user_names[reply["user_id"]]
                 
                 # Recursively get nested replies
                 reply["replies"] = get_replies(reply["id"])
@@ -1724,6 +1835,16 @@ async def get_task(
             
             return replies
         
+        # Names the joins did not return, resolved in one cached lookup per kind
+        unnamed_comments = [c for c in comments_result.data or [] if not c.get("employees")]
+        fallback_employee_names = name_directory.names("employees", [c.get("employee_id") for c in unnamed_comments])
+        fallback_employees_by_user = name_directory.resolve_employees_by_user(
+            [c.get("user_id") for c in unnamed_comments if not fallback_employee_names.get(c.get("employee_id"))]
+        )
+        fallback_user_names = name_directory.names(
+            "users",
+            [c.get("user_id") for c in comments_result.data or [] if not c.get("users")],
+        )
         comments = []
         for comment in comments_result.data or []:
             # Get user name - handle both dict and list formats from Supabase join
@@ -1745,34 +1866,15 @@ async def get_task(
 
             # Fallback: nếu chưa có employee_name, tìm theo employee_id hoặc user_id
             if not comment.get("employee_name"):
-                employee_id = comment.get("employee_id")
-                if employee_id:
-                    try:
-                        emp_result = supabase.table("employees").select("first_name, last_name").eq("id", employee_id).single().execute()
-                        if emp_result.data:
-                            emp_data = emp_result.data
-                            comment["employee_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                    except Exception:
-                        pass
-                
-                # Fallback: tìm employee theo user_id
-                if not comment.get("employee_name") and comment.get("user_id"):
-                    try:
-                        emp_result = supabase.table("employees").select("first_name, last_name").eq("user_id", comment.get("user_id")).single().execute()
-                        if emp_result.data:
-                            emp_data = emp_result.data
-                            comment["employee_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                    except Exception:
-                        pass
+                comment_employee_name = fallback_employee_names.get(comment.get("employee_id")) or display_name(
+                    "employees", fallback_employees_by_user.get(comment.get("user_id"))
+                )
+                if comment_employee_name:
+                    comment["employee_name"] = comment_employee_name
 
             # Fallback: nếu chưa có user_name mà có user_id thì lấy từ bảng users
-            if not comment.get("user_name") and comment.get("user_id"):
-                try:
-                    user_result = supabase.table("users").select("full_name").eq("id", comment.get("user_id")).single().execute()
-                    if user_result.data:
-                        comment["user_name"] = user_result.data.get("full_name")
-                except Exception:
-                    pass
+            if not comment.get("user_name") and fallback_user_names.get(comment.get("user_id")):
+                comment["user_name"] = fallback_user_names[comment["user_id"]]
             
             # Get replies for this comment (only if parent_id column exists)
             try:
@@ -1809,13 +1911,14 @@ async def get_task(
         
         # Get sub-tasks
         sub_tasks_result = supabase.table("tasks").select("*").eq("parent_id", task_id).is_("deleted_at", "null").order("created_at", desc=True).execute()
+        sub_task_assignee_names = name_directory.names(
+            "employees", [sub_task.get("assigned_to") for sub_task in sub_tasks_result.data or []]
+        )
         sub_tasks = []
         for sub_task in sub_tasks_result.data or []:
             # Process assigned_to for sub-tasks
-            if sub_task.get("assigned_to"):
-                emp = supabase.table("employees").select("first_name, last_name").eq("id", sub_task.get("assigned_to")).single().execute()
-                if emp.data:
-                    sub_task["assigned_to_name"] = f"{emp.data.get('first_name', '')} {emp.data.get('last_name', '')}".strip()
+            if sub_task_assignee_names.get(sub_task.get("assigned_to")):
+                sub_task["assigned_to_name"] = sub_task_assignee_names[sub_task["assigned_to"]]
             sub_tasks.append(sub_task)
 
         # Enrich main task with counts and checklists for Android parity
@@ -2119,9 +2222,8 @@ async def cleanup_deleted_items(
     try:
         result = await task_cleanup_service.cleanup_old_deleted_items()
         return {
-            "message": "Cleanup completed",
-            "deleted_tasks": result["deleted_tasks"],
-            "deleted_groups": result["deleted_groups"]
+            "message": "Cleanup completed" if result["completed"] else "Cleanup paused (time budget reached), run again to continue",
+            **result
         }
     except Exception as e:
         raise HTTPException(
@@ -2250,30 +2352,13 @@ async def get_project_comments(
                 elif comment.get("user_id"):
                     missing_user_ids.add(comment.get("user_id"))  # Will lookup employee by user_id
         
-        # Batch fetch missing user names (only if needed)
-        user_map = {}
-        if missing_user_ids:
-            try:
-                user_ids_list = list(missing_user_ids)[:100]  # Limit to 100 to avoid query timeout
-                users_result = supabase.table("users").select("id, full_name").in_("id", user_ids_list).execute()
-                if users_result.data:
-                    user_map = {u["id"]: u.get("full_name") for u in users_result.data}
-            except Exception as e:
-                logger.debug(f"Could not batch fetch users: {str(e)}")
-        
-        # Batch fetch missing employee names (only if needed)
-        employee_map = {}
-        if missing_employee_ids:
-            try:
-                emp_ids_list = list(missing_employee_ids)[:100]  # Limit to 100
-                emp_result = supabase.table("employees").select("id, first_name, last_name").in_("id", emp_ids_list).execute()
-                if emp_result.data:
-                    employee_map = {
-                        e["id"]: f"{e.get('first_name', '')} {e.get('last_name', '')}".strip() 
-                        for e in emp_result.data
-                    }
-            except Exception as e:
-                logger.debug(f"Could not batch fetch employees: {str(e)}")
+        # Missing names from the name directory (cached, one query per kind at most)
+        user_map = name_directory.names("users", missing_user_ids)
+        employee_map = name_directory.names("employees", missing_employee_ids)
+        employees_by_user = name_directory.resolve_employees_by_user(
+            comment.get("user_id") for comment in all_comments
+            if not comment.get("employee_name") and not comment.get("employee_id")
+        )
         
         # Apply batch-fetched data to comments
         for comment in all_comments:
@@ -2285,14 +2370,8 @@ async def get_project_comments(
             if not comment.get("employee_name"):
                 if comment.get("employee_id") and comment.get("employee_id") in employee_map:
                     comment["employee_name"] = employee_map[comment.get("employee_id")]
-                elif comment.get("user_id") and comment.get("user_id") in user_map:
-                    # Try to get employee by user_id (single query only if really needed)
-                    try:
-                        emp_res = supabase.table("employees").select("first_name, last_name").eq("user_id", comment.get("user_id")).maybe_single().execute()
-                        if emp_res.data:
-                            comment["employee_name"] = f"{emp_res.data.get('first_name', '')} {emp_res.data.get('last_name', '')}".strip()
-                    except Exception:
-                        pass  # Skip if fails
+                elif comment.get("user_id") in employees_by_user:
+                    comment["employee_name"] = display_name("employees", employees_by_user[comment["user_id"]])
             
             # We return flat list for sequential chat, but keep replies empty to match model
             comment["replies"] = []
@@ -2352,6 +2431,9 @@ async def get_task_comments(
                 # parent_id column doesn't exist, return empty list
                 return []
             
+            unnamed_replies = [r for r in replies_result.data or [] if not r.get("employees") or not r.get("users")]
+            reply_employee_names = name_directory.names("employees", [r.get("employee_id") for r in unnamed_replies])
+            reply_user_names = name_directory.names("users", [r.get("user_id") for r in unnamed_replies])
             replies = []
             for reply in replies_result.data or []:
                 # Get user name
@@ -2370,24 +2452,13 @@ async def get_task_comments(
                     if emp:
                         reply["employee_name"] = f"{emp.get('first_name', '')} {emp.get('last_name', '')}".strip()
                 
-                # If join didn't work, query directly for employee
-                if not reply.get("employee_name") and reply.get("employee_id"):
-                    try:
-                        emp_result = supabase.table("employees").select("first_name, last_name").eq("id", reply.get("employee_id")).single().execute()
-                        if emp_result.data:
-                            emp_data = emp_result.data
-                            reply["employee_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                    except Exception:
-                        pass
+                # If join didn't work, use the name directory
+                if not reply.get("employee_name") and reply_employee_names.get(reply.get("employee_id")):
+                    reply["employee_name"] = reply_employee_names[reply["employee_id"]]
 
                 # Fallback: nếu chưa có user_name mà có user_id thì lấy từ bảng users
-                if not reply.get("user_name") and reply.get("user_id"):
-                    try:
-                        user_result = supabase.table("users").select("full_name").eq("id", reply.get("user_id")).single().execute()
-                        if user_result.data:
-                            reply["user_name"] = user_result.data.get("full_name")
-                    except Exception:
-                        pass
+                if not reply.get("user_name") and reply_user_names.get(reply.get("user_id")):
+                    reply["user_name"] = reply_user_names[reply["user_id"]]
                 
                 # Recursively get nested replies
                 reply["replies"] = get_replies(reply["id"])
@@ -2395,6 +2466,16 @@ async def get_task_comments(
             
             return replies
         
+        # Names the joins did not return, resolved in one cached lookup per kind
+        unnamed_comments = [c for c in comments_result.data or [] if not c.get("employees")]
+        fallback_employee_names = name_directory.names("employees", [c.get("employee_id") for c in unnamed_comments])
+        fallback_employees_by_user = name_directory.resolve_employees_by_user(
+            [c.get("user_id") for c in unnamed_comments if not fallback_employee_names.get(c.get("employee_id"))]
+        )
+        fallback_user_names = name_directory.names(
+            "users",
+            [c.get("user_id") for c in comments_result.data or [] if not c.get("users")],
+        )
         comments = []
         for comment in comments_result.data or []:
             # Get user name
@@ -2415,35 +2496,15 @@ async def get_task_comments(
             
             # If join didn't work, try to get employee name by employee_id, then by user_id
             if not comment.get("employee_name"):
-                # 1) By employee_id on the comment (nếu có)
-                employee_id = comment.get("employee_id")
-                if employee_id:
-                    try:
-                        emp_result = supabase.table("employees").select("first_name, last_name").eq("id", employee_id).single().execute()
-                        if emp_result.data:
-                            emp_data = emp_result.data
-                            comment["employee_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                    except Exception:
-                        pass
-                
-                # 2) Fallback: tìm employee theo user_id (nếu không có employee_id)
-                if not comment.get("employee_name") and comment.get("user_id"):
-                    try:
-                        emp_result = supabase.table("employees").select("first_name, last_name").eq("user_id", comment.get("user_id")).single().execute()
-                        if emp_result.data:
-                            emp_data = emp_result.data
-                            comment["employee_name"] = f"{emp_data.get('first_name', '')} {emp_data.get('last_name', '')}".strip()
-                    except Exception:
-                        pass
+                comment_employee_name = fallback_employee_names.get(comment.get("employee_id")) or display_name(
+                    "employees", fallback_employees_by_user.get(comment.get("user_id"))
+                )
+                if comment_employee_name:
+                    comment["employee_name"] = comment_employee_name
 
             # Fallback: nếu chưa có user_name mà có user_id thì lấy từ bảng users
-            if not comment.get("user_name") and comment.get("user_id"):
-                try:
-                    user_result = supabase.table("users").select("full_name").eq("id", comment.get("user_id")).single().execute()
-                    if user_result.data:
-                        comment["user_name"] = user_result.data.get("full_name")
-                except Exception:
-                    pass
+            if not comment.get("user_name") and fallback_user_names.get(comment.get("user_id")):
+                comment["user_name"] = fallback_user_names[comment["user_id"]]
             
             # Get replies for this comment (only if parent_id column exists)
             try:
@@ -3591,9 +3652,11 @@ async def stop_time_log(
         if stop_data.description is not None:
             update_data["description"] = stop_data.description
 
+        # The trigger sets duration_minutes and adds it to tasks.time_spent and the rollups
         result = supabase.table("task_time_logs").update(update_data).eq("id", log_id).execute()
         updated_log = result.data[0]
-        _recalculate_task_time_spent(supabase, log["task_id"])
+        if "duration_minutes" not in updated_log:
+            _recalculate_task_time_spent(supabase, log["task_id"])
         return updated_log
     except HTTPException:
         raise
@@ -3611,7 +3674,7 @@ async def delete_time_log(
 ):
     try:
         supabase = get_supabase_client()
-        log_result = supabase.table("task_time_logs").select("task_id, user_id").eq("id", log_id).limit(1).execute()
+        log_result = supabase.table("task_time_logs").select("*").eq("id", log_id).limit(1).execute()
         if not log_result.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -3624,8 +3687,10 @@ async def delete_time_log(
                 detail="You can only delete your own time logs"
             )
 
+        # The trigger subtracts the log's duration from tasks.time_spent and the rollups
         supabase.table("task_time_logs").delete().eq("id", log_id).execute()
-        _recalculate_task_time_spent(supabase, log["task_id"])
+        if "duration_minutes" not in log:
+            _recalculate_task_time_spent(supabase, log["task_id"])
         return {"message": "Time log deleted"}
     except HTTPException:
         raise
@@ -3635,6 +3700,90 @@ async def delete_time_log(
             detail=f"Failed to delete time log: {str(e)}"
         )
 
+# Roles that see every employee's timesheet and the utilization report
+TIMESHEET_REPORT_ROLES = {"admin", "manager", "hr_manager", "accountant"}
+# Longest date range accepted by the timesheet reports
+TIMESHEET_MAX_RANGE_DAYS = 366
+
+
+def _role_value(user: User) -> str:
+    role = user.role.value if hasattr(user.role, "value") else str(user.role)
+    return role.lower()
+
+
+def _validate_report_range(start_date: date, end_date: date):
+    if end_date < start_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= TIMESHEET_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must be at most {TIMESHEET_MAX_RANGE_DAYS} days"
+        )
+
+
+@router.get("/time-logs/rollups")
+async def get_time_log_rollups(
+    start_date: date = Query(..., description="First day (inclusive)"),
+    end_date: date = Query(..., description="Last day (inclusive)"),
+    period: str = Query("day", description="day, week (starting Monday) or range"),
+    user_id: Optional[str] = Query(None, description="Limit to one user (default: yourself unless you manage timesheets)"),
+    project_id: Optional[str] = Query(None, description="Limit to one project"),
+    current_user: User = Depends(get_current_user)
+):
+    """Timesheet: logged minutes per period, user and project (from the daily rollups)"""
+    _validate_report_range(start_date, end_date)
+    if period not in ROLLUP_PERIODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"period must be one of {', '.join(ROLLUP_PERIODS)}"
+        )
+    if _role_value(current_user) not in TIMESHEET_REPORT_ROLES:
+        if user_id and user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only view your own timesheet"
+            )
+        user_id = current_user.id
+    try:
+        rows = await asyncio.to_thread(
+            time_tracking_service.get_rollups, start_date, end_date, period, user_id, project_id
+        )
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "period": period,
+            "total_minutes": sum(int(row.get("minutes") or 0) for row in rows),
+            "rows": rows,
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch timesheet: {str(e)}"
+        )
+
+
+@router.get("/time-logs/utilization")
+async def get_time_log_utilization(
+    start_date: date = Query(..., description="First day (inclusive)"),
+    end_date: date = Query(..., description="Last day (inclusive)"),
+    project_id: Optional[str] = Query(None, description="Limit to one project"),
+    current_user: User = Depends(get_current_user)
+):
+    """Utilization across projects: logged time vs capacity per employee, per project totals"""
+    _validate_report_range(start_date, end_date)
+    if _role_value(current_user) not in TIMESHEET_REPORT_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to view the utilization report"
+        )
+    try:
+        return await asyncio.to_thread(time_tracking_service.get_utilization, start_date, end_date, project_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to build utilization report: {str(e)}"
+        )
+
 # ==================== Task Participants ====================
 
 @router.get("/{task_id}/participants", response_model=List[TaskParticipant])
@@ -3858,7 +4007,8 @@ async def upload_task_attachment(
             file=file,
             folder_path=folder_path,
             generate_unique_name=False,
-            custom_filename=storage_filename
+            custom_filename=storage_filename,
+            generate_variants=True
         )
         stored_path = file_result.get("path")
         stored_filename = storage_filename
@@ -3894,6 +4044,10 @@ async def upload_task_attachment(
         if checklist_item_id:
             attachment_data["checklist_item_id"] = checklist_item_id
         
+        # Thumbnail/medium URLs for images (generated in background)
+        if file_result.get("variants"):
+            attachment_data["variants"] = file_result["variants"]
+        
         result = supabase.table("task_attachments").insert(attachment_data).execute()
         
         return {
@@ -3904,7 +4058,9 @@ async def upload_task_attachment(
             "file_type": file_result["content_type"],
             "file_size": file_result["size"],
             "uploaded_by_name": current_user.full_name,
-            "created_at": attachment_data["created_at"]
+            "created_at": attachment_data["created_at"],
+            "variants": file_result.get("variants"),
+            "variants_pending": file_result.get("variants_pending", False)
         }
     except HTTPException:
         raise
@@ -0,0 +1,36 @@
+"""
+Backfill (or check) the project labor cost rollups
+Usage: python backend/scripts/backfill_labor_cost_rollups.py [--check]
+
+Rebuilds project_labor_cost_rollups from all time entries and finished task
+time logs, filling in the hourly cost of older logs. With --check only reports
+how many rollup rows differ and exits with status 1 if any do.
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.labor_cost_service import labor_cost_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Only report mismatched rollup rows")
+    args = parser.parse_args()
+
+    report = labor_cost_service.check_rollups(repair=not args.check)
+    if not report["rollup_rows_mismatched"]:
+        print("✅ Labor cost rollups are consistent")
+        return 0
+
+    action = "Rebuilt" if report["repaired"] else "Found"
+    print(f"⚠️  {action} {report['rollup_rows_mismatched']} mismatched labor cost rollup rows")
+    return 0 if report["repaired"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+API load benchmark against an in-memory Supabase stand-in
+
+Seeds a deterministic, realistically sized data set (benchmarks/seed.py) into
+the fake Supabase client (benchmarks/fake_supabase.py), starts the real app
+in-process and drives the hot endpoints (login, dashboard, quotes, task board,
+chat scroll, notification inbox, ...) over ASGI. Every fake query sleeps for
+--db-latency-ms, so N+1 patterns cost what they cost against a remote PostgREST.
+No network, no Supabase project, no credentials needed.
+
+Usage (from backend/):
+    python scripts/benchmark_api.py [--scale 1.0] [--requests 200] [--concurrency 8]
+                                    [--db-latency-ms 1.0] [--scenario tasks --scenario chat]
+                                    [--json results.json] [--baseline baseline.json]
+
+With --baseline, exits with status 1 when a scenario's p95 grows by more than
+--max-regression, its queries per request grow, or it starts failing.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import runner
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.scenarios import select
+from benchmarks.seed import seed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="Seed volume multiplier (1.0 = ~10k tasks, 30k messages)")
+    parser.add_argument("--requests", type=int, default=200, help="Recorded requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=3, help="Unrecorded requests per scenario")
+    parser.add_argument("--db-latency-ms", type=float, default=1.0, help="Simulated PostgREST round-trip per query")
+    parser.add_argument("--scenario", action="append", help="Scenario name or group (repeatable, default: all)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Previous --json output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed p95 growth vs baseline (0.25 = 25%%)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's logging output")
+    args = parser.parse_args()
+
+    runner.prepare_environment()
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    scenarios = select(args.scenario)
+    fake = FakeSupabase(latency_ms=args.db_latency_ms)
+    started = time.perf_counter()
+    handles = seed(fake, scale=args.scale)
+    rows = sum(handles["row_counts"].values())
+    print(f"Seeded {rows} rows in {len(handles['row_counts'])} tables ({time.perf_counter() - started:.1f}s)")
+
+    results = asyncio.run(runner.run(fake, scenarios, handles, args.requests, args.concurrency, args.warmup))
+    summaries = [result.summary() for result in results]
+    print(f"\n{args.requests} requests/scenario, concurrency {args.concurrency}, db latency {args.db_latency_ms} ms\n")
+    print(runner.format_report(summaries))
+
+    for result in results:
+        for sample in result.error_samples:
+            print(f"  {result.name}: {sample}")
+
+    if args.json:
+        settings = {key: getattr(args, key) for key in ("scale", "requests", "concurrency", "db_latency_ms")}
+        with open(args.json, "w") as f:
+            f.write(runner.to_json(summaries, settings))
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = runner.compare(summaries, baseline, args.max_regression)
+        if problems:
+            print("\nRegressions vs baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("\nNo regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
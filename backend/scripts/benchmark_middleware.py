@@ -0,0 +1,247 @@
+"""
+Micro-benchmark: BaseHTTPMiddleware chain vs. pure-ASGI middleware pipeline
+
+Builds two minimal apps with the same routes (/health and a typical JSON list
+route) - one with the previous BaseHTTPMiddleware stack, one with
+middleware.pipeline.MiddlewarePipeline - and drives them in-process through the
+ASGI interface (no network, no database), reporting requests/sec and latency.
+
+Usage (from backend/):
+    python scripts/benchmark_middleware.py [--requests 5000] [--concurrency 32] [--rate-limit]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import traceback
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request, status
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, RedirectResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware.pipeline import MiddlewarePipeline
+from middleware.rate_limit import rate_limiter, get_rate_limit_config, match_rule, resolve_identity, resolve_role
+
+ENVIRONMENT = "development"
+CORS_OPTIONS = dict(
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
+    allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After"],
+    max_age=3600,
+)
+
+# Payload shaped like a typical list endpoint (50 rows)
+ITEMS = [
+    {
+        "id": str(uuid.UUID(int=i)),
+        "name": f"Item {i}",
+        "status": "active",
+        "amount": i * 1000.5,
+        "created_at": "2024-01-01T00:00:00Z",
+    }
+    for i in range(50)
+]
+
+
+def add_routes(app: FastAPI):
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "service": "financial-management-api", "version": "1.0.0"}
+
+    @app.get("/api/items")
+    async def items():
+        return ITEMS
+
+
+# --- Previous BaseHTTPMiddleware stack (reference for the "before" numbers) ---
+
+class LegacyHTTPSRedirect(BaseHTTPMiddleware):
+    def __init__(self, app, environment: str = "development"):
+        super().__init__(app)
+        self.environment = environment
+
+    async def dispatch(self, request: Request, call_next):
+        if self.environment != "production":
+            return await call_next(request)
+        if request.url.scheme == "http":
+            return RedirectResponse(url=str(request.url.replace(scheme="https")), status_code=308)
+        return await call_next(request)
+
+
+class LegacySecurityHeaders(BaseHTTPMiddleware):
+    def __init__(self, app, environment: str = "development"):
+        super().__init__(app)
+        self.environment = environment
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        if self.environment == "production":
+            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        return response
+
+
+class LegacyRequestID(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+class LegacyErrorHandler(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except Exception as e:
+            traceback.print_exc()
+            return JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={"detail": "Internal server error. Please try again later.", "error_type": type(e).__name__, "message": str(e)}
+            )
+
+
+class LegacyRateLimit(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        config = get_rate_limit_config()
+        if not config["enabled"] or request.url.path in ["/", "/health", "/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        identifier, user_id = resolve_identity(request.scope)
+        role = await resolve_role(config, user_id)
+        bucket, max_requests, window_seconds = match_rule(config, request.url.path, request.method, role)
+        decision = await rate_limiter.hit(identifier, max_requests, window_seconds, bucket)
+        if not decision.allowed:
+            return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers={"Access-Control-Allow-Origin": "*", "Access-Control-Allow-Credentials": "true"})
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(decision.limit)
+        response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+        return response
+
+
+def build_legacy_app() -> FastAPI:
+    app = FastAPI()
+    add_routes(app)
+    app.add_middleware(LegacyHTTPSRedirect, environment=ENVIRONMENT)
+    app.add_middleware(LegacySecurityHeaders, environment=ENVIRONMENT)
+    app.add_middleware(CORSMiddleware, **CORS_OPTIONS)
+    app.add_middleware(LegacyRequestID)
+    app.add_middleware(LegacyErrorHandler)
+    app.add_middleware(LegacyRateLimit)
+    return app
+
+
+def build_pipeline_app() -> FastAPI:
+    app = FastAPI()
+    add_routes(app)
+    app.add_middleware(MiddlewarePipeline, environment=ENVIRONMENT, cors_options=CORS_OPTIONS)
+    return app
+
+
+# --- In-process ASGI driver ---
+
+async def call(app, path: str) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"origin", b"http://localhost:3000")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80),
+    }
+    sent = False
+    status_code = None
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Like a server: the client "disconnects" once the response is complete
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_complete.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    if status_code != 200:
+        raise RuntimeError(f"{path} returned {status_code}")
+    return elapsed
+
+
+async def run(app, path: str, total: int, concurrency: int) -> dict:
+    # Warm up (route compilation, lazy imports)
+    for _ in range(50):
+        await call(app, path)
+
+    latencies = []
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            latencies.append(await call(app, path))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate-limit", action="store_true", help="Exercise the rate limiter (very high limit)")
+    args = parser.parse_args()
+
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if args.rate_limit else "false"
+    os.environ["RATE_LIMIT_MAX_REQUESTS"] = str(10 ** 9)
+
+    apps = {"BaseHTTPMiddleware": build_legacy_app(), "pure ASGI": build_pipeline_app()}
+    print(f"{args.requests} requests, concurrency {args.concurrency}, rate limit {'on' if args.rate_limit else 'off'}\n")
+    print(f"{'route':<12} {'stack':<20} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for path in ("/health", "/api/items"):
+        results = {}
+        for name, app in apps.items():
+            rate_limiter.backend.clear()
+            results[name] = await run(app, path, args.requests, args.concurrency)
+            r = results[name]
+            print(f"{path:<12} {name:<20} {r['rps']:>10.0f} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f}")
+        speedup = results["pure ASGI"]["rps"] / results["BaseHTTPMiddleware"]["rps"]
+        print(f"{'':<12} {'speedup':<20} {speedup:>9.2f}x\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Password hashing benchmark: event-loop latency under concurrent logins
+
+Simulates N concurrent logins (bcrypt verify) while a probe coroutine measures
+how late the event loop wakes it up, once with bcrypt called inline (the old
+behaviour) and once through services/password_hasher.py. Exits with status 1
+when the pooled mode exceeds LOOP_LAG_BUDGET_MS.
+
+Usage (from backend/):
+    python scripts/benchmark_password_hashing.py [--logins 20] [--rounds 12]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.password_hasher import PasswordHasher, hash_password_sync, verify_password_sync
+
+# Worst event-loop wake-up delay tolerated while logins are being verified
+LOOP_LAG_BUDGET_MS = 50
+PROBE_INTERVAL_SECONDS = 0.005
+
+
+async def _probe(lags: list, done: asyncio.Event):
+    """Record how late each short sleep returns (= time the loop was blocked)"""
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL_SECONDS) * 1000)
+
+
+async def _run(mode: str, logins: int, hashed: str, hasher: PasswordHasher) -> dict:
+    lags: list = []
+    done = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, done))
+    await asyncio.sleep(0.05)
+
+    async def login():
+        if mode == "inline":
+            # What an async route calling bcrypt directly does
+            return verify_password_sync("correct horse", hashed)
+        return await hasher.verify("correct horse", hashed)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe
+    assert all(results)
+    return {
+        "mode": mode,
+        "total_s": elapsed,
+        "max_lag_ms": max(lags) if lags else 0.0,
+        "p95_lag_ms": statistics.quantiles(lags, n=20)[-1] if len(lags) >= 20 else max(lags or [0.0]),
+    }
+
+
+async def main_async(args) -> int:
+    hashed = hash_password_sync("correct horse", rounds=args.rounds)
+    hasher = PasswordHasher()
+    print(f"{args.logins} concurrent logins, bcrypt cost {args.rounds}, pool of {hasher.workers} threads\n")
+    print(f"{'mode':<8} {'total (s)':>10} {'max loop lag (ms)':>18} {'p95 lag (ms)':>13}")
+    pooled = None
+    for mode in ("inline", "pool"):
+        result = await _run(mode, args.logins, hashed, hasher)
+        print(f"{result['mode']:<8} {result['total_s']:>10.2f} {result['max_lag_ms']:>18.1f} {result['p95_lag_ms']:>13.1f}")
+        if mode == "pool":
+            pooled = result
+    hasher.shutdown()
+
+    if pooled["max_lag_ms"] > LOOP_LAG_BUDGET_MS:
+        print(f"\n❌ Pooled max loop lag {pooled['max_lag_ms']:.1f} ms exceeds budget {LOOP_LAG_BUDGET_MS} ms")
+        return 1
+    print(f"\n✅ Pooled max loop lag within budget ({LOOP_LAG_BUDGET_MS} ms)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-loop latency during concurrent bcrypt verification")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12)
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
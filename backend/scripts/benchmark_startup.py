@@ -0,0 +1,107 @@
+"""
+Startup benchmark: import time of main.py against a tracked budget
+
+Runs `python -X importtime -c "import main"` in fresh interpreters, reports the
+slowest imports and the cumulative time of `main`, then times the background
+import of the deferred routers. Exits with status 1 when a budget is exceeded,
+so it can run in CI after dependency or router changes.
+
+Usage (from backend/, with the usual environment variables set):
+    python scripts/benchmark_startup.py [--runs 5] [--top 20]
+
+Update STARTUP_BUDGET_MS deliberately when a slower import is accepted.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets in milliseconds (median over runs)
+STARTUP_BUDGET_MS = {
+    # `import main`: everything needed before /health and /api/auth can answer
+    "main_import": 1500,
+    # Background import + include of all deferred routers
+    "deferred_routers": 6000,
+}
+
+_DEFERRED_PROBE = """
+import json, time
+import main
+start = time.perf_counter()
+for module_name in main.router_loader.deferred_modules:
+    __import__("routers." + module_name)
+print(json.dumps({"deferred_routers": (time.perf_counter() - start) * 1000}))
+"""
+
+
+def _run(args, extra_env=None) -> subprocess.CompletedProcess:
+    env = dict(os.environ, **(extra_env or {}))
+    result = subprocess.run([sys.executable, *args], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-3000:], file=sys.stderr)
+        raise SystemExit(f"Command failed: {' '.join(args)}")
+    return result
+
+
+def parse_importtime(stderr: str) -> dict:
+    """{module: (self_us, cumulative_us)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_import(runs: int):
+    totals = []
+    modules = {}
+    for _ in range(runs):
+        result = _run(["-X", "importtime", "-c", "import main"], {"LAZY_ROUTERS": "true"})
+        modules = parse_importtime(result.stderr)
+        totals.append(modules["main"][1] / 1000)
+    return statistics.median(totals), modules
+
+
+def measure_deferred(runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        result = _run(["-c", _DEFERRED_PROBE], {"LAZY_ROUTERS": "true"})
+        timings.append(json.loads(result.stdout.strip().splitlines()[-1])["deferred_routers"])
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules to list (by self time)")
+    args = parser.parse_args()
+
+    main_ms, modules = measure_import(args.runs)
+    print("Slowest imports on the startup path (self time, last run):")
+    print(f"{'self ms':>9} {'cumul. ms':>10}  module")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}  {name}")
+
+    heavy = [name for name in ("pandas", "openpyxl", "supabase", "requests") if name in modules]
+    print(f"\nHeavy modules imported at startup: {', '.join(heavy) if heavy else 'none'}")
+
+    results = {"main_import": main_ms, "deferred_routers": measure_deferred(args.runs)}
+    print(f"\n{'metric':<20} {'median ms':>10} {'budget ms':>10}")
+    over_budget = False
+    for metric, value in results.items():
+        budget = STARTUP_BUDGET_MS[metric]
+        flag = "" if value <= budget else "  OVER BUDGET"
+        over_budget = over_budget or value > budget
+        print(f"{metric:<20} {value:>10.0f} {budget:>10}{flag}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Query-count regression guard for the hot API routes
+
+Runs the 20 most-used routes (benchmarks/query_budgets.py) against the
+in-memory Supabase stand-in on two seed sizes and checks the PostgREST queries
+each request makes: over its budget, or growing with the amount of data (a
+query per task/comment/conversation), fails the run with exit status 1. Routes
+marked expected_failure are listed with their tracking note instead, and fail
+the run once they meet their budget. No network, no Supabase project, no
+credentials needed.
+
+Usage (from backend/):
+    python scripts/check_query_budgets.py [--verbose]
+
+Budgets are target ceilings: fix the route (or mark it expected_failure),
+do not raise its budget.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.query_budgets import BUDGETS, check
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="Print the query breakdown of every route")
+    args = parser.parse_args()
+
+    failures, expected, measurements = check()
+    small, large = measurements.values()
+    print(f"{'route':<30}{'small':>7}{'large':>7}{'budget':>8}")
+    for budget in BUDGETS:
+        before, after = small[budget.name], large[budget.name]
+        print(f"{budget.name:<30}{before['queries']:>7}{after['queries']:>7}{budget.max_queries:>8}")
+        if args.verbose:
+            for key, count in sorted(after["breakdown"].items(), key=lambda item: -item[1]):
+                print(f"    {count:>4}x {key}")
+
+    if expected:
+        print("\nExpected failures (tracked):")
+        for line in expected:
+            print(f"  {line}")
+    if failures:
+        print("\nQuery budget failures:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    if expected:
+        print(f"\nNo new query budget failures ({len(expected)} expected failures tracked)")
+    else:
+        print("\nAll routes within their query budgets")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Check (and repair) the counter columns on tasks
+Usage: python backend/scripts/repair_task_counters.py [--repair] [--limit 1000]
+
+Without --repair only reports tasks whose comment/attachment/assignee/checklist
+counters differ from the real counts. Exits with status 1 if any were found and
+not repaired.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.task_counter_service import task_counter_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repair", action="store_true", help="Write the real counts to the mismatched tasks")
+    parser.add_argument("--limit", type=int, default=1000, help="Maximum tasks to report/repair")
+    args = parser.parse_args()
+
+    report = task_counter_service.check_counters(repair=args.repair, limit=args.limit)
+    if not report["mismatched"]:
+        print("✅ All task counters are consistent")
+        return 0
+
+    action = "Repaired" if report["repaired"] else "Found"
+    print(f"⚠️  {action} {report['mismatched']} tasks with mismatched counters")
+    for sample in report["samples"]:
+        print(json.dumps(sample, ensure_ascii=False))
+    return 0 if report["repaired"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Custom Product Catalog
+Versioned in-memory snapshot of the custom-product catalog (categories, columns,
+options, structures). Name generation and the configurator read from the snapshot
+instead of querying per column; the custom-products write endpoints call
+invalidate(), and the TTL bounds staleness for writes made by other workers.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+CUSTOM_PRODUCT_CATALOG_TTL_SECONDS = int(os.getenv("CUSTOM_PRODUCT_CATALOG_TTL_SECONDS", "300"))
+# Rows per request when loading a table (PostgREST caps responses at max-rows)
+CATALOG_PAGE_SIZE = 1000
+
+CATALOG_TABLES = {
+    "categories": "custom_product_categories",
+    "columns": "custom_product_columns",
+    "options": "custom_product_options",
+    "structures": "custom_product_structures",
+}
+
+
+def _ordered(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return sorted(rows, key=lambda row: row.get("order_index") or 0)
+
+
+@dataclass
+class CatalogSnapshot:
+    """Read-only view of the catalog; rows are shared between requests, do not modify them"""
+    version: int
+    loaded_at: float
+    # id -> row, including inactive rows (old products still reference them)
+    categories: Dict[str, Dict[str, Any]]
+    columns: Dict[str, Dict[str, Any]]
+    options: Dict[str, Dict[str, Any]]
+    structures: Dict[str, Dict[str, Any]]
+    # Active rows, ordered by order_index
+    columns_by_category: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    options_by_column: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    default_structures: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, version: int, tables: Dict[str, List[Dict[str, Any]]]) -> "CatalogSnapshot":
+        snapshot = cls(
+            version=version,
+            loaded_at=time.monotonic(),
+            **{name: {row["id"]: row for row in tables[name]} for name in CATALOG_TABLES},
+        )
+        for column in _ordered(tables["columns"]):
+            if column.get("is_active"):
+                snapshot.columns_by_category.setdefault(column["category_id"], []).append(column)
+        for option in _ordered(tables["options"]):
+            if option.get("is_active"):
+                snapshot.options_by_column.setdefault(option["column_id"], []).append(option)
+        for structure in sorted(tables["structures"], key=lambda row: row.get("created_at") or ""):
+            if structure.get("is_default"):
+                # The write endpoints keep one default per category; if several exist the newest wins
+                snapshot.default_structures[structure["category_id"]] = structure
+        return snapshot
+
+    def structure_for(self, category_id: str, structure_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if structure_id:
+            return self.structures.get(structure_id)
+        return self.default_structures.get(category_id)
+
+    def generate_name(
+        self,
+        category_id: str,
+        selected_options: Dict[str, str],
+        structure_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Assemble a product name from column_id -> option_id
+
+        Raises:
+            LookupError: no structure for the category
+        """
+        structure = self.structure_for(category_id, structure_id)
+        if not structure:
+            raise LookupError("No structure found for category")
+        separator = structure.get("separator") or " "
+
+        option_details = []
+        generated_parts = []
+        for column_id in structure.get("column_order") or []:
+            option_id = selected_options.get(column_id)
+            column = self.columns.get(column_id)
+            option = self.options.get(option_id) if option_id else None
+            if not column or not option:
+                continue
+            category = self.categories.get(column["category_id"])
+            category_name = category["name"] if category else "Unknown"
+            part_detail = {
+                "option_name": option["name"],
+                "column_name": column["name"],
+                "category_name": category_name,
+                "full_text": f"{option['name']} ({category_name})",
+            }
+            option_details.append(part_detail)
+            generated_parts.append(part_detail["full_text"])
+
+        return {
+            "generated_name": separator.join(generated_parts),
+            "option_details": option_details,
+            "separator": separator,
+            "generated_parts": generated_parts,
+        }
+
+    def dashboard_data(self) -> Dict[str, Any]:
+        """Active categories/structures/columns/options in the dashboard's display order"""
+        categories = [row for row in self.categories.values() if row.get("is_active")]
+        structures = [row for row in self.structures.values() if row.get("is_active")]
+        return {
+            "version": self.version,
+            "categories": list(reversed(_ordered(categories))),
+            "structures": sorted(structures, key=lambda row: row.get("created_at") or "", reverse=True),
+            "columns_by_category": {
+                category_id: list(reversed(columns)) for category_id, columns in self.columns_by_category.items()
+            },
+            "options_by_column": {
+                column_id: list(reversed(options)) for column_id, options in self.options_by_column.items()
+            },
+        }
+
+
+class CustomProductCatalog:
+    """Loads and caches the catalog snapshot (one load at a time)"""
+
+    def __init__(self, ttl_seconds: int = CUSTOM_PRODUCT_CATALOG_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _fresh(self) -> Optional[CatalogSnapshot]:
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot and time.monotonic() - snapshot.loaded_at <= self.ttl_seconds:
+                return snapshot
+            return None
+
+    def get(self) -> CatalogSnapshot:
+        """Current snapshot, loading it if missing or expired (blocking)"""
+        snapshot = self._fresh()
+        if snapshot:
+            return snapshot
+        with self._load_lock:
+            # Another thread may have loaded it while we waited
+            snapshot = self._fresh()
+            if snapshot:
+                return snapshot
+            with self._lock:
+                generation = self._generation
+            tables = {name: self._load_table(table) for name, table in CATALOG_TABLES.items()}
+            snapshot = CatalogSnapshot.build(next(self._versions), tables)
+            with self._lock:
+                # Don't keep a snapshot that an invalidate() raced with
+                if generation == self._generation:
+                    self._snapshot = snapshot
+            logger.info(
+                f"Custom product catalog v{snapshot.version} loaded: {len(snapshot.categories)} categories, "
+                f"{len(snapshot.columns)} columns, {len(snapshot.options)} options, {len(snapshot.structures)} structures"
+            )
+            return snapshot
+
+    def _load_table(self, table: str) -> List[Dict[str, Any]]:
+        supabase = get_supabase_client()
+        rows: List[Dict[str, Any]] = []
+        while True:
+            page = (
+                supabase.table(table)
+                .select("*")
+                .order("id")
+                .range(len(rows), len(rows) + CATALOG_PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            rows.extend(page)
+            if len(page) < CATALOG_PAGE_SIZE:
+                return rows
+
+    def invalidate(self):
+        """Drop the snapshot after catalog writes"""
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+
+# Global instance
+custom_product_catalog = CustomProductCatalog()
@@ -0,0 +1,249 @@
+"""
+Email Outbox Service
+Durable email queue: API requests write to the email_outbox table and return,
+a background worker delivers the messages with retry, backoff and dead-lettering
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Messages claimed per worker round
+OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+# Idle poll interval; new messages wake the worker immediately
+OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "30"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+# Retry delay: base * 2^(attempt-1), capped
+OUTBOX_BACKOFF_BASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_BASE_SECONDS", "30"))
+OUTBOX_BACKOFF_MAX_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+# Rows stuck in 'sending' longer than this (worker crashed) are claimed again
+OUTBOX_STALE_LOCK_SECONDS = 600
+
+# Concurrent sends per provider. SMTP sessions are reused per executor thread,
+# so a low limit keeps bulk sends on the same authenticated connections.
+PROVIDER_CONCURRENCY = {
+    "smtp": int(os.getenv("EMAIL_SMTP_CONCURRENCY", "2")),
+    "resend": int(os.getenv("EMAIL_RESEND_CONCURRENCY", "5")),
+    "n8n": int(os.getenv("EMAIL_N8N_CONCURRENCY", "5")),
+}
+
+
+class EmailOutboxService:
+    """Queue emails in email_outbox and deliver them from a background worker"""
+
+    # email_type -> EmailService coroutine called with the stored payload as kwargs
+    HANDLERS = {
+        "notification": "send_notification_email",
+        "quote": "send_quote_email",
+        "quote_approved": "send_quote_approved_notification_email",
+        "password_change": "send_password_change_confirmation",
+    }
+
+    def __init__(self):
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Direct sends used when the outbox table is unavailable
+        self._fallback_tasks: Set[asyncio.Task] = set()
+
+    async def enqueue(self, email_type: str, to_email: str, payload: Dict[str, Any],
+                      email_log_id: Optional[str] = None) -> bool:
+        """Queue one email. payload holds the keyword arguments of the EmailService method;
+        email_log_id (optional) is an email_logs row the worker marks sent or failed"""
+        message = {"email_type": email_type, "to_email": to_email, "payload": payload}
+        if email_log_id:
+            message["email_log_id"] = email_log_id
+        return await self.enqueue_many([message]) == 1
+
+    async def enqueue_many(self, messages: List[Dict[str, Any]]) -> int:
+        """Queue several emails with one insert
+
+        Args:
+            messages: [{"email_type": str, "to_email": str, "payload": dict,
+                        "email_log_id": str (optional)}, ...]
+
+        Returns:
+            Number of messages accepted
+        """
+        if not messages:
+            return 0
+        for message in messages:
+            if message["email_type"] not in self.HANDLERS:
+                raise ValueError(f"Unknown email type: {message['email_type']}")
+
+        now = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for message in messages:
+            row = {
+                "email_type": message["email_type"],
+                "to_email": message["to_email"],
+                "payload": jsonable_encoder(message["payload"]),
+                "status": "pending",
+                "attempts": 0,
+                "max_attempts": OUTBOX_MAX_ATTEMPTS,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            if message.get("email_log_id"):
+                row["email_log_id"] = message["email_log_id"]
+            rows.append(row)
+        try:
+            supabase = get_supabase_client()
+            result = await asyncio.to_thread(supabase.table("email_outbox").insert(rows).execute)
+            self._wake()
+            return len(result.data or [])
+        except Exception as e:
+            # Outbox unavailable (e.g. migration not applied): send directly in background
+            logger.error(f"Failed to queue {len(rows)} email(s), sending directly: {e}")
+            for row in rows:
+                task = asyncio.create_task(self._deliver_direct(row))
+                self._fallback_tasks.add(task)
+                task.add_done_callback(self._fallback_tasks.discard)
+            return len(rows)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(PROVIDER_CONCURRENCY.get(provider, 2))
+        return self._semaphores[provider]
+
+    async def run_worker(self):
+        """Drain the outbox until cancelled"""
+        self._wakeup = asyncio.Event()
+        logger.info("Email outbox worker started")
+        while True:
+            try:
+                processed = await self.process_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {e}")
+                processed = 0
+
+            if processed >= OUTBOX_BATCH_SIZE:
+                continue  # More messages are probably due
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process_due(self) -> int:
+        """Claim and deliver one batch of due messages
+
+        Returns:
+            Number of messages processed
+        """
+        supabase = get_supabase_client()
+        now = datetime.now(timezone.utc)
+        stale = (now - timedelta(seconds=OUTBOX_STALE_LOCK_SECONDS)).isoformat()
+        claimable = f"and(status.eq.pending,next_attempt_at.lte.{now.isoformat()}),and(status.eq.sending,locked_at.lt.{stale})"
+
+        due_result = await asyncio.to_thread(
+            supabase.table("email_outbox")
+            .select("id")
+            .or_(claimable)
+            .order("next_attempt_at")
+            .limit(OUTBOX_BATCH_SIZE)
+            .execute
+        )
+        ids = [row["id"] for row in due_result.data or []]
+        if not ids:
+            return 0
+
+        # Claim: the filter is re-checked by the UPDATE, so concurrent workers
+        # never get the same row
+        claimed_result = await asyncio.to_thread(
+            supabase.table("email_outbox")
+            .update({"status": "sending", "locked_at": now.isoformat()})
+            .in_("id", ids)
+            .or_(claimable)
+            .execute
+        )
+        claimed = claimed_result.data or []
+        await asyncio.gather(*[self._process(row) for row in claimed])
+        return len(claimed)
+
+    async def _process(self, row: Dict[str, Any]):
+        from services.email_service import email_service
+
+        error = None
+        async with self._semaphore(email_service.email_provider):
+            try:
+                if not await self._deliver(row["email_type"], row.get("payload") or {}):
+                    error = f"{email_service.email_provider} provider reported failure"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+
+        attempts = (row.get("attempts") or 0) + 1
+        now = datetime.now(timezone.utc)
+        if error is None:
+            update = {"status": "sent", "attempts": attempts, "sent_at": now.isoformat(), "last_error": None}
+        elif attempts >= (row.get("max_attempts") or OUTBOX_MAX_ATTEMPTS):
+            # Dead letter: kept for inspection, never retried automatically
+            update = {"status": "dead", "attempts": attempts, "last_error": error}
+            logger.error(f"Email {row['id']} to {row.get('to_email')} dead-lettered after {attempts} attempts: {error}")
+        else:
+            delay = min(OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), OUTBOX_BACKOFF_MAX_SECONDS)
+            update = {
+                "status": "pending",
+                "attempts": attempts,
+                "last_error": error,
+                "next_attempt_at": (now + timedelta(seconds=delay)).isoformat(),
+            }
+            logger.warning(f"Email {row['id']} attempt {attempts} failed, retrying in {delay}s: {error}")
+
+        update["provider"] = email_service.email_provider
+        update["locked_at"] = None
+        try:
+            supabase = get_supabase_client()
+            await asyncio.to_thread(supabase.table("email_outbox").update(update).eq("id", row["id"]).execute)
+        except Exception as e:
+            logger.error(f"Failed to update email outbox row {row['id']}: {e}")
+        if update["status"] in ("sent", "dead"):
+            await self._update_email_log(row.get("email_log_id"), error if update["status"] == "dead" else None)
+
+    async def _deliver_direct(self, row: Dict[str, Any]):
+        """Fallback send without the outbox (single attempt)"""
+        error = None
+        try:
+            if not await self._deliver(row["email_type"], row["payload"]):
+                error = "provider reported failure"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Direct email to {row.get('to_email')} failed: {error}")
+        await self._update_email_log(row.get("email_log_id"), error)
+
+    async def _update_email_log(self, email_log_id: Optional[str], error: Optional[str]):
+        """Mark the email_logs row of a delivered (error None) or abandoned message"""
+        if not email_log_id:
+            return
+        if error is None:
+            update = {"status": "sent", "sent_at": datetime.now(timezone.utc).isoformat(), "error_message": None}
+        else:
+            update = {"status": "failed", "error_message": error}
+        try:
+            supabase = get_supabase_client()
+            await asyncio.to_thread(supabase.table("email_logs").update(update).eq("id", email_log_id).execute)
+        except Exception as e:
+            logger.error(f"Failed to update email log {email_log_id}: {e}")
+
+    async def _deliver(self, email_type: str, payload: Dict[str, Any]) -> bool:
+        from services.email_service import email_service
+
+        handler = getattr(email_service, self.HANDLERS[email_type])
+        return bool(await handler(**payload))
+
+
+# Global instance
+email_outbox_service = EmailOutboxService()
@@ -5,10 +5,9 @@ Email service for sending quotes and invoices to customers
 import smtplib
 import os
 import base64
-import io
 import asyncio
 import json
-import requests
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -20,6 +19,100 @@ from decimal import Decimal, InvalidOperation
 # Lazy import to avoid initialization issues during testing
 # from services.supabase_client import get_supabase_client
 from config import settings
+from services.quote_render_service import quote_render_service, html_to_pdf_bytes, resize_image
+
+
+def _format_currency(amount):
+    return f"{amount:,.0f} VND"
+
+
+def _format_dimension(val):
+    if val is None or val == '':
+        return ''
+    try:
+        decimal_val = Decimal(str(val))
+    except (InvalidOperation, ValueError):
+        try:
+            decimal_val = Decimal(float(val))
+        except Exception:
+            return str(val) if val else ''
+    if decimal_val == 0:
+        return ''
+    # Round to 2 decimal places for area display
+    rounded = round(float(decimal_val), 2)
+    # Format with 2 decimal places, remove trailing zeros
+    formatted = f"{rounded:.2f}".rstrip('0').rstrip('.')
+    return formatted
+
+
+# Convert number to Vietnamese words (simplified)
+def _number_to_words(num):
+    if num == 0:
+        return "Không"
+    return f"{num:,.0f}"
+
+
+# Static fragments of the quote template, built once at import
+_QUOTE_ITEMS_TABLE_OPEN = """
+                <div style="margin: 20px 0;">
+                    <table style="width: 100%; border-collapse: collapse; border: 1px solid #000;">
+                        <thead>
+                            <tr style="background: #1e40af; color: #fff;">
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">STT</th>
+                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;">HẠNG MỤC</th>
+                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;">MÔ TẢ CHI TIẾT</th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">ĐVT</th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;" colspan="2">QUY CÁCH</th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">DIỆN TÍCH (m²)</th>
+                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;">ĐƠN GIÁ</th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">VAT (%)</th>
+                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;">THÀNH TIỀN</th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">HÌNH ẢNH</th>
+                            </tr>
+                            <tr style="background: #1e40af; color: #fff;">
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">NGANG (mm)</th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">CAO (mm)</th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;"></th>
+                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                """
+
+_QUOTE_ITEMS_TABLE_CLOSE = """
+                        </tbody>
+                    </table>
+                </div>
+                """
+
+_DEFAULT_PAYMENT_TERMS = [
+    'CỌC ĐỢT 1 : LÊN THIẾT KẾ 3D',
+    'CỌC ĐỢT 2: 50% KÍ HỢP ĐỒNG, RA ĐƠN SẢN XUẤT',
+    'CÒN LẠI : KHI BÀN GIAO VÀ KIỂM TRA NGHIỆM THU CÔNG TRÌNH'
+]
+_DEFAULT_PAYMENT_TERMS_HTML = ''.join(f"""
+                                <tr style="background: #ffd700;">
+                                    <td style="padding: 10px; border: 1px solid #000; font-weight:bold; color:#000000;">{description}</td>
+                                    <td style="padding: 10px; text-align: right; border: 1px solid #000; color:#000000;"></td>
+                                    <td style="padding: 10px; text-align: center; border: 1px solid #000; color:#000000;"></td>
+                                </tr>
+                                """ for description in _DEFAULT_PAYMENT_TERMS)
+
+_DEFAULT_NOTES_HTML = """
+                    <p style="margin:5px 0;">• Nếu phụ kiện, thiết bị của khách hàng mà CTy lắp sẽ tính công 200k/1 bộ</p>
+                    <p style="margin:5px 0;">• Giá đã bao gồm nhân công lắp đặt trọn gói trong khu vực TPHCM</p>
+                    <p style="margin:5px 0;">• Giá chưa bao gồm Thuế GTGT 10%</p>
+                    <p style="margin:5px 0;">• Thời gian lắp đặt từ 7 - 9 ngày, không tính chủ nhật hoặc ngày Lễ</p>
+                    <p style="margin:5px 0;">• Bản vẽ 3D mang tính chất minh họa (giống thực tế 80% - 90%)</p>
+                    <p style="margin:5px 0;">• Khách hàng sẽ kiểm tra lại thông tin sau khi lắp đặt hoàn thiện và bàn giao</p>"""
+
 
 class EmailService:
     def __init__(self):
@@ -48,11 +141,13 @@ class EmailService:
 
         # Debug flag to control verbose logging
         self.debug = os.getenv("EMAIL_DEBUG", "0") == "1"
-        # Thread pool executor for running blocking SMTP operations
-        self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="email_smtp")
-        # Resolve logo path robustly
-        from utils.file_utils import get_company_logo_path
-        self.logo_path = get_company_logo_path()
+        # Executor, HTTP session and logo path are created on first use so importing
+        # the service (auth router, startup) stays cheap
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._http_session = None
+        self._logo_path: Optional[str] = None
+        # One persistent SMTP session per executor thread (smtplib connections are not thread-safe)
+        self._smtp_local = threading.local()
 
         # Log email provider being used
         if self.debug:
@@ -65,14 +160,73 @@ class EmailService:
                 print(f"   n8n Webhook ID: {'SET' if self.n8n_webhook_id else 'NOT SET'}")
                 print(f"   n8n API Key: {'SET' if self.n8n_api_key else 'NOT SET'}")
 
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool executor for running blocking SMTP operations"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="email_smtp")
+        return self._executor
+
+    @property
+    def http_session(self):
+        """Shared HTTP session: keeps TLS connections to Resend/n8n alive between sends"""
+        if self._http_session is None:
+            import requests
+            self._http_session = requests.Session()
+        return self._http_session
+
+    @property
+    def logo_path(self) -> str:
+        """Company logo path, resolved robustly on first use"""
+        if self._logo_path is None:
+            from utils.file_utils import get_company_logo_path
+            self._logo_path = get_company_logo_path()
+        return self._logo_path
+
+    def _get_smtp_connection(self) -> smtplib.SMTP:
+        """Return this thread's authenticated SMTP session, reconnecting if it was dropped"""
+        server = getattr(self._smtp_local, "server", None)
+        if server is not None:
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp_connection()
+
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.smtp_timeout)
+        server.starttls()
+        server.login(self.smtp_username, self.smtp_password)
+        self._smtp_local.server = server
+        return server
+
+    def _close_smtp_connection(self):
+        """Close this thread's SMTP session (if any)"""
+        server = getattr(self._smtp_local, "server", None)
+        self._smtp_local.server = None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
     def _send_smtp_sync(self, msg: MIMEMultipart, to_email: str) -> bool:
-        """Synchronous SMTP send operation (runs in thread pool)"""
+        """Synchronous SMTP send operation (runs in thread pool)
+
+        Reuses the thread's SMTP session so bulk sends do STARTTLS/login once.
+        """
         try:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.smtp_timeout) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
-            return True
+            for attempt in range(2):
+                server = self._get_smtp_connection()
+                try:
+                    server.send_message(msg)
+                    return True
+                except smtplib.SMTPServerDisconnected:
+                    # Session expired between noop and send: reconnect once
+                    self._close_smtp_connection()
+                    if attempt:
+                        raise
+            return False
         except smtplib.SMTPAuthenticationError as e:
             print(f"SMTP Authentication Error: {e}")
             print(f"   SMTP Server: {self.smtp_server}:{self.smtp_port}")
@@ -91,6 +245,7 @@ class EmailService:
 
     async def _send_via_n8n(self, to_email: str, subject: str, html_content: str, text_content: str, email_type: str = "general", attachments: Optional[List[Dict]] = None, metadata: Optional[Dict[str, Any]] = None) -> bool:
         """Send email via n8n webhook (HTTP) - For n8n automation workflows"""
+        import requests
         try:
             if not self.n8n_webhook_url:
                 print("N8N_WEBHOOK_URL not set. Please set it in environment variables.")
@@ -126,7 +281,7 @@ class EmailService:
             loop = asyncio.get_event_loop()
             response = await loop.run_in_executor(
                 self.executor,
-                lambda: requests.post(self.n8n_webhook_url, headers=headers, json=payload, timeout=30)
+                lambda: self.http_session.post(self.n8n_webhook_url, headers=headers, json=payload, timeout=30)
             )
 
             if response.status_code in [200, 201]:
@@ -158,6 +313,7 @@ class EmailService:
 
     async def _send_via_resend(self, to_email: str, subject: str, html_content: str, text_content: str, attachments: Optional[List[Dict]] = None) -> bool:
         """Send email via Resend API (HTTP) - Recommended for Render"""
+        import requests
         try:
             if not self.resend_api_key:
                 print("ERROR: RESEND_API_KEY not set. Please set it in Render environment variables.")
@@ -200,7 +356,7 @@ class EmailService:
             loop = asyncio.get_event_loop()
             response = await loop.run_in_executor(
                 self.executor,
-                lambda: requests.post(self.resend_api_url, headers=headers, json=payload, timeout=30)
+                lambda: self.http_session.post(self.resend_api_url, headers=headers, json=payload, timeout=30)
             )
 
             if response.status_code == 200:
@@ -228,76 +384,31 @@ class EmailService:
 
     def _resize_image(self, image_data: bytes, max_width: int = 300, max_height: int = 100) -> bytes:
         """Resize image if too large. Returns resized image bytes or original if resize fails."""
-        try:
-            from PIL import Image
-            img = Image.open(io.BytesIO(image_data))
-
-            # Get original dimensions
-            width, height = img.size
-
-            # Resize if too large
-            if width > max_width or height > max_height:
-                # Calculate new dimensions maintaining aspect ratio
-                ratio = min(max_width / width, max_height / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-
-                # Resize image
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-                # Convert back to bytes
-                output = io.BytesIO()
-                # Preserve format if possible, otherwise use JPEG
-                if img.format and img.format in ['PNG', 'JPEG', 'JPG']:
-                    img.save(output, format=img.format, quality=90, optimize=True)
-                else:
-                    img.save(output, format='JPEG', quality=90, optimize=True)
-                return output.getvalue()
-
-            return image_data
-        except Exception as e:
-            # If resize fails, return original
-            print(f"Warning: Failed to resize image: {e}")
-            return image_data
+        return resize_image(image_data, max_width, max_height)
 
     def _attach_company_logo(self, msg: MIMEMultipart) -> str | None:
         """Attach company logo inline and return its content-id.
         Returns 'company_logo' if attached successfully, otherwise None.
         """
         try:
-            if os.path.exists(self.logo_path):
-                with open(self.logo_path, 'rb') as f:
-                    img_data = f.read()
-                    # Resize if too large (max 300x100 for email)
-                    img_data = self._resize_image(img_data, max_width=300, max_height=100)
-                    img = MIMEImage(img_data)
-                    img.add_header('Content-ID', '<company_logo>')
-                    img.add_header('Content-Disposition', 'inline', filename='logo_phucdat.jpg')
-                    msg.attach(img)
-                    return 'company_logo'
+            # Decoded and resized once, then served from the asset cache (max 300x100 for email)
+            img_data = quote_render_service.logo_bytes(logo_path=self.logo_path)
+            if img_data:
+                img = MIMEImage(img_data)
+                img.add_header('Content-ID', '<company_logo>')
+                img.add_header('Content-Disposition', 'inline', filename='logo_phucdat.jpg')
+                msg.attach(img)
+                return 'company_logo'
             return None
         except Exception:
             return None
 
     def _html_to_pdf_bytes(self, html: str) -> bytes | None:
-        """Best-effort HTML→PDF conversion. Tries WeasyPrint, then xhtml2pdf. Returns None if unavailable."""
-        # Try WeasyPrint
-        try:
-            from weasyprint import HTML  # type: ignore
-            pdf_bytes = HTML(string=html).write_pdf()
-            return pdf_bytes
-        except Exception:
-            pass
-        # Try xhtml2pdf
-        try:
-            from xhtml2pdf import pisa  # type: ignore
-            import io
-            src = io.StringIO(html)
-            out = io.BytesIO()
-            pisa.CreatePDF(src, dest=out)  # returns pisaStatus, but we can ignore
-            return out.getvalue()
-        except Exception:
-            return None
+        """Best-effort HTML→PDF conversion. Tries WeasyPrint, then xhtml2pdf. Returns None if unavailable.
+
+        Blocking; async callers use quote_render_service.render_pdf() instead.
+        """
+        return html_to_pdf_bytes(html)
 
     def _format_additional_notes(self, additional_notes: str) -> str:
         """Format additional notes as bullet points (same style as GHI CHÚ)"""
@@ -318,49 +429,29 @@ class EmailService:
         return bullet_points
 
     def generate_quote_email_html(self, quote_data: Dict[str, Any], customer_name: str, employee_name: str = None, employee_phone: str = None, quote_items: list = None, custom_payment_terms: list = None, additional_notes: str = None, company_info: Dict[str, Any] = None, bank_info: Dict[str, Any] = None, default_notes: list = None, logo_src: str = None) -> str:
-        """Generate HTML content for quote email (for preview or sending)"""
-        # Format currency
-        def format_currency(amount):
-            return f"{amount:,.0f} VND"
+        """Generate HTML content for quote email (for preview or sending)
 
+        Rendered HTML is cached by a hash of the template version and all inputs, so
+        repeated previews of an unchanged quote are served from memory.
+        """
+        key = quote_render_service.render_key(
+            quote_data, customer_name, employee_name, employee_phone, quote_items,
+            custom_payment_terms, additional_notes, company_info, bank_info, default_notes, logo_src
+        )
+        return quote_render_service.render_html(key, lambda: self._build_quote_email_html(
+            quote_data, customer_name, employee_name, employee_phone, quote_items,
+            custom_payment_terms, additional_notes, company_info, bank_info, default_notes, logo_src
+        ))
+
+    def _build_quote_email_html(self, quote_data: Dict[str, Any], customer_name: str, employee_name: str = None, employee_phone: str = None, quote_items: list = None, custom_payment_terms: list = None, additional_notes: str = None, company_info: Dict[str, Any] = None, bank_info: Dict[str, Any] = None, default_notes: list = None, logo_src: str = None) -> str:
+        """Build the quote email HTML (uncached)"""
         # Format additional notes before using in f-string
         additional_notes_html = self._format_additional_notes(additional_notes) if additional_notes else ''
 
         # Create simple HTML email body with quote details
         quote_items_html = ""
         if quote_items:
-            quote_items_html = """
-                <div style="margin: 20px 0;">
-                    <table style="width: 100%; border-collapse: collapse; border: 1px solid #000;">
-                        <thead>
-                            <tr style="background: #1e40af; color: #fff;">
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">STT</th>
-                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;">HẠNG MỤC</th>
-                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;">MÔ TẢ CHI TIẾT</th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">ĐVT</th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;" colspan="2">QUY CÁCH</th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">DIỆN TÍCH (m²)</th>
-                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;">ĐƠN GIÁ</th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">VAT (%)</th>
-                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;">THÀNH TIỀN</th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">HÌNH ẢNH</th>
-                            </tr>
-                            <tr style="background: #1e40af; color: #fff;">
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: left; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">NGANG (mm)</th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;">CAO (mm)</th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold;"></th>
-                                <th style="padding: 8px; text-align: center; border: 1px solid #000; font-weight: bold;"></th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                """
+            quote_items_html = _QUOTE_ITEMS_TABLE_OPEN
 
             for idx, item in enumerate(quote_items, 1):
                 # Category name is now expected to be pre-populated in item['category_name']
@@ -370,25 +461,6 @@ class EmailService:
                 depth = item.get('depth') or ''
                 height = item.get('height') or ''
 
-                # Format dimensions
-                def format_dimension(val):
-                    if val is None or val == '':
-                        return ''
-                    try:
-                        decimal_val = Decimal(str(val))
-                    except (InvalidOperation, ValueError):
-                        try:
-                            decimal_val = Decimal(float(val))
-                        except Exception:
-                            return str(val) if val else ''
-                    if decimal_val == 0:
-                        return ''
-                    # Round to 2 decimal places for area display
-                    rounded = round(float(decimal_val), 2)
-                    # Format with 2 decimal places, remove trailing zeros
-                    formatted = f"{rounded:.2f}".rstrip('0').rstrip('.')
-                    return formatted
-
                 quantity_display = item.get('quantity', 0)
                 if item.get('area'):
                     quantity_display = item.get('area')
@@ -420,7 +492,7 @@ class EmailService:
                     # Calculate: total_price × (1 + VAT%)
                     # This gives us: (Đơn giá × Số lượng × Diện tích) × (1 + VAT%)
                     total_price_after_tax = total_price_before_tax * (1 + vat_rate / 100)
-                    total_price_display = format_currency(total_price_after_tax)
+                    total_price_display = _format_currency(total_price_after_tax)
                     # Debug log (only if debug is enabled)
                     if self.debug:
                         unit_price = item.get('unit_price', 0)
@@ -455,21 +527,17 @@ class EmailService:
                                 {f"<div style='font-size:12px;color:#000000;margin-top:4px;'>{item.get('description','')}</div>" if (item.get('description')) else ''}
                             </td>
                             <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{item.get('unit', '')}</td>
-                            <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{format_dimension(length)}</td>
-                            <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{format_dimension(height)}</td>
-                            <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{format_dimension(quantity_display)}</td>
-                            <td style=\"padding: 8px; text-align: right; border: 1px solid #000; color:#000000;\">{format_currency(item.get('unit_price', 0))}</td>
+                            <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{_format_dimension(length)}</td>
+                            <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{_format_dimension(height)}</td>
+                            <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{_format_dimension(quantity_display)}</td>
+                            <td style=\"padding: 8px; text-align: right; border: 1px solid #000; color:#000000;\">{_format_currency(item.get('unit_price', 0))}</td>
                             <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000;\">{vat_display}</td>
                             <td style=\"padding: 8px; text-align: right; border: 1px solid #000; font-weight: bold; color:#000000;\">{total_price_display}</td>
                             <td style=\"padding: 8px; text-align: center; border: 1px solid #000; color:#000000; vertical-align: middle;\">{product_image_html if product_image_html else '—'}</td>
                         </tr>
                 """
 
-            quote_items_html += """
-                        </tbody>
-                    </table>
-                </div>
-                """
+            quote_items_html += _QUOTE_ITEMS_TABLE_CLOSE
 
         # Calculate total product amount (sum of all items with tax included)
         total_product_amount = 0
@@ -496,12 +564,6 @@ class EmailService:
         total_amount = quote_data.get('total_amount', total_product_amount)
         discount_amount = quote_data.get('discount_amount', 0)
 
-        # Function to convert number to Vietnamese words (simplified)
-        def number_to_words(num):
-            if num == 0:
-                return "Không"
-            return f"{num:,.0f}"
-
         # Generate payment terms HTML - Always show payment terms section
         payment_terms_html = ""
         if custom_payment_terms and isinstance(custom_payment_terms, list) and len(custom_payment_terms) > 0:
@@ -520,20 +582,7 @@ class EmailService:
 
         # Always show default payment terms if custom_payment_terms is empty or None
         if not payment_terms_html:
-            # Default payment terms
-            default_terms = [
-                {'description': 'CỌC ĐỢT 1 : LÊN THIẾT KẾ 3D', 'amount': '', 'received': False},
-                {'description': 'CỌC ĐỢT 2: 50% KÍ HỢP ĐỒNG, RA ĐƠN SẢN XUẤT', 'amount': '', 'received': False},
-                {'description': 'CÒN LẠI : KHI BÀN GIAO VÀ KIỂM TRA NGHIỆM THU CÔNG TRÌNH', 'amount': '', 'received': False}
-            ]
-            for term in default_terms:
-                payment_terms_html += f"""
-                                <tr style="background: #ffd700;">
-                                    <td style="padding: 10px; border: 1px solid #000; font-weight:bold; color:#000000;">{term['description']}</td>
-                                    <td style="padding: 10px; text-align: right; border: 1px solid #000; color:#000000;"></td>
-                                    <td style="padding: 10px; text-align: center; border: 1px solid #000; color:#000000;"></td>
-                                </tr>
-                                """
+            payment_terms_html = _DEFAULT_PAYMENT_TERMS_HTML
 
         # Get company info from customization or use defaults
         company_name_display = (company_info.get("company_name") if company_info else None) or "Công Ty TNHH Nhôm Kính Phúc Đạt"
@@ -638,18 +687,18 @@ class EmailService:
             <table style="width: 100%; border-collapse: collapse; margin-top: 10px;">
                 <tr style="background: #ffd700;">
                     <td colspan="11" style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;">TỔNG HẠNG MỤC</td>
-                    <td style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;\">""" + format_currency(total_product_amount) + """</td>
+                    <td style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;\">""" + _format_currency(total_product_amount) + """</td>
                 </tr>""")
 
         if discount_amount > 0:
             html_parts.append(f"""
                 <tr style="background: #add8e6;">
                     <td colspan="11" style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;">CHIẾT KHẤU {quote_data.get("discount_percentage", 0)}% KHÁCH THANH TOÁN TIỀN MẶT</td>
-                    <td style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;">-{format_currency(discount_amount)}</td>
+                    <td style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;">-{_format_currency(discount_amount)}</td>
                 </tr>
                 <tr style="background: #ffd700;">
                     <td colspan="11" style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;">TỔNG HẠNG MỤC</td>
-                    <td style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;\">""" + format_currency(total_amount) + """</td>
+                    <td style="padding: 10px; text-align: right; font-weight: bold; border: 1px solid #000; color:#000000;\">""" + _format_currency(total_amount) + """</td>
                 </tr>""")
 
         html_parts.append("""
@@ -658,7 +707,7 @@ class EmailService:
             <!-- Giá thành tạm tính -->
             <div style="margin: 20px 0; padding: 10px; background: #f9f9f9; border: 1px solid #000;">
                 <div style="font-size:14px; font-weight:bold; color:#000000;">
-                    Giá thành tạm tính : """ + number_to_words(total_product_amount) + """ đồng.
+                    Giá thành tạm tính : """ + _number_to_words(total_product_amount) + """ đồng.
                 </div>
             </div>
 
@@ -690,13 +739,7 @@ class EmailService:
         if default_notes:
             html_parts.append(self._format_default_notes(default_notes))
         else:
-            html_parts.append("""
-                    <p style="margin:5px 0;">• Nếu phụ kiện, thiết bị của khách hàng mà CTy lắp sẽ tính công 200k/1 bộ</p>
-                    <p style="margin:5px 0;">• Giá đã bao gồm nhân công lắp đặt trọn gói trong khu vực TPHCM</p>
-                    <p style="margin:5px 0;">• Giá chưa bao gồm Thuế GTGT 10%</p>
-                    <p style="margin:5px 0;">• Thời gian lắp đặt từ 7 - 9 ngày, không tính chủ nhật hoặc ngày Lễ</p>
-                    <p style="margin:5px 0;">• Bản vẽ 3D mang tính chất minh họa (giống thực tế 80% - 90%)</p>
-                    <p style="margin:5px 0;">• Khách hàng sẽ kiểm tra lại thông tin sau khi lắp đặt hoàn thiện và bàn giao</p>""")
+            html_parts.append(_DEFAULT_NOTES_HTML)
 
         if additional_notes_html:
             html_parts.append(additional_notes_html)
@@ -715,8 +758,6 @@ class EmailService:
 
         return ''.join(html_parts)
 
-        return html_body
-
     async def send_quote_email(self, quote_data: Dict[str, Any], customer_email: str, customer_name: str, quote_items: list = None, custom_payment_terms: list = None, additional_notes: str = None, prepared_html: str | None = None, company_info: Dict[str, Any] = None, bank_info: Dict[str, Any] = None, default_notes: list = None, attachments: list = None) -> bool:
         """Send quote email to customer"""
         try:
@@ -956,7 +997,7 @@ class EmailService:
 
                 # Try to add PDF version if available
                 try:
-                    pdf_bytes = self._html_to_pdf_bytes(html_body)
+                    pdf_bytes = await quote_render_service.render_pdf(html_body)
                     if pdf_bytes:
                         pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
                         n8n_attachments.append({
@@ -1003,11 +1044,7 @@ class EmailService:
                     else:
                         # Try to get default logo from file
                         try:
-                            if os.path.exists(self.logo_path):
-                                with open(self.logo_path, 'rb') as f:
-                                    img_data = f.read()
-                                    img_data = self._resize_image(img_data, max_width=300, max_height=100)
-                                    logo_base64 = base64.b64encode(img_data).decode('utf-8')
+                            logo_base64 = quote_render_service.logo_base64(self.logo_path)
                         except Exception as e:
                             print(f"WARNING: Failed to load default logo for Resend: {e}")
 
@@ -1038,7 +1075,7 @@ class EmailService:
 
                 # Try to add PDF version if available
                 try:
-                    pdf_bytes = self._html_to_pdf_bytes(html_body)
+                    pdf_bytes = await quote_render_service.render_pdf(html_body)
                     if pdf_bytes:
                         pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
                         resend_attachments.append({
@@ -1126,16 +1163,8 @@ class EmailService:
                 if company_info and company_info.get("company_logo_base64"):
                     # Attach base64 logo (resized)
                     try:
-                        # Extract base64 data (remove data:image/...;base64, prefix if present)
-                        base64_data = company_info.get("company_logo_base64")
-                        if ',' in base64_data:
-                            base64_data = base64_data.split(',', 1)[1]
-
-                        # Decode base64 to bytes
-                        img_bytes = base64.b64decode(base64_data)
-
-                        # Resize if too large
-                        img_bytes = self._resize_image(img_bytes, max_width=300, max_height=100)
+                        # Decode (data:image/...;base64, prefix allowed) and resize, cached per logo
+                        img_bytes = quote_render_service.logo_bytes(logo_base64=company_info.get("company_logo_base64"))
 
                         # Attach as inline image
                         img = MIMEImage(img_bytes)
@@ -1187,7 +1216,7 @@ class EmailService:
 
             # Try attach PDF version of the quote
             try:
-                pdf_bytes = self._html_to_pdf_bytes(html_body)
+                pdf_bytes = await quote_render_service.render_pdf(html_body)
                 if pdf_bytes:
                     pdf_part = MIMEApplication(pdf_bytes, _subtype='pdf')
                     pdf_part.add_header('Content-Disposition', 'attachment', filename=f"Bao-gia-{quote_data.get('quote_number','')}.pdf")
@@ -1729,11 +1758,16 @@ Nếu bạn không thực hiện thay đổi này, hãy đặt lại mật khẩ
             msg.attach(alt)
             self._attach_company_logo(msg)
 
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            # Send email on the pooled SMTP session (in thread pool)
+            loop = asyncio.get_event_loop()
+            success = await loop.run_in_executor(
+                self.executor,
+                self._send_smtp_sync,
+                msg,
+                employee_email
+            )
+            if not success:
+                return False
 
             print(f"Quote approved notification email sent successfully to {employee_email}")
             return True
@@ -0,0 +1,428 @@
+"""
+Employee Onboarding Service
+Bulk employee import (Excel): all emails are validated with a few .in_() queries,
+employee codes are allocated as one block, auth users are created with bounded
+concurrency and users/employees rows are inserted in batches. Each row's status is
+recorded in employee_import_rows, so a failed import can be resumed with its job id.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from services.name_directory import name_directory
+from services.password_hasher import password_hasher
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Concurrent supabase.auth.admin.create_user calls
+EMPLOYEE_IMPORT_AUTH_CONCURRENCY = int(os.getenv("EMPLOYEE_IMPORT_AUTH_CONCURRENCY", "8"))
+# Rows per users/employees insert
+EMPLOYEE_IMPORT_BATCH_SIZE = int(os.getenv("EMPLOYEE_IMPORT_BATCH_SIZE", "100"))
+# Emails per .in_() lookup (keeps the query string well under URL limits)
+EMAIL_LOOKUP_CHUNK = 200
+# Employee codes are EMP + yyyymm + 4 digits
+EMPLOYEE_CODE_MIN = 1000
+EMPLOYEE_CODE_MAX = 9999
+
+ROW_PENDING = "pending"
+ROW_AUTH_CREATED = "auth_created"
+ROW_DONE = "done"
+ROW_ERROR = "error"
+
+
+@dataclass
+class OnboardingRow:
+    """One Excel row; rows that failed parsing arrive with status='error'"""
+    row_number: int
+    email: str
+    first_name: str = ""
+    last_name: str = ""
+    phone: Optional[str] = None
+    department_id: Optional[str] = None
+    position_id: Optional[str] = None
+    hire_date: Optional[str] = None
+    salary: Optional[float] = None
+    role: str = "employee"
+    password: str = ""
+    status: str = ROW_PENDING
+    error: Optional[str] = None
+    user_id: Optional[str] = None
+    employee_id: Optional[str] = None
+    employee_code: Optional[str] = None
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+    def fail(self, message: str):
+        # Rows that already own an auth user stay resumable
+        self.status = ROW_AUTH_CREATED if self.user_id else ROW_ERROR
+        self.error = message
+
+
+def _chunks(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class EmployeeOnboardingService:
+    """Batched employee import with per-row status"""
+
+    async def run(
+        self,
+        rows: List[OnboardingRow],
+        created_by: str,
+        file_name: Optional[str] = None,
+        job_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Import rows; pass job_id to resume a previous import of the same file
+
+        Raises:
+            LookupError: job_id does not exist
+        """
+        supabase = get_supabase_client()
+        if job_id:
+            skipped = await self._resume(supabase, job_id, rows)
+        else:
+            job_id = await self._start_job(supabase, file_name, len(rows), created_by)
+            skipped = 0
+
+        active = [row for row in rows if row.status == ROW_PENDING]
+        await self._validate_emails(supabase, active)
+        active = [row for row in rows if row.status == ROW_PENDING]
+        await self._allocate_codes(supabase, active)
+        active = [row for row in rows if row.status == ROW_PENDING]
+
+        await self._create_auth_users(supabase, active)
+        # Checkpoint: auth users exist now, a crash after this point resumes from here
+        await self._save_rows(supabase, job_id, rows)
+
+        ready = [row for row in rows if row.status == ROW_AUTH_CREATED and row.error is None]
+        success = await self._insert_records(supabase, ready, created_by)
+
+        await self._save_rows(supabase, job_id, rows)
+        failed = [row for row in rows if row.status != ROW_DONE]
+        await self._finish_job(supabase, job_id, rows, failed)
+
+        return {
+            "job_id": job_id,
+            "success_count": success,
+            "skipped_count": skipped,
+            "error_count": len(failed),
+            "errors": [f"Dòng {row.row_number}: {row.error}" for row in failed],
+            "rows": [
+                {
+                    "row_number": row.row_number,
+                    "email": row.email,
+                    "status": row.status,
+                    "employee_code": row.employee_code,
+                    "error": row.error,
+                }
+                for row in rows
+            ],
+        }
+
+    # ---------------------------------------------------------------- jobs
+
+    async def _start_job(self, supabase, file_name: Optional[str], total: int, created_by: str) -> Optional[str]:
+        job_id = str(uuid.uuid4())
+        try:
+            await asyncio.to_thread(
+                supabase.table("employee_import_jobs").insert({
+                    "id": job_id,
+                    "file_name": file_name,
+                    "status": "running",
+                    "total_rows": total,
+                    "created_by": created_by,
+                }).execute
+            )
+            return job_id
+        except Exception as e:
+            # Job tables unavailable (migration not applied): import without resume support
+            logger.error(f"Failed to create employee import job: {e}")
+            return None
+
+    async def _resume(self, supabase, job_id: str, rows: List[OnboardingRow]) -> int:
+        """Apply stored row states; returns the number of rows already done"""
+        job = await asyncio.to_thread(
+            supabase.table("employee_import_jobs").select("id").eq("id", job_id).execute
+        )
+        if not job.data:
+            raise LookupError(f"Employee import job {job_id} not found")
+        stored = await asyncio.to_thread(
+            supabase.table("employee_import_rows")
+            .select("row_number, email, status, user_id, employee_id, employee_code")
+            .eq("job_id", job_id)
+            .execute
+        )
+        states = {state["row_number"]: state for state in stored.data or []}
+
+        skipped = 0
+        for row in rows:
+            state = states.get(row.row_number)
+            # Only trust the stored state if the file still has the same person on that row
+            if row.status != ROW_PENDING or not state or state.get("email") != row.email:
+                continue
+            if state["status"] == ROW_DONE:
+                row.status = ROW_DONE
+                row.user_id = state.get("user_id")
+                row.employee_id = state.get("employee_id")
+                row.employee_code = state.get("employee_code")
+                skipped += 1
+            elif state.get("user_id"):
+                row.user_id = state["user_id"]
+                row.employee_id = state.get("employee_id")
+                row.employee_code = state.get("employee_code")
+        await asyncio.to_thread(
+            supabase.table("employee_import_jobs")
+            .update({"status": "running", "updated_at": datetime.now(timezone.utc).isoformat()})
+            .eq("id", job_id)
+            .execute
+        )
+        return skipped
+
+    async def _save_rows(self, supabase, job_id: Optional[str], rows: List[OnboardingRow]):
+        if not job_id:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        records = [
+            {
+                "job_id": job_id,
+                "row_number": row.row_number,
+                "email": row.email,
+                "status": row.status,
+                "user_id": row.user_id,
+                "employee_id": row.employee_id,
+                "employee_code": row.employee_code,
+                "error": row.error,
+                "updated_at": now,
+            }
+            for row in rows
+        ]
+        try:
+            for chunk in _chunks(records, 500):
+                await asyncio.to_thread(
+                    supabase.table("employee_import_rows")
+                    .upsert(chunk, on_conflict="job_id,row_number", returning="minimal")
+                    .execute
+                )
+        except Exception as e:
+            logger.error(f"Failed to save employee import job {job_id} row states: {e}")
+
+    async def _finish_job(self, supabase, job_id: Optional[str], rows: List[OnboardingRow], failed: List[OnboardingRow]):
+        if not job_id:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            await asyncio.to_thread(
+                supabase.table("employee_import_jobs").update({
+                    "status": "completed_with_errors" if failed else "completed",
+                    "total_rows": len(rows),
+                    "success_count": len(rows) - len(failed),
+                    "error_count": len(failed),
+                    "updated_at": now,
+                    "completed_at": now,
+                }).eq("id", job_id).execute
+            )
+        except Exception as e:
+            logger.error(f"Failed to finish employee import job {job_id}: {e}")
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job summary with per-row status (blocking)"""
+        supabase = get_supabase_client()
+        job = supabase.table("employee_import_jobs").select("*").eq("id", job_id).execute()
+        if not job.data:
+            return None
+        rows = (
+            supabase.table("employee_import_rows")
+            .select("row_number, email, status, employee_code, error, updated_at")
+            .eq("job_id", job_id)
+            .order("row_number")
+            .execute()
+        )
+        return {**job.data[0], "rows": rows.data or []}
+
+    # -------------------------------------------------------------- phases
+
+    async def _validate_emails(self, supabase, rows: List[OnboardingRow]):
+        """Duplicates within the file and against users/employees, one query per chunk"""
+        seen: Dict[str, OnboardingRow] = {}
+        for row in rows:
+            if row.email in seen:
+                row.fail(f"Email {row.email} trùng với dòng {seen[row.email].row_number}")
+            else:
+                seen[row.email] = row
+        if not seen:
+            return
+
+        emails = list(seen)
+        for chunk in _chunks(emails, EMAIL_LOOKUP_CHUNK):
+            users, employees = await asyncio.gather(
+                asyncio.to_thread(supabase.table("users").select("id, email").in_("email", chunk).execute),
+                asyncio.to_thread(supabase.table("employees").select("id, email").in_("email", chunk).execute),
+            )
+            for existing in users.data or []:
+                row = seen.get((existing.get("email") or "").lower())
+                # A resumed row may already have its users record
+                if row and existing["id"] != row.user_id:
+                    row.fail(f"Email {row.email} đã tồn tại")
+            for existing in employees.data or []:
+                row = seen.get((existing.get("email") or "").lower())
+                if row and existing["id"] != row.employee_id:
+                    row.fail(f"Email {row.email} đã tồn tại")
+
+    async def _allocate_codes(self, supabase, rows: List[OnboardingRow]):
+        """Give every row without a code one from a single block for this month"""
+        needing = [row for row in rows if not row.employee_code]
+        if not needing:
+            return
+        prefix = f"EMP{datetime.now().strftime('%Y%m')}"
+        existing = await asyncio.to_thread(
+            supabase.table("employees")
+            .select("employee_code")
+            .like("employee_code", f"{prefix}%")
+            .execute
+        )
+        used = set()
+        for record in existing.data or []:
+            suffix = (record.get("employee_code") or "")[len(prefix):]
+            if suffix.isdigit():
+                used.add(int(suffix))
+
+        # Continue after the highest code in use, then fill gaps from the bottom
+        start = max(used) + 1 if used else EMPLOYEE_CODE_MIN
+        numbers = (
+            number
+            for number in list(range(start, EMPLOYEE_CODE_MAX + 1)) + list(range(EMPLOYEE_CODE_MIN, start))
+            if number not in used
+        )
+        for row in needing:
+            number = next(numbers, None)
+            if number is None:
+                row.fail("Hết mã nhân viên cho tháng này")
+                continue
+            row.employee_code = f"{prefix}{number}"
+
+    async def _create_auth_users(self, supabase, rows: List[OnboardingRow]):
+        semaphore = asyncio.Semaphore(EMPLOYEE_IMPORT_AUTH_CONCURRENCY)
+
+        async def create(row: OnboardingRow):
+            async with semaphore:
+                try:
+                    response = await asyncio.to_thread(supabase.auth.admin.create_user, {
+                        "email": row.email,
+                        "password": row.password,
+                        "email_confirm": True,
+                        "user_metadata": {"full_name": row.full_name, "role": row.role},
+                    })
+                except Exception as e:
+                    row.fail(str(e))
+                    return
+            if not response.user:
+                row.fail("Không tạo được tài khoản")
+                return
+            row.user_id = response.user.id
+            row.status = ROW_AUTH_CREATED
+
+        await asyncio.gather(*(create(row) for row in rows if not row.user_id))
+        for row in rows:
+            if row.user_id and row.status == ROW_PENDING:
+                # Resumed row: auth user was created by the previous run
+                row.status = ROW_AUTH_CREATED
+
+    async def _insert_records(self, supabase, rows: List[OnboardingRow], created_by: str) -> int:
+        """Insert users then employees in batches; returns rows completed"""
+        if not rows:
+            return 0
+        hashes = await password_hasher.hash_many([row.password for row in rows])
+        now = datetime.now(timezone.utc).isoformat()
+        for row in rows:
+            row.employee_id = row.employee_id or str(uuid.uuid4())
+
+        user_records = {
+            row.row_number: {
+                "id": row.user_id,
+                "email": row.email,
+                "full_name": row.full_name,
+                "role": row.role,
+                "password_hash": password_hash,
+                "is_active": True,
+                "created_by": created_by,
+                "updated_by": created_by,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row, password_hash in zip(rows, hashes)
+        }
+        employee_records = {
+            row.row_number: {
+                "id": row.employee_id,
+                "user_id": row.user_id,
+                "employee_code": row.employee_code,
+                "first_name": row.first_name,
+                "last_name": row.last_name,
+                "email": row.email,
+                "phone": row.phone,
+                "department_id": row.department_id,
+                "position_id": row.position_id,
+                "hire_date": row.hire_date,
+                "salary": row.salary,
+                "status": "active",
+                "created_by": created_by,
+                "updated_by": created_by,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for row in rows
+        }
+
+        success = 0
+        for batch in _chunks(rows, EMPLOYEE_IMPORT_BATCH_SIZE):
+            # Upserts keyed by id, so a resumed row whose records exist succeeds again
+            inserted = await self._upsert_batch(supabase, "users", batch, user_records)
+            inserted = await self._upsert_batch(supabase, "employees", inserted, employee_records)
+            for row in inserted:
+                row.status = ROW_DONE
+                row.error = None
+            success += len(inserted)
+        # Upserts may rewrite cached users; new employees may belong to users cached without one
+        name_directory.invalidate("users")
+        name_directory.invalidate("employees")
+        return success
+
+    async def _upsert_batch(self, supabase, table: str, rows: List[OnboardingRow], records: Dict[int, Dict[str, Any]]) -> List[OnboardingRow]:
+        """One upsert for the batch; on failure retry row by row to isolate the bad ones"""
+        if not rows:
+            return []
+        try:
+            await asyncio.to_thread(
+                supabase.table(table)
+                .upsert([records[row.row_number] for row in rows], on_conflict="id", returning="minimal")
+                .execute
+            )
+            return rows
+        except Exception as e:
+            logger.warning(f"Employee import: batch upsert into {table} failed, retrying per row: {e}")
+
+        inserted = []
+        for row in rows:
+            try:
+                await asyncio.to_thread(
+                    supabase.table(table)
+                    .upsert(records[row.row_number], on_conflict="id", returning="minimal")
+                    .execute
+                )
+                inserted.append(row)
+            except Exception as e:
+                row.fail(str(e))
+        return inserted
+
+
+# Global instance
+employee_onboarding_service = EmployeeOnboardingService()
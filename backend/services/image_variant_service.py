@@ -0,0 +1,211 @@
+"""
+Image Variant Service
+Generates downscaled WebP variants (thumbnails) for uploaded images off the request path
+"""
+
+import asyncio
+import io
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set
+
+from services.supabase_client import get_supabase_client
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared worker pool for all buckets.
+# Pillow releases the GIL while decoding/resizing so a small thread pool is enough
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_VARIANT_WORKERS", "2")),
+    thread_name_prefix="image_variants"
+)
+# Keep references to running tasks so they are not garbage collected
+_pending_tasks: Set[asyncio.Task] = set()
+# Variant paths remembered as existing / missing (each LRU-bounded)
+VARIANT_CACHE_SIZE = int(os.getenv("IMAGE_VARIANT_CACHE_SIZE", "10000"))
+# A missing variant is looked up in storage again after this many seconds
+VARIANT_MISSING_RECHECK_SECONDS = 30
+
+
+class ImageVariantService:
+    """Service for generating and locating image variants"""
+
+    # Variant name -> longest side in pixels
+    VARIANT_SIZES = {
+        "thumb": 320,
+        "medium": 1280,
+    }
+
+    # Raster formats Pillow can decode; SVG and GIF are served as-is
+    SUPPORTED_TYPES = ['image/jpeg', 'image/jpg', 'image/png', 'image/webp']
+
+    VARIANT_FOLDER = "_variants"
+    VARIANT_CONTENT_TYPE = "image/webp"
+    WEBP_QUALITY = 80
+
+    def __init__(self, bucket_name: str = "minhchung_chiphi"):
+        self.bucket_name = bucket_name
+        # Existence checks served from memory: path -> None (exists), path -> checked at (missing)
+        self._existing: "OrderedDict[str, None]" = OrderedDict()
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def supports(self, content_type: Optional[str]) -> bool:
+        """Whether variants can be generated for this MIME type"""
+        return (content_type or "").lower() in self.SUPPORTED_TYPES
+
+    def variant_path(self, original_path: str, variant: str) -> str:
+        """Storage path of a variant: {folder}/_variants/{name}_{variant}.webp"""
+        folder, _, filename = original_path.rpartition('/')
+        stem = filename.rsplit('.', 1)[0] if '.' in filename else filename
+        variant_name = f"{stem}_{variant}.webp"
+        return f"{folder}/{self.VARIANT_FOLDER}/{variant_name}".strip('/')
+
+    def variant_urls(self, original_path: str) -> Dict[str, str]:
+        """Public URLs of all variants for an original file"""
+        return {
+            variant: self._public_url(self.variant_path(original_path, variant))
+            for variant in self.VARIANT_SIZES
+        }
+
+    def _public_url(self, file_path: str) -> str:
+        return f"{settings.SUPABASE_URL}/storage/v1/object/public/{self.bucket_name}/{file_path}"
+
+    def variant_exists(self, original_path: str, variant: str) -> bool:
+        """Check whether a variant has been generated
+
+        Answered from memory when the variant is known to exist (generated by this
+        worker or seen before) or was missing less than VARIANT_MISSING_RECHECK_SECONDS
+        ago; otherwise one storage list call (blocking).
+        """
+        path = self.variant_path(original_path, variant)
+        with self._cache_lock:
+            if path in self._existing:
+                self._existing.move_to_end(path)
+                return True
+            checked_at = self._missing.get(path)
+            if checked_at is not None and time.monotonic() - checked_at < VARIANT_MISSING_RECHECK_SECONDS:
+                return False
+        folder, _, name = path.rpartition('/')
+        try:
+            supabase = get_supabase_client()
+            entries = supabase.storage.from_(self.bucket_name).list(folder, {"limit": 10, "search": name})
+            exists = any(isinstance(entry, dict) and entry.get("name") == name for entry in entries or [])
+        except Exception as e:
+            logger.warning(f"Could not check variant {path}: {e}")
+            return False
+        if exists:
+            self._mark_existing(path)
+        else:
+            self._mark_missing(path)
+        return exists
+
+    def variants_exist(self, original_path: str) -> bool:
+        """Whether every variant of the original has been generated (blocking)"""
+        return all(self.variant_exists(original_path, variant) for variant in self.VARIANT_SIZES)
+
+    def forget(self, original_path: str):
+        """Drop cached existence of the variants (the original is being deleted)"""
+        with self._cache_lock:
+            for variant in self.VARIANT_SIZES:
+                path = self.variant_path(original_path, variant)
+                self._existing.pop(path, None)
+                self._missing.pop(path, None)
+
+    def _mark_existing(self, path: str):
+        with self._cache_lock:
+            self._missing.pop(path, None)
+            self._existing[path] = None
+            self._existing.move_to_end(path)
+            while len(self._existing) > VARIANT_CACHE_SIZE:
+                self._existing.popitem(last=False)
+
+    def _mark_missing(self, path: str):
+        with self._cache_lock:
+            self._missing[path] = time.monotonic()
+            self._missing.move_to_end(path)
+            while len(self._missing) > VARIANT_CACHE_SIZE:
+                self._missing.popitem(last=False)
+
+    def schedule(self, source_path: str, original_path: str, delete_source: bool = True) -> Dict[str, str]:
+        """Generate variants in the background and return their (future) URLs
+
+        The URLs only resolve once the task has stored the variants: callers report
+        them as pending, and GET /api/uploads/file/{path}?variant= redirects to the
+        original meanwhile.
+
+        Args:
+            source_path: Local file with the original image
+            original_path: Storage path of the original image
+            delete_source: Remove source_path once processing is done
+        """
+        for variant in self.VARIANT_SIZES:
+            self._mark_missing(self.variant_path(original_path, variant))
+        task = asyncio.create_task(self._generate(source_path, original_path, delete_source))
+        _pending_tasks.add(task)
+        task.add_done_callback(_pending_tasks.discard)
+        return self.variant_urls(original_path)
+
+    async def _generate(self, source_path: str, original_path: str, delete_source: bool):
+        try:
+            loop = asyncio.get_running_loop()
+            variants = await loop.run_in_executor(_executor, self._render_variants, source_path)
+            for variant, data in variants.items():
+                path = self.variant_path(original_path, variant)
+                await asyncio.to_thread(self._store_variant, path, data)
+                self._mark_existing(path)
+            logger.info(f"Generated {len(variants)} image variant(s) for {original_path}")
+        except Exception as e:
+            logger.warning(f"Failed to generate image variants for {original_path}: {e}")
+        finally:
+            if delete_source:
+                try:
+                    os.remove(source_path)
+                except OSError:
+                    pass
+
+    def _render_variants(self, source_path: str) -> Dict[str, bytes]:
+        """Decode the image once and encode every size bucket as WebP"""
+        from PIL import Image, ImageOps
+
+        with Image.open(source_path) as img:
+            # Apply EXIF rotation from phone cameras before dropping metadata
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+            variants = {}
+            # Largest first so each smaller bucket is resized from an already reduced image
+            for variant, size in sorted(self.VARIANT_SIZES.items(), key=lambda item: -item[1]):
+                if max(img.size) > size:
+                    img.thumbnail((size, size), Image.Resampling.LANCZOS)
+                output = io.BytesIO()
+                img.save(output, format="WEBP", quality=self.WEBP_QUALITY, method=4)
+                variants[variant] = output.getvalue()
+            return variants
+
+    def _store_variant(self, file_path: str, data: bytes):
+        supabase = get_supabase_client()
+        supabase.storage.from_(self.bucket_name).upload(
+            file_path,
+            data,
+            file_options={
+                "content-type": self.VARIANT_CONTENT_TYPE,
+                "upsert": "true"
+            }
+        )
+
+
+# Global instance
+image_variant_service = ImageVariantService()
+
+def get_image_variant_service(bucket_name: Optional[str] = None) -> ImageVariantService:
+    """Get image variant service instance"""
+    if bucket_name and bucket_name != image_variant_service.bucket_name:
+        return ImageVariantService(bucket_name=bucket_name)
+    return image_variant_service
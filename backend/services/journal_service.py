@@ -15,8 +15,10 @@ from models.journal_entry import (
 class JournalService:
     """Service for managing journal entries"""
     
-    def __init__(self):
-        self.supabase = get_supabase_client()
+    @property
+    def supabase(self):
+        # Resolved per use: constructing the service at import must not create the client
+        return get_supabase_client()
     
     async def create_journal_entry(self, entry_data: JournalEntryCreate, user_id: str) -> JournalEntry:
         """Create a new journal entry with lines"""
@@ -0,0 +1,105 @@
+"""
+Labor Cost Service
+Project labor hours and cost from project_labor_cost_rollups: one row per
+(project, employee, month), kept up to date by database triggers on
+time_entries and task_time_logs (database/migrations/add_labor_cost_rollups.sql).
+Profitability and project reports read these totals instead of every time entry;
+check_rollups() compares them with the raw rows and rebuilds them (backfill).
+"""
+
+import asyncio
+import logging
+import os
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Repair rollups found out of sync by the periodic check (false = only log them)
+LABOR_COST_ROLLUP_AUTO_REPAIR = os.getenv("LABOR_COST_ROLLUP_AUTO_REPAIR", "true").lower() == "true"
+
+
+def empty_labor_totals() -> Dict[str, float]:
+    return {
+        "hours": 0.0,
+        "cost": 0.0,
+        "time_entry_hours": 0.0,
+        "time_entry_cost": 0.0,
+        "task_log_hours": 0.0,
+        "task_log_cost": 0.0,
+    }
+
+
+class LaborCostService:
+    """Labor hours/cost reads over the monthly project rollups"""
+
+    def get_rollups(
+        self,
+        project_ids: Iterable[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """Rollup rows of the projects (blocking)
+
+        Rows are monthly: start_date/end_date select the months they fall in.
+        """
+        project_ids = list(project_ids)
+        if not project_ids:
+            return []
+        supabase = get_supabase_client()
+        query = supabase.table("project_labor_cost_rollups").select(
+            "project_id, employee_id, month, entry_hours, entry_cost, log_hours, log_cost"
+        ).in_("project_id", project_ids)
+        if start_date:
+            query = query.gte("month", start_date.replace(day=1).isoformat())
+        if end_date:
+            query = query.lte("month", end_date.isoformat())
+        return query.execute().data or []
+
+    def get_project_totals(
+        self,
+        project_ids: Iterable[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        """Labor totals per project id; every requested project gets an entry (blocking)"""
+        project_ids = list(project_ids)
+        totals = {project_id: empty_labor_totals() for project_id in project_ids}
+        for row in self.get_rollups(project_ids, start_date, end_date):
+            project_totals = totals.setdefault(row["project_id"], empty_labor_totals())
+            project_totals["time_entry_hours"] += float(row.get("entry_hours") or 0)
+            project_totals["time_entry_cost"] += float(row.get("entry_cost") or 0)
+            project_totals["task_log_hours"] += float(row.get("log_hours") or 0)
+            project_totals["task_log_cost"] += float(row.get("log_cost") or 0)
+        for project_totals in totals.values():
+            project_totals["hours"] = project_totals["time_entry_hours"] + project_totals["task_log_hours"]
+            project_totals["cost"] = project_totals["time_entry_cost"] + project_totals["task_log_cost"]
+        return totals
+
+    def get_project_total(self, project_id: str) -> Dict[str, float]:
+        """Labor totals of one project (blocking)"""
+        return self.get_project_totals([project_id])[project_id]
+
+    def check_rollups(self, repair: bool = False) -> Dict[str, Any]:
+        """Compare rollups with time entries and task logs; repair rebuilds them (blocking)"""
+        supabase = get_supabase_client()
+        result = supabase.rpc("check_labor_cost_rollups", {"p_repair": repair}).execute()
+        row = (result.data or [{}])[0]
+        return {
+            "rollup_rows_mismatched": row.get("rollup_rows_mismatched", 0),
+            "repaired": repair,
+        }
+
+    async def run_periodic_check(self) -> Dict[str, Any]:
+        """Periodic check; logs drift (e.g. logs or tasks edited with the triggers disabled)"""
+        report = await asyncio.to_thread(self.check_rollups, LABOR_COST_ROLLUP_AUTO_REPAIR)
+        if report["rollup_rows_mismatched"]:
+            action = "repaired" if report["repaired"] else "found"
+            logger.warning(f"Labor cost rollups: {action} {report['rollup_rows_mismatched']} rollup rows out of sync")
+        return report
+
+
+# Global instance
+labor_cost_service = LaborCostService()
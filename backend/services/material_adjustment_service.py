@@ -3,14 +3,124 @@ Material Adjustment Service
 Service để tính toán và áp dụng quy tắc điều chỉnh vật tư
 """
 
-from typing import List, Dict, Optional, Any
+import time
+from typing import List, Dict, Optional, Any, Iterable, Tuple
 from services.supabase_client import get_supabase_client
 
+# Thời gian giữ quy tắc trong bộ nhớ (giây). Router material_adjustment_rules
+# sẽ xóa cache ngay khi có thay đổi nên TTL chỉ là lưới an toàn.
+RULES_CACHE_TTL_SECONDS = 300
+
+
+def _compute_change(old_value: Optional[float], new_value: float) -> Optional[Tuple[float, float, str]]:
+    """
+    Tính % thay đổi, giá trị thay đổi tuyệt đối và hướng thay đổi.
+    Trả về None nếu không có thay đổi.
+    """
+    if old_value is None or old_value == 0:
+        change_percentage = 0
+        change_absolute = 0
+    else:
+        change_percentage = ((new_value - old_value) / old_value) * 100
+        change_absolute = new_value - old_value
+
+    if change_absolute > 0:
+        return change_percentage, change_absolute, 'increase'
+    if change_absolute < 0:
+        return change_percentage, change_absolute, 'decrease'
+    return None
+
+
+def _match_rules(
+    rules: List[Dict[str, Any]],
+    change_percentage: float,
+    change_absolute: float,
+    change_direction: str,
+    product_category_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Lọc các quy tắc (đã sắp xếp theo priority) khớp với thay đổi"""
+    applicable_rules = []
+    for rule in rules:
+        # Kiểm tra allowed_category_ids: nếu rule có allowed_category_ids,
+        # sản phẩm phải thuộc một trong các category đó
+        allowed_category_ids = rule.get("allowed_category_ids")
+        if allowed_category_ids and isinstance(allowed_category_ids, list) and len(allowed_category_ids) > 0:
+            if not product_category_id or product_category_id not in allowed_category_ids:
+                continue  # Skip rule này vì không khớp category
+
+        # Kiểm tra hướng thay đổi có khớp không
+        if rule.get("change_direction", "increase") not in ["both", change_direction]:
+            continue
+
+        rule_change_type = rule.get("change_type")
+        rule_change_value = float(rule.get("change_value", 0))
+
+        # Kiểm tra điều kiện
+        if rule_change_type == "percentage":
+            if abs(change_percentage) >= abs(rule_change_value):
+                applicable_rules.append(rule)
+        elif rule_change_type == "absolute":
+            if abs(change_absolute) >= abs(rule_change_value):
+                applicable_rules.append(rule)
+
+    return applicable_rules
+
+
 class MaterialAdjustmentService:
     """Service để tính toán điều chỉnh vật tư"""
     
+    @property
+    def supabase(self):
+        # Resolved per use: constructing the service at import must not create the client
+        return get_supabase_client()
+
     def __init__(self):
-        self.supabase = get_supabase_client()
+        # Cache quy tắc active theo expense_object_id:
+        # {expense_object_id: (loaded_at, {dimension_type: [rules sorted by priority]})}
+        self._rules_cache: Dict[str, Tuple[float, Dict[str, List[Dict[str, Any]]]]] = {}
+    
+    def invalidate_rules_cache(self, expense_object_id: Optional[str] = None):
+        """Xóa cache quy tắc (toàn bộ hoặc cho một đối tượng chi phí)"""
+        if expense_object_id:
+            self._rules_cache.pop(str(expense_object_id), None)
+        else:
+            self._rules_cache.clear()
+    
+    def load_rules(self, expense_object_ids: Iterable[str]) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """
+        Lấy toàn bộ quy tắc active cho các expense_object_id trong một query
+        
+        Returns:
+            Index {(expense_object_id, dimension_type): [rules sorted by priority]}
+        """
+        ids = {str(eid) for eid in expense_object_ids if eid}
+        now = time.monotonic()
+        missing = [
+            eid for eid in ids
+            if eid not in self._rules_cache
+            or now - self._rules_cache[eid][0] > RULES_CACHE_TTL_SECONDS
+        ]
+        
+        if missing:
+            result = self.supabase.table("material_adjustment_rules")\
+                .select("*")\
+                .in_("expense_object_id", missing)\
+                .eq("is_active", True)\
+                .order("priority")\
+                .execute()
+            
+            loaded: Dict[str, Dict[str, List[Dict[str, Any]]]] = {eid: {} for eid in missing}
+            for rule in result.data or []:
+                eid = str(rule.get("expense_object_id"))
+                loaded.setdefault(eid, {}).setdefault(rule.get("dimension_type"), []).append(rule)
+            for eid, by_dimension in loaded.items():
+                self._rules_cache[eid] = (now, by_dimension)
+        
+        index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for eid in ids:
+            for dim_type, rules in self._rules_cache[eid][1].items():
+                index[(eid, dim_type)] = rules
+        return index
     
     def get_applicable_rules(
         self,
@@ -34,65 +144,13 @@ class MaterialAdjustmentService:
             Danh sách quy tắc áp dụng được, đã sắp xếp theo priority
         """
         try:
-            # Tính toán thay đổi
-            if old_value is None or old_value == 0:
-                change_percentage = 0
-                change_absolute = 0
-            else:
-                change_percentage = ((new_value - old_value) / old_value) * 100
-                change_absolute = new_value - old_value
-            
-            # Xác định hướng thay đổi
-            if change_absolute > 0:
-                change_direction = 'increase'
-            elif change_absolute < 0:
-                change_direction = 'decrease'
-            else:
+            change = _compute_change(old_value, new_value)
+            if change is None:
                 return []  # Không có thay đổi
             
-            # Lấy tất cả quy tắc active cho expense_object_id và dimension_type
-            result = self.supabase.table("material_adjustment_rules")\
-                .select("*")\
-                .eq("expense_object_id", expense_object_id)\
-                .eq("dimension_type", dimension_type)\
-                .eq("is_active", True)\
-                .order("priority")\
-                .execute()
-            
-            applicable_rules = []
-            for rule in result.data:
-                # Kiểm tra allowed_category_ids: nếu rule có allowed_category_ids, 
-                # sản phẩm phải thuộc một trong các category đó
-                allowed_category_ids = rule.get("allowed_category_ids")
-                if allowed_category_ids and isinstance(allowed_category_ids, list) and len(allowed_category_ids) > 0:
-                    # Rule có giới hạn category, kiểm tra product_category_id
-                    if not product_category_id or product_category_id not in allowed_category_ids:
-                        continue  # Skip rule này vì không khớp category
-                
-                rule_change_direction = rule.get("change_direction", "increase")
-                
-                # Kiểm tra hướng thay đổi có khớp không
-                if rule_change_direction not in ["both", change_direction]:
-                    continue
-                
-                rule_change_type = rule.get("change_type")
-                rule_change_value = float(rule.get("change_value", 0))
-                
-                # Kiểm tra điều kiện
-                is_applicable = False
-                if rule_change_type == "percentage":
-                    # Kiểm tra % thay đổi
-                    if abs(change_percentage) >= abs(rule_change_value):
-                        is_applicable = True
-                elif rule_change_type == "absolute":
-                    # Kiểm tra giá trị tuyệt đối thay đổi
-                    if abs(change_absolute) >= abs(rule_change_value):
-                        is_applicable = True
-                
-                if is_applicable:
-                    applicable_rules.append(rule)
-            
-            return applicable_rules
+            index = self.load_rules([expense_object_id])
+            rules = index.get((str(expense_object_id), dimension_type), [])
+            return _match_rules(rules, *change, product_category_id)
             
         except Exception as e:
             print(f"Error getting applicable rules: {str(e)}")
@@ -158,6 +216,24 @@ class MaterialAdjustmentService:
         Returns:
             Danh sách components đã được điều chỉnh
         """
+        # Tính thay đổi của từng kích thước một lần cho tất cả components
+        changes = []
+        for dim_type, change_info in dimension_changes.items():
+            new_val = change_info.get("new")
+            if new_val is None:
+                continue
+            change = _compute_change(change_info.get("old"), new_val)
+            if change is not None:
+                changes.append((dim_type, change))
+        
+        # Lấy quy tắc cho tất cả expense_object_id trong một query
+        rule_index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        if changes:
+            try:
+                rule_index = self.load_rules(c.get("expense_object_id") for c in components)
+            except Exception as e:
+                print(f"Error loading adjustment rules: {str(e)}")
+        
         adjusted_components = []
         
         for component in components:
@@ -166,32 +242,23 @@ class MaterialAdjustmentService:
                 adjusted_components.append(component)
                 continue
             
-            original_quantity = float(component.get("quantity", 0))
-            original_unit_price = float(component.get("unit_price", 0))
-            
             # Lấy tất cả quy tắc áp dụng cho component này
             all_applicable_rules = []
-            
-            for dim_type, change_info in dimension_changes.items():
-                old_val = change_info.get("old")
-                new_val = change_info.get("new")
-                
-                if new_val is None:
+            for dim_type, change in changes:
+                rules = rule_index.get((str(expense_object_id), dim_type))
+                if not rules:
                     continue
-                
-                applicable_rules = self.get_applicable_rules(
-                    expense_object_id,
-                    dim_type,
-                    old_val,
-                    new_val
-                )
-                all_applicable_rules.extend(applicable_rules)
+                try:
+                    all_applicable_rules.extend(_match_rules(rules, *change))
+                except Exception as e:
+                    # Quy tắc lỗi (vd. change_value không phải số): bỏ qua kích thước này
+                    print(f"Error getting applicable rules: {str(e)}")
             
             # Tính toán điều chỉnh
             if all_applicable_rules:
                 adjustment_result = self.calculate_adjustment(
-                    original_quantity,
-                    original_unit_price,
+                    float(component.get("quantity", 0)),
+                    float(component.get("unit_price", 0)),
                     all_applicable_rules
                 )
                 
@@ -206,3 +273,6 @@ class MaterialAdjustmentService:
         
         return adjusted_components
 
+
+# Global instance
+material_adjustment_service = MaterialAdjustmentService()
@@ -0,0 +1,218 @@
+"""
+Name Directory
+Cached display names (plus a few contact fields and the user role) of
+employees, users, customers and projects. Enrichment code resolves all ids of a
+response at once: cached entries are returned directly and the missing ids are
+loaded with one in.(...) query per kind, so names never cost a query per row.
+Entries expire after NAME_DIRECTORY_TTL_SECONDS and the least recently used are
+evicted beyond NAME_DIRECTORY_MAX_ENTRIES per kind. The write routers call
+invalidate(); the TTL bounds staleness for writes made by other workers. warm()
+preloads the most recently updated rows at startup.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+NAME_DIRECTORY_TTL_SECONDS = int(os.getenv("NAME_DIRECTORY_TTL_SECONDS", "300"))
+NAME_DIRECTORY_MAX_ENTRIES = int(os.getenv("NAME_DIRECTORY_MAX_ENTRIES", "10000"))
+# Rows per kind loaded by warm()
+NAME_DIRECTORY_WARM_ROWS = int(os.getenv("NAME_DIRECTORY_WARM_ROWS", "2000"))
+# Ids per in.(...) query (keeps the URLs short)
+NAME_DIRECTORY_BATCH_SIZE = 200
+
+# kind -> columns cached per row
+DIRECTORY_FIELDS = {
+    "employees": "id, user_id, first_name, last_name, email, phone",
+    "users": "id, full_name, email, role",
+    "customers": "id, name, email, phone, address",
+    "projects": "id, name, project_code, customer_id, manager_id",
+}
+
+
+def display_name(kind: str, row: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not row:
+        return None
+    if kind == "employees":
+        return f"{row.get('first_name') or ''} {row.get('last_name') or ''}".strip() or None
+    if kind == "users":
+        return row.get("full_name")
+    return row.get("name")
+
+
+class _LRUCache:
+    """id -> (loaded_at, value) with expiry and a size bound; None values are cached misses"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """(cached values, missing keys)"""
+        now = time.monotonic()
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or now - entry[0] > self.ttl_seconds:
+                    missing.append(key)
+                    continue
+                self._data.move_to_end(key)
+                found[key] = entry[1]
+        return found, missing
+
+    def set_many(self, values: Dict[str, Any]):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in values.items():
+                self._data[key] = (now, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def discard_values(self, values: Iterable[Any]):
+        values = set(values)
+        with self._lock:
+            for key in [key for key, (_, value) in self._data.items() if value in values]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class NameDirectory:
+    """Bulk id -> row lookups for display names, cached per kind"""
+
+    def __init__(self, ttl_seconds: int = NAME_DIRECTORY_TTL_SECONDS, max_entries: int = NAME_DIRECTORY_MAX_ENTRIES):
+        self._caches = {kind: _LRUCache(max_entries, ttl_seconds) for kind in DIRECTORY_FIELDS}
+        # user_id -> employee id (None: the user has no employee record)
+        self._employee_by_user = _LRUCache(max_entries, ttl_seconds)
+        self.stats = {"hits": 0, "misses": 0, "queries": 0, "errors": 0}
+
+    def _fetch(self, kind: str, column: str, values: List[str]) -> Optional[List[Dict[str, Any]]]:
+        """Rows where column is in values; None if a query failed"""
+        supabase = get_supabase_client()
+        rows: List[Dict[str, Any]] = []
+        for start in range(0, len(values), NAME_DIRECTORY_BATCH_SIZE):
+            self.stats["queries"] += 1
+            try:
+                result = supabase.table(kind).select(DIRECTORY_FIELDS[kind])\
+                    .in_(column, values[start:start + NAME_DIRECTORY_BATCH_SIZE])\
+                    .execute()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Name directory: failed to load {kind}: {e}")
+                return None
+            rows.extend(result.data or [])
+        return rows
+
+    def resolve(self, kind: str, ids: Iterable[Optional[str]]) -> Dict[str, Dict[str, Any]]:
+        """Rows (DIRECTORY_FIELDS[kind]) of the ids that exist (blocking)
+
+        Rows are shared between requests; do not modify them.
+        """
+        cache = self._caches[kind]
+        wanted = list(dict.fromkeys(str(id_) for id_ in ids if id_))
+        found, missing = cache.get_many(wanted)
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(missing)
+        if missing:
+            rows = self._fetch(kind, "id", missing)
+            if rows is not None:
+                loaded: Dict[str, Any] = {id_: None for id_ in missing}
+                loaded.update({row["id"]: row for row in rows})
+                cache.set_many(loaded)
+                if kind == "employees":
+                    self._employee_by_user.set_many({row["user_id"]: row["id"] for row in rows if row.get("user_id")})
+                found.update(loaded)
+        return {id_: row for id_, row in found.items() if row is not None}
+
+    def resolve_employees_by_user(self, user_ids: Iterable[Optional[str]]) -> Dict[str, Dict[str, Any]]:
+        """user_id -> employee row for the users that have one (blocking)"""
+        wanted = list(dict.fromkeys(str(id_) for id_ in user_ids if id_))
+        employee_ids, missing = self._employee_by_user.get_many(wanted)
+        if missing:
+            rows = self._fetch("employees", "user_id", missing)
+            if rows is not None:
+                self._caches["employees"].set_many({row["id"]: row for row in rows})
+                loaded: Dict[str, Any] = {user_id: None for user_id in missing}
+                for row in rows:
+                    # Several employee records for one user: keep the first
+                    if loaded.get(row["user_id"]) is None:
+                        loaded[row["user_id"]] = row["id"]
+                self._employee_by_user.set_many(loaded)
+                employee_ids.update(loaded)
+        employees = self.resolve("employees", [id_ for id_ in employee_ids.values() if id_])
+        return {
+            user_id: employees[employee_id]
+            for user_id, employee_id in employee_ids.items()
+            if employee_id and employee_id in employees
+        }
+
+    def names(self, kind: str, ids: Iterable[Optional[str]]) -> Dict[str, str]:
+        """id -> display name, for the ids that exist and have one (blocking)"""
+        return {
+            id_: name
+            for id_, row in self.resolve(kind, ids).items()
+            if (name := display_name(kind, row))
+        }
+
+    def name(self, kind: str, id_: Optional[str]) -> Optional[str]:
+        return self.names(kind, [id_]).get(str(id_)) if id_ else None
+
+    def invalidate(self, kind: str, ids: Optional[Iterable[Optional[str]]] = None):
+        """Drop ids (or the whole kind) after writes; creating an employee should drop the kind"""
+        cache = self._caches[kind]
+        if ids is None:
+            cache.clear()
+            if kind == "employees":
+                self._employee_by_user.clear()
+            return
+        ids = [str(id_) for id_ in ids if id_]
+        cache.discard(ids)
+        if kind == "employees":
+            # The employee may have been linked to another user
+            self._employee_by_user.discard_values(ids)
+
+    def warm(self) -> Dict[str, int]:
+        """Preload the most recently updated rows of every kind (blocking; startup)"""
+        supabase = get_supabase_client()
+        loaded = {}
+        for kind, cache in self._caches.items():
+            try:
+                rows = supabase.table(kind).select(DIRECTORY_FIELDS[kind])\
+                    .order("updated_at", desc=True)\
+                    .limit(NAME_DIRECTORY_WARM_ROWS)\
+                    .execute().data or []
+            except Exception as e:
+                logger.warning(f"Name directory: failed to warm {kind}: {e}")
+                continue
+            cache.set_many({row["id"]: row for row in rows})
+            if kind == "employees":
+                self._employee_by_user.set_many({row["user_id"]: row["id"] for row in rows if row.get("user_id")})
+            loaded[kind] = len(rows)
+        logger.info(f"Name directory warmed: {loaded}")
+        return loaded
+
+
+# Global instance
+name_directory = NameDirectory()
@@ -0,0 +1,216 @@
+"""
+Notification Dispatcher
+Coalesces in-app notification events off the request path: events are buffered
+for a short window, recipients are resolved from a cached project-membership
+map, bursts on the same task are folded into one digest per recipient and all
+rows are written with a single bulk insert
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Events arriving within this window are written together
+NOTIFICATION_BATCH_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_BATCH_WINDOW_SECONDS", "2"))
+# Flush early when this many events are buffered
+NOTIFICATION_MAX_BATCH_EVENTS = int(os.getenv("NOTIFICATION_MAX_BATCH_EVENTS", "500"))
+PROJECT_MEMBERSHIP_TTL_SECONDS = int(os.getenv("PROJECT_MEMBERSHIP_TTL_SECONDS", "120"))
+# Lines listed in a digest message before "... và N thay đổi khác"
+DIGEST_MAX_LINES = 5
+
+
+class ProjectMembershipCache:
+    """project_id -> active team user ids, loaded in one query for many projects"""
+
+    def __init__(self, ttl_seconds: int = PROJECT_MEMBERSHIP_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._members: Dict[str, Tuple[float, Set[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, project_ids: Iterable[str]) -> Dict[str, Set[str]]:
+        """Team user ids per project (blocking; call from a worker thread)"""
+        now = time.monotonic()
+        result: Dict[str, Set[str]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for project_id in set(project_ids):
+                entry = self._members.get(project_id)
+                if entry and now - entry[0] <= self.ttl_seconds:
+                    result[project_id] = entry[1]
+                else:
+                    missing.append(project_id)
+        if missing:
+            rows = get_supabase_client().table("project_team")\
+                .select("project_id, user_id")\
+                .in_("project_id", missing)\
+                .eq("status", "active")\
+                .not_.is_("user_id", "null")\
+                .execute().data or []
+            loaded: Dict[str, Set[str]] = {project_id: set() for project_id in missing}
+            for row in rows:
+                if row.get("user_id"):
+                    loaded[row["project_id"]].add(row["user_id"])
+            with self._lock:
+                for project_id, members in loaded.items():
+                    self._members[project_id] = (now, members)
+            result.update(loaded)
+        return result
+
+    def invalidate(self, project_id: Optional[str] = None):
+        """Drop one project (or everything) after project_team writes"""
+        with self._lock:
+            if project_id is None:
+                self._members.clear()
+            else:
+                self._members.pop(project_id, None)
+
+
+@dataclass
+class NotificationEvent:
+    """One logical notification; recipients are resolved at flush time
+
+    Recipients = explicit user_ids + the project team (if team_project_id), minus
+    exclude_user_ids. Events sharing a digest_key for the same recipient within one batch become a
+    single notification titled digest_title (formatted with {count}).
+    """
+    title: str
+    message: str
+    notification_type: str
+    entity_type: Optional[str] = None
+    entity_id: Optional[str] = None
+    action_url: Optional[str] = None
+    user_ids: List[str] = field(default_factory=list)
+    team_project_id: Optional[str] = None
+    exclude_user_ids: List[str] = field(default_factory=list)
+    digest_key: Optional[Tuple[str, ...]] = None
+    digest_title: Optional[str] = None
+    digest_line: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+class NotificationDispatcher:
+    """Buffer notification events and write them in batches"""
+
+    def __init__(self):
+        self._events: List[NotificationEvent] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self.stats = {"events": 0, "batches": 0, "rows": 0, "digested": 0, "duplicates": 0, "errors": 0}
+
+    def dispatch(self, event: NotificationEvent):
+        """Queue an event; never blocks the caller"""
+        self._events.append(event)
+        self.stats["events"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (script/thread): write synchronously
+            self._write(self._take())
+            return
+        if len(self._events) >= NOTIFICATION_MAX_BATCH_EVENTS:
+            self._schedule_flush(loop)
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(NOTIFICATION_BATCH_WINDOW_SECONDS, self._schedule_flush, loop)
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        events = self._take()
+        if not events:
+            return
+        task = loop.create_task(asyncio.to_thread(self._write, events))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def _take(self) -> List[NotificationEvent]:
+        events, self._events = self._events, []
+        return events
+
+    async def drain(self):
+        """Write everything still buffered (shutdown)"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        events = self._take()
+        if events:
+            await asyncio.to_thread(self._write, events)
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+    def _write(self, events: List[NotificationEvent]):
+        try:
+            rows = self.build_rows(events)
+            if rows:
+                get_supabase_client().table("notifications").insert(rows).execute()
+            self.stats["batches"] += 1
+            self.stats["rows"] += len(rows)
+            logger.info(f"Notification batch: {len(events)} events -> {len(rows)} notifications")
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to write notification batch ({len(events)} events): {e}")
+
+    def build_rows(self, events: List[NotificationEvent]) -> List[Dict[str, Any]]:
+        """Resolve recipients, fold digests and drop duplicates (blocking)"""
+        teams = membership_cache.get_many(e.team_project_id for e in events if e.team_project_id)
+
+        # (user_id, digest_key or unique id) -> events in arrival order
+        groups: Dict[Tuple[str, Any], List[NotificationEvent]] = {}
+        for index, event in enumerate(events):
+            team = teams.get(event.team_project_id, set()) if event.team_project_id else set()
+            recipients = list(event.user_ids) + sorted(team)
+            excluded = set(event.exclude_user_ids)
+            for uid in dict.fromkeys(recipients):
+                if not uid or uid in excluded:
+                    continue
+                key = (uid, event.digest_key if event.digest_key else ("event", index))
+                groups.setdefault(key, []).append(event)
+
+        rows: List[Dict[str, Any]] = []
+        seen: Set[Tuple[Any, ...]] = set()
+        for (uid, _), grouped in groups.items():
+            row = self._row(uid, grouped)
+            identity = (uid, row["type"], row["entity_id"], row["title"], row["message"])
+            if identity in seen:
+                self.stats["duplicates"] += 1
+                continue
+            seen.add(identity)
+            rows.append(row)
+        return rows
+
+    def _row(self, user_id: str, events: List[NotificationEvent]) -> Dict[str, Any]:
+        first, last = events[0], events[-1]
+        row = {
+            "user_id": user_id,
+            "title": last.title,
+            "message": last.message,
+            "type": last.notification_type,
+            "entity_type": last.entity_type,
+            "entity_id": last.entity_id,
+            "is_read": False,
+            "action_url": last.action_url,
+            "created_at": first.created_at,
+        }
+        # Identical repeats (e.g. the same checklist saved twice) are not a digest
+        lines = list(dict.fromkeys(e.digest_line or e.message for e in events))
+        if len(lines) > 1:
+            self.stats["digested"] += len(events) - 1
+            row["title"] = (last.digest_title or "{count} cập nhật").format(count=len(lines))
+            shown = "; ".join(lines[:DIGEST_MAX_LINES])
+            more = len(lines) - DIGEST_MAX_LINES
+            row["message"] = shown + (f" và {more} thay đổi khác" if more > 0 else "")
+        return row
+
+
+# Global instances
+membership_cache = ProjectMembershipCache()
+notification_dispatcher = NotificationDispatcher()
@@ -2,23 +2,28 @@
 Notification service for employee notifications
 """
 
+import asyncio
 import os
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from supabase import create_client, Client
+
+from services.notification_dispatcher import NotificationEvent, membership_cache, notification_dispatcher
+from services.name_directory import name_directory
+from services.supabase_client import get_supabase_client
+from utils.pagination import before_cursor_filter, encode_cursor
+
+# Returned by the notify_* methods whose notifications are written by the dispatcher
+QUEUED_RESULT = {"created": 0, "queued": True, "errors": []}
+
+# Read notifications older than this are moved to notifications_archive
+NOTIFICATION_ARCHIVE_AFTER_DAYS = int(os.getenv("NOTIFICATION_ARCHIVE_AFTER_DAYS", "90"))
+NOTIFICATION_ARCHIVE_BATCH_SIZE = int(os.getenv("NOTIFICATION_ARCHIVE_BATCH_SIZE", "5000"))
+
 
 class NotificationService:
-    def __init__(self):
-        # ⚠️ SECURITY: No hardcoded credentials - must use environment variables
-        self.supabase_url = os.getenv("SUPABASE_URL")
-        self.supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
-        
-        if not self.supabase_url:
-            raise ValueError("SUPABASE_URL environment variable is required")
-        if not self.supabase_key:
-            raise ValueError("SUPABASE_SERVICE_KEY environment variable is required")
-        
-        self.supabase = create_client(self.supabase_url, self.supabase_key)
+    @property
+    def supabase(self):
+        return get_supabase_client()
     
     async def create_quote_notification(self, quote_data: Dict[str, Any], employee_id: str) -> bool:
         """Create notification for new quote"""
@@ -77,32 +82,120 @@ class NotificationService:
             return False
     
     async def get_employee_notifications(self, user_id: str, limit: int = 50) -> list:
-        """Get notifications for a specific user"""
+        """Get notifications for a specific user (first inbox page)"""
         try:
+            page = await self.list_inbox(user_id, limit=limit)
+            return page["items"]
+        except Exception as e:
+            print(f"Error getting notifications: {e}")
+            return []
+
+    async def list_inbox(self, user_id: str, limit: int = 30, cursor: Optional[str] = None, unread_only: bool = False) -> Dict[str, Any]:
+        """One page of the user's inbox, newest first
+        
+        Keyset pagination on (created_at, id): each page is an index range scan no
+        matter how deep the user scrolls. Raises ValueError for a malformed cursor.
+        """
+        query = self.supabase.table("notifications").select("*").eq("user_id", user_id)
+        if unread_only:
+            query = query.eq("is_read", False)
+        if cursor:
+            query = query.or_(before_cursor_filter(cursor))
+        result = query.order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit + 1)\
+            .execute()
+        
+        rows = result.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        
+        # Map is_read to read for frontend compatibility
+        items = []
+        for notification in rows:
+            mapped_notification = notification.copy()
+            mapped_notification['read'] = mapped_notification.pop('is_read', False) or False
+            items.append(mapped_notification)
+        return {"items": items, "next_cursor": next_cursor}
+
+    async def get_unread_count(self, user_id: str) -> int:
+        """Unread badge count from notification_counters (one primary-key read)"""
+        try:
+            result = self.supabase.table("notification_counters")\
+                .select("unread_count")\
+                .eq("user_id", user_id)\
+                .limit(1)\
+                .execute()
+            return result.data[0]["unread_count"] if result.data else 0
+        except Exception as e:
+            # Counters not migrated yet: count the rows instead
+            print(f"Error reading notification counter, falling back to count: {e}")
             result = self.supabase.table("notifications")\
-                .select("*")\
+                .select("id", count="exact")\
                 .eq("user_id", user_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
+                .eq("is_read", False)\
+                .limit(1)\
                 .execute()
-            
-            if result.data:
-                # Map is_read to read for frontend compatibility
-                mapped_notifications = []
-                for notification in result.data:
-                    mapped_notification = notification.copy()
-                    mapped_notification['read'] = notification.get('is_read', False)
-                    # Remove the old is_read field to avoid confusion
-                    if 'is_read' in mapped_notification:
-                        del mapped_notification['is_read']
-                    mapped_notifications.append(mapped_notification)
-                return mapped_notifications
-            else:
-                return []
-            
+            return result.count or 0
+
+    async def get_counters(self, user_id: str) -> Dict[str, int]:
+        """Total and unread counts for the user"""
+        try:
+            result = self.supabase.table("notification_counters")\
+                .select("unread_count, total_count")\
+                .eq("user_id", user_id)\
+                .limit(1)\
+                .execute()
+            if not result.data:
+                return {"total": 0, "unread": 0}
+            return {"total": result.data[0]["total_count"], "unread": result.data[0]["unread_count"]}
         except Exception as e:
-            print(f"Error getting notifications: {e}")
-            return []
+            # Counters not migrated yet: count the rows instead
+            print(f"Error reading notification counters, falling back to count: {e}")
+            total_result = self.supabase.table("notifications")\
+                .select("id", count="exact")\
+                .eq("user_id", user_id)\
+                .limit(1)\
+                .execute()
+            unread_result = self.supabase.table("notifications")\
+                .select("id", count="exact")\
+                .eq("user_id", user_id)\
+                .eq("is_read", False)\
+                .limit(1)\
+                .execute()
+            return {"total": total_result.count or 0, "unread": unread_result.count or 0}
+
+    async def mark_read(self, user_id: str, notification_ids: Optional[List[str]] = None) -> int:
+        """Mark the user's unread notifications (all, or the given ids) as read
+        
+        Only unread rows are touched, and no rows are returned, so repeating the
+        call is cheap. Returns the number of notifications that changed.
+        """
+        query = self.supabase.table("notifications")\
+            .update({"is_read": True, "read_at": datetime.utcnow().isoformat()}, count="exact", returning="minimal")\
+            .eq("user_id", user_id)\
+            .eq("is_read", False)
+        if notification_ids is not None:
+            if not notification_ids:
+                return 0
+            query = query.in_("id", notification_ids)
+        return query.execute().count or 0
+
+    async def archive_read_notifications(self, older_than_days: int = NOTIFICATION_ARCHIVE_AFTER_DAYS, batch_size: int = NOTIFICATION_ARCHIVE_BATCH_SIZE) -> int:
+        """Move read notifications older than older_than_days to notifications_archive"""
+        archived = 0
+        while True:
+            result = self.supabase.rpc("archive_read_notifications", {
+                "p_older_than_days": older_than_days,
+                "p_batch_size": batch_size
+            }).execute()
+            moved = result.data or 0
+            archived += moved
+            if moved < batch_size:
+                return archived
+            await asyncio.sleep(0)
 
     async def create_notifications_bulk(self, title: str, message: str, user_ids: List[str], action_url: Optional[str] = None, send_email: bool = True) -> Dict[str, Any]:
         """Create notifications for multiple users and optionally send email"""
@@ -127,20 +220,27 @@ class NotificationService:
                     results["created"] = len(result.data)
                 else:
                     results["errors"].append("Insert returned no data")
-            # Optionally send emails
+            # Optionally send emails (queued in the outbox, delivered by the background worker)
             if send_email:
                 try:
-                    # Fetch user emails from users table
-                    ures = self.supabase.table("users").select("id,email,full_name").in_("id", user_ids).execute()
-                    from services.email_service import email_service
-                    if ures.data:
-                        for user in ures.data:
-                            email = user.get("email")
-                            full_name = user.get("full_name", "")
-                            if email:
-                                ok = await email_service.send_notification_email(email, title, message, action_url)
-                                if ok:
-                                    results["emails_sent"] += 1
+                    # User emails from the name directory (cached users rows)
+                    recipients = await asyncio.to_thread(name_directory.resolve, "users", user_ids)
+                    from services.email_outbox_service import email_outbox_service
+                    messages = [
+                        {
+                            "email_type": "notification",
+                            "to_email": user["email"],
+                            "payload": {
+                                "employee_email": user["email"],
+                                "title": title,
+                                "message": message,
+                                "action_url": action_url
+                            }
+                        }
+                        for user in recipients.values()
+                        if user.get("email")
+                    ]
+                    results["emails_sent"] = await email_outbox_service.enqueue_many(messages)
                 except Exception as e:
                     results["errors"].append(f"Email error: {e}")
             return results
@@ -266,74 +366,48 @@ class NotificationService:
             return {"created": 0, "errors": [str(e)]}
     
     async def get_project_team_user_ids(self, project_id: str) -> List[str]:
-        """Get list of user IDs from project team members (active members only)"""
+        """Get list of user IDs from project team members (active members only, cached)"""
         try:
-            result = self.supabase.table("project_team")\
-                .select("user_id")\
-                .eq("project_id", project_id)\
-                .eq("status", "active")\
-                .not_.is_("user_id", "null")\
-                .execute()
-            
-            if result.data:
-                # Filter out None values and return unique user IDs
-                user_ids = list(set([member["user_id"] for member in result.data if member.get("user_id")]))
-                print(f"get_project_team_user_ids: Found {len(user_ids)} user IDs for project {project_id}: {user_ids}")
-                return user_ids
-            print(f"get_project_team_user_ids: No team members found for project {project_id}")
-            return []
+            members = await asyncio.to_thread(membership_cache.get_many, [project_id])
+            return list(members.get(project_id, set()))
         except Exception as e:
             print(f"Error getting project team user IDs: {e}")
-            import traceback
-            print(traceback.format_exc())
             return []
     
-    async def notify_project_team(self, project_id: str, title: str, message: str, notification_type: str, entity_type: Optional[str] = "project", entity_id: Optional[str] = None, action_url: Optional[str] = None, exclude_user_id: Optional[str] = None) -> Dict[str, Any]:
-        """Notify all project team members about a project event"""
+    def _queue(self, **event: Any) -> Dict[str, Any]:
+        """Hand a notification to the dispatcher (batched, written off the request path)"""
         try:
-            user_ids = await self.get_project_team_user_ids(project_id)
-            
-            if not user_ids:
-                print(f"No team members found for project {project_id}")
-                return {"created": 0, "errors": ["No team members found"]}
-            
-            # Exclude the user who triggered the event (if provided)
-            if exclude_user_id and exclude_user_id in user_ids:
-                user_ids = [uid for uid in user_ids if uid != exclude_user_id]
-            
-            if not user_ids:
-                print(f"No team members to notify after excluding user {exclude_user_id}")
-                return {"created": 0, "errors": ["No team members to notify"]}
-            
-            # Create notifications with specific type
-            results = {"created": 0, "emails_sent": 0, "errors": []}
-            try:
-                notifications_payload = []
-                for uid in user_ids:
-                    notifications_payload.append({
-                        "user_id": uid,
-                        "title": title,
-                        "message": message,
-                        "type": notification_type,
-                        "entity_type": entity_type,
-                        "entity_id": entity_id or project_id,
-                        "is_read": False,
-                        "action_url": action_url,
-                        "created_at": datetime.utcnow().isoformat()
-                    })
-                if notifications_payload:
-                    result = self.supabase.table("notifications").insert(notifications_payload).execute()
-                    if result.data:
-                        results["created"] = len(result.data)
-                    else:
-                        results["errors"].append("Insert returned no data")
-            except Exception as e:
-                results["errors"].append(str(e))
-            return results
+            notification_dispatcher.dispatch(NotificationEvent(**event))
+            return dict(QUEUED_RESULT)
         except Exception as e:
-            print(f"Error notifying project team: {e}")
+            print(f"Error queueing notification: {e}")
             return {"created": 0, "errors": [str(e)]}
     
+    async def notify_project_team(self, project_id: str, title: str, message: str, notification_type: str, entity_type: Optional[str] = "project", entity_id: Optional[str] = None, action_url: Optional[str] = None, exclude_user_id: Optional[str] = None, exclude_user_ids: Optional[List[str]] = None, digest_title: Optional[str] = None, digest_line: Optional[str] = None) -> Dict[str, Any]:
+        """Notify all project team members about a project event
+        
+        Recipients are resolved from the cached team membership when the batch is
+        written. Events with a digest_title on the same entity within one batch are
+        merged into a single notification per member.
+        """
+        excluded = list(exclude_user_ids or [])
+        if exclude_user_id:
+            excluded.append(exclude_user_id)
+        entity_id = entity_id or project_id
+        return self._queue(
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            entity_type=entity_type,
+            entity_id=entity_id,
+            action_url=action_url,
+            team_project_id=project_id,
+            exclude_user_ids=excluded,
+            digest_key=(entity_type or "", entity_id, digest_title) if digest_title else None,
+            digest_title=digest_title,
+            digest_line=digest_line
+        )
+    
     async def notify_project_created(self, project_data: Dict[str, Any], creator_name: Optional[str] = None, creator_user_id: Optional[str] = None) -> Dict[str, Any]:
         """Notify project team when a new project is created"""
         try:
@@ -389,124 +463,56 @@ class NotificationService:
     
     async def notify_team_member_added(self, project_id: str, project_name: str, member_name: str, added_by_name: Optional[str] = None, added_by_user_id: Optional[str] = None, new_member_user_id: Optional[str] = None) -> Dict[str, Any]:
         """Notify project team when a new team member is added"""
-        try:
-            added_by_text = f" bởi {added_by_name}" if added_by_name else ""
-            
-            title = f"Thành viên mới: {project_name}"
-            message = f"{member_name} đã được thêm vào đội ngũ dự án {project_name}{added_by_text}"
-            action_url = f"/projects/{project_id}" if project_id else None
-            
-            # Get team user IDs
-            user_ids = await self.get_project_team_user_ids(project_id)
-            
-            if not user_ids:
-                print(f"No team members found for project {project_id}")
-                return {"created": 0, "errors": ["No team members found"]}
-            
-            # Exclude both the person who added and the new member
-            user_ids_to_notify = [uid for uid in user_ids if uid and uid != added_by_user_id and uid != new_member_user_id]
-            
-            if not user_ids_to_notify:
-                print(f"No team members to notify after excluding added_by_user_id={added_by_user_id} and new_member_user_id={new_member_user_id}")
-                return {"created": 0, "errors": ["No team members to notify"]}
-            
-            # Create notifications
-            results = {"created": 0, "emails_sent": 0, "errors": []}
-            try:
-                notifications_payload = []
-                for uid in user_ids_to_notify:
-                    notifications_payload.append({
-                        "user_id": uid,
-                        "title": title,
-                        "message": message,
-                        "type": "team_member_added",
-                        "entity_type": "project",
-                        "entity_id": project_id,
-                        "is_read": False,
-                        "action_url": action_url,
-                        "created_at": datetime.utcnow().isoformat()
-                    })
-                
-                if notifications_payload:
-                    result = self.supabase.table("notifications").insert(notifications_payload).execute()
-                    if result.data:
-                        results["created"] = len(result.data)
-                        print(f"Created {len(result.data)} notifications for team member addition")
-                    else:
-                        results["errors"].append("Insert returned no data")
-                else:
-                    results["errors"].append("No notifications to create")
-            except Exception as e:
-                print(f"Error creating notifications: {e}")
-                results["errors"].append(str(e))
-            
-            return results
-        except Exception as e:
-            print(f"Error notifying team member addition: {e}")
-            return {"created": 0, "errors": [str(e)]}
+        added_by_text = f" bởi {added_by_name}" if added_by_name else ""
+        
+        title = f"Thành viên mới: {project_name}"
+        message = f"{member_name} đã được thêm vào đội ngũ dự án {project_name}{added_by_text}"
+        action_url = f"/projects/{project_id}" if project_id else None
+        
+        # Exclude both the person who added and the new member
+        return await self.notify_project_team(
+            project_id=project_id,
+            title=title,
+            message=message,
+            notification_type="team_member_added",
+            entity_type="project",
+            entity_id=project_id,
+            action_url=action_url,
+            exclude_user_ids=[uid for uid in (added_by_user_id, new_member_user_id) if uid],
+            digest_title=f"{{count}} thành viên mới trong dự án {project_name}",
+            digest_line=member_name
+        )
 
     async def notify_user_added_to_team(self, project_id: str, project_name: str, new_member_user_id: str, added_by_name: Optional[str] = None) -> Dict[str, Any]:
         """Thông báo cho thành viên mới: bạn đã được thêm vào đội ngũ dự án"""
         if not new_member_user_id:
             return {"created": 0, "errors": ["No user_id for new member"]}
-        try:
-            added_by_text = f" bởi {added_by_name}" if added_by_name else ""
-            title = "Bạn đã được thêm vào đội ngũ dự án"
-            message = f"Bạn đã được thêm vào đội ngũ dự án {project_name}{added_by_text}"
-            action_url = f"/projects/{project_id}" if project_id else None
-            notification_data = {
-                "user_id": new_member_user_id,
-                "title": title,
-                "message": message,
-                "type": "added_to_team",
-                "entity_type": "project",
-                "entity_id": project_id,
-                "is_read": False,
-                "action_url": action_url,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            result = self.supabase.table("notifications").insert(notification_data).execute()
-            if result.data:
-                print(f"Notification created for new team member {new_member_user_id}")
-                return {"created": 1, "errors": []}
-            return {"created": 0, "errors": ["Insert returned no data"]}
-        except Exception as e:
-            print(f"Error notifying user added to team: {e}")
-            return {"created": 0, "errors": [str(e)]}
+        added_by_text = f" bởi {added_by_name}" if added_by_name else ""
+        return self._queue(
+            title="Bạn đã được thêm vào đội ngũ dự án",
+            message=f"Bạn đã được thêm vào đội ngũ dự án {project_name}{added_by_text}",
+            notification_type="added_to_team",
+            entity_type="project",
+            entity_id=project_id,
+            action_url=f"/projects/{project_id}" if project_id else None,
+            user_ids=[new_member_user_id]
+        )
 
     async def notify_assigned_to_task(self, task_id: str, task_title: str, project_id: str, project_name: str, assignee_user_ids: List[str], assigned_by_name: Optional[str] = None) -> Dict[str, Any]:
         """Thông báo cho người được gán: bạn có nhiệm vụ mới"""
-        if not assignee_user_ids:
+        user_ids = [uid for uid in assignee_user_ids or [] if uid]
+        if not user_ids:
             return {"created": 0, "errors": []}
-        try:
-            assigned_by_text = f" (gán bởi {assigned_by_name})" if assigned_by_name else ""
-            title = f"Nhiệm vụ mới: {task_title}"
-            message = f"Bạn có nhiệm vụ mới '{task_title}' trong dự án {project_name}{assigned_by_text}"
-            action_url = f"/tasks/{task_id}" if task_id else None
-            notifications_payload = []
-            for uid in assignee_user_ids:
-                if not uid:
-                    continue
-                notifications_payload.append({
-                    "user_id": uid,
-                    "title": title,
-                    "message": message,
-                    "type": "task_assigned",
-                    "entity_type": "task",
-                    "entity_id": task_id,
-                    "is_read": False,
-                    "action_url": action_url,
-                    "created_at": datetime.utcnow().isoformat()
-                })
-            if not notifications_payload:
-                return {"created": 0, "errors": []}
-            result = self.supabase.table("notifications").insert(notifications_payload).execute()
-            if result.data:
-                return {"created": len(result.data), "errors": []}
-            return {"created": 0, "errors": ["Insert returned no data"]}
-        except Exception as e:
-            print(f"Error notifying assigned to task: {e}")
-            return {"created": 0, "errors": [str(e)]}
+        assigned_by_text = f" (gán bởi {assigned_by_name})" if assigned_by_name else ""
+        return self._queue(
+            title=f"Nhiệm vụ mới: {task_title}",
+            message=f"Bạn có nhiệm vụ mới '{task_title}' trong dự án {project_name}{assigned_by_text}",
+            notification_type="task_assigned",
+            entity_type="task",
+            entity_id=task_id,
+            action_url=f"/tasks/{task_id}" if task_id else None,
+            user_ids=user_ids
+        )
 
     async def notify_checklist_created(self, task_id: str, task_title: str, checklist_title: str, project_id: str, project_name: str, creator_name: Optional[str] = None, creator_user_id: Optional[str] = None) -> Dict[str, Any]:
         """Thông báo đội ngũ: checklist mới trong nhiệm vụ"""
@@ -522,7 +528,9 @@ class NotificationService:
             entity_type="task",
             entity_id=task_id,
             action_url=action_url,
-            exclude_user_id=creator_user_id
+            exclude_user_id=creator_user_id,
+            digest_title=f"{{count}} checklist đã thay đổi trong nhiệm vụ '{task_title}'",
+            digest_line=title
         )
 
     async def notify_checklist_updated(self, task_id: str, task_title: str, checklist_title: str, project_id: str, project_name: str, updated_by_user_id: Optional[str] = None) -> Dict[str, Any]:
@@ -538,7 +546,9 @@ class NotificationService:
             entity_type="task",
             entity_id=task_id,
             action_url=action_url,
-            exclude_user_id=updated_by_user_id
+            exclude_user_id=updated_by_user_id,
+            digest_title=f"{{count}} checklist đã thay đổi trong nhiệm vụ '{task_title}'",
+            digest_line=title
         )
 
     async def notify_checklist_deleted(self, task_id: str, task_title: str, checklist_title: str, project_id: str, project_name: str, deleted_by_user_id: Optional[str] = None) -> Dict[str, Any]:
@@ -554,125 +564,74 @@ class NotificationService:
             entity_type="task",
             entity_id=task_id,
             action_url=action_url,
-            exclude_user_id=deleted_by_user_id
+            exclude_user_id=deleted_by_user_id,
+            digest_title=f"{{count}} checklist đã thay đổi trong nhiệm vụ '{task_title}'",
+            digest_line=title
         )
 
     async def notify_checklist_item_changed(self, task_id: str, task_title: str, item_content: str, project_id: str, project_name: str, assignee_user_ids: List[str], change_type: str, changed_by_user_id: Optional[str] = None) -> Dict[str, Any]:
-        """Thông báo cho người được gán checklist item: thêm/sửa/xóa item. change_type: 'created'|'updated'|'deleted'"""
-        if not assignee_user_ids:
+        """Thông báo cho người được gán checklist item: thêm/sửa/xóa item. change_type: 'created'|'updated'|'deleted'
+        
+        Nhiều thay đổi trong cùng nhiệm vụ trong một batch được gộp thành một thông báo
+        """
+        user_ids = [uid for uid in assignee_user_ids or [] if uid]
+        if not user_ids:
             return {"created": 0, "errors": []}
         labels = {"created": "đã thêm", "updated": "đã cập nhật", "deleted": "đã xóa"}
         label = labels.get(change_type, change_type)
-        title = f"Công việc {label}: {item_content[:50]}{'...' if len(item_content) > 50 else ''}"
-        message = f"Công việc '{item_content}' trong nhiệm vụ '{task_title}' (dự án {project_name}) {label}"
-        action_url = f"/tasks/{task_id}" if task_id else None
-        notifications_payload = []
-        for uid in assignee_user_ids:
-            if not uid or uid == changed_by_user_id:
-                continue
-            notifications_payload.append({
-                "user_id": uid,
-                "title": title,
-                "message": message,
-                "type": f"checklist_item_{change_type}",
-                "entity_type": "task",
-                "entity_id": task_id,
-                "is_read": False,
-                "action_url": action_url,
-                "created_at": datetime.utcnow().isoformat()
-            })
-        if not notifications_payload:
-            return {"created": 0, "errors": []}
-        try:
-            result = self.supabase.table("notifications").insert(notifications_payload).execute()
-            if result.data:
-                return {"created": len(result.data), "errors": []}
-            return {"created": 0, "errors": ["Insert returned no data"]}
-        except Exception as e:
-            print(f"Error notifying checklist item change: {e}")
-            return {"created": 0, "errors": [str(e)]}
+        short_content = f"{item_content[:50]}{'...' if len(item_content) > 50 else ''}"
+        return self._queue(
+            title=f"Công việc {label}: {short_content}",
+            message=f"Công việc '{item_content}' trong nhiệm vụ '{task_title}' (dự án {project_name}) {label}",
+            notification_type=f"checklist_item_{change_type}",
+            entity_type="task",
+            entity_id=task_id,
+            action_url=f"/tasks/{task_id}" if task_id else None,
+            user_ids=user_ids,
+            exclude_user_ids=[changed_by_user_id] if changed_by_user_id else [],
+            digest_key=("checklist_item", task_id),
+            digest_title=f"{{count}} công việc đã thay đổi trong nhiệm vụ '{task_title}'",
+            digest_line=f"'{short_content}' {label}"
+        )
 
     async def notify_employee_assigned_to_task(self, task_id: str, task_title: str, project_id: str, project_name: str, employee_id: str, employee_name: str, assigned_by_name: Optional[str] = None, assigned_by_user_id: Optional[str] = None, checklist_title: Optional[str] = None, responsibility_type: Optional[str] = None) -> Dict[str, Any]:
-        """Notify project team when an employee is assigned to a task"""
-        try:
-            # Get employee's user_id
-            emp_result = self.supabase.table("employees").select("user_id").eq("id", employee_id).limit(1).execute()
-            employee_user_id = emp_result.data[0].get("user_id") if emp_result.data else None
-            
-            assigned_by_text = f" bởi {assigned_by_name}" if assigned_by_name else ""
-            
-            # Map responsibility_type sang tiếng Việt
-            responsibility_labels = {
-                "accountable": "Chịu trách nhiệm",
-                "responsible": "Thực hiện",
-                "consulted": "Tư vấn",
-                "informed": "Thông báo"
-            }
-            responsibility_text = f" với vai trò {responsibility_labels.get(responsibility_type, responsibility_type)}" if responsibility_type else ""
-            
-            # Tạo message rõ ràng hơn về nhiệm vụ được gán
-            if checklist_title:
-                title = f"Gán nhân viên vào nhiệm vụ: {task_title}"
-                message = f"{employee_name} đã được gán vào nhiệm vụ '{task_title}' - công việc '{checklist_title}'{responsibility_text} trong dự án {project_name}{assigned_by_text}"
-            else:
-                title = f"Gán nhân viên vào nhiệm vụ: {task_title}"
-                message = f"{employee_name} đã được gán vào nhiệm vụ '{task_title}'{responsibility_text} trong dự án {project_name}{assigned_by_text}"
-            
-            action_url = f"/projects/{project_id}/tasks/{task_id}" if project_id and task_id else None
-            
-            # Get team user IDs
-            user_ids = await self.get_project_team_user_ids(project_id)
-            
-            if not user_ids:
-                print(f"No team members found for project {project_id}")
-                return {"created": 0, "errors": ["No team members found"]}
-            
-            # Exclude only the person who assigned (nhân viên được gán cũng nên nhận thông báo để biết họ đã được gán)
-            user_ids_to_notify = [uid for uid in user_ids if uid and uid != assigned_by_user_id]
-            
-            # Nhân viên được gán cũng nên nhận thông báo (nếu có user_id và là thành viên của đội ngũ)
-            if employee_user_id and employee_user_id in user_ids:
-                if employee_user_id not in user_ids_to_notify:
-                    user_ids_to_notify.append(employee_user_id)
-            
-            if not user_ids_to_notify:
-                print(f"No team members to notify after excluding assigned_by_user_id={assigned_by_user_id}")
-                return {"created": 0, "errors": ["No team members to notify"]}
-            
-            # Create notifications
-            results = {"created": 0, "emails_sent": 0, "errors": []}
-            try:
-                notifications_payload = []
-                for uid in user_ids_to_notify:
-                    notifications_payload.append({
-                        "user_id": uid,
-                        "title": title,
-                        "message": message,
-                        "type": "employee_assigned_to_task",
-                        "entity_type": "task",
-                        "entity_id": task_id,
-                        "is_read": False,
-                        "action_url": action_url,
-                        "created_at": datetime.utcnow().isoformat()
-                    })
-                
-                if notifications_payload:
-                    result = self.supabase.table("notifications").insert(notifications_payload).execute()
-                    if result.data:
-                        results["created"] = len(result.data)
-                        print(f"Created {len(result.data)} notifications for employee assignment to task")
-                    else:
-                        results["errors"].append("Insert returned no data")
-                else:
-                    results["errors"].append("No notifications to create")
-            except Exception as e:
-                print(f"Error creating notifications: {e}")
-                results["errors"].append(str(e))
-            
-            return results
-        except Exception as e:
-            print(f"Error notifying employee assignment to task: {e}")
-            return {"created": 0, "errors": [str(e)]}
+        """Notify project team when an employee is assigned to a task
+        
+        The assigned employee receives it through the team (if they are a member);
+        no separate employees lookup is needed.
+        """
+        assigned_by_text = f" bởi {assigned_by_name}" if assigned_by_name else ""
+        
+        # Map responsibility_type sang tiếng Việt
+        responsibility_labels = {
+            "accountable": "Chịu trách nhiệm",
+            "responsible": "Thực hiện",
+            "consulted": "Tư vấn",
+            "informed": "Thông báo"
+        }
+        responsibility_text = f" với vai trò {responsibility_labels.get(responsibility_type, responsibility_type)}" if responsibility_type else ""
+        
+        # Tạo message rõ ràng hơn về nhiệm vụ được gán
+        title = f"Gán nhân viên vào nhiệm vụ: {task_title}"
+        if checklist_title:
+            message = f"{employee_name} đã được gán vào nhiệm vụ '{task_title}' - công việc '{checklist_title}'{responsibility_text} trong dự án {project_name}{assigned_by_text}"
+        else:
+            message = f"{employee_name} đã được gán vào nhiệm vụ '{task_title}'{responsibility_text} trong dự án {project_name}{assigned_by_text}"
+        
+        action_url = f"/projects/{project_id}/tasks/{task_id}" if project_id and task_id else None
+        
+        return await self.notify_project_team(
+            project_id=project_id,
+            title=title,
+            message=message,
+            notification_type="employee_assigned_to_task",
+            entity_type="task",
+            entity_id=task_id,
+            action_url=action_url,
+            exclude_user_id=assigned_by_user_id,
+            digest_title=f"{{count}} phân công mới trong nhiệm vụ '{task_title}'",
+            digest_line=f"{employee_name}" + (f" - {checklist_title}" if checklist_title else "")
+        )
     
     async def notify_task_completed(self, task_id: str, task_title: str, project_id: str, project_name: str, completed_by_name: Optional[str] = None, completed_by_user_id: Optional[str] = None) -> Dict[str, Any]:
         """Notify project team when a task is completed"""
@@ -0,0 +1,72 @@
+"""
+Password Hasher
+bcrypt hashing/verification off the event loop. Each bcrypt call costs
+~100-300 ms of CPU; bcrypt releases the GIL while hashing, so a small thread
+pool runs them in parallel without blocking other requests. The pool size
+bounds how many CPU cores password work can take at once.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import bcrypt
+
+# Concurrent bcrypt operations per worker process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# bcrypt cost factor for new hashes (existing hashes keep their own)
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+
+
+def hash_password_sync(password: str, rounds: int = PASSWORD_HASH_ROUNDS) -> str:
+    """Hash password using bcrypt (blocking)"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    """Verify password against hash (blocking)"""
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+class PasswordHasher:
+    """Awaitable bcrypt on a bounded thread pool"""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS):
+        self.workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Created on first use (most requests never hash a password)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    async def hash(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, hash_password_sync, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, verify_password_sync, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch (e.g. an Excel import) in parallel, preserving order"""
+        loop = asyncio.get_running_loop()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(self.executor, hash_password_sync, password) for password in passwords
+        )))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Global instance
+password_hasher = PasswordHasher()
@@ -6,6 +6,7 @@ Handles all financial calculations and data aggregation for projects
 from typing import Dict, List, Optional, Tuple
 from datetime import date, datetime
 from services.supabase_client import get_supabase_client
+from services.labor_cost_service import labor_cost_service
 
 
 class ProjectProfitabilityService:
@@ -49,14 +50,10 @@ class ProjectProfitabilityService:
     
     async def calculate_project_costs(self, project_id: str) -> Dict:
         """Calculate total costs for a project"""
-        # Get time entries and calculate labor costs
-        time_entries = self.supabase.table("time_entries").select("*").eq("project_id", project_id).execute()
-        total_hours = sum(entry["hours_worked"] for entry in time_entries.data)
-        total_labor_cost = 0
-        
-        for entry in time_entries.data:
-            if entry["hourly_rate"]:
-                total_labor_cost += entry["hours_worked"] * entry["hourly_rate"]
+        # Labor costs from the monthly rollups (time entries + task time logs)
+        labor = labor_cost_service.get_project_total(project_id)
+        total_hours = labor["hours"]
+        total_labor_cost = labor["cost"]
         
         # Get direct project expenses
         expenses = self.supabase.table("expenses").select("amount, status").eq("project_id", project_id).execute()
@@ -76,7 +73,15 @@ class ProjectProfitabilityService:
                 "labor": {
                     "total_hours": total_hours,
                     "total_cost": total_labor_cost,
-                    "average_hourly_rate": total_labor_cost / total_hours if total_hours > 0 else 0
+                    "average_hourly_rate": total_labor_cost / total_hours if total_hours > 0 else 0,
+                    "time_entries": {
+                        "hours": labor["time_entry_hours"],
+                        "cost": labor["time_entry_cost"]
+                    },
+                    "task_logs": {
+                        "hours": labor["task_log_hours"],
+                        "cost": labor["task_log_cost"]
+                    }
                 },
                 "expenses": {
                     "total_cost": total_expenses,
@@ -194,14 +199,13 @@ class ProjectProfitabilityService:
         # Get all related data in parallel
         invoices = self.supabase.table("invoices").select("project_id, total_amount, paid_amount").in_("project_id", project_ids).execute()
         sales_receipts = self.supabase.table("sales_receipts").select("project_id, total_amount").in_("project_id", project_ids).execute()
-        time_entries = self.supabase.table("time_entries").select("project_id, hours_worked, hourly_rate").in_("project_id", project_ids).execute()
+        labor_by_project = labor_cost_service.get_project_totals(project_ids)
         expenses = self.supabase.table("expenses").select("project_id, amount").in_("project_id", project_ids).execute()
         bills = self.supabase.table("bills").select("project_id, amount, paid_amount").in_("project_id", project_ids).execute()
         
         # Pre-process data into hash maps for O(1) lookup
         invoices_by_project = {}
         sales_receipts_by_project = {}
-        time_entries_by_project = {}
         expenses_by_project = {}
         bills_by_project = {}
         
@@ -217,12 +221,6 @@ class ProjectProfitabilityService:
                 sales_receipts_by_project[project_id] = []
             sales_receipts_by_project[project_id].append(receipt)
         
-        for entry in time_entries.data:
-            project_id = entry["project_id"]
-            if project_id not in time_entries_by_project:
-                time_entries_by_project[project_id] = []
-            time_entries_by_project[project_id].append(entry)
-        
         for expense in expenses.data:
             project_id = expense["project_id"]
             if project_id not in expenses_by_project:
@@ -253,13 +251,12 @@ class ProjectProfitabilityService:
             total_paid_revenue = total_paid_invoices + total_sales_receipts
             
             # Calculate costs
-            project_time_entries = time_entries_by_project.get(project_id, [])
             project_expenses = expenses_by_project.get(project_id, [])
             project_bills = bills_by_project.get(project_id, [])
             
             # Labor costs
-            total_hours = sum(te["hours_worked"] for te in project_time_entries)
-            labor_cost = sum(te["hours_worked"] * te["hourly_rate"] for te in project_time_entries if te["hourly_rate"])
+            total_hours = labor_by_project[project_id]["hours"]
+            labor_cost = labor_by_project[project_id]["cost"]
             
             # Other costs
             expenses_cost = sum(exp["amount"] for exp in project_expenses)
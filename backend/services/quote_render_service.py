@@ -0,0 +1,242 @@
+"""
+Quote Render Service
+Caches rendered quote HTML/PDF and embedded logo assets, and renders PDFs in a
+process pool so WeasyPrint/xhtml2pdf never block the API worker
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the quote HTML template changes so cached renders are not reused
+QUOTE_TEMPLATE_VERSION = "1"
+
+QUOTE_HTML_CACHE_SIZE = int(os.getenv("QUOTE_HTML_CACHE_SIZE", "256"))
+QUOTE_PDF_CACHE_SIZE = int(os.getenv("QUOTE_PDF_CACHE_SIZE", "16"))
+QUOTE_RENDER_CACHE_TTL_SECONDS = int(os.getenv("QUOTE_RENDER_CACHE_TTL_SECONDS", "1800"))
+# PDF rendering is CPU bound: separate processes, capped concurrency
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "1"))
+PDF_RENDER_MAX_CONCURRENCY = int(os.getenv("PDF_RENDER_MAX_CONCURRENCY", "2"))
+
+LOGO_MAX_WIDTH = 300
+LOGO_MAX_HEIGHT = 100
+
+
+def html_to_pdf_bytes(html: str) -> Optional[bytes]:
+    """Best-effort HTML→PDF conversion. Tries WeasyPrint, then xhtml2pdf. Returns None if unavailable.
+
+    Module level so it can run in a worker process.
+    """
+    # Try WeasyPrint
+    try:
+        from weasyprint import HTML  # type: ignore
+        return HTML(string=html).write_pdf()
+    except Exception:
+        pass
+    # Try xhtml2pdf
+    try:
+        from xhtml2pdf import pisa  # type: ignore
+        src = io.StringIO(html)
+        out = io.BytesIO()
+        pisa.CreatePDF(src, dest=out)  # returns pisaStatus, but we can ignore
+        return out.getvalue()
+    except Exception:
+        return None
+
+
+def resize_image(image_data: bytes, max_width: int = LOGO_MAX_WIDTH, max_height: int = LOGO_MAX_HEIGHT) -> bytes:
+    """Resize image if too large. Returns resized image bytes or original if resize fails."""
+    try:
+        from PIL import Image
+        img = Image.open(io.BytesIO(image_data))
+
+        # Get original dimensions
+        width, height = img.size
+
+        # Resize if too large
+        if width > max_width or height > max_height:
+            # Calculate new dimensions maintaining aspect ratio
+            ratio = min(max_width / width, max_height / height)
+            new_width = int(width * ratio)
+            new_height = int(height * ratio)
+
+            # Resize image
+            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+            # Convert back to bytes
+            output = io.BytesIO()
+            # Preserve format if possible, otherwise use JPEG
+            if img.format and img.format in ['PNG', 'JPEG', 'JPG']:
+                img.save(output, format=img.format, quality=90, optimize=True)
+            else:
+                img.save(output, format='JPEG', quality=90, optimize=True)
+            return output.getvalue()
+
+        return image_data
+    except Exception as e:
+        # If resize fails, return original
+        print(f"Warning: Failed to resize image: {e}")
+        return image_data
+
+
+class _TTLCache:
+    """Small thread-safe LRU cache with expiry"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class QuoteRenderService:
+    """Render cache for quote HTML/PDF and logo assets"""
+
+    def __init__(self):
+        self._html_cache = _TTLCache(QUOTE_HTML_CACHE_SIZE, QUOTE_RENDER_CACHE_TTL_SECONDS)
+        self._pdf_cache = _TTLCache(QUOTE_PDF_CACHE_SIZE, QUOTE_RENDER_CACHE_TTL_SECONDS)
+        # Logos change rarely and are small once resized
+        self._logo_cache = _TTLCache(16, QUOTE_RENDER_CACHE_TTL_SECONDS)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._pdf_semaphore = asyncio.Semaphore(PDF_RENDER_MAX_CONCURRENCY)
+
+    @staticmethod
+    def render_key(*inputs: Any) -> str:
+        """Stable hash of the template version and all render inputs.
+
+        The quote row (incl. updated_at) is part of the inputs, so any edit to the
+        quote, its items or the customization yields a new key.
+        """
+        payload = json.dumps([QUOTE_TEMPLATE_VERSION, inputs], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def render_html(self, key: str, build: Callable[[], str]) -> str:
+        """Return the cached HTML for key, building it on a miss"""
+        html = self._html_cache.get(key)
+        if html is None:
+            html = build()
+            self._html_cache.set(key, html)
+        return html
+
+    async def render_pdf(self, html: str) -> Optional[bytes]:
+        """Render HTML to PDF in the process pool (cached by HTML hash)"""
+        key = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        pdf_bytes = self._pdf_cache.get(key)
+        if pdf_bytes is not None:
+            return pdf_bytes
+
+        loop = asyncio.get_running_loop()
+        async with self._pdf_semaphore:
+            try:
+                pdf_bytes = await loop.run_in_executor(self._get_pool(), html_to_pdf_bytes, html)
+            except BrokenProcessPool:
+                # Worker died (e.g. OOM); recreate the pool on next use and render in a thread now
+                logger.warning("PDF render process pool broken, falling back to thread")
+                self._reset_pool()
+                pdf_bytes = await asyncio.to_thread(html_to_pdf_bytes, html)
+
+        if pdf_bytes:
+            self._pdf_cache.set(key, pdf_bytes)
+        return pdf_bytes
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created lazily so processes are only spawned once a PDF is actually needed
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=PDF_RENDER_WORKERS)
+            return self._pool
+
+    def _reset_pool(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def shutdown(self):
+        """Stop PDF worker processes"""
+        self._reset_pool()
+
+    def logo_bytes(self, logo_base64: Optional[str] = None, logo_path: Optional[str] = None) -> Optional[bytes]:
+        """Decoded and resized logo from a base64 string (data URI allowed) or a file path"""
+        if logo_base64:
+            key = "b64:" + hashlib.sha256(logo_base64.encode("utf-8")).hexdigest()
+        elif logo_path and os.path.exists(logo_path):
+            key = f"file:{logo_path}:{os.path.getmtime(logo_path)}"
+        else:
+            return None
+
+        data = self._logo_cache.get(key)
+        if data is None:
+            if logo_base64:
+                raw = base64.b64decode(logo_base64.split(',', 1)[1] if ',' in logo_base64 else logo_base64)
+            else:
+                with open(logo_path, 'rb') as f:
+                    raw = f.read()
+            data = resize_image(raw)
+            self._logo_cache.set(key, data)
+        return data
+
+    def logo_base64(self, logo_path: str) -> Optional[str]:
+        """Resized logo file as a base64 string for data URIs"""
+        data = self.logo_bytes(logo_path=logo_path)
+        return base64.b64encode(data).decode('utf-8') if data else None
+
+    def stats(self) -> dict:
+        return {
+            "html_entries": len(self._html_cache),
+            "html_hits": self._html_cache.hits,
+            "html_misses": self._html_cache.misses,
+            "pdf_entries": len(self._pdf_cache),
+            "pdf_hits": self._pdf_cache.hits,
+            "pdf_misses": self._pdf_cache.misses,
+        }
+
+    def clear(self):
+        self._html_cache.clear()
+        self._pdf_cache.clear()
+        self._logo_cache.clear()
+
+
+# Global instance
+quote_render_service = QuoteRenderService()
@@ -2,11 +2,14 @@
 Supabase client configuration and utilities
 """
 
-from supabase import create_client, Client
-from supabase.lib.client_options import ClientOptions
+from typing import TYPE_CHECKING
 from config import settings
+from utils.query_metrics import InstrumentedClient, QUERY_METRICS_ENABLED
 import logging
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 logger = logging.getLogger(__name__)
 
 class SupabaseService:
@@ -16,11 +19,14 @@ class SupabaseService:
         self.url = settings.SUPABASE_URL
         self.service_key = settings.SUPABASE_SERVICE_KEY
         self.anon_key = settings.SUPABASE_ANON_KEY
-        self.client: Client = None
-        self._initialize_client()
+        # Created on first get_client() so importing this module (and /health) stays cheap
+        self.client: "Client" = None
+        # Wrapper recording each query for per-request metrics (utils/query_metrics.py)
+        self.instrumented_client: InstrumentedClient = None
     
     def _initialize_client(self):
         """Initialize Supabase client with service role key to bypass RLS"""
+        from supabase import create_client  # Imported on first use (slow import)
         try:
             # Verify service key is set
             if not self.service_key:
@@ -58,23 +64,28 @@ class SupabaseService:
             logger.error(f"Service key set: {bool(self.service_key)}")
             raise
     
-    def get_client(self) -> Client:
+    def get_client(self) -> "Client":
         """Get Supabase client instance"""
         if not self.client:
             self._initialize_client()
-        return self.client
+        if not QUERY_METRICS_ENABLED:
+            return self.client
+        if self.instrumented_client is None or self.instrumented_client.raw is not self.client:
+            self.instrumented_client = InstrumentedClient(self.client)
+        return self.instrumented_client
     
-    def get_anon_client(self) -> Client:
+    def get_anon_client(self) -> "Client":
         """Get Supabase client with anon key for frontend operations"""
+        from supabase import create_client
         return create_client(self.url, self.anon_key)
 
 # Global instance
 supabase_service = SupabaseService()
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """Dependency to get Supabase client"""
     return supabase_service.get_client()
 
-def get_supabase_anon_client() -> Client:
+def get_supabase_anon_client() -> "Client":
     """Get Supabase anon client for public operations"""
     return supabase_service.get_anon_client()
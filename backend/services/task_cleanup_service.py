@@ -3,112 +3,284 @@ Task Cleanup Service
 Automatically permanently deletes soft-deleted tasks and groups after 24 hours
 """
 
+import asyncio
 import logging
+import os
+import time
 from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Tuple
 from services.supabase_client import get_supabase_client
 from services.file_upload_service import get_file_upload_service
 
 logger = logging.getLogger(__name__)
 
+# Number of ids per .in_() query / delete
+CLEANUP_BATCH_SIZE = int(os.getenv("TASK_CLEANUP_BATCH_SIZE", "100"))
+# Number of storage objects per remove call
+STORAGE_REMOVE_CHUNK_SIZE = int(os.getenv("TASK_CLEANUP_STORAGE_CHUNK_SIZE", "500"))
+# Stop starting new batches after this many seconds; the next run resumes
+CLEANUP_TIME_BUDGET_SECONDS = float(os.getenv("TASK_CLEANUP_TIME_BUDGET_SECONDS", "60"))
+# Removes of an orphaned storage object before it is left for manual inspection
+ORPHAN_MAX_ATTEMPTS = int(os.getenv("TASK_CLEANUP_ORPHAN_MAX_ATTEMPTS", "10"))
+
+
+def _chunks(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 class TaskCleanupService:
     """Service for cleaning up soft-deleted tasks and groups"""
-    
+
     def __init__(self):
         self.upload_service = get_file_upload_service()
-    
-    async def cleanup_old_deleted_items(self):
-        """Permanently delete tasks and groups that were deleted more than 24 hours ago"""
+
+    async def cleanup_old_deleted_items(self, time_budget_seconds: float = CLEANUP_TIME_BUDGET_SECONDS) -> Dict[str, Any]:
+        """Permanently delete tasks and groups that were deleted more than 24 hours ago
+
+        Work is done in batches: one attachments query, one .in_() row delete and
+        chunked storage removes per batch. The file paths are collected before the rows
+        are deleted; objects that then cannot be removed are recorded in
+        storage_orphaned_files and retried by later runs (each blob reference is
+        released once). A batch whose rows could not be deleted, or a run that stops
+        at the time budget, is simply retried by the next run.
+
+        Returns:
+            Metrics: deleted_tasks, deleted_groups, deleted_files (objects actually
+            removed), orphaned_files, orphans_removed, batches, failed_tasks,
+            failed_groups, remaining_tasks, remaining_groups, completed,
+            duration_seconds
+        """
+        started = time.monotonic()
+        metrics = {
+            "deleted_tasks": 0,
+            "deleted_groups": 0,
+            "deleted_files": 0,
+            "orphaned_files": 0,
+            "orphans_removed": 0,
+            "batches": 0,
+            "failed_tasks": 0,
+            "failed_groups": 0,
+            "remaining_tasks": 0,
+            "remaining_groups": 0,
+            "completed": True,
+            "duration_seconds": 0.0
+        }
+
+        def out_of_time() -> bool:
+            return time.monotonic() - started > time_budget_seconds
+
         try:
             supabase = get_supabase_client()
             cutoff_time = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-            
+
+            # Objects earlier runs could not remove
+            metrics["orphans_removed"] = await self._sweep_orphans(supabase)
+
+            # Find groups deleted more than 24 hours ago
+            old_groups_result = await asyncio.to_thread(
+                supabase.table("task_groups").select("id").not_.is_("deleted_at", "null").lt("deleted_at", cutoff_time).execute
+            )
+            group_ids = [group["id"] for group in old_groups_result.data or []]
+
             # Find tasks deleted more than 24 hours ago
-            old_tasks_result = supabase.table("tasks").select("id, group_id").not_.is_("deleted_at", "null").lt("deleted_at", cutoff_time).execute()
+            old_tasks_result = await asyncio.to_thread(
+                supabase.table("tasks").select("id, group_id").not_.is_("deleted_at", "null").lt("deleted_at", cutoff_time).execute
+            )
             old_tasks = old_tasks_result.data or []
-            
-            # Find groups deleted more than 24 hours ago
-            old_groups_result = supabase.table("task_groups").select("id").not_.is_("deleted_at", "null").lt("deleted_at", cutoff_time).execute()
-            old_groups = old_groups_result.data or []
-            
-            deleted_tasks_count = 0
-            deleted_groups_count = 0
-            
+
+            # Tasks of expired groups (their files live under the group folder)
+            group_tasks = []
+            for batch in _chunks(group_ids, CLEANUP_BATCH_SIZE):
+                group_tasks_result = await asyncio.to_thread(
+                    supabase.table("tasks").select("id, group_id").in_("group_id", batch).execute
+                )
+                group_tasks.extend(group_tasks_result.data or [])
+
             # Permanently delete old tasks
-            for task in old_tasks:
+            task_ids = [task["id"] for task in old_tasks]
+            task_groups = {task["id"]: task.get("group_id") or "" for task in old_tasks}
+            deleted_task_ids = set()
+            for index, batch in enumerate(_chunks(task_ids, CLEANUP_BATCH_SIZE)):
+                if out_of_time():
+                    metrics["remaining_tasks"] = len(task_ids) - index * CLEANUP_BATCH_SIZE
+                    break
                 try:
-                    task_id = task["id"]
-                    task_group_id = task.get("group_id", "")
-                    
-                    # Get all attachments
-                    attachments_result = supabase.table("task_attachments").select("file_name").eq("task_id", task_id).execute()
-                    attachments = attachments_result.data or []
-                    
-                    # Delete files from storage (if not already deleted)
-                    for attachment in attachments:
-                        try:
-                            if task_group_id:
-                                file_path = f"Groups/{task_group_id}/Tasks/{task_id}/{attachment['file_name']}"
-                            else:
-                                file_path = f"Tasks/{task_id}/{attachment['file_name']}"
-                            await self.upload_service.delete_file(file_path)
-                        except Exception as e:
-                            logger.warning(f"Failed to delete file {attachment['file_name']}: {str(e)}")
-                    
-                    # Permanently delete task and related data (cascade will handle attachments, comments, etc.)
-                    supabase.table("tasks").delete().eq("id", task_id).execute()
-                    deleted_tasks_count += 1
+                    paths = await self._attachment_paths(supabase, batch, task_groups)
+
+                    # Cascade will handle attachments, comments, etc.
+                    await asyncio.to_thread(supabase.table("tasks").delete().in_("id", batch).execute)
+                    deleted_task_ids.update(batch)
+                    metrics["deleted_tasks"] += len(batch)
+                    metrics["batches"] += 1
                 except Exception as e:
-                    logger.error(f"Failed to permanently delete task {task['id']}: {str(e)}")
-            
+                    metrics["failed_tasks"] += len(batch)
+                    logger.error(f"Failed to permanently delete task batch ({len(batch)} tasks): {str(e)}")
+                    continue
+                removed, orphaned = await self._remove_files(paths)
+                metrics["deleted_files"] += removed
+                metrics["orphaned_files"] += orphaned
+
             # Permanently delete old groups
-            for group in old_groups:
+            group_task_ids: Dict[str, List[str]] = {}
+            task_groups = {}
+            for task in group_tasks:
+                if task["id"] in deleted_task_ids:
+                    continue  # Files already removed with the expired tasks
+                group_task_ids.setdefault(task["group_id"], []).append(task["id"])
+                task_groups[task["id"]] = task["group_id"]
+
+            for index, batch in enumerate(_chunks(group_ids, CLEANUP_BATCH_SIZE)):
+                if out_of_time():
+                    metrics["remaining_groups"] = len(group_ids) - index * CLEANUP_BATCH_SIZE
+                    break
                 try:
-                    group_id = group["id"]
-                    
-                    # Get all tasks in this group
-                    tasks_result = supabase.table("tasks").select("id").eq("group_id", group_id).execute()
-                    tasks = tasks_result.data or []
-                    
-                    # Delete all files from group folder
-                    # Delete avatar
-                    try:
-                        avatar_path = f"Groups/{group_id}/avatar/avatar.jpg"
-                        await self.upload_service.delete_file(avatar_path)
-                    except Exception:
-                        try:
-                            avatar_path = f"Groups/{group_id}/avatar/avatar.png"
-                            await self.upload_service.delete_file(avatar_path)
-                        except Exception:
-                            pass
-                    
-                    # Delete all task files
-                    for task in tasks:
-                        task_id = task["id"]
-                        attachments_result = supabase.table("task_attachments").select("file_name").eq("task_id", task_id).execute()
-                        attachments = attachments_result.data or []
-                        
-                        for attachment in attachments:
-                            try:
-                                file_path = f"Groups/{group_id}/Tasks/{task_id}/{attachment['file_name']}"
-                                await self.upload_service.delete_file(file_path)
-                            except Exception as e:
-                                logger.warning(f"Failed to delete task file: {str(e)}")
-                    
-                    # Permanently delete group (cascade will handle members and tasks)
-                    supabase.table("task_groups").delete().eq("id", group_id).execute()
-                    deleted_groups_count += 1
+                    batch_task_ids = [task_id for group_id in batch for task_id in group_task_ids.get(group_id, [])]
+                    paths = await self._attachment_paths(supabase, batch_task_ids, task_groups)
+                    # Group avatars (remove ignores missing objects; only existing ones are counted)
+                    for group_id in batch:
+                        paths.append(f"Groups/{group_id}/avatar/avatar.jpg")
+                        paths.append(f"Groups/{group_id}/avatar/avatar.png")
+
+                    # Cascade will handle members and tasks
+                    await asyncio.to_thread(supabase.table("task_groups").delete().in_("id", batch).execute)
+                    metrics["deleted_groups"] += len(batch)
+                    metrics["batches"] += 1
                 except Exception as e:
-                    logger.error(f"Failed to permanently delete group {group['id']}: {str(e)}")
-            
-            logger.info(f"Cleanup completed: {deleted_tasks_count} tasks and {deleted_groups_count} groups permanently deleted")
-            return {
-                "deleted_tasks": deleted_tasks_count,
-                "deleted_groups": deleted_groups_count
-            }
+                    metrics["failed_groups"] += len(batch)
+                    logger.error(f"Failed to permanently delete group batch ({len(batch)} groups): {str(e)}")
+                    continue
+                removed, orphaned = await self._remove_files(paths)
+                metrics["deleted_files"] += removed
+                metrics["orphaned_files"] += orphaned
+
+            metrics["completed"] = not (
+                metrics["remaining_tasks"] or metrics["remaining_groups"]
+                or metrics["failed_tasks"] or metrics["failed_groups"]
+            )
+            metrics["duration_seconds"] = round(time.monotonic() - started, 3)
+            if metrics["completed"]:
+                state = "completed"
+            elif metrics["failed_tasks"] or metrics["failed_groups"]:
+                state = f"incomplete ({metrics['failed_tasks']} tasks, {metrics['failed_groups']} groups left for the next run)"
+            else:
+                state = "paused (time budget)"
+            logger.info(
+                f"Cleanup {state}: "
+                f"{metrics['deleted_tasks']} tasks, {metrics['deleted_groups']} groups, "
+                f"{metrics['deleted_files']} files in {metrics['batches']} batches, "
+                f"{metrics['orphaned_files']} files left for retry, {metrics['orphans_removed']} earlier ones removed, "
+                f"{metrics['duration_seconds']}s"
+            )
+            return metrics
         except Exception as e:
             logger.error(f"Cleanup error: {str(e)}")
             raise
 
+    async def _attachment_paths(self, supabase, task_ids: List[str], task_groups: Dict[str, str]) -> List[str]:
+        """Storage paths of all attachments of the given tasks (one query per batch)"""
+        paths = []
+        for batch in _chunks(task_ids, CLEANUP_BATCH_SIZE):
+            attachments_result = await asyncio.to_thread(
+                supabase.table("task_attachments").select("task_id, file_name").in_("task_id", batch).execute
+            )
+            for attachment in attachments_result.data or []:
+                task_id = attachment["task_id"]
+                group_id = task_groups.get(task_id)
+                if group_id:
+                    paths.append(f"Groups/{group_id}/Tasks/{task_id}/{attachment['file_name']}")
+                else:
+                    paths.append(f"Tasks/{task_id}/{attachment['file_name']}")
+        return paths
+
+    async def _remove_files(self, paths: List[str]) -> Tuple[int, int]:
+        """Release and remove storage objects in chunks (rows are already deleted)
+
+        Returns:
+            (paths removed or released, objects recorded as orphans for a later run)
+        """
+        removed = 0
+        orphaned = 0
+        for chunk in _chunks(paths, STORAGE_REMOVE_CHUNK_SIZE):
+            released, objects = await self.upload_service.release_files(chunk)
+            removed += len(released)
+            error = None
+            try:
+                deleted = await self.upload_service.remove_objects(objects)
+                if deleted is None:
+                    error = "storage reported an error"
+            except Exception as e:
+                error = str(e)
+            if error:
+                logger.warning(f"Failed to delete {len(objects)} files, recorded for retry: {error}")
+                await self._record_orphans(objects, error)
+                orphaned += len(objects)
+            else:
+                removed += sum(1 for path in chunk if path in deleted)
+        return removed, orphaned
+
+    async def _record_orphans(self, object_paths: List[str], error: str):
+        """Remember objects for _sweep_orphans (their blob references are already released)"""
+        if not object_paths:
+            return
+        bucket = self.upload_service.bucket_name
+        try:
+            supabase = get_supabase_client()
+            await asyncio.to_thread(
+                supabase.table("storage_orphaned_files").upsert(
+                    [{"bucket": bucket, "storage_path": path, "last_error": error[:500]} for path in object_paths],
+                    on_conflict="bucket,storage_path"
+                ).execute
+            )
+        except Exception as e:
+            logger.error(f"Failed to record orphaned files {object_paths}: {str(e)}")
+
+    async def _sweep_orphans(self, supabase) -> int:
+        """Retry removing up to one chunk of recorded orphans; returns the objects removed"""
+        bucket = self.upload_service.bucket_name
+        try:
+            orphans_result = await asyncio.to_thread(
+                supabase.table("storage_orphaned_files").select("storage_path, attempts")
+                .eq("bucket", bucket).lt("attempts", ORPHAN_MAX_ATTEMPTS)
+                .order("created_at").limit(STORAGE_REMOVE_CHUNK_SIZE).execute
+            )
+        except Exception as e:
+            logger.warning(f"Could not read orphaned files: {str(e)}")
+            return 0
+        orphans = orphans_result.data or []
+        if not orphans:
+            return 0
+        paths = [orphan["storage_path"] for orphan in orphans]
+        error = None
+        try:
+            deleted = await self.upload_service.remove_objects(paths)
+            if deleted is None:
+                error = "storage reported an error"
+        except Exception as e:
+            error = str(e)
+        try:
+            if error:
+                now = datetime.now(timezone.utc).isoformat()
+                await asyncio.to_thread(
+                    supabase.table("storage_orphaned_files").upsert([
+                        {
+                            "bucket": bucket,
+                            "storage_path": orphan["storage_path"],
+                            "attempts": orphan["attempts"] + 1,
+                            "last_error": error[:500],
+                            "last_attempt_at": now
+                        }
+                        for orphan in orphans
+                    ], on_conflict="bucket,storage_path").execute
+                )
+                logger.warning(f"Failed to remove {len(paths)} orphaned files: {error}")
+                return 0
+            await asyncio.to_thread(
+                supabase.table("storage_orphaned_files").delete().eq("bucket", bucket).in_("storage_path", paths).execute
+            )
+        except Exception as e:
+            logger.warning(f"Could not update orphaned files: {str(e)}")
+        return 0 if error else len(deleted)
+
 # Global instance
 task_cleanup_service = TaskCleanupService()
-
@@ -0,0 +1,53 @@
+"""
+Task Counter Service
+Consistency check for the counter columns on tasks (comment_count, attachment_count,
+assignee_count, checklist_item_count, checklist_completed_count). The columns are
+kept up to date by database triggers (database/migrations/add_task_counters.sql);
+this compares them with the real counts and optionally repairs the difference.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict
+
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Maximum mismatched tasks reported (and repaired) per run
+TASK_COUNTER_CHECK_LIMIT = int(os.getenv("TASK_COUNTER_CHECK_LIMIT", "1000"))
+# Repair mismatches found by the periodic check (false = only log them)
+TASK_COUNTER_AUTO_REPAIR = os.getenv("TASK_COUNTER_AUTO_REPAIR", "true").lower() == "true"
+
+
+class TaskCounterService:
+    """Check and repair denormalized task counters"""
+
+    def check_counters(self, repair: bool = False, limit: int = TASK_COUNTER_CHECK_LIMIT) -> Dict[str, Any]:
+        """Find tasks whose counters differ from the real counts (blocking)
+
+        Returns:
+            mismatched: number of tasks found, repaired: whether they were fixed,
+            samples: up to 20 {task_id, stored, actual}
+        """
+        supabase = get_supabase_client()
+        result = supabase.rpc("check_task_counters", {"p_repair": repair, "p_limit": limit}).execute()
+        rows = result.data or []
+        return {
+            "mismatched": len(rows),
+            "repaired": repair,
+            "samples": rows[:20],
+        }
+
+    async def run_periodic_check(self) -> Dict[str, Any]:
+        """Periodic check; logs drift so a missed write path gets noticed"""
+        report = await asyncio.to_thread(self.check_counters, TASK_COUNTER_AUTO_REPAIR)
+        if report["mismatched"]:
+            action = "repaired" if report["repaired"] else "found"
+            logger.warning(f"Task counters: {action} {report['mismatched']} mismatched tasks, e.g. {report['samples'][:3]}")
+        return report
+
+
+# Global instance
+task_counter_service = TaskCounterService()
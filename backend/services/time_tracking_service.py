@@ -0,0 +1,167 @@
+"""
+Time Tracking Service
+Timesheet rollups and utilization from time_log_daily_rollups. The table and
+tasks.time_spent are kept up to date incrementally by database triggers on
+task_time_logs (database/migrations/add_time_log_rollups.sql): stopping a log
+adds its duration, deleting it subtracts it. Reports read the rollups instead of
+scanning raw logs; check_rollups() compares them with the logs and repairs drift.
+"""
+
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from services.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Capacity used for utilization: hours per working day, working days (ISO weekday numbers)
+TIMESHEET_HOURS_PER_DAY = float(os.getenv("TIMESHEET_HOURS_PER_DAY", "8"))
+TIMESHEET_WORKDAYS = {int(day) for day in os.getenv("TIMESHEET_WORKDAYS", "1,2,3,4,5").split(",") if day.strip()}
+# Repair rollups found out of sync by the periodic check (false = only log them)
+TIME_LOG_ROLLUP_AUTO_REPAIR = os.getenv("TIME_LOG_ROLLUP_AUTO_REPAIR", "true").lower() == "true"
+
+ROLLUP_PERIODS = ("day", "week", "range")
+
+
+def working_days(start_date: date, end_date: date) -> int:
+    return sum(
+        1 for offset in range((end_date - start_date).days + 1)
+        if (start_date + timedelta(days=offset)).isoweekday() in TIMESHEET_WORKDAYS
+    )
+
+
+class TimeTrackingService:
+    """Timesheet and utilization reads over the daily time-log rollups"""
+
+    def get_rollups(
+        self,
+        start_date: date,
+        end_date: date,
+        period: str = "day",
+        user_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Minutes and log count per (period_start, user_id, project_id) (blocking)"""
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"period must be one of {', '.join(ROLLUP_PERIODS)}")
+        supabase = get_supabase_client()
+        result = supabase.rpc("get_time_log_rollups", {
+            "p_start_date": start_date.isoformat(),
+            "p_end_date": end_date.isoformat(),
+            "p_period": period,
+            "p_user_id": user_id,
+            "p_project_id": project_id,
+        }).execute()
+        return result.data or []
+
+    def get_utilization(
+        self,
+        start_date: date,
+        end_date: date,
+        project_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Logged time vs capacity per employee, split by project (blocking)
+
+        Active employees without logged time are included (0% utilization)
+        unless the report is limited to one project.
+        """
+        rows = self.get_rollups(start_date, end_date, "range", project_id=project_id)
+        supabase = get_supabase_client()
+
+        minutes_by_user: Dict[str, Dict[Optional[str], int]] = defaultdict(dict)
+        for row in rows:
+            minutes_by_user[row["user_id"]][row.get("project_id")] = int(row.get("minutes") or 0)
+
+        employees_query = supabase.table("employees").select("id, user_id, first_name, last_name, department_id")
+        if project_id:
+            user_ids = list(minutes_by_user)
+            employees = employees_query.in_("user_id", user_ids).execute().data if user_ids else []
+        else:
+            employees = employees_query.eq("status", "active").execute().data or []
+        employees_by_user = {employee["user_id"]: employee for employee in employees if employee.get("user_id")}
+
+        project_ids = sorted({pid for projects in minutes_by_user.values() for pid in projects if pid})
+        projects = {}
+        if project_ids:
+            result = supabase.table("projects").select("id, name, project_code").in_("id", project_ids).execute()
+            projects = {project["id"]: project for project in result.data or []}
+
+        capacity_minutes = int(working_days(start_date, end_date) * TIMESHEET_HOURS_PER_DAY * 60)
+        project_totals: Dict[Optional[str], int] = defaultdict(int)
+        report = []
+        for user_id in sorted(set(employees_by_user) | set(minutes_by_user)):
+            employee = employees_by_user.get(user_id, {})
+            by_project = minutes_by_user.get(user_id, {})
+            logged = sum(by_project.values())
+            for pid, minutes in by_project.items():
+                project_totals[pid] += minutes
+            report.append({
+                "user_id": user_id,
+                "employee_id": employee.get("id"),
+                "employee_name": f"{employee.get('first_name', '')} {employee.get('last_name', '')}".strip() or None,
+                "department_id": employee.get("department_id"),
+                "logged_minutes": logged,
+                "capacity_minutes": capacity_minutes,
+                "utilization": round(logged / capacity_minutes * 100, 1) if capacity_minutes else None,
+                "projects": [
+                    {
+                        "project_id": pid,
+                        "project_name": projects.get(pid, {}).get("name") if pid else None,
+                        "minutes": minutes,
+                        "share": round(minutes / logged * 100, 1) if logged else 0.0,
+                    }
+                    for pid, minutes in sorted(by_project.items(), key=lambda item: -item[1])
+                ],
+            })
+
+        total_logged = sum(entry["logged_minutes"] for entry in report)
+        total_capacity = capacity_minutes * len(report)
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "working_days": working_days(start_date, end_date),
+            "hours_per_day": TIMESHEET_HOURS_PER_DAY,
+            "total_logged_minutes": total_logged,
+            "total_capacity_minutes": total_capacity,
+            "utilization": round(total_logged / total_capacity * 100, 1) if total_capacity else None,
+            "employees": sorted(report, key=lambda entry: -entry["logged_minutes"]),
+            "projects": [
+                {
+                    "project_id": pid,
+                    "project_name": projects.get(pid, {}).get("name") if pid else None,
+                    "project_code": projects.get(pid, {}).get("project_code") if pid else None,
+                    "minutes": minutes,
+                }
+                for pid, minutes in sorted(project_totals.items(), key=lambda item: -item[1])
+            ],
+        }
+
+    def check_rollups(self, repair: bool = False) -> Dict[str, Any]:
+        """Compare rollups and tasks.time_spent with the raw logs (blocking)"""
+        supabase = get_supabase_client()
+        result = supabase.rpc("check_time_log_rollups", {"p_repair": repair}).execute()
+        row = (result.data or [{}])[0]
+        return {
+            "rollup_rows_mismatched": row.get("rollup_rows_mismatched", 0),
+            "tasks_mismatched": row.get("tasks_mismatched", 0),
+            "repaired": repair,
+        }
+
+    async def run_periodic_check(self) -> Dict[str, Any]:
+        """Periodic check; logs drift (e.g. logs or tasks edited with the triggers disabled)"""
+        report = await asyncio.to_thread(self.check_rollups, TIME_LOG_ROLLUP_AUTO_REPAIR)
+        if report["rollup_rows_mismatched"] or report["tasks_mismatched"]:
+            action = "repaired" if report["repaired"] else "found"
+            logger.warning(
+                f"Time log rollups: {action} {report['rollup_rows_mismatched']} rollup rows and "
+                f"{report['tasks_mismatched']} tasks out of sync"
+            )
+        return report
+
+
+# Global instance
+time_tracking_service = TimeTrackingService()
@@ -4,15 +4,15 @@ JWT token handling, password hashing, and user authentication
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 import jwt
 from jwt import PyJWTError
-import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from config import settings
 from services.supabase_client import get_supabase_client
+from services.password_hasher import hash_password_sync, password_hasher, verify_password_sync
 from models.user import User, UserRole
 
 security = HTTPBearer()
@@ -80,12 +80,24 @@ def verify_token(token: str) -> dict:
         )
 
 def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash password using bcrypt (blocking; use hash_password_async in routes)"""
+    return hash_password_sync(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    """Verify password against hash (blocking; use verify_password_async in routes)"""
+    return verify_password_sync(plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """Hash password on the bcrypt worker pool"""
+    return await password_hasher.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify password on the bcrypt worker pool"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """Hash many passwords in parallel on the bcrypt worker pool (order preserved)"""
+    return await password_hasher.hash_many(passwords)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Get current authenticated user using Supabase token"""
@@ -0,0 +1,38 @@
+"""
+Keyset pagination helpers
+Opaque cursors over (created_at, id) for newest-first lists. The next page is
+"rows strictly before the last row of this page", which the database answers
+with an index range scan however deep the client pages.
+"""
+
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Opaque cursor for the row after which the next page starts"""
+    return base64.urlsafe_b64encode(f"{created_at}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(created_at, id) of a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        uuid.UUID(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, row_id
+
+
+def before_cursor_filter(cursor: str, column: str = "created_at") -> str:
+    """PostgREST or= filter for rows after the cursor in (column DESC, id DESC) order
+
+    Use as query.or_(before_cursor_filter(cursor)) together with
+    .order(column, desc=True).order("id", desc=True).
+    """
+    created_at, row_id = decode_cursor(cursor)
+    return f'{column}.lt."{created_at}",and({column}.eq."{created_at}",id.lt.{row_id})'
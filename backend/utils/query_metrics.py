@@ -0,0 +1,285 @@
+"""
+Query metrics
+Per-request instrumentation of PostgREST calls made through get_supabase_client().
+
+InstrumentedClient wraps the Supabase client; every .execute() of a table/rpc
+query is timed and recorded (table, operation, duration, rows) into the
+RequestMetrics of the current request (a context variable set by
+middleware/query_metrics.py) and into process-wide histograms exposed by
+/metrics in Prometheus text format.
+"""
+
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("query_metrics")
+
+QUERY_METRICS_ENABLED = os.getenv("QUERY_METRICS_ENABLED", "true").lower() == "true"
+# A request is logged with its query breakdown when it is slower than this
+# or makes more queries than SLOW_REQUEST_QUERY_COUNT (likely N+1)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_QUERY_COUNT = int(os.getenv("SLOW_REQUEST_QUERY_COUNT", "25"))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Builder methods that decide the kind of query
+_OPERATIONS = {"select", "insert", "update", "upsert", "delete"}
+
+
+@dataclass
+class QueryRecord:
+    table: str
+    operation: str
+    duration: float
+    rows: int
+    error: bool = False
+
+
+@dataclass
+class RequestMetrics:
+    """Queries made while handling one request"""
+    request_id: Optional[str] = None
+    started: float = field(default_factory=time.perf_counter)
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    @property
+    def query_count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(q.duration for q in self.queries)
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """Queries grouped by (table, operation), slowest first"""
+        groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for q in self.queries:
+            group = groups.setdefault((q.table, q.operation), {"table": q.table, "operation": q.operation, "count": 0, "ms": 0.0, "rows": 0, "errors": 0})
+            group["count"] += 1
+            group["ms"] += q.duration * 1000
+            group["rows"] += q.rows
+            group["errors"] += int(q.error)
+        for group in groups.values():
+            group["ms"] = round(group["ms"], 1)
+        return sorted(groups.values(), key=lambda g: g["ms"], reverse=True)
+
+
+_current: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar("query_metrics", default=None)
+
+
+def start_request(request_id: Optional[str] = None) -> Tuple[RequestMetrics, contextvars.Token]:
+    metrics = RequestMetrics(request_id=request_id)
+    return metrics, _current.set(metrics)
+
+
+def end_request(token: contextvars.Token):
+    _current.reset(token)
+
+
+def current_request() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+class _Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class QueryMetricsRegistry:
+    """Process-wide histograms per route and per (table, operation)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._request_duration: Dict[Tuple[str, str], _Histogram] = defaultdict(lambda: _Histogram(DURATION_BUCKETS))
+        self._request_queries: Dict[Tuple[str, str], _Histogram] = defaultdict(lambda: _Histogram(QUERY_COUNT_BUCKETS))
+        self._request_db: Dict[Tuple[str, str], _Histogram] = defaultdict(lambda: _Histogram(DURATION_BUCKETS))
+        self._query_duration: Dict[Tuple[str, str], _Histogram] = defaultdict(lambda: _Histogram(DURATION_BUCKETS))
+        self._query_errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        # Called with (method, route, metrics) after each request (query budget checks)
+        self._listeners: List[Callable[[str, str, RequestMetrics], None]] = []
+
+    def add_listener(self, listener: Callable[[str, str, RequestMetrics], None]):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, str, RequestMetrics], None]):
+        self._listeners.remove(listener)
+
+    def record_query(self, record: QueryRecord):
+        with self._lock:
+            self._query_duration[(record.table, record.operation)].observe(record.duration)
+            if record.error:
+                self._query_errors[(record.table, record.operation)] += 1
+
+    def record_request(self, method: str, route: str, duration: float, metrics: RequestMetrics):
+        key = (method, route)
+        with self._lock:
+            self._request_duration[key].observe(duration)
+            self._request_queries[key].observe(metrics.query_count)
+            self._request_db[key].observe(metrics.db_seconds)
+        for listener in list(self._listeners):
+            listener(method, route, metrics)
+
+    def reset(self):
+        with self._lock:
+            for histograms in (self._request_duration, self._request_queries, self._request_db, self._query_duration):
+                histograms.clear()
+            self._query_errors.clear()
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def histogram(name: str, help_text: str, histograms: Dict[Tuple[str, str], _Histogram], label_names: Tuple[str, str]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in sorted(histograms.items()):
+                labels = _labels(**dict(zip(label_names, key)))
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+        with self._lock:
+            histogram("http_request_duration_seconds", "Request duration by route", self._request_duration, ("method", "route"))
+            histogram("http_request_db_queries", "PostgREST queries per request by route", self._request_queries, ("method", "route"))
+            histogram("http_request_db_seconds", "Time spent in PostgREST queries per request by route", self._request_db, ("method", "route"))
+            histogram("db_query_duration_seconds", "PostgREST query duration by table and operation", self._query_duration, ("table", "operation"))
+            lines.append("# HELP db_query_errors_total Failed PostgREST queries by table and operation")
+            lines.append("# TYPE db_query_errors_total counter")
+            for (table, operation), count in sorted(self._query_errors.items()):
+                lines.append(f"db_query_errors_total{{{_labels(table=table, operation=operation)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def log_slow_request(method: str, route: str, path: str, status_code: int, duration: float, metrics: RequestMetrics):
+    """Structured log line with the query breakdown when a request is slow or chatty"""
+    if duration * 1000 < SLOW_REQUEST_MS and metrics.query_count <= SLOW_REQUEST_QUERY_COUNT:
+        return
+    logger.warning(json.dumps({
+        "event": "slow_request",
+        "request_id": metrics.request_id,
+        "method": method,
+        "route": route,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 1),
+        "db_ms": round(metrics.db_seconds * 1000, 1),
+        "query_count": metrics.query_count,
+        "queries": metrics.breakdown()[:15],
+    }, ensure_ascii=False))
+
+
+def _row_count(result: Any) -> int:
+    data = getattr(result, "data", None)
+    if isinstance(data, list):
+        return len(data)
+    return 1 if data else 0
+
+
+class _InstrumentedQuery:
+    """Proxy for a PostgREST request builder; times execute()"""
+
+    __slots__ = ("_target", "_table", "_operation")
+
+    def __init__(self, target: Any, table: str, operation: str):
+        self._target = target
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._target, name)
+        if name == "execute":
+            return self._execute
+        if not callable(attr):
+            # Properties such as .not_ return the builder itself
+            if hasattr(attr, "execute"):
+                return _InstrumentedQuery(attr, self._table, self._operation)
+            return attr
+        operation = name if name in _OPERATIONS else self._operation
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Filters/modifiers return a builder: keep instrumenting the chain
+            if hasattr(result, "execute"):
+                return _InstrumentedQuery(result, self._table, operation)
+            return result
+
+        return call
+
+    def _execute(self, *args, **kwargs):
+        start = time.perf_counter()
+        error = False
+        rows = 0
+        try:
+            result = self._target.execute(*args, **kwargs)
+            rows = _row_count(result)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            record = QueryRecord(self._table, self._operation, time.perf_counter() - start, rows, error)
+            registry.record_query(record)
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.queries.append(record)
+
+
+class InstrumentedClient:
+    """Supabase client wrapper recording every table/rpc query"""
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def table(self, table_name: str):
+        return _InstrumentedQuery(self._client.table(table_name), table_name, "select")
+
+    def from_(self, table_name: str):
+        return _InstrumentedQuery(self._client.from_(table_name), table_name, "select")
+
+    def rpc(self, fn: str, *args, **kwargs):
+        return _InstrumentedQuery(self._client.rpc(fn, *args, **kwargs), f"rpc:{fn}", "rpc")
+
+    @property
+    def raw(self) -> Any:
+        """The wrapped supabase client"""
+        return self._client
+
+    def __getattr__(self, name: str):
+        # storage, auth, postgrest, ... pass through
+        return getattr(self._client, name)
+
+
+# Global instance
+registry = QueryMetricsRegistry()
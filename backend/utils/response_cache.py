@@ -0,0 +1,147 @@
+"""
+Response cache
+In-memory cache of serialized JSON responses for read-heavy reference endpoints
+(dropdowns, statuses, categories). Responses carry a strong ETag; a request whose
+If-None-Match matches gets an empty 304, so repeat loads cost no database
+round-trip and almost no bandwidth.
+
+Entries are grouped by namespace and dropped by the write endpoints of that data
+(response_cache.invalidate("customers")). The cache is per process, so the TTL
+bounds staleness for writes made by other workers or directly in the database.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Clients always revalidate (cheap 304) instead of using a possibly stale copy
+CACHE_CONTROL = "private, no-cache"
+
+
+@lru_cache(maxsize=64)
+def _type_adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _serialize(data: Any, response_model: Any = None) -> bytes:
+    """JSON body as FastAPI would produce it (validated through response_model if given)"""
+    if response_model is not None:
+        adapter = _type_adapter(response_model)
+        return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return json.dumps(
+        jsonable_encoder(data), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison as required for If-None-Match (RFC 9110 13.1.2)
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    """LRU/TTL cache of (body, ETag) keyed by namespace and request parameters"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _get(self, cache_key: Tuple[str, Hashable]) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[cache_key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def _set(self, cache_key: Tuple[str, Hashable], body: bytes, etag: str):
+        with self._lock:
+            self._entries[cache_key] = (time.monotonic(), body, etag)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def respond(
+        self,
+        request: Request,
+        namespace: str,
+        key: Hashable,
+        build: Callable[[], Any],
+        response_model: Any = None
+    ) -> Response:
+        """Serve a cached JSON response, building and caching it on a miss
+
+        Args:
+            request: Incoming request (for If-None-Match)
+            namespace: Invalidation group, e.g. "customers"
+            key: Hashable request parameters that change the response
+            build: Returns the response data (sync or async); exceptions propagate
+                   and nothing is cached
+            response_model: The route's response_model, applied like FastAPI does
+        """
+        cache_key = (namespace, key)
+        cached = self._get(cache_key) if RESPONSE_CACHE_ENABLED else None
+        if cached is None:
+            data = build()
+            if inspect.isawaitable(data):
+                data = await data
+            body = _serialize(data, response_model)
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            if RESPONSE_CACHE_ENABLED:
+                self._set(cache_key, body, etag)
+        else:
+            body, etag = cached
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *namespaces: str):
+        """Drop all cached responses of the given namespaces"""
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] in namespaces]:
+                del self._entries[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+# Global instance
+response_cache = ResponseCache()
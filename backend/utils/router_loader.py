@@ -0,0 +1,109 @@
+"""
+Router loader
+Registers API routers either eagerly or deferred, so the server can answer
+/health and auth requests before the heavy report/import modules are imported.
+
+Deferred routers are imported in a worker thread after startup and included in
+their original order; requests for them wait until loading has finished
+(see middleware/deferred_routes.py).
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+# LAZY_ROUTERS=false imports every router at startup (previous behaviour)
+LAZY_ROUTERS = os.getenv("LAZY_ROUTERS", "true").lower() == "true"
+
+
+class RouterLoader:
+    """Eager/deferred router registration for one FastAPI app"""
+
+    def __init__(self, app: FastAPI, package: str = "routers", lazy: bool = LAZY_ROUTERS):
+        self.app = app
+        self.package = package
+        self.lazy = lazy
+        # Path prefixes served without waiting for deferred routers
+        self.eager_paths: List[str] = []
+        self._deferred: List[Tuple[str, Optional[str], Optional[List[str]]]] = []
+        self._loaded = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.load_seconds: Optional[float] = None
+        self.failed: List[str] = []
+        if not lazy:
+            self._loaded.set()
+
+    def include(self, module_name: str, prefix: Optional[str] = None, tags: Optional[List[str]] = None, eager: bool = False):
+        """Register routers.<module_name>.router (same arguments as app.include_router)"""
+        if eager or not self.lazy:
+            self._include(importlib.import_module(f"{self.package}.{module_name}"), prefix, tags)
+            if eager and prefix:
+                self.eager_paths.append(prefix)
+        else:
+            self._deferred.append((module_name, prefix, tags))
+
+    def _include(self, module, prefix: Optional[str], tags: Optional[List[str]]):
+        kwargs = {}
+        if prefix:
+            kwargs["prefix"] = prefix
+        if tags:
+            kwargs["tags"] = tags
+        self.app.include_router(module.router, **kwargs)
+
+    @property
+    def deferred_modules(self) -> List[str]:
+        """Router modules waiting for background import, in registration order"""
+        return list(dict.fromkeys(module_name for module_name, _, _ in self._deferred))
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded.is_set()
+
+    def start(self):
+        """Start importing deferred routers in the background (call from lifespan)"""
+        if self._task is None and not self.loaded:
+            self._task = asyncio.create_task(self._load_deferred())
+
+    async def wait(self):
+        """Wait until deferred routers are included (starts loading if needed)"""
+        if not self.loaded:
+            self.start()
+            await self._loaded.wait()
+
+    async def _load_deferred(self):
+        start = time.perf_counter()
+        modules = {}
+        try:
+            for module_name, prefix, tags in self._deferred:
+                # The same module may be registered under several prefixes
+                if module_name not in modules:
+                    try:
+                        modules[module_name] = await asyncio.to_thread(importlib.import_module, f"{self.package}.{module_name}")
+                    except Exception as e:
+                        logger.error(f"Failed to import router {module_name}: {e}")
+                        self.failed.append(module_name)
+                        modules[module_name] = None
+                if modules[module_name] is not None:
+                    # include_router runs on the event loop, never concurrently with routing
+                    self._include(modules[module_name], prefix, tags)
+        finally:
+            # Regenerate /openapi.json with the new routes
+            self.app.openapi_schema = None
+            self.load_seconds = time.perf_counter() - start
+            self._loaded.set()
+            logger.info(f"Deferred routers loaded in {self.load_seconds:.2f}s ({len(modules)} modules, {len(self.failed)} failed)")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
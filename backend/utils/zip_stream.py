@@ -0,0 +1,157 @@
+"""
+Streaming ZIP utilities
+Build a ZIP archive from remote files and yield it chunk by chunk, so large
+exports start immediately and use constant memory
+"""
+
+import asyncio
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+
+import requests
+
+# Parallel downloads; also the number of files buffered ahead of the writer
+ZIP_DOWNLOAD_CONCURRENCY = int(os.getenv("ZIP_DOWNLOAD_CONCURRENCY", "4"))
+ZIP_CHUNK_SIZE = 256 * 1024
+# Downloads larger than this spill from memory to disk
+ZIP_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+ZIP_DOWNLOAD_TIMEOUT = 30
+
+# Already compressed formats are stored as-is (deflating them wastes CPU)
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.mp4', '.mov', '.zip', '.rar', '.7z', '.pdf', '.docx', '.xlsx', '.pptx'
+}
+
+_http = requests.Session()
+
+
+class _ZipOutput:
+    """Write-only, non-seekable sink: ZipFile writes into it, the generator drains it"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _download(url: str) -> Tuple[tempfile.SpooledTemporaryFile, int]:
+    """Download url into a spooled temp file (runs in a worker thread)"""
+    spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_SIZE)
+    try:
+        with _http.get(url, stream=True, timeout=ZIP_DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            size = 0
+            for chunk in response.iter_content(chunk_size=ZIP_CHUNK_SIZE):
+                spool.write(chunk)
+                size += len(chunk)
+        spool.seek(0)
+        return spool, size
+    except Exception:
+        spool.close()
+        raise
+
+
+def _unique_name(name: str, used: set) -> str:
+    if name not in used:
+        used.add(name)
+        return name
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while f"{stem} ({counter}){ext}" in used:
+        counter += 1
+    name = f"{stem} ({counter}){ext}"
+    used.add(name)
+    return name
+
+
+async def stream_zip_from_urls(
+    files: List[Tuple[str, str]],
+    max_concurrency: int = ZIP_DOWNLOAD_CONCURRENCY
+) -> AsyncIterator[bytes]:
+    """Yield a ZIP archive of remote files as it is built
+
+    Files are downloaded with bounded concurrency and added in completion order.
+    At most max_concurrency files are in flight or waiting to be written.
+    Files that fail to download are skipped.
+
+    Args:
+        files: [(path inside the archive, url), ...]
+        max_concurrency: Parallel downloads
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(max_concurrency)
+    tasks = set()
+
+    async def fetch(arcname: str, url: str):
+        try:
+            spool, size = await asyncio.to_thread(_download, url)
+            await queue.put((arcname, spool, size))
+        except Exception as e:
+            print(f"Error downloading file {arcname}: {e}")
+            await queue.put((arcname, None, 0))
+
+    async def schedule():
+        for arcname, url in files:
+            await slots.acquire()
+            task = asyncio.create_task(fetch(arcname, url))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    scheduler = asyncio.create_task(schedule())
+    output = _ZipOutput()
+    used_names: set = set()
+    try:
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for _ in range(len(files)):
+                arcname, spool, size = await queue.get()
+                try:
+                    if spool is None:
+                        continue
+                    info = zipfile.ZipInfo(_unique_name(arcname, used_names), date_time=datetime.now().timetuple()[:6])
+                    extension = os.path.splitext(arcname)[1].lower()
+                    info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                    # Known size lets zipfile decide on ZIP64 for very large files
+                    info.file_size = size
+                    with zip_file.open(info, 'w') as entry:
+                        for chunk in iter(lambda: spool.read(ZIP_CHUNK_SIZE), b""):
+                            entry.write(chunk)
+                            data = output.drain()
+                            if data:
+                                yield data
+                    data = output.drain()
+                    if data:
+                        yield data
+                finally:
+                    if spool is not None:
+                        spool.close()
+                    slots.release()
+        # Central directory
+        yield output.drain()
+    finally:
+        # Client disconnected or archive finished: stop outstanding downloads
+        scheduler.cancel()
+        for task in list(tasks):
+            task.cancel()
+        while not queue.empty():
+            _, spool, _ = queue.get_nowait()
+            if spool is not None:
+                spool.close()
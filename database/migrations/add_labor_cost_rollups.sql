@@ -0,0 +1,303 @@
+-- =====================================================
+-- LABOR COST ROLLUPS
+-- Chi phí nhân công cộng dồn theo (dự án, nhân viên, tháng) cho báo cáo lợi nhuận:
+-- trigger trên time_entries (POST /projects/{id}/time-entries) cộng giờ x đơn giá,
+-- trigger trên task_time_logs cộng thời lượng log khi dừng x chi phí giờ của nhân
+-- viên. Báo cáo lợi nhuận / so sánh dự án đọc bảng tổng hợp thay vì quét toàn bộ
+-- time_entries (services/labor_cost_service.py). check_labor_cost_rollups(true)
+-- tính lại toàn bộ lịch sử (scripts/backfill_labor_cost_rollups.py)
+-- Cần chạy sau add_time_log_rollups.sql (task_time_logs.duration_minutes, project_id)
+-- =====================================================
+
+-- Số giờ công chuẩn một tháng (22 ngày x 8 giờ): chi phí giờ = lương tháng / số giờ
+CREATE OR REPLACE FUNCTION labor_hours_per_month()
+RETURNS NUMERIC AS $$
+    SELECT 176::numeric;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Nhân viên của một người dùng (log thời gian lưu user_id)
+CREATE OR REPLACE FUNCTION employee_for_user(p_user_id UUID)
+RETURNS UUID AS $$
+    SELECT id FROM employees WHERE user_id = p_user_id ORDER BY created_at LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION employee_hourly_cost(p_user_id UUID)
+RETURNS NUMERIC AS $$
+    SELECT COALESCE(salary, 0) / labor_hours_per_month()
+    FROM employees WHERE user_id = p_user_id ORDER BY created_at LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+-- time_entries có nơi dùng hours, nơi dùng hours_worked; ngày là date (hoặc entry_date)
+CREATE OR REPLACE FUNCTION time_entry_hours(p_row JSONB)
+RETURNS NUMERIC AS $$
+    SELECT COALESCE((p_row->>'hours_worked')::numeric, (p_row->>'hours')::numeric, 0);
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION time_entry_month(p_row JSONB)
+RETURNS DATE AS $$
+    SELECT date_trunc('month', LEFT(COALESCE(p_row->>'date', p_row->>'entry_date', p_row->>'date_worked', p_row->>'created_at'), 10)::date)::date;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Chi phí giờ chốt tại thời điểm dừng log: tăng lương sau đó không đổi chi phí cũ
+ALTER TABLE task_time_logs ADD COLUMN IF NOT EXISTS hourly_cost DECIMAL(12,2);
+
+UPDATE task_time_logs
+SET hourly_cost = COALESCE(employee_hourly_cost(user_id), 0)
+WHERE end_time IS NOT NULL AND hourly_cost IS NULL;
+
+CREATE TABLE IF NOT EXISTS project_labor_cost_rollups (
+    -- Dữ liệu dẫn xuất, không khóa ngoại (xem time_log_daily_rollups)
+    project_id UUID NOT NULL,
+    employee_id UUID,                           -- NULL: chưa gắn nhân viên
+    month DATE NOT NULL,                        -- ngày đầu tháng
+    entry_hours NUMERIC NOT NULL DEFAULT 0,     -- từ time_entries
+    entry_cost NUMERIC NOT NULL DEFAULT 0,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    log_hours NUMERIC NOT NULL DEFAULT 0,       -- từ task_time_logs
+    log_cost NUMERIC NOT NULL DEFAULT 0,
+    log_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_project_labor_cost_rollups_key
+ON project_labor_cost_rollups(project_id, (COALESCE(employee_id, '00000000-0000-0000-0000-000000000000'::uuid)), month);
+
+CREATE INDEX IF NOT EXISTS idx_project_labor_cost_rollups_month
+ON project_labor_cost_rollups(month);
+
+CREATE OR REPLACE FUNCTION apply_labor_cost_delta(
+    p_project_id UUID,
+    p_employee_id UUID,
+    p_month DATE,
+    p_entry_hours NUMERIC,
+    p_entry_cost NUMERIC,
+    p_entries INTEGER,
+    p_log_hours NUMERIC,
+    p_log_cost NUMERIC,
+    p_logs INTEGER
+)
+RETURNS void AS $$
+BEGIN
+    IF p_project_id IS NULL OR p_month IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO project_labor_cost_rollups (
+        project_id, employee_id, month,
+        entry_hours, entry_cost, entry_count, log_hours, log_cost, log_count
+    )
+    VALUES (
+        p_project_id, p_employee_id, p_month,
+        GREATEST(p_entry_hours, 0), GREATEST(p_entry_cost, 0), GREATEST(p_entries, 0),
+        GREATEST(p_log_hours, 0), GREATEST(p_log_cost, 0), GREATEST(p_logs, 0)
+    )
+    ON CONFLICT (project_id, (COALESCE(employee_id, '00000000-0000-0000-0000-000000000000'::uuid)), month)
+    DO UPDATE SET
+        entry_hours = project_labor_cost_rollups.entry_hours + p_entry_hours,
+        entry_cost = project_labor_cost_rollups.entry_cost + p_entry_cost,
+        entry_count = project_labor_cost_rollups.entry_count + p_entries,
+        log_hours = project_labor_cost_rollups.log_hours + p_log_hours,
+        log_cost = project_labor_cost_rollups.log_cost + p_log_cost,
+        log_count = project_labor_cost_rollups.log_count + p_logs,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- =====================================================
+-- time_entries: trừ phần cũ, cộng phần mới
+-- =====================================================
+CREATE OR REPLACE FUNCTION time_entries_apply_labor_costs()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row JSONB;
+    v_hours NUMERIC;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_row := to_jsonb(OLD);
+        v_hours := time_entry_hours(v_row);
+        PERFORM apply_labor_cost_delta(
+            OLD.project_id, OLD.employee_id, time_entry_month(v_row),
+            -v_hours, -v_hours * COALESCE(OLD.hourly_rate, 0), -1, 0, 0, 0
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_row := to_jsonb(NEW);
+        v_hours := time_entry_hours(v_row);
+        PERFORM apply_labor_cost_delta(
+            NEW.project_id, NEW.employee_id, time_entry_month(v_row),
+            v_hours, v_hours * COALESCE(NEW.hourly_rate, 0), 1, 0, 0, 0
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_time_entries_labor_costs ON time_entries;
+CREATE TRIGGER trg_time_entries_labor_costs
+    AFTER INSERT OR UPDATE OR DELETE ON time_entries
+    FOR EACH ROW EXECUTE FUNCTION time_entries_apply_labor_costs();
+
+-- =====================================================
+-- task_time_logs: chỉ log đã kết thúc, nhiệm vụ thuộc dự án
+-- =====================================================
+CREATE OR REPLACE FUNCTION set_time_log_hourly_cost()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.end_time IS NOT NULL AND NEW.hourly_cost IS NULL THEN
+        NEW.hourly_cost := COALESCE(employee_hourly_cost(NEW.user_id), 0);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_time_log_hourly_cost ON task_time_logs;
+CREATE TRIGGER trg_time_log_hourly_cost
+    BEFORE INSERT OR UPDATE OF end_time ON task_time_logs
+    FOR EACH ROW EXECUTE FUNCTION set_time_log_hourly_cost();
+
+CREATE OR REPLACE FUNCTION time_logs_apply_labor_costs()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_hours NUMERIC;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.end_time IS NOT NULL THEN
+        v_hours := COALESCE(OLD.duration_minutes, 0) / 60.0;
+        PERFORM apply_labor_cost_delta(
+            OLD.project_id,
+            employee_for_user(OLD.user_id),
+            date_trunc('month', OLD.start_time AT TIME ZONE 'Asia/Ho_Chi_Minh')::date,
+            0, 0, 0, -v_hours, -v_hours * COALESCE(OLD.hourly_cost, 0), -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.end_time IS NOT NULL THEN
+        v_hours := COALESCE(NEW.duration_minutes, 0) / 60.0;
+        PERFORM apply_labor_cost_delta(
+            NEW.project_id,
+            employee_for_user(NEW.user_id),
+            date_trunc('month', NEW.start_time AT TIME ZONE 'Asia/Ho_Chi_Minh')::date,
+            0, 0, 0, v_hours, v_hours * COALESCE(NEW.hourly_cost, 0), 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_time_logs_labor_costs ON task_time_logs;
+CREATE TRIGGER trg_time_logs_labor_costs
+    AFTER INSERT OR DELETE OR UPDATE OF task_id, user_id, start_time, end_time, hourly_cost ON task_time_logs
+    FOR EACH ROW EXECUTE FUNCTION time_logs_apply_labor_costs();
+
+-- Nhiệm vụ chuyển dự án: chuyển chi phí các log sang dự án mới
+-- (trg_tasks_move_time_logs cập nhật task_time_logs.project_id)
+CREATE OR REPLACE FUNCTION tasks_move_labor_costs()
+RETURNS TRIGGER AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT employee_for_user(user_id) AS employee_id,
+               date_trunc('month', start_time AT TIME ZONE 'Asia/Ho_Chi_Minh')::date AS month,
+               SUM(COALESCE(duration_minutes, 0) / 60.0) AS hours,
+               SUM(COALESCE(duration_minutes, 0) / 60.0 * COALESCE(hourly_cost, 0)) AS cost,
+               COUNT(*)::int AS logs
+        FROM task_time_logs
+        WHERE task_id = NEW.id AND end_time IS NOT NULL
+        GROUP BY 1, 2
+    LOOP
+        PERFORM apply_labor_cost_delta(OLD.project_id, r.employee_id, r.month, 0, 0, 0, -r.hours, -r.cost, -r.logs);
+        PERFORM apply_labor_cost_delta(NEW.project_id, r.employee_id, r.month, 0, 0, 0, r.hours, r.cost, r.logs);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_tasks_move_labor_costs ON tasks;
+CREATE TRIGGER trg_tasks_move_labor_costs
+    AFTER UPDATE OF project_id ON tasks
+    FOR EACH ROW
+    WHEN (OLD.project_id IS DISTINCT FROM NEW.project_id)
+    EXECUTE FUNCTION tasks_move_labor_costs();
+
+-- =====================================================
+-- Kiểm tra / tính lại: số dòng tổng hợp bị lệch so với dữ liệu thực tế,
+-- p_repair = true thì tính lại toàn bộ (kể cả chi phí giờ còn thiếu của log cũ)
+-- =====================================================
+CREATE OR REPLACE VIEW labor_cost_rollups_actual AS
+    SELECT project_id,
+           employee_id,
+           month,
+           SUM(entry_hours) AS entry_hours,
+           SUM(entry_cost) AS entry_cost,
+           SUM(entry_count)::int AS entry_count,
+           SUM(log_hours) AS log_hours,
+           SUM(log_cost) AS log_cost,
+           SUM(log_count)::int AS log_count
+    FROM (
+        SELECT e.project_id,
+               e.employee_id,
+               time_entry_month(to_jsonb(e)) AS month,
+               time_entry_hours(to_jsonb(e)) AS entry_hours,
+               time_entry_hours(to_jsonb(e)) * COALESCE(e.hourly_rate, 0) AS entry_cost,
+               1 AS entry_count,
+               0::numeric AS log_hours,
+               0::numeric AS log_cost,
+               0 AS log_count
+        FROM time_entries e
+        WHERE e.project_id IS NOT NULL
+        UNION ALL
+        SELECT l.project_id,
+               employee_for_user(l.user_id),
+               date_trunc('month', l.start_time AT TIME ZONE 'Asia/Ho_Chi_Minh')::date,
+               0, 0, 0,
+               COALESCE(l.duration_minutes, 0) / 60.0,
+               COALESCE(l.duration_minutes, 0) / 60.0 * COALESCE(l.hourly_cost, 0),
+               1
+        FROM task_time_logs l
+        WHERE l.end_time IS NOT NULL AND l.project_id IS NOT NULL
+    ) s
+    GROUP BY 1, 2, 3;
+
+CREATE OR REPLACE FUNCTION check_labor_cost_rollups(p_repair BOOLEAN DEFAULT false)
+RETURNS TABLE(rollup_rows_mismatched INTEGER) AS $$
+DECLARE
+    v_rollups INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO v_rollups
+    FROM labor_cost_rollups_actual a
+    FULL OUTER JOIN (
+        SELECT * FROM project_labor_cost_rollups WHERE entry_count > 0 OR log_count > 0
+    ) r
+        ON r.project_id = a.project_id
+       AND COALESCE(r.employee_id, '00000000-0000-0000-0000-000000000000'::uuid)
+         = COALESCE(a.employee_id, '00000000-0000-0000-0000-000000000000'::uuid)
+       AND r.month = a.month
+    WHERE (r.entry_hours, r.entry_cost, r.entry_count, r.log_hours, r.log_cost, r.log_count)
+          IS DISTINCT FROM
+          (a.entry_hours, a.entry_cost, a.entry_count, a.log_hours, a.log_cost, a.log_count);
+
+    IF p_repair THEN
+        UPDATE task_time_logs
+        SET hourly_cost = COALESCE(employee_hourly_cost(user_id), 0)
+        WHERE end_time IS NOT NULL AND hourly_cost IS NULL;
+    END IF;
+
+    IF p_repair AND v_rollups > 0 THEN
+        DELETE FROM project_labor_cost_rollups;
+        INSERT INTO project_labor_cost_rollups (
+            project_id, employee_id, month,
+            entry_hours, entry_cost, entry_count, log_hours, log_cost, log_count
+        )
+        SELECT project_id, employee_id, month,
+               entry_hours, entry_cost, entry_count, log_hours, log_cost, log_count
+        FROM labor_cost_rollups_actual;
+    END IF;
+
+    RETURN QUERY SELECT v_rollups;
+END;
+$$ LANGUAGE plpgsql;
+
+-- RLS - chỉ service role truy cập
+ALTER TABLE project_labor_cost_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Khởi tạo từ dữ liệu hiện có
+SELECT * FROM check_labor_cost_rollups(true);
@@ -0,0 +1,164 @@
+-- =====================================================
+-- TASK COUNTERS
+-- Cột đếm trên tasks (bình luận, tệp đính kèm, người được gán, tiến độ checklist)
+-- được trigger cập nhật khi thêm/xóa, để đọc thẻ nhiệm vụ không cần truy vấn
+-- tổng hợp. check_task_counters() so sánh với số thực tế và sửa lệch
+-- (services/task_counter_service.py, scripts/repair_task_counters.py)
+-- Chạy sau create_task_board_stats.sql (dùng get_task_card_stats)
+-- =====================================================
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS attachment_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS assignee_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS checklist_item_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS checklist_completed_count INTEGER NOT NULL DEFAULT 0;
+
+-- Cộng/trừ 1 vào cột đếm (tên cột truyền qua TG_ARGV[0])
+CREATE OR REPLACE FUNCTION bump_task_counter()
+RETURNS TRIGGER AS $$
+DECLARE
+    counter_column TEXT := TG_ARGV[0];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format('UPDATE tasks SET %1$I = %1$I + 1 WHERE id = $1', counter_column) USING NEW.task_id;
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE format('UPDATE tasks SET %1$I = GREATEST(%1$I - 1, 0) WHERE id = $1', counter_column) USING OLD.task_id;
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_task_comment_count ON task_comments;
+CREATE TRIGGER trg_task_comment_count
+    AFTER INSERT OR DELETE ON task_comments
+    FOR EACH ROW EXECUTE FUNCTION bump_task_counter('comment_count');
+
+DROP TRIGGER IF EXISTS trg_task_attachment_count ON task_attachments;
+CREATE TRIGGER trg_task_attachment_count
+    AFTER INSERT OR DELETE ON task_attachments
+    FOR EACH ROW EXECUTE FUNCTION bump_task_counter('attachment_count');
+
+DROP TRIGGER IF EXISTS trg_task_assignee_count ON task_assignments;
+CREATE TRIGGER trg_task_assignee_count
+    AFTER INSERT OR DELETE ON task_assignments
+    FOR EACH ROW EXECUTE FUNCTION bump_task_counter('assignee_count');
+
+-- Tiến độ checklist: tính lại cho nhiệm vụ (ít dòng), đúng cả khi item đổi
+-- trạng thái hoặc cả checklist bị xóa (cascade)
+CREATE OR REPLACE FUNCTION refresh_task_checklist_counts(p_task_id UUID)
+RETURNS void AS $$
+    UPDATE tasks t SET
+        checklist_item_count = s.total,
+        checklist_completed_count = s.done
+    FROM (
+        SELECT COUNT(i.id)::int AS total,
+               COUNT(i.id) FILTER (WHERE i.is_completed)::int AS done
+        FROM task_checklists cl
+        JOIN task_checklist_items i ON i.checklist_id = cl.id
+        WHERE cl.task_id = p_task_id
+    ) s
+    WHERE t.id = p_task_id
+      AND (t.checklist_item_count, t.checklist_completed_count) IS DISTINCT FROM (s.total, s.done);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION task_checklist_items_refresh_counts()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_task_id UUID;
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.checklist_id = OLD.checklist_id
+       AND NEW.is_completed IS NOT DISTINCT FROM OLD.is_completed THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT task_id INTO v_task_id FROM task_checklists WHERE id = NEW.checklist_id;
+        IF v_task_id IS NOT NULL THEN
+            PERFORM refresh_task_checklist_counts(v_task_id);
+        END IF;
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND NEW.checklist_id <> OLD.checklist_id) THEN
+        SELECT task_id INTO v_task_id FROM task_checklists WHERE id = OLD.checklist_id;
+        -- Checklist đã bị xóa (cascade): trigger của task_checklists xử lý
+        IF v_task_id IS NOT NULL THEN
+            PERFORM refresh_task_checklist_counts(v_task_id);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_task_checklist_item_counts ON task_checklist_items;
+CREATE TRIGGER trg_task_checklist_item_counts
+    AFTER INSERT OR UPDATE OR DELETE ON task_checklist_items
+    FOR EACH ROW EXECUTE FUNCTION task_checklist_items_refresh_counts();
+
+CREATE OR REPLACE FUNCTION task_checklists_refresh_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_task_checklist_counts(OLD.task_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_task_checklist_counts ON task_checklists;
+CREATE TRIGGER trg_task_checklist_counts
+    AFTER DELETE ON task_checklists
+    FOR EACH ROW EXECUTE FUNCTION task_checklists_refresh_counts();
+
+-- =====================================================
+-- Kiểm tra / sửa lệch: trả về các nhiệm vụ có cột đếm khác số thực tế,
+-- p_repair = true thì cập nhật lại
+-- =====================================================
+CREATE OR REPLACE FUNCTION check_task_counters(p_repair BOOLEAN DEFAULT false, p_limit INTEGER DEFAULT 1000)
+RETURNS TABLE(task_id UUID, stored JSONB, actual JSONB) AS $$
+BEGIN
+    RETURN QUERY
+    WITH actual_counts AS (
+        SELECT * FROM get_task_card_stats(ARRAY(SELECT id FROM tasks))
+    ),
+    mismatched AS (
+        SELECT t.id,
+               jsonb_build_object(
+                   'comment_count', t.comment_count,
+                   'attachment_count', t.attachment_count,
+                   'assignee_count', t.assignee_count,
+                   'checklist_item_count', t.checklist_item_count,
+                   'checklist_completed_count', t.checklist_completed_count
+               ) AS stored_counts,
+               jsonb_build_object(
+                   'comment_count', a.comment_count,
+                   'attachment_count', a.attachment_count,
+                   'assignee_count', a.assignee_count,
+                   'checklist_item_count', a.checklist_item_count,
+                   'checklist_completed_count', a.checklist_completed_count
+               ) AS actual_counts_json,
+               a.comment_count, a.attachment_count, a.assignee_count,
+               a.checklist_item_count, a.checklist_completed_count
+        FROM tasks t
+        JOIN actual_counts a ON a.task_id = t.id
+        WHERE (t.comment_count, t.attachment_count, t.assignee_count, t.checklist_item_count, t.checklist_completed_count)
+              IS DISTINCT FROM
+              (a.comment_count, a.attachment_count, a.assignee_count, a.checklist_item_count, a.checklist_completed_count)
+        LIMIT p_limit
+    ),
+    repaired AS (
+        UPDATE tasks t SET
+            comment_count = m.comment_count,
+            attachment_count = m.attachment_count,
+            assignee_count = m.assignee_count,
+            checklist_item_count = m.checklist_item_count,
+            checklist_completed_count = m.checklist_completed_count
+        FROM mismatched m
+        WHERE p_repair AND t.id = m.id
+        RETURNING t.id
+    )
+    SELECT m.id, m.stored_counts, m.actual_counts_json
+    FROM mismatched m;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Khởi tạo giá trị từ dữ liệu hiện có
+SELECT COUNT(*) FROM check_task_counters(true, 2147483647);
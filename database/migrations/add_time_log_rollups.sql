@@ -0,0 +1,283 @@
+-- =====================================================
+-- TIME LOG ROLLUPS
+-- Cộng dồn thời gian làm việc theo kiểu tăng dần: trigger trên task_time_logs
+-- cộng thời lượng khi log được dừng, trừ khi log bị xóa, vào tasks.time_spent
+-- và bảng tổng hợp theo ngày (người dùng, dự án, ngày). Bảng công (ngày/tuần)
+-- và báo cáo hiệu suất sử dụng đọc từ bảng tổng hợp thay vì quét log thô
+-- (services/time_tracking_service.py). check_time_log_rollups() so sánh với
+-- dữ liệu thực tế và sửa lệch. Log lưu sẵn project_id của nhiệm vụ: khi nhiệm vụ
+-- bị xóa hẳn (log bị xóa theo cascade) vẫn trừ đúng dự án; nhiệm vụ chuyển dự án
+-- thì trigger trên tasks chuyển số phút sang dự án mới
+-- Ngày làm việc tính theo giờ Việt Nam (DEFAULT_TIMEZONE), theo thời điểm bắt đầu log
+-- =====================================================
+
+-- Thời lượng (phút) lưu sẵn khi log kết thúc, đọc không cần tính lại
+ALTER TABLE task_time_logs ADD COLUMN IF NOT EXISTS duration_minutes INTEGER;
+
+UPDATE task_time_logs
+SET duration_minutes = GREATEST(FLOOR(EXTRACT(EPOCH FROM (end_time - start_time)) / 60), 0)::int
+WHERE end_time IS NOT NULL AND duration_minutes IS NULL;
+
+-- Dự án của nhiệm vụ, lưu trên log (trigger trg_time_log_project, trg_tasks_move_time_logs)
+ALTER TABLE task_time_logs ADD COLUMN IF NOT EXISTS project_id UUID;
+
+UPDATE task_time_logs l
+SET project_id = t.project_id
+FROM tasks t
+WHERE t.id = l.task_id AND l.project_id IS DISTINCT FROM t.project_id;
+
+CREATE TABLE IF NOT EXISTS time_log_daily_rollups (
+    -- Dữ liệu dẫn xuất, không khóa ngoại: trigger còn ghi vào đây khi xóa
+    -- người dùng/dự án (log bị xóa hoặc đổi user_id theo cascade)
+    user_id UUID NOT NULL,
+    project_id UUID,                            -- NULL: nhiệm vụ không thuộc dự án
+    work_date DATE NOT NULL,
+    minutes INTEGER NOT NULL DEFAULT 0,
+    log_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Khóa (người dùng, dự án, ngày); project_id NULL gộp chung một dòng
+CREATE UNIQUE INDEX IF NOT EXISTS idx_time_log_daily_rollups_key
+ON time_log_daily_rollups(user_id, (COALESCE(project_id, '00000000-0000-0000-0000-000000000000'::uuid)), work_date);
+
+CREATE INDEX IF NOT EXISTS idx_time_log_daily_rollups_date
+ON time_log_daily_rollups(work_date);
+
+CREATE INDEX IF NOT EXISTS idx_time_log_daily_rollups_project_date
+ON time_log_daily_rollups(project_id, work_date);
+
+-- Cộng/trừ phút vào bảng tổng hợp theo ngày
+CREATE OR REPLACE FUNCTION apply_time_log_rollup_delta(
+    p_user_id UUID,
+    p_project_id UUID,
+    p_work_date DATE,
+    p_minutes INTEGER,
+    p_logs INTEGER
+)
+RETURNS void AS $$
+BEGIN
+    IF p_user_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO time_log_daily_rollups (user_id, project_id, work_date, minutes, log_count)
+    VALUES (p_user_id, p_project_id, p_work_date, GREATEST(p_minutes, 0), GREATEST(p_logs, 0))
+    ON CONFLICT (user_id, (COALESCE(project_id, '00000000-0000-0000-0000-000000000000'::uuid)), work_date)
+    DO UPDATE SET
+        minutes = GREATEST(time_log_daily_rollups.minutes + p_minutes, 0),
+        log_count = GREATEST(time_log_daily_rollups.log_count + p_logs, 0),
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Cộng/trừ phút của một log vào nhiệm vụ và bảng tổng hợp
+-- (dự án lấy từ log: nhiệm vụ có thể đã bị xóa)
+DROP FUNCTION IF EXISTS apply_time_log_delta(UUID, UUID, TIMESTAMP WITH TIME ZONE, INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION apply_time_log_delta(
+    p_task_id UUID,
+    p_user_id UUID,
+    p_project_id UUID,
+    p_start_time TIMESTAMP WITH TIME ZONE,
+    p_minutes INTEGER,
+    p_logs INTEGER
+)
+RETURNS void AS $$
+BEGIN
+    UPDATE tasks
+    SET time_spent = GREATEST(COALESCE(time_spent, 0) + p_minutes, 0)
+    WHERE id = p_task_id;
+
+    PERFORM apply_time_log_rollup_delta(
+        p_user_id, p_project_id, (p_start_time AT TIME ZONE 'Asia/Ho_Chi_Minh')::date, p_minutes, p_logs
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tính thời lượng khi log có end_time
+CREATE OR REPLACE FUNCTION set_time_log_duration()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.end_time IS NULL THEN
+        NEW.duration_minutes := NULL;
+    ELSE
+        NEW.duration_minutes := GREATEST(FLOOR(EXTRACT(EPOCH FROM (NEW.end_time - NEW.start_time)) / 60), 0)::int;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_time_log_duration ON task_time_logs;
+CREATE TRIGGER trg_time_log_duration
+    BEFORE INSERT OR UPDATE OF start_time, end_time ON task_time_logs
+    FOR EACH ROW EXECUTE FUNCTION set_time_log_duration();
+
+-- Lưu dự án của nhiệm vụ khi tạo log / chuyển log sang nhiệm vụ khác
+CREATE OR REPLACE FUNCTION set_time_log_project()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.project_id := (SELECT project_id FROM tasks WHERE id = NEW.task_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_time_log_project ON task_time_logs;
+CREATE TRIGGER trg_time_log_project
+    BEFORE INSERT OR UPDATE OF task_id ON task_time_logs
+    FOR EACH ROW EXECUTE FUNCTION set_time_log_project();
+
+-- Chỉ log đã kết thúc được tính: trừ phần cũ, cộng phần mới
+CREATE OR REPLACE FUNCTION time_logs_apply_rollups()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.end_time IS NOT NULL THEN
+        PERFORM apply_time_log_delta(OLD.task_id, OLD.user_id, OLD.project_id, OLD.start_time, -OLD.duration_minutes, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.end_time IS NOT NULL THEN
+        PERFORM apply_time_log_delta(NEW.task_id, NEW.user_id, NEW.project_id, NEW.start_time, NEW.duration_minutes, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_time_logs_rollups ON task_time_logs;
+CREATE TRIGGER trg_time_logs_rollups
+    AFTER INSERT OR DELETE OR UPDATE OF task_id, user_id, start_time, end_time ON task_time_logs
+    FOR EACH ROW EXECUTE FUNCTION time_logs_apply_rollups();
+
+-- Nhiệm vụ chuyển dự án: chuyển số phút của các log sang dự án mới
+-- (task_time_logs.project_id không nằm trong trigger trên log nên không tính lại lần nữa)
+CREATE OR REPLACE FUNCTION tasks_move_time_log_rollups()
+RETURNS TRIGGER AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT user_id,
+               (start_time AT TIME ZONE 'Asia/Ho_Chi_Minh')::date AS work_date,
+               SUM(duration_minutes)::int AS minutes,
+               COUNT(*)::int AS logs
+        FROM task_time_logs
+        WHERE task_id = NEW.id AND end_time IS NOT NULL
+        GROUP BY 1, 2
+    LOOP
+        PERFORM apply_time_log_rollup_delta(r.user_id, OLD.project_id, r.work_date, -r.minutes, -r.logs);
+        PERFORM apply_time_log_rollup_delta(r.user_id, NEW.project_id, r.work_date, r.minutes, r.logs);
+    END LOOP;
+
+    UPDATE task_time_logs
+    SET project_id = NEW.project_id
+    WHERE task_id = NEW.id AND project_id IS DISTINCT FROM NEW.project_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_tasks_move_time_logs ON tasks;
+CREATE TRIGGER trg_tasks_move_time_logs
+    AFTER UPDATE OF project_id ON tasks
+    FOR EACH ROW
+    WHEN (OLD.project_id IS DISTINCT FROM NEW.project_id)
+    EXECUTE FUNCTION tasks_move_time_log_rollups();
+
+-- =====================================================
+-- Đọc: tổng hợp theo ngày / tuần (thứ Hai) / cả khoảng
+-- =====================================================
+CREATE OR REPLACE FUNCTION get_time_log_rollups(
+    p_start_date DATE,
+    p_end_date DATE,
+    p_period TEXT DEFAULT 'day',              -- 'day' | 'week' | 'range'
+    p_user_id UUID DEFAULT NULL,
+    p_project_id UUID DEFAULT NULL
+)
+RETURNS TABLE(period_start DATE, user_id UUID, project_id UUID, minutes BIGINT, log_count BIGINT) AS $$
+    SELECT CASE p_period
+               WHEN 'week' THEN date_trunc('week', r.work_date)::date
+               WHEN 'range' THEN p_start_date
+               ELSE r.work_date
+           END AS period_start,
+           r.user_id,
+           r.project_id,
+           SUM(r.minutes) AS minutes,
+           SUM(r.log_count) AS log_count
+    FROM time_log_daily_rollups r
+    WHERE r.work_date BETWEEN p_start_date AND p_end_date
+      AND (p_user_id IS NULL OR r.user_id = p_user_id)
+      AND (p_project_id IS NULL OR r.project_id = p_project_id)
+      AND r.log_count > 0
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- Kiểm tra / sửa lệch: số dòng tổng hợp và số nhiệm vụ (có log) bị lệch,
+-- p_repair = true thì tính lại từ task_time_logs
+-- =====================================================
+CREATE OR REPLACE VIEW time_log_rollups_actual AS
+    SELECT l.user_id,
+           t.project_id,
+           (l.start_time AT TIME ZONE 'Asia/Ho_Chi_Minh')::date AS work_date,
+           SUM(l.duration_minutes)::int AS minutes,
+           COUNT(*)::int AS log_count
+    FROM task_time_logs l
+    JOIN tasks t ON t.id = l.task_id
+    WHERE l.end_time IS NOT NULL AND l.user_id IS NOT NULL
+    GROUP BY 1, 2, 3;
+
+CREATE OR REPLACE FUNCTION check_time_log_rollups(p_repair BOOLEAN DEFAULT false)
+RETURNS TABLE(rollup_rows_mismatched INTEGER, tasks_mismatched INTEGER) AS $$
+DECLARE
+    v_rollups INTEGER;
+    v_tasks INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO v_rollups
+    FROM time_log_rollups_actual a
+    FULL OUTER JOIN (SELECT * FROM time_log_daily_rollups WHERE log_count > 0) r
+        ON r.user_id = a.user_id
+       AND COALESCE(r.project_id, '00000000-0000-0000-0000-000000000000'::uuid)
+         = COALESCE(a.project_id, '00000000-0000-0000-0000-000000000000'::uuid)
+       AND r.work_date = a.work_date
+    WHERE (r.minutes, r.log_count) IS DISTINCT FROM (a.minutes, a.log_count);
+
+    -- Nhiệm vụ không có log giữ time_spent nhập tay
+    SELECT COUNT(*) INTO v_tasks
+    FROM tasks t
+    JOIN (
+        SELECT task_id, COALESCE(SUM(duration_minutes), 0)::int AS minutes
+        FROM task_time_logs
+        GROUP BY task_id
+    ) a ON a.task_id = t.id
+    WHERE COALESCE(t.time_spent, 0) <> a.minutes;
+
+    IF p_repair THEN
+        UPDATE task_time_logs l
+        SET project_id = t.project_id
+        FROM tasks t
+        WHERE t.id = l.task_id AND l.project_id IS DISTINCT FROM t.project_id;
+    END IF;
+
+    IF p_repair AND v_rollups > 0 THEN
+        DELETE FROM time_log_daily_rollups;
+        INSERT INTO time_log_daily_rollups (user_id, project_id, work_date, minutes, log_count)
+        SELECT user_id, project_id, work_date, minutes, log_count FROM time_log_rollups_actual;
+    END IF;
+
+    IF p_repair AND v_tasks > 0 THEN
+        UPDATE tasks t SET time_spent = a.minutes
+        FROM (
+            SELECT task_id, COALESCE(SUM(duration_minutes), 0)::int AS minutes
+            FROM task_time_logs
+            GROUP BY task_id
+        ) a
+        WHERE a.task_id = t.id AND COALESCE(t.time_spent, 0) <> a.minutes;
+    END IF;
+
+    RETURN QUERY SELECT v_rollups, v_tasks;
+END;
+$$ LANGUAGE plpgsql;
+
+-- RLS - chỉ service role truy cập
+ALTER TABLE time_log_daily_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Khởi tạo giá trị từ dữ liệu hiện có
+SELECT * FROM check_time_log_rollups(true);
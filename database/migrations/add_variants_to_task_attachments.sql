@@ -0,0 +1,6 @@
+-- Add variants column to task_attachments table
+-- Stores URLs of generated image variants, e.g. {"thumb": "...", "medium": "..."}
+-- Variants are created in the background by services/image_variant_service.py
+
+ALTER TABLE task_attachments
+ADD COLUMN IF NOT EXISTS variants JSONB;
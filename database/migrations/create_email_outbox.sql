@@ -0,0 +1,39 @@
+-- =====================================================
+-- EMAIL OUTBOX
+-- Hàng đợi email bền vững, worker nền (services/email_outbox_service.py) gửi
+-- với retry + backoff; thất bại quá max_attempts chuyển sang 'dead'
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    email_type VARCHAR(50) NOT NULL,          -- notification, quote, quote_approved, password_change
+    to_email VARCHAR(255) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb, -- keyword arguments cho EmailService
+    email_log_id UUID,                        -- email_logs được cập nhật sent/failed khi gửi xong
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'sending', 'sent', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    provider VARCHAR(20),
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    sent_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Bảng đã tạo trước khi có cột email_log_id
+ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS email_log_id UUID;
+
+-- Index cho worker lấy các email đến hạn
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+ON email_outbox(next_attempt_at)
+WHERE status IN ('pending', 'sending');
+
+-- Index để xem dead letters
+CREATE INDEX IF NOT EXISTS idx_email_outbox_dead
+ON email_outbox(created_at DESC)
+WHERE status = 'dead';
+
+-- RLS - chỉ service role truy cập
+ALTER TABLE email_outbox ENABLE ROW LEVEL SECURITY;
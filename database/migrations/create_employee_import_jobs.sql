@@ -0,0 +1,45 @@
+-- =====================================================
+-- EMPLOYEE IMPORT JOBS
+-- Theo dõi import nhân viên từ Excel theo lô (services/employee_onboarding_service.py):
+-- mỗi job ghi trạng thái từng dòng, upload lại cùng file với job_id để tiếp tục
+-- các dòng chưa xong (bỏ qua dòng đã 'done', dùng lại tài khoản đã tạo)
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS employee_import_jobs (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    file_name VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'running'
+        CHECK (status IN ('running', 'completed', 'completed_with_errors', 'failed')),
+    total_rows INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    created_by UUID REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS employee_import_rows (
+    job_id UUID NOT NULL REFERENCES employee_import_jobs(id) ON DELETE CASCADE,
+    row_number INTEGER NOT NULL,                -- số dòng trong file Excel
+    email VARCHAR(255),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'auth_created', 'done', 'error')),
+    user_id UUID,                               -- tài khoản auth đã tạo (dùng lại khi tiếp tục)
+    employee_id UUID,
+    employee_code VARCHAR(50),
+    error TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (job_id, row_number)
+);
+
+-- Index cho cấp mã nhân viên theo khối (LIKE 'EMPyyyymm%')
+CREATE INDEX IF NOT EXISTS idx_employees_employee_code_pattern
+ON employees(employee_code varchar_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_employee_import_jobs_created
+ON employee_import_jobs(created_at DESC);
+
+-- RLS - chỉ service role truy cập
+ALTER TABLE employee_import_jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE employee_import_rows ENABLE ROW LEVEL SECURITY;
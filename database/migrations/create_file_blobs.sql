@@ -0,0 +1,93 @@
+-- =====================================================
+-- CONTENT-ADDRESSED FILE INDEX
+-- Dedup các file giống hệt nhau (cùng SHA-256) trong Storage
+-- Dùng bởi services/file_upload_service.py (deduplicate=True)
+-- =====================================================
+
+-- Bước 1: Bảng index blob theo hash nội dung
+CREATE TABLE IF NOT EXISTS file_blobs (
+    bucket VARCHAR(100) NOT NULL,
+    sha256 CHAR(64) NOT NULL,
+    storage_path TEXT NOT NULL,
+    file_size BIGINT,
+    content_type VARCHAR(100),
+    ref_count INTEGER NOT NULL DEFAULT 1,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_referenced_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (bucket, sha256)
+);
+
+-- Index cho delete theo đường dẫn
+CREATE UNIQUE INDEX IF NOT EXISTS idx_file_blobs_bucket_path
+ON file_blobs(bucket, storage_path);
+
+-- Bước 2: Tăng ref_count khi upload trùng nội dung (atomic)
+CREATE OR REPLACE FUNCTION acquire_file_blob(p_bucket TEXT, p_sha256 TEXT)
+RETURNS TABLE(storage_path TEXT, ref_count INTEGER)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Dòng đã về 0 trỏ tới object đã bị xóa: bỏ đi để upload lại và index lại
+    DELETE FROM file_blobs fb
+    WHERE fb.bucket = p_bucket AND fb.sha256 = p_sha256 AND fb.ref_count <= 0;
+
+    RETURN QUERY
+    UPDATE file_blobs fb
+    SET ref_count = fb.ref_count + 1,
+        last_referenced_at = NOW()
+    WHERE fb.bucket = p_bucket AND fb.sha256 = p_sha256 AND fb.ref_count > 0
+    RETURNING fb.storage_path, fb.ref_count;
+END;
+$$;
+
+-- Bước 3: Giảm ref_count khi xóa; xóa dòng index khi về 0
+-- Trả về ref_count còn lại cho các path có trong index
+CREATE OR REPLACE FUNCTION release_file_blobs(p_bucket TEXT, p_storage_paths TEXT[])
+RETURNS TABLE(storage_path TEXT, ref_count INTEGER)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Hai câu lệnh riêng: DELETE trong CTE không thấy các dòng vừa UPDATE ở CTE khác
+    -- Path lặp lại trong mảng giảm đúng số lần xuất hiện
+    UPDATE file_blobs fb
+    SET ref_count = fb.ref_count - requested.n
+    FROM (
+        SELECT path, count(*)::INTEGER AS n
+        FROM unnest(p_storage_paths) AS path
+        GROUP BY path
+    ) requested
+    WHERE fb.bucket = p_bucket AND fb.storage_path = requested.path;
+
+    -- Các object hết tham chiếu (ref_count = 0): caller xóa chúng khỏi Storage
+    RETURN QUERY
+    DELETE FROM file_blobs fb
+    WHERE fb.bucket = p_bucket
+      AND fb.storage_path = ANY(p_storage_paths)
+      AND fb.ref_count <= 0
+    RETURNING fb.storage_path, 0;
+
+    RETURN QUERY
+    SELECT fb.storage_path, fb.ref_count
+    FROM file_blobs fb
+    WHERE fb.bucket = p_bucket AND fb.storage_path = ANY(p_storage_paths);
+END;
+$$;
+
+-- Dọn các dòng đã về 0 do phiên bản cũ của release_file_blobs để lại
+-- (object của chúng đã bị xóa khỏi Storage)
+DELETE FROM file_blobs WHERE ref_count <= 0;
+
+-- Bước 4: RLS - chỉ service role truy cập
+ALTER TABLE file_blobs ENABLE ROW LEVEL SECURITY;
+
+-- =====================================================
+-- VERIFICATION QUERIES
+-- =====================================================
+
+-- Path lặp lại (chạy trong transaction rồi ROLLBACK):
+-- BEGIN;
+-- INSERT INTO file_blobs (bucket, sha256, storage_path, ref_count)
+-- VALUES ('check', repeat('a', 64), 'check/a.pdf', 3), ('check', repeat('b', 64), 'check/b.pdf', 2);
+-- SELECT * FROM release_file_blobs('check', ARRAY['check/a.pdf', 'check/a.pdf', 'check/b.pdf', 'check/b.pdf']);
+-- -- Kỳ vọng: ('check/a.pdf', 1) và ('check/b.pdf', 0); dòng check/b.pdf đã bị xóa
+-- ROLLBACK;
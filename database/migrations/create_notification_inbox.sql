@@ -0,0 +1,196 @@
+-- =====================================================
+-- NOTIFICATION INBOX
+-- Phân trang theo cursor (created_at, id), bộ đếm chưa đọc theo user được trigger
+-- cập nhật khi insert/đọc/xóa, và lưu trữ thông báo đã đọc cũ sang bảng archive
+-- (services/notification_service.py, routers/notifications.py)
+-- =====================================================
+
+-- Index cho inbox: keyset pagination theo (created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_notifications_user_inbox
+ON notifications(user_id, created_at DESC, id DESC);
+
+-- Index cho danh sách chưa đọc và mark-read (chỉ chạm các dòng chưa đọc)
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread
+ON notifications(user_id, created_at DESC)
+WHERE is_read = false;
+
+-- =====================================================
+-- Bộ đếm theo user: badge đọc 1 dòng theo khóa chính
+-- =====================================================
+CREATE TABLE IF NOT EXISTS notification_counters (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    total_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Trigger theo statement (transition tables): một bulk insert của dispatcher
+-- chỉ cập nhật mỗi user một lần
+CREATE OR REPLACE FUNCTION notification_counters_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO notification_counters AS c (user_id, unread_count, total_count, updated_at)
+    SELECT user_id,
+           COUNT(*) FILTER (WHERE NOT COALESCE(is_read, false)),
+           COUNT(*),
+           NOW()
+    FROM new_rows
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        unread_count = c.unread_count + EXCLUDED.unread_count,
+        total_count = c.total_count + EXCLUDED.total_count,
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notification_counters_on_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO notification_counters AS c (user_id, unread_count, total_count, updated_at)
+    SELECT user_id, SUM(unread), SUM(total), NOW()
+    FROM (
+        SELECT user_id, CASE WHEN COALESCE(is_read, false) THEN 0 ELSE 1 END AS unread, 1 AS total
+        FROM new_rows
+        UNION ALL
+        SELECT user_id, CASE WHEN COALESCE(is_read, false) THEN 0 ELSE -1 END, -1
+        FROM old_rows
+    ) changes
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+    HAVING SUM(unread) <> 0 OR SUM(total) <> 0
+    ON CONFLICT (user_id) DO UPDATE SET
+        unread_count = GREATEST(c.unread_count + EXCLUDED.unread_count, 0),
+        total_count = GREATEST(c.total_count + EXCLUDED.total_count, 0),
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notification_counters_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE notification_counters c SET
+        unread_count = GREATEST(c.unread_count - d.unread, 0),
+        total_count = GREATEST(c.total_count - d.total, 0),
+        updated_at = NOW()
+    FROM (
+        SELECT user_id,
+               COUNT(*) FILTER (WHERE NOT COALESCE(is_read, false)) AS unread,
+               COUNT(*) AS total
+        FROM old_rows
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+    ) d
+    WHERE c.user_id = d.user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notification_counters_insert ON notifications;
+CREATE TRIGGER trg_notification_counters_insert
+    AFTER INSERT ON notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notification_counters_on_insert();
+
+DROP TRIGGER IF EXISTS trg_notification_counters_update ON notifications;
+CREATE TRIGGER trg_notification_counters_update
+    AFTER UPDATE ON notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notification_counters_on_update();
+
+DROP TRIGGER IF EXISTS trg_notification_counters_delete ON notifications;
+CREATE TRIGGER trg_notification_counters_delete
+    AFTER DELETE ON notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notification_counters_on_delete();
+
+-- Khởi tạo bộ đếm từ dữ liệu hiện có
+INSERT INTO notification_counters (user_id, unread_count, total_count, updated_at)
+SELECT user_id,
+       COUNT(*) FILTER (WHERE NOT COALESCE(is_read, false)),
+       COUNT(*),
+       NOW()
+FROM notifications
+WHERE user_id IS NOT NULL
+GROUP BY user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    unread_count = EXCLUDED.unread_count,
+    total_count = EXCLUDED.total_count,
+    updated_at = NOW();
+
+-- Thống kê theo type (GROUP BY trên server thay vì tải toàn bộ dòng về backend)
+CREATE OR REPLACE FUNCTION get_notification_type_counts(p_user_id UUID)
+RETURNS TABLE(type VARCHAR, count BIGINT) AS $$
+    SELECT n.type, COUNT(*)
+    FROM notifications n
+    WHERE n.user_id = p_user_id
+    GROUP BY n.type;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- Lưu trữ: thông báo đã đọc cũ hơn N ngày chuyển khỏi bảng nóng
+-- =====================================================
+CREATE TABLE IF NOT EXISTS notifications_archive (
+    id UUID PRIMARY KEY,
+    user_id UUID,
+    title VARCHAR(255) NOT NULL,
+    message TEXT NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    entity_type VARCHAR(50),
+    entity_id UUID,
+    is_read BOOLEAN DEFAULT true,
+    read_at TIMESTAMP WITH TIME ZONE,
+    action_url TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Index cho job lưu trữ (chỉ các dòng đã đọc)
+CREATE INDEX IF NOT EXISTS idx_notifications_read_created
+ON notifications(created_at)
+WHERE is_read = true;
+
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_user
+ON notifications_archive(user_id, created_at DESC);
+
+-- Chuyển tối đa p_batch_size dòng mỗi lần gọi; trả về số dòng đã xóa khỏi notifications
+-- (kể cả dòng đã có sẵn trong archive) để vòng lặp bên Python chỉ dừng khi hết dòng
+CREATE OR REPLACE FUNCTION archive_read_notifications(
+    p_older_than_days INTEGER DEFAULT 90,
+    p_batch_size INTEGER DEFAULT 5000
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH candidates AS (
+        SELECT id FROM notifications
+        WHERE is_read = true
+          AND created_at < NOW() - make_interval(days => p_older_than_days)
+        ORDER BY created_at
+        LIMIT p_batch_size
+    ),
+    deleted AS (
+        DELETE FROM notifications n
+        USING candidates c
+        WHERE n.id = c.id
+        RETURNING n.id, n.user_id, n.title, n.message, n.type, n.entity_type, n.entity_id,
+                  n.is_read, n.read_at, n.action_url, n.created_at
+    ),
+    archived AS (
+        INSERT INTO notifications_archive (id, user_id, title, message, type, entity_type, entity_id,
+                                           is_read, read_at, action_url, created_at)
+        SELECT * FROM deleted
+        ON CONFLICT (id) DO NOTHING
+    )
+    SELECT COUNT(*) INTO moved FROM deleted;
+
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- RLS - chỉ service role truy cập
+ALTER TABLE notification_counters ENABLE ROW LEVEL SECURITY;
+ALTER TABLE notifications_archive ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,24 @@
+-- =====================================================
+-- STORAGE ORPHANED FILES
+-- Object Storage không xóa được khi dọn nhiệm vụ/nhóm đã xóa
+-- (services/task_cleanup_service.py): dòng dữ liệu vẫn được xóa hẳn, còn
+-- đường dẫn object được ghi vào đây để các lần chạy sau thử xóa lại.
+-- Quá max attempts (TASK_CLEANUP_ORPHAN_MAX_ATTEMPTS) thì giữ lại để kiểm tra tay
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS storage_orphaned_files (
+    bucket VARCHAR(100) NOT NULL,
+    storage_path TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    last_attempt_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (bucket, storage_path)
+);
+
+-- Index cho lần dọn tiếp theo (các object còn được thử lại)
+CREATE INDEX IF NOT EXISTS idx_storage_orphaned_files_attempts
+ON storage_orphaned_files(attempts, created_at);
+
+-- RLS - chỉ service role truy cập
+ALTER TABLE storage_orphaned_files ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,72 @@
+-- =====================================================
+-- TASK BOARD
+-- Phân trang theo cursor (created_at, id) cho danh sách nhiệm vụ và một RPC trả
+-- về số bình luận / tệp đính kèm / người được gán / tiến độ checklist cho cả
+-- trang trong một truy vấn (routers/tasks.py: GET /api/tasks/board)
+-- =====================================================
+
+-- Keyset pagination: nhiệm vụ chưa xóa, mới nhất trước
+CREATE INDEX IF NOT EXISTS idx_tasks_active_created
+ON tasks(created_at DESC, id DESC)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_active_project_created
+ON tasks(project_id, created_at DESC, id DESC)
+WHERE deleted_at IS NULL;
+
+-- Index cho các phép đếm theo task_id
+CREATE INDEX IF NOT EXISTS idx_task_attachments_task_id ON task_attachments(task_id);
+CREATE INDEX IF NOT EXISTS idx_task_comments_task_id ON task_comments(task_id);
+CREATE INDEX IF NOT EXISTS idx_task_assignments_task_id ON task_assignments(task_id);
+CREATE INDEX IF NOT EXISTS idx_task_checklists_task_id ON task_checklists(task_id);
+CREATE INDEX IF NOT EXISTS idx_task_checklist_items_checklist_id ON task_checklist_items(checklist_id);
+
+-- Thống kê thẻ nhiệm vụ cho nhiều task cùng lúc (mỗi bảng được group một lần)
+CREATE OR REPLACE FUNCTION get_task_card_stats(p_task_ids UUID[])
+RETURNS TABLE(
+    task_id UUID,
+    comment_count INTEGER,
+    attachment_count INTEGER,
+    assignee_count INTEGER,
+    checklist_item_count INTEGER,
+    checklist_completed_count INTEGER
+) AS $$
+    WITH ids AS (
+        SELECT DISTINCT unnest(p_task_ids) AS task_id
+    ),
+    comments AS (
+        SELECT c.task_id, COUNT(*)::int AS n
+        FROM task_comments c JOIN ids USING (task_id)
+        GROUP BY c.task_id
+    ),
+    attachments AS (
+        SELECT a.task_id, COUNT(*)::int AS n
+        FROM task_attachments a JOIN ids USING (task_id)
+        GROUP BY a.task_id
+    ),
+    assignments AS (
+        SELECT a.task_id, COUNT(*)::int AS n
+        FROM task_assignments a JOIN ids USING (task_id)
+        GROUP BY a.task_id
+    ),
+    checklist_items AS (
+        SELECT cl.task_id,
+               COUNT(i.id)::int AS total,
+               COUNT(i.id) FILTER (WHERE i.is_completed)::int AS done
+        FROM task_checklists cl
+        JOIN ids USING (task_id)
+        JOIN task_checklist_items i ON i.checklist_id = cl.id
+        GROUP BY cl.task_id
+    )
+    SELECT ids.task_id,
+           COALESCE(comments.n, 0),
+           COALESCE(attachments.n, 0),
+           COALESCE(assignments.n, 0),
+           COALESCE(checklist_items.total, 0),
+           COALESCE(checklist_items.done, 0)
+    FROM ids
+    LEFT JOIN comments USING (task_id)
+    LEFT JOIN attachments USING (task_id)
+    LEFT JOIN assignments USING (task_id)
+    LEFT JOIN checklist_items USING (task_id);
+$$ LANGUAGE sql STABLE;